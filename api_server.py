@@ -22,6 +22,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from bot.api.credit_sync_api import router as credit_router
+from bot.api.market_api import router as market_router
 from bot.models import init_db, close_db
 
 # 创建FastAPI应用
@@ -125,6 +126,9 @@ async def health_check():
 # 注册积分同步路由
 app.include_router(credit_router)
 
+# 注册市场行情路由
+app.include_router(market_router)
+
 
 # 主程序入口
 if __name__ == "__main__":
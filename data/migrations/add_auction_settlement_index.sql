@@ -0,0 +1,6 @@
+-- 为拍卖表添加结算索引
+-- 说明: 拍卖改由到期计时服务在结束时间精确结算，启动时按此索引载入进行中的拍卖，
+--       不再扫描整张拍卖表
+
+-- 创建索引
+CREATE INDEX IF NOT EXISTS ix_auctions_active_ends_at ON auctions(is_active, ends_at);
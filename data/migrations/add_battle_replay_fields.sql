@@ -0,0 +1,15 @@
+-- 为战斗记录表添加重放字段
+-- 说明: 每场战斗由独立随机种子驱动，保存种子和开战属性快照后可精确重放
+
+-- 随机种子（63位整数）
+ALTER TABLE battle_records ADD COLUMN seed BIGINT;
+
+-- 开战时双方属性快照（JSON）
+ALTER TABLE battle_records ADD COLUMN snapshot TEXT;
+
+-- 注释说明
+-- 旧记录 seed/snapshot 为空，无法重放
+-- 重放命令: .战斗回放 <战斗记录ID>（仅管理员）
+
+-- PostgreSQL: 战斗类型枚举新增竞技场（SQLite 无需执行）
+-- ALTER TYPE battletype ADD VALUE IF NOT EXISTS 'ARENA';
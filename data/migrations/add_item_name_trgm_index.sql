@@ -0,0 +1,8 @@
+-- 物品名 trigram 索引（可选，仅 PostgreSQL）
+-- 说明: 物品名子串搜索默认使用启动时载入的内存 n-gram 索引；
+--       配置 NAME_SEARCH_BACKEND=pg_trgm 后改由数据库完成，LIKE '%名称%' 可使用下面的 GIN 索引。
+--       pg_trgm 按“单词字符”切分，中文需要数据库使用非 C 的 locale（如 zh_CN.UTF-8）才能被正确索引。
+
+-- PostgreSQL
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS ix_items_name_trgm ON items USING gin (name gin_trgm_ops);
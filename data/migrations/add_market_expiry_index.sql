@@ -0,0 +1,12 @@
+-- 为市场表添加过期清理索引
+-- 说明: 过期未售出的上架物品由定时任务分批退还卖家并删除上架记录，
+--       部分索引只包含未售出的记录，清理时按过期时间直接定位
+
+-- SQLite
+CREATE INDEX IF NOT EXISTS ix_markets_unsold_expires_at ON markets(expires_at) WHERE is_sold = 0;
+
+-- PostgreSQL
+-- CREATE INDEX IF NOT EXISTS ix_markets_unsold_expires_at ON markets(expires_at) WHERE NOT is_sold;
+
+-- MySQL 不支持部分索引，使用普通索引
+-- CREATE INDEX ix_markets_unsold_expires_at ON markets(expires_at);
@@ -0,0 +1,56 @@
+-- 挂单交易（买卖盘撮合）迁移
+-- 说明: 新增挂单表；挂单撮合的成交同样写入交易记录，
+--       交易记录改为可不关联一口价市场订单，并记录买卖双方挂单
+
+-- ============================================
+-- 1. 挂单表
+-- ============================================
+CREATE TABLE IF NOT EXISTS market_orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    player_id INTEGER NOT NULL REFERENCES players(id),
+    item_id INTEGER NOT NULL REFERENCES items(id),
+
+    side VARCHAR(4) NOT NULL,  -- BUY, SELL
+    price INTEGER NOT NULL,  -- 单价
+    quantity INTEGER NOT NULL,  -- 挂单数量
+    filled_quantity INTEGER NOT NULL DEFAULT 0,  -- 已成交数量
+
+    is_active BOOLEAN NOT NULL DEFAULT 1,
+
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    closed_at DATETIME NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_market_orders_player_id ON market_orders(player_id);
+CREATE INDEX IF NOT EXISTS ix_market_orders_active_item ON market_orders(is_active, item_id);
+
+-- ============================================
+-- 2. 交易记录关联挂单
+-- ============================================
+-- SQLite 不支持修改列约束，重建表以允许 market_id 为空
+-- （PostgreSQL 可直接执行:
+--   ALTER TABLE trade_records ALTER COLUMN market_id DROP NOT NULL;
+--   ALTER TABLE trade_records ADD COLUMN buy_order_id INTEGER REFERENCES market_orders(id);
+--   ALTER TABLE trade_records ADD COLUMN sell_order_id INTEGER REFERENCES market_orders(id);）
+CREATE TABLE trade_records_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    market_id INTEGER NULL REFERENCES markets(id),
+    buy_order_id INTEGER NULL REFERENCES market_orders(id),
+    sell_order_id INTEGER NULL REFERENCES market_orders(id),
+    seller_id INTEGER NOT NULL REFERENCES players(id),
+    buyer_id INTEGER NOT NULL REFERENCES players(id),
+    item_id INTEGER NOT NULL REFERENCES items(id),
+    quantity INTEGER NOT NULL,
+    total_price INTEGER NOT NULL,
+    tax INTEGER NOT NULL DEFAULT 0,
+    traded_at DATETIME NOT NULL
+);
+
+INSERT INTO trade_records_new (id, market_id, seller_id, buyer_id, item_id, quantity, total_price, tax, traded_at)
+SELECT id, market_id, seller_id, buyer_id, item_id, quantity, total_price, tax, traded_at FROM trade_records;
+
+DROP TABLE trade_records;
+ALTER TABLE trade_records_new RENAME TO trade_records;
+
+CREATE INDEX IF NOT EXISTS ix_trade_records_seller_id ON trade_records(seller_id);
+CREATE INDEX IF NOT EXISTS ix_trade_records_buyer_id ON trade_records(buyer_id);
@@ -0,0 +1,6 @@
+-- 为市场表添加列表分页索引
+-- 说明: 市场列表改为按 (上架时间, 订单ID) 倒序的键集分页，
+--       翻页直接从索引定位，不再使用 OFFSET
+
+-- 创建索引
+CREATE INDEX IF NOT EXISTS ix_markets_open_listed ON markets(is_sold, listed_at, id);
@@ -0,0 +1,26 @@
+-- 为玩家表添加战力字段
+-- 说明: 战力原为按属性实时计算的属性方法，现改为持久化字段并建索引，
+--       战力榜可直接按索引排序。之后由模型在 攻击/防御/气血上限/速度/暴击率/境界 变化时自动重算
+
+-- 添加战力字段
+ALTER TABLE players ADD COLUMN combat_power BIGINT DEFAULT 0 NOT NULL;
+
+-- 按现有属性回填（与 bot.models.player.calculate_combat_power 保持一致）
+UPDATE players SET combat_power = CAST(
+    CAST(attack * 3 + defense * 2 + max_hp * 0.5 + speed * 0.8 + crit_rate * 1000 AS INTEGER)
+    * CASE realm
+        WHEN 'QI_REFINING' THEN 1.0 + realm_level * 0.1
+        WHEN 'FOUNDATION' THEN 5.0 + realm_level * 2.0
+        WHEN 'CORE_FORMATION' THEN 25.0 + realm_level * 10.0
+        WHEN 'NASCENT_SOUL' THEN 125.0 + realm_level * 50.0
+        WHEN 'DEITY_TRANSFORMATION' THEN 625.0 + realm_level * 250.0
+        ELSE 1.0
+      END
+AS INTEGER);
+
+-- 创建索引以优化战力排序
+CREATE INDEX IF NOT EXISTS ix_players_combat_power ON players(combat_power);
+
+-- 注释说明
+-- 境界倍率表见 bot.models.player.REALM_POWER_MULTIPLIERS
+-- PostgreSQL 的 CAST(... AS INTEGER) 为四舍五入，回填值可能与程序计算差1，下次属性变化时自动校正
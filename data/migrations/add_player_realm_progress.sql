@@ -0,0 +1,40 @@
+-- 为玩家表添加修炼进度字段
+-- 说明: 修炼进度 = 到达当前境界的累计修为（RealmConfig.get_cumulative_exp）+ 当前修为，
+--       随修炼和突破单调递增。境界榜和个人境界排名都按此字段排序，
+--       之后由模型在 境界/小等级/修为 变化时自动重算
+
+-- 添加修炼进度字段
+ALTER TABLE players ADD COLUMN realm_progress BIGINT DEFAULT 0 NOT NULL;
+
+-- 按现有境界回填（各境界累计修为与 RealmConfig 保持一致）
+UPDATE players SET realm_progress = cultivation_exp + CASE
+    WHEN realm = 'QI_REFINING' AND realm_level = 1 THEN 10000
+    WHEN realm = 'QI_REFINING' AND realm_level = 2 THEN 25000
+    WHEN realm = 'QI_REFINING' AND realm_level = 3 THEN 47500
+    WHEN realm = 'QI_REFINING' AND realm_level = 4 THEN 81250
+    WHEN realm = 'QI_REFINING' AND realm_level = 5 THEN 131875
+    WHEN realm = 'QI_REFINING' AND realm_level = 6 THEN 207813
+    WHEN realm = 'QI_REFINING' AND realm_level = 7 THEN 321719
+    WHEN realm = 'QI_REFINING' AND realm_level = 8 THEN 492578
+    WHEN realm = 'QI_REFINING' AND realm_level = 9 THEN 748867
+    WHEN realm = 'QI_REFINING' AND realm_level = 10 THEN 1133301
+    WHEN realm = 'QI_REFINING' AND realm_level = 11 THEN 1709951
+    WHEN realm = 'QI_REFINING' AND realm_level = 12 THEN 2574926
+    WHEN realm = 'QI_REFINING' AND realm_level = 13 THEN 3872389
+    WHEN realm = 'FOUNDATION' AND realm_level = 0 THEN 5872389
+    WHEN realm = 'FOUNDATION' AND realm_level = 1 THEN 10872389
+    WHEN realm = 'FOUNDATION' AND realm_level = 2 THEN 20872389
+    WHEN realm = 'CORE_FORMATION' AND realm_level = 0 THEN 45872389
+    WHEN realm = 'CORE_FORMATION' AND realm_level = 1 THEN 85872389
+    WHEN realm = 'CORE_FORMATION' AND realm_level = 2 THEN 145872389
+    WHEN realm = 'NASCENT_SOUL' AND realm_level = 0 THEN 245872389
+    WHEN realm = 'NASCENT_SOUL' AND realm_level = 1 THEN 395872389
+    WHEN realm = 'NASCENT_SOUL' AND realm_level = 2 THEN 645872389
+    WHEN realm = 'DEITY_TRANSFORMATION' AND realm_level = 0 THEN 695872389
+    WHEN realm = 'DEITY_TRANSFORMATION' AND realm_level = 1 THEN 775872389
+    WHEN realm = 'DEITY_TRANSFORMATION' AND realm_level = 2 THEN 895872389
+    ELSE 0
+END;
+
+-- 创建索引以优化境界排序
+CREATE INDEX IF NOT EXISTS ix_players_realm_progress ON players(realm_progress);
@@ -0,0 +1,23 @@
+-- 物品成交行情迁移
+-- 说明: 按物品、按小时/按天汇总成交（开/高/低/收、成交量、成交额），
+--       每笔成交写入交易记录时在同一事务内更新；
+--       已有交易记录在新版本启动时自动回填（K线表为空时）
+
+CREATE TABLE IF NOT EXISTS price_candles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id INTEGER NOT NULL REFERENCES items(id),
+    period VARCHAR(4) NOT NULL,  -- HOUR, DAY
+    period_start DATETIME NOT NULL,  -- 周期起始时间
+
+    -- 成交单价
+    open INTEGER NOT NULL,
+    high INTEGER NOT NULL,
+    low INTEGER NOT NULL,
+    close INTEGER NOT NULL,
+
+    volume INTEGER NOT NULL,  -- 成交数量
+    turnover BIGINT NOT NULL,  -- 成交额
+    trade_count INTEGER NOT NULL,  -- 成交笔数
+
+    CONSTRAINT uq_price_candles_item_period_start UNIQUE (item_id, period, period_start)
+);
@@ -0,0 +1,14 @@
+-- 消息自动删除计划迁移
+-- 说明: 自动删除的消息不再各自启动一个睡眠任务，而是登记到删除服务的时间堆中，
+--       并批量写入本表；重启后从本表载入，已到期的立即删除
+
+CREATE TABLE IF NOT EXISTS scheduled_deletions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id BIGINT NOT NULL,
+    message_id BIGINT NOT NULL,
+    delete_at DATETIME NOT NULL,  -- 删除时间
+
+    CONSTRAINT uq_scheduled_deletions_chat_message UNIQUE (chat_id, message_id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_scheduled_deletions_delete_at ON scheduled_deletions (delete_at);
@@ -0,0 +1,7 @@
+-- 世界BOSS攻击日志序号
+-- 说明: 世界BOSS战斗状态在内存中结算、定期批量写回，每次攻击先写入预写日志
+--       （RAID_JOURNAL_DIR/boss_<id>.journal）。journal_seq 记录已写回到的日志序号，
+--       崩溃重启后只重放之后的攻击，不会重复计算伤害
+
+-- SQLite / PostgreSQL / MySQL
+ALTER TABLE world_bosses ADD COLUMN journal_seq BIGINT NOT NULL DEFAULT 0;
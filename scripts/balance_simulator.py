@@ -0,0 +1,198 @@
+"""离线数值平衡模拟器
+
+按 PlayerService 的境界属性规则为每个境界/小境界生成标准玩家，
+对 data/init_monsters.sql 中的全部怪物进行批量模拟战斗（多进程），
+输出胜率与每小时收益矩阵 CSV，用于上线前检验平衡改动。
+
+用法:
+    python scripts/balance_simulator.py -o data/balance.csv
+    python scripts/balance_simulator.py --simulations 2000 --strategy aggressive --workers 8
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+# 添加项目路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# 离线运行不连接 Telegram，配置要求的 Token 给一个占位值
+os.environ.setdefault("BOT_TOKEN", "offline-balance-simulator")
+
+from bot.config import settings
+from bot.models import Monster, Player, RealmType, Skill
+from bot.services.battle_engine import Combatant, CombatSkill
+from bot.services.battle_simulator import BattleSimulator
+from bot.services.battle_strategy import BattleStrategy
+from bot.services.player_service import PlayerService
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+# 每个境界的小境界范围
+REALM_LEVELS = {
+    RealmType.MORTAL: [0],
+    RealmType.QI_REFINING: list(range(1, 14)),
+    RealmType.FOUNDATION: [0, 1, 2],
+    RealmType.CORE_FORMATION: [0, 1, 2],
+    RealmType.NASCENT_SOUL: [0, 1, 2],
+    RealmType.DEITY_TRANSFORMATION: [0, 1, 2],
+}
+
+REALM_ORDER = {realm: index for index, realm in enumerate(RealmType)}
+
+FIVE_ELEMENTS = ["金", "木", "水", "火", "土"]
+
+CSV_FIELDS = [
+    "realm", "realm_level", "spirit_root", "skills",
+    "monster_id", "monster", "monster_realm", "monster_level",
+    "win_rate", "draw_rate", "expected_rounds", "expected_hp_loss",
+    "exp_per_hour", "spirit_stones_per_hour",
+]
+
+
+def load_sql_rows(sql_path: str, model) -> List[Dict]:
+    """把初始化 SQL 脚本导入内存 SQLite，按模型字段读出所有行"""
+    columns = [column.name for column in model.__table__.columns if column.name != "id"]
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        f"CREATE TABLE {model.__tablename__} (id INTEGER PRIMARY KEY AUTOINCREMENT, {', '.join(columns)})"
+    )
+    with open(sql_path, encoding="utf-8") as f:
+        conn.executescript(f.read())
+    rows = [dict(row) for row in conn.execute(f"SELECT * FROM {model.__tablename__} ORDER BY id")]
+    conn.close()
+    return rows
+
+
+def parse_realm(value) -> RealmType:
+    """解析SQL中的境界字段（可能是枚举值、枚举名或“炼气期3层”这样的描述）"""
+    for realm in RealmType:
+        if value == realm.name or (value and str(value).startswith(realm.value)):
+            return realm
+    return RealmType.MORTAL
+
+
+def build_population(skill_rows: List[Dict], strategy: BattleStrategy, root_size: int) -> List[Dict]:
+    """按境界规则生成标准玩家（每个境界 × 每种主修元素一个）"""
+    population = []
+    for realm, levels in REALM_LEVELS.items():
+        for level in levels:
+            for index, element in enumerate(FIVE_ELEMENTS):
+                elements = [FIVE_ELEMENTS[(index + i) % 5] for i in range(root_size)]
+
+                player = Player(
+                    id=len(population) + 1,
+                    nickname=f"{realm.value}{level}-{element}",
+                    realm=realm,
+                    realm_level=level,
+                    battle_strategy=strategy.value,
+                    crit_rate=Player.__table__.c.crit_rate.default.arg,
+                    crit_damage=Player.__table__.c.crit_damage.default.arg,
+                )
+                PlayerService.apply_realm_attributes(player)
+
+                # 凡人尚未入道，不会法术
+                skills = []
+                if realm != RealmType.MORTAL:
+                    for row in skill_rows:
+                        if not row["damage_multiplier"] or row["element"] not in elements:
+                            continue
+                        if REALM_ORDER[parse_realm(row["required_realm"])] > REALM_ORDER[realm]:
+                            continue
+                        effects = json.loads(row["special_effects"]) if row["special_effects"] else ()
+                        skills.append(CombatSkill(
+                            row["id"], row["name"], row["element"], row["base_power"] or 0,
+                            row["damage_multiplier"], row["spiritual_cost"], effects=effects or (),
+                        ))
+
+                unit = Combatant.from_player(player, skills, elements)
+                population.append({
+                    "realm": realm.value,
+                    "realm_level": level,
+                    "spirit_root": "".join(elements),
+                    "snapshot": unit.to_snapshot(),
+                })
+    return population
+
+
+def simulate_archetype(args: Tuple[Dict, List[Dict], int, int, int]) -> List[Dict]:
+    """子进程：一个标准玩家对全部怪物"""
+    archetype, monsters, simulations, max_rounds, seed = args
+    unit = Combatant.from_snapshot(archetype["snapshot"])
+    fights_per_hour = 3600 / settings.PVE_COOLDOWN
+
+    rows = []
+    for offset, monster_row in enumerate(monsters):
+        monster = Combatant.from_monster(Monster(**monster_row))
+        result = BattleSimulator.simulate(unit, monster, simulations, max_rounds, seed + offset)
+        avg_stones = (monster_row["spirit_stones_min"] + monster_row["spirit_stones_max"]) / 2
+
+        rows.append({
+            "realm": archetype["realm"],
+            "realm_level": archetype["realm_level"],
+            "spirit_root": archetype["spirit_root"],
+            "skills": len(unit.skills),
+            "monster_id": monster_row["id"],
+            "monster": monster_row["name"],
+            "monster_realm": monster_row["realm"],
+            "monster_level": monster_row["level"],
+            "win_rate": round(result.win_rate, 4),
+            # 1 - 胜率 - 负率 的浮点误差可能得到 -0.0
+            "draw_rate": round(max(0.0, result.draw_rate), 4),
+            "expected_rounds": round(result.expected_rounds, 2),
+            "expected_hp_loss": round(result.expected_hp_loss, 1),
+            "exp_per_hour": round(result.win_rate * monster_row["exp_reward"] * fights_per_hour, 1),
+            "spirit_stones_per_hour": round(result.win_rate * avg_stones * fights_per_hour, 1),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线数值平衡模拟器")
+    parser.add_argument("-o", "--output", default=os.path.join(DATA_DIR, "balance_matrix.csv"), help="输出CSV路径")
+    parser.add_argument("--monsters", default=os.path.join(DATA_DIR, "init_monsters.sql"), help="怪物数据SQL")
+    parser.add_argument("--skills", default=os.path.join(DATA_DIR, "init_skills_new.sql"), help="技能数据SQL")
+    parser.add_argument("--simulations", type=int, default=1000, help="每个组合的模拟场数")
+    parser.add_argument("--strategy", default=BattleStrategy.BALANCED.value,
+                        choices=[strategy.value for strategy in BattleStrategy], help="标准玩家战斗策略")
+    parser.add_argument("--root-size", type=int, default=3, choices=range(1, 6), help="标准玩家灵根数量")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="进程数")
+    parser.add_argument("--seed", type=int, default=20241, help="随机种子（相同种子结果可复现）")
+    args = parser.parse_args()
+
+    monsters = load_sql_rows(args.monsters, Monster)
+    skills = load_sql_rows(args.skills, Skill) if args.skills else []
+    population = build_population(skills, BattleStrategy(args.strategy), args.root_size)
+
+    total_fights = len(population) * len(monsters) * args.simulations
+    print(f"⚖️ 标准玩家 {len(population)} 个 × 怪物 {len(monsters)} 个 × {args.simulations} 场 = {total_fights:,} 场战斗")
+
+    started = time.time()
+    tasks = [
+        (archetype, monsters, args.simulations, settings.MAX_BATTLE_ROUNDS, args.seed + index * len(monsters))
+        for index, archetype in enumerate(population)
+    ]
+
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for done, rows in enumerate(pool.map(simulate_archetype, tasks), start=1):
+                writer.writerows(rows)
+                if done % 10 == 0 or done == len(tasks):
+                    print(f"  已完成 {done}/{len(tasks)}...")
+
+    elapsed = time.time() - started
+    print(f"✅ 完成，用时 {elapsed:.1f} 秒（{total_fights / max(elapsed, 1e-9):,.0f} 场/秒）")
+    print(f"📄 结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""市场行情API接口
+
+提供物品成交行情查询，供网页、其他项目查询物品价格。
+
+API端点：
+- GET /api/market/prices/{item_id} - 查询参考价和最近的日/小时行情
+- GET /api/market/prices/{item_id}/candles - 查询K线
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.models import get_db
+from bot.models.market import PriceCandle, PricePeriod
+from bot.services.price_history_service import PriceHistoryService
+
+# 创建路由
+router = APIRouter(prefix="/api/market", tags=["market"])
+
+
+# ============================================
+# 响应模型
+# ============================================
+
+class CandleResponse(BaseModel):
+    """K线"""
+    period_start: datetime
+    open: int
+    high: int
+    low: int
+    close: int
+    volume: int
+    vwap: int
+    trade_count: int
+
+    @classmethod
+    def from_candle(cls, candle: Optional[PriceCandle]) -> Optional["CandleResponse"]:
+        if candle is None:
+            return None
+        return cls(
+            period_start=candle.period_start,
+            open=candle.open,
+            high=candle.high,
+            low=candle.low,
+            close=candle.close,
+            volume=candle.volume,
+            vwap=candle.vwap,
+            trade_count=candle.trade_count,
+        )
+
+
+class PriceResponse(BaseModel):
+    """物品行情"""
+    item_id: int
+    reference_price: Optional[int]
+    day: Optional[CandleResponse]
+    hour: Optional[CandleResponse]
+
+
+class CandlesResponse(BaseModel):
+    """K线列表"""
+    item_id: int
+    period: PricePeriod
+    candles: List[CandleResponse]
+
+
+# ============================================
+# API端点
+# ============================================
+
+@router.get("/prices/{item_id}", response_model=PriceResponse)
+async def get_price(item_id: int, db: AsyncSession = Depends(get_db)):
+    """查询物品参考价（最近一个交易日的成交量加权均价）和最近的日/小时行情"""
+    day = await PriceHistoryService.latest(db, item_id, PricePeriod.DAY)
+    hour = await PriceHistoryService.latest(db, item_id, PricePeriod.HOUR)
+
+    return PriceResponse(
+        item_id=item_id,
+        reference_price=day.vwap if day else None,
+        day=CandleResponse.from_candle(day),
+        hour=CandleResponse.from_candle(hour),
+    )
+
+
+@router.get("/prices/{item_id}/candles", response_model=CandlesResponse)
+async def get_candles(
+    item_id: int,
+    period: PricePeriod = PricePeriod.HOUR,
+    limit: int = Query(24, ge=1, le=200),
+    db: AsyncSession = Depends(get_db)
+):
+    """查询物品最近的K线（按时间先后）"""
+    candles = await PriceHistoryService.candles(db, item_id, period, limit)
+
+    return CandlesResponse(
+        item_id=item_id,
+        period=period,
+        candles=[CandleResponse.from_candle(candle) for candle in candles],
+    )
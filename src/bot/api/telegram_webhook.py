@@ -0,0 +1,104 @@
+"""Telegram Webhook 端点
+
+以 Webhook 模式运行时，Telegram 把更新 POST 到本端点，端点把更新放入
+`Application.update_queue`，之后与长轮询模式走完全相同的处理流程。
+
+本地调试可以直接 POST 录制好的更新 JSON：
+    curl -X POST http://localhost:8443/telegram/webhook \\
+         -H "Content-Type: application/json" \\
+         -H "X-Telegram-Bot-Api-Secret-Token: <WEBHOOK_SECRET>" \\
+         -d @update.json
+"""
+import hmac
+import logging
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Request, status
+from telegram import Update
+from telegram.ext import Application
+
+from bot.config import settings
+from bot.utils.message_dispatcher import OutboundDispatcher
+
+logger = logging.getLogger(__name__)
+
+
+def create_webhook_router(
+    application: Application,
+    path: str = settings.WEBHOOK_PATH,
+    secret: str = settings.WEBHOOK_SECRET
+) -> APIRouter:
+    """创建接收 Telegram 更新的路由"""
+    router = APIRouter(tags=["telegram"])
+
+    @router.post(path)
+    async def receive_update(
+        request: Request,
+        x_telegram_bot_api_secret_token: Optional[str] = Header(None)
+    ):
+        """接收一条更新并放入处理队列"""
+        if secret and not hmac.compare_digest(x_telegram_bot_api_secret_token or "", secret):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无效的Webhook密钥")
+
+        try:
+            update = Update.de_json(await request.json(), application.bot)
+        except Exception as e:
+            logger.warning(f"无法解析的Webhook更新: {e}")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无效的更新数据")
+
+        await application.update_queue.put(update)
+        return {"ok": True}
+
+    return router
+
+
+def create_webhook_app(application: Application, allowed_updates: List[str]) -> FastAPI:
+    """创建 Webhook 模式的 ASGI 应用
+
+    应用的生命周期与 Bot 绑定：启动时初始化 Bot、执行 post_init 并注册 Webhook，
+    关闭时按相反顺序停止，与 `run_polling` 的生命周期回调保持一致。
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await application.initialize()
+        if application.post_init:
+            await application.post_init(application)
+
+        if settings.WEBHOOK_URL:
+            webhook_url = settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH
+            await application.bot.set_webhook(
+                url=webhook_url,
+                secret_token=settings.WEBHOOK_SECRET or None,
+                allowed_updates=allowed_updates,
+                drop_pending_updates=True,
+            )
+            logger.info(f"Webhook 已注册: {webhook_url}")
+        else:
+            logger.info("未配置 WEBHOOK_URL，跳过注册（仅接收本地推送的更新）")
+
+        await application.start()
+        try:
+            yield
+        finally:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+            await application.shutdown()
+            if application.post_shutdown:
+                await application.post_shutdown(application)
+
+    app = FastAPI(title=f"{settings.GAME_NAME} Webhook", lifespan=lifespan, docs_url=None, redoc_url=None)
+    app.include_router(create_webhook_router(application))
+
+    @app.get("/health", tags=["system"])
+    async def health_check():
+        """健康检查端点"""
+        health = {"status": "healthy", "service": "telegram_webhook", "pending_updates": application.update_queue.qsize()}
+        rate_limiter = application.bot.rate_limiter
+        if isinstance(rate_limiter, OutboundDispatcher):
+            health["outbound"] = rate_limiter.stats()
+        return health
+
+    return app
@@ -138,6 +138,9 @@ class RealmConfig:
     def get_cumulative_exp(realm: RealmType, realm_level: int) -> int:
         """获取当前境界的累计总修为 (用于对比计算)
 
+        只累加已圆满的大境界和当前大境界内已达到的小等级，
+        因此随境界提升严格递增。
+
         Args:
             realm: 当前大境界
             realm_level: 当前小等级
@@ -148,7 +151,7 @@ class RealmConfig:
         total = 0
 
         # 计算炼气期
-        if realm.value in ["炼气期", "筑基期", "结丹期", "元婴期", "化神期"]:
+        if realm.value in ["筑基期", "结丹期", "元婴期", "化神期"]:
             for level in range(1, 14):
                 total += RealmConfig.QI_REFINING_EXP[level]
 
@@ -158,7 +161,7 @@ class RealmConfig:
             return total
 
         # 计算筑基期
-        if realm.value in ["筑基期", "结丹期", "元婴期", "化神期"]:
+        if realm.value in ["结丹期", "元婴期", "化神期"]:
             for stage in range(3):
                 total += RealmConfig.FOUNDATION_EXP[stage]
 
@@ -168,7 +171,7 @@ class RealmConfig:
             return total
 
         # 计算结丹期
-        if realm.value in ["结丹期", "元婴期", "化神期"]:
+        if realm.value in ["元婴期", "化神期"]:
             for stage in range(3):
                 total += RealmConfig.CORE_FORMATION_EXP[stage]
 
@@ -178,7 +181,7 @@ class RealmConfig:
             return total
 
         # 计算元婴期
-        if realm.value in ["元婴期", "化神期"]:
+        if realm.value in ["化神期"]:
             for stage in range(3):
                 total += RealmConfig.NASCENT_SOUL_EXP[stage]
 
@@ -189,8 +192,6 @@ class RealmConfig:
 
         # 计算化神期
         if realm == RealmType.DEITY_TRANSFORMATION:
-            for stage in range(3):
-                total += RealmConfig.DEITY_TRANSFORMATION_EXP[stage]
             for stage in range(realm_level + 1):
                 total += RealmConfig.DEITY_TRANSFORMATION_EXP[stage]
             return total
@@ -17,18 +17,33 @@ class Settings(BaseSettings):
     # Telegram Bot配置
     BOT_TOKEN: str = Field(..., description="Telegram Bot Token")
     BOT_USERNAME: str = Field(default="", description="Bot用户名")
+    MAX_CONCURRENT_UPDATES: int = Field(default=64, description="同时处理的更新数上限（同一玩家的更新始终串行）")
+
+    # 运行模式：polling（长轮询）或 webhook（内置HTTP端点接收更新）
+    BOT_MODE: str = Field(default="polling", description="运行模式 polling/webhook")
+    WEBHOOK_URL: str = Field(default="", description="Webhook公网地址（如 https://bot.example.com），为空时不向Telegram注册")
+    WEBHOOK_PATH: str = Field(default="/telegram/webhook", description="Webhook端点路径")
+    WEBHOOK_SECRET: str = Field(default="", description="Webhook密钥（校验 X-Telegram-Bot-Api-Secret-Token）")
+    WEBHOOK_LISTEN: str = Field(default="0.0.0.0", description="Webhook监听地址")
+    WEBHOOK_PORT: int = Field(default=8443, description="Webhook监听端口")
 
     # 数据库配置
     DATABASE_URL: str = Field(
         default="sqlite+aiosqlite:///./data/xiuxian.db",
         description="数据库连接URL"
     )
+    NAME_SEARCH_BACKEND: str = Field(
+        default="memory",
+        description="物品名子串搜索方式 memory（内存n-gram索引）/pg_trgm（PostgreSQL trigram索引）"
+    )
 
     # Redis配置（可选）
     REDIS_HOST: str = Field(default="localhost", description="Redis主机")
     REDIS_PORT: int = Field(default=6379, description="Redis端口")
     REDIS_DB: int = Field(default=0, description="Redis数据库")
     REDIS_PASSWORD: str = Field(default="", description="Redis密码")
+    REDIS_ENABLED: bool = Field(default=True, description="是否使用Redis（不可用时自动退回进程内缓存）")
+    PLAYER_CACHE_TTL: int = Field(default=300, description="玩家资料缓存有效期（秒）")
 
     # 游戏配置
     GAME_NAME: str = Field(default="修仙世界", description="游戏名称")
@@ -54,6 +69,21 @@ class Settings(BaseSettings):
     SECT_CREATE_COST: int = Field(default=50000, description="创建宗门消耗灵石（已降低50%）")
     SECT_MAX_MEMBERS_BASE: int = Field(default=20, description="宗门基础最大成员数")
 
+    # 定时任务配置
+    SCHEDULER_BATCH_SIZE: int = Field(default=1000, description="定时任务批量更新每批行数")
+
+    # 世界BOSS战斗配置
+    RAID_JOURNAL_DIR: str = Field(default="./data/raid_journal", description="世界BOSS攻击预写日志目录")
+    RAID_FLUSH_INTERVAL_MS: int = Field(default=500, description="世界BOSS战斗状态写回间隔（毫秒）")
+    RAID_FLUSH_HITS: int = Field(default=200, description="累计多少次攻击后立即写回")
+
+    # 出站消息限速（Telegram 洪水限制：全局约 30 条/秒，单聊约 1 条/秒，群组约 20 条/分钟）
+    OUTBOUND_GLOBAL_RATE: float = Field(default=30, description="全局每秒最多发送的请求数")
+    OUTBOUND_CHAT_RATE: float = Field(default=1, description="单个私聊每秒最多发送的请求数")
+    OUTBOUND_GROUP_RATE_PER_MINUTE: float = Field(default=20, description="单个群组每分钟最多发送的请求数")
+    OUTBOUND_CHAT_BURST: int = Field(default=3, description="单个聊天允许的突发请求数")
+    OUTBOUND_MAX_RETRIES: int = Field(default=3, description="被限流（RetryAfter）后的最大重试次数")
+
     # 日志配置
     LOG_LEVEL: str = Field(default="INFO", description="日志级别")
     LOG_FILE: str = Field(default="./data/logs/xiuxian.log", description="日志文件路径")
@@ -66,6 +96,11 @@ class Settings(BaseSettings):
         """是否生产环境"""
         return self.LOG_LEVEL == "INFO"
 
+    @property
+    def use_webhook(self) -> bool:
+        """是否以Webhook模式运行"""
+        return self.BOT_MODE.lower() == "webhook"
+
     @property
     def redis_url(self) -> str:
         """Redis连接URL"""
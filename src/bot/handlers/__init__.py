@@ -3,12 +3,14 @@ from . import (
     start, cultivation, spirit_root, realm, skill, quest, battle,
     inventory, shop, sect, ranking, signin, rename,
     cultivation_method, alchemy, lifespan, refinery, market, core_quality,
-    divine_sense, spirit_beast, formation, talisman, cave_dwelling, adventure, achievement, sect_war, arena, world_boss, credit_shop
+    divine_sense, spirit_beast, formation, talisman, cave_dwelling, adventure, achievement, sect_war, arena, world_boss, credit_shop,
+    admin
 )
 
 __all__ = [
     "start", "cultivation", "spirit_root", "realm", "skill", "quest", "battle",
     "inventory", "shop", "sect", "ranking", "signin", "rename",
     "cultivation_method", "alchemy", "lifespan", "refinery", "market", "core_quality",
-    "divine_sense", "spirit_beast", "formation", "talisman", "cave_dwelling", "adventure", "achievement", "sect_war", "arena", "world_boss", "credit_shop"
+    "divine_sense", "spirit_beast", "formation", "talisman", "cave_dwelling", "adventure", "achievement", "sect_war", "arena", "world_boss", "credit_shop",
+    "admin"
 ]
@@ -0,0 +1,49 @@
+"""管理员命令处理器"""
+from telegram import Update
+from telegram.ext import MessageHandler, filters, ContextTypes
+
+from bot.config import settings
+from bot.services.game_catalog import GameCatalog
+from bot.services.price_history_service import PriceHistoryService
+
+
+async def reload_catalog_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """重新载入静态游戏数据（管理员） - .重载数据"""
+    user = update.effective_user
+
+    if user.id not in settings.ADMIN_IDS:
+        await update.message.reply_text("❌ 仅管理员可用")
+        return
+
+    try:
+        counts = await GameCatalog.load()
+    except Exception as e:
+        await update.message.reply_text(f"❌ 重载失败，继续使用原有数据：{e}")
+        return
+
+    lines = ["✅ 静态数据已重新载入", ""]
+    lines.extend(f"• {name}：{count}" for name, count in counts.items())
+    await update.message.reply_text("\n".join(lines))
+
+
+async def backfill_prices_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """从交易记录重新生成行情K线（管理员） - .重建行情"""
+    user = update.effective_user
+
+    if user.id not in settings.ADMIN_IDS:
+        await update.message.reply_text("❌ 仅管理员可用")
+        return
+
+    try:
+        count = await PriceHistoryService.backfill()
+    except Exception as e:
+        await update.message.reply_text(f"❌ 重建失败：{e}")
+        return
+
+    await update.message.reply_text(f"✅ 行情已重建，共 {count} 根K线")
+
+
+def register_handlers(application):
+    """注册管理员处理器"""
+    application.add_handler(MessageHandler(filters.Regex(r"^\.重载数据"), reload_catalog_command))
+    application.add_handler(MessageHandler(filters.Regex(r"^\.重建行情"), backfill_prices_command))
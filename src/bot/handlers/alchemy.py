@@ -4,9 +4,10 @@ from telegram import Update
 from telegram.ext import MessageHandler, filters, ContextTypes, CommandHandler
 
 from bot.models.database import AsyncSessionLocal
-from bot.models import Player, Item
+from bot.models import Player
 from bot.models.alchemy import PillRecipe, PlayerAlchemy
 from bot.services.alchemy_service import AlchemyService
+from bot.services.game_catalog import GameCatalog
 from sqlalchemy import select
 
 
@@ -105,10 +106,7 @@ async def recipes_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             status_icon = "✅" if can_refine else "🔒"
 
             # 获取产出丹药信息
-            result = await session.execute(
-                select(Item).where(Item.id == recipe.result_pill_id)
-            )
-            pill = result.scalar_one_or_none()
+            pill = (await GameCatalog.get(session)).items_by_id.get(recipe.result_pill_id)
             pill_name = pill.name if pill else "未知丹药"
 
             msg += f"{status_icon} **{recipe.name}**\n"
@@ -121,10 +119,7 @@ async def recipes_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             ingredients = json.loads(recipe.ingredients)
             ingredient_names = []
             for ing in ingredients:
-                result = await session.execute(
-                    select(Item).where(Item.id == ing["item_id"])
-                )
-                item = result.scalar_one_or_none()
+                item = (await GameCatalog.get(session)).items_by_id.get(ing["item_id"])
                 if item:
                     ingredient_names.append(f"{item.name}x{ing['quantity']}")
 
@@ -131,6 +131,7 @@ async def challenge_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         else:
             result_message += f"💔 失败\n"
 
+        result_message += f"⚔️ 鏖战 {result_data['rounds']} 回合（战斗记录 #{result_data['battle_id']}）\n"
         result_message += f"积分变化: {result_data['points_change']:+d}\n"
 
         if result_data["win_streak"] > 0:
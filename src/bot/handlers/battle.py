@@ -2,25 +2,23 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import MessageHandler, filters, ContextTypes, CommandHandler, CallbackQueryHandler
 
+from bot.config import settings
 from bot.models.database import AsyncSessionLocal
-from bot.models import Player, Monster, PlayerSkill, Skill
-from bot.services import BattleService, SkillService
+from bot.models import Player, PlayerSkill, Skill
+from bot.services import BattleService, PlayerService, SkillService
+from bot.services.battle_simulator import BattleSimulator
 from bot.services.battle_strategy import BattleAI, BattleStrategy
+from bot.services.game_catalog import GameCatalog
+from bot.utils.concurrency import battles
+from bot.utils.player_context import player_session
 from sqlalchemy import select
 import random
 
 
 async def battle_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """开始PVE战斗 - /battle [怪物名称]"""
-    user = update.effective_user
-
-    async with AsyncSessionLocal() as session:
-        # 获取玩家
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    # 按战斗档位预加载技能和灵根，战斗时不再单独查询
+    async with player_session(update, context, "combat") as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -82,10 +80,7 @@ async def battle_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         # 获取怪物
-        result = await session.execute(
-            select(Monster).where(Monster.name == monster_name)
-        )
-        monster = result.scalar_one_or_none()
+        monster = (await GameCatalog.get(session)).monsters_by_name.get(monster_name)
 
         if not monster:
             await update.message.reply_text(
@@ -105,12 +100,12 @@ async def battle_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(msg)
 
         # 执行战斗
-        result, battle_log, rewards = await BattleService.battle_pve(
+        result, report, rewards = await BattleService.battle_pve(
             session, player, monster
         )
 
         # 发送战斗日志
-        log_msg = "```\n" + "\n".join(battle_log) + "\n```"
+        log_msg = "```\n" + "\n".join(report.render()) + "\n```"
         await update.message.reply_text(log_msg, parse_mode="Markdown")
 
         # 发送结果摘要
@@ -132,13 +127,7 @@ async def battle_pvp_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """PVP战斗 - /pvp [@username 或 回复消息]"""
     user = update.effective_user
 
-    async with AsyncSessionLocal() as session:
-        # 获取攻击方
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        attacker = result.scalar_one_or_none()
-
+    async with player_session(update, context, "combat") as (session, attacker):
         if not attacker:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -172,17 +161,14 @@ async def battle_pvp_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
             return
 
         # 获取防守方玩家
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == defender_id)
-        )
-        defender = result.scalar_one_or_none()
+        defender = await PlayerService.load_player(session, defender_id, "combat")
 
         if not defender:
             await update.message.reply_text("❌ 对方还未开始游戏")
             return
 
         # 检查防守方是否可以被挑战
-        if defender.is_in_battle:
+        if battles.busy(defender.id):
             await update.message.reply_text("❌ 对方正在战斗中")
             return
 
@@ -205,12 +191,12 @@ async def battle_pvp_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await update.message.reply_text(msg)
 
         # 执行战斗
-        result, battle_log, rewards = await BattleService.battle_pvp(
+        result, report, rewards = await BattleService.battle_pvp(
             session, attacker, defender
         )
 
         # 发送战斗日志
-        log_msg = "```\n" + "\n".join(battle_log) + "\n```"
+        log_msg = "```\n" + "\n".join(report.render()) + "\n```"
         await update.message.reply_text(log_msg, parse_mode="Markdown")
 
         # 发送结果
@@ -409,8 +395,122 @@ async def battle_strategy_command(update: Update, context: ContextTypes.DEFAULT_
         await update.message.reply_text(msg, parse_mode="Markdown")
 
 
+async def battle_replay_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """重放历史战斗（管理员） - /战斗回放 <战斗记录ID>"""
+    user = update.effective_user
+
+    if user.id not in settings.ADMIN_IDS:
+        await update.message.reply_text("❌ 仅管理员可用")
+        return
+
+    if not context.args or not context.args[0].isdigit():
+        await update.message.reply_text("❌ 用法：/战斗回放 <战斗记录ID>")
+        return
+
+    record_id = int(context.args[0])
+
+    async with AsyncSessionLocal() as session:
+        record, report, verified = await BattleService.replay_battle(session, record_id)
+
+    if not record:
+        await update.message.reply_text(f"❌ 未找到战斗记录 #{record_id}")
+        return
+
+    if not report:
+        await update.message.reply_text(f"❌ 战斗记录 #{record_id} 没有种子数据，无法重放")
+        return
+
+    msg = f"🎬 战斗回放 #{record.id}（{record.battle_type.value}，{record.created_at:%Y-%m-%d %H:%M}）\n"
+    msg += f"🎲 种子：{record.seed}\n"
+    msg += "✅ 重放结果与记录一致\n" if verified else "⚠️ 重放结果与记录不一致\n"
+
+    log_msg = msg + "```\n" + "\n".join(report.render()) + "\n```"
+    await update.message.reply_text(log_msg, parse_mode="Markdown")
+
+
+async def battle_predict_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """挑战预测 - /挑战预测 <怪物名称> 或回复对方消息预测切磋"""
+    # 双方都按战斗档位预加载，模拟时不再逐项查询技能和装备
+    async with player_session(update, context, "combat") as (session, player):
+        if not player:
+            await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
+            return
+
+        if update.message.reply_to_message:
+            opponent = await PlayerService.load_player(
+                session, update.message.reply_to_message.from_user.id, "combat"
+            )
+            if not opponent or opponent.id == player.id:
+                await update.message.reply_text("❌ 无法预测与该玩家的切磋")
+                return
+
+            opponent_name = opponent.nickname
+            prediction = await BattleSimulator.predict_pvp(session, player, opponent)
+        elif context.args:
+            monster_name = " ".join(context.args)
+            monster = (await GameCatalog.get(session)).monsters_by_name.get(monster_name)
+            if not monster:
+                await update.message.reply_text(f"❌ 未找到怪物：{monster_name}")
+                return
+
+            opponent_name = monster.name
+            prediction = await BattleSimulator.predict_pve(session, player, monster)
+        else:
+            await update.message.reply_text(
+                "❌ 用法：/挑战预测 <怪物名称>\n"
+                "或在对方消息上回复 /挑战预测 预测切磋"
+            )
+            return
+
+    msg = f"🔮 【挑战预测】{player.nickname} VS {opponent_name}\n\n"
+    msg += f"🎯 胜率：{prediction.win_rate:.1%}\n"
+    msg += f"💀 败率：{prediction.lose_rate:.1%}\n"
+    if prediction.draw_rate > 0:
+        msg += f"⏱️ 平局：{prediction.draw_rate:.1%}\n"
+    msg += f"🔁 预计回合：{prediction.expected_rounds:.1f}\n"
+    msg += f"❤️ 预计损血：{prediction.expected_hp_loss:.0f}/{player.hp}\n\n"
+    msg += f"💡 基于 {prediction.simulations:,} 场模拟战斗"
+
+    await update.message.reply_text(msg)
+
+
+async def balance_sweep_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """怪物平衡扫描（管理员） - /平衡测试"""
+    user = update.effective_user
+
+    if user.id not in settings.ADMIN_IDS:
+        await update.message.reply_text("❌ 仅管理员可用")
+        return
+
+    async with player_session(update, context, "combat") as (session, player):
+        if not player:
+            await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
+            return
+
+        sweep = await BattleSimulator.sweep_monsters(session, player)
+
+    msg = f"⚖️ 【平衡测试】{player.nickname}（{player.full_realm_name}）\n"
+    msg += "怪物 | 胜率 | 回合 | 损血\n"
+    msg += "━━━━━━━━━━━━━━\n"
+    for monster, prediction in sweep:
+        line = (
+            f"{monster.name}({monster.level}) | {prediction.win_rate:.0%} | "
+            f"{prediction.expected_rounds:.1f} | {prediction.expected_hp_loss:.0f}\n"
+        )
+        if len(msg) + len(line) > 3900:
+            msg += "…（结果过长已截断）"
+            break
+        msg += line
+
+    await update.message.reply_text(msg)
+
+
 def register_handlers(application):
     """注册战斗相关处理器"""
+    # 回放/预测命令需在 .战斗 和竞技场 .挑战 之前注册，避免被前缀匹配
+    application.add_handler(MessageHandler(filters.Regex(r"^\.战斗回放"), battle_replay_command))
+    application.add_handler(MessageHandler(filters.Regex(r"^\.挑战预测"), battle_predict_command))
+    application.add_handler(MessageHandler(filters.Regex(r"^\.平衡测试"), balance_sweep_command))
     application.add_handler(MessageHandler(filters.Regex(r"^\.战斗"), battle_command))
     application.add_handler(MessageHandler(filters.Regex(r"^\.切磋"), battle_pvp_command))
     application.add_handler(MessageHandler(filters.Regex(r"^\.施法"), use_skill_command))
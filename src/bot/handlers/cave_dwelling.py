@@ -7,12 +7,13 @@ from telegram.ext import MessageHandler, filters, ContextTypes, CommandHandler,
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.models import Player, Item, PlayerInventory
+from bot.models import Player, PlayerInventory
 from bot.models.cave_dwelling import (
     CaveDwelling, CaveRoom, SpiritField, CaveUpgradeRecord,
     CaveDwellingGrade, CaveRoomType
 )
 from bot.models.database import get_db
+from bot.services.game_catalog import GameCatalog
 from bot.services.player_service import PlayerService
 from bot.services.spirit_field_service import SpiritFieldService
 
@@ -488,13 +489,21 @@ async def plant_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         # 查找种子物品
-        result = await db.execute(
-            select(Item).where(Item.name.like(f"%{seed_name}%"))
-        )
-        seed_items = result.scalars().all()
+        catalog = await GameCatalog.get(db)
+        # 同名物品只取一条（与 items_by_name 一致）
+        seed_items = [
+            item for item in map(catalog.items_by_id.get, catalog.item_names.contains(seed_name))
+            if catalog.items_by_name[item.name] is item
+        ]
 
         if not seed_items:
-            await update.message.reply_text(f"❌ 未找到种子：{seed_name}")
+            text = f"❌ 未找到种子：{seed_name}"
+            similar = list(dict.fromkeys(
+                catalog.items_by_id[item_id].name for item_id, _ in catalog.item_names.search(seed_name, limit=3)
+            ))
+            if similar:
+                text += f"\n你要找的是不是：{'、'.join(similar)}"
+            await update.message.reply_text(text)
             return
 
         if len(seed_items) > 1:
@@ -509,10 +518,7 @@ async def plant_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # TODO: 这里应该有个种子到产出物的映射表
         # 简化处理：假设种子名去掉"种子"就是产出物
         harvest_name = seed_item.name.replace("种子", "").replace("种", "")
-        result = await db.execute(
-            select(Item).where(Item.name == harvest_name)
-        )
-        harvest_item = result.scalar_one_or_none()
+        harvest_item = catalog.items_by_name.get(harvest_name)
 
         if not harvest_item:
             await update.message.reply_text(f"❌ 找不到对应的收获物：{harvest_name}")
@@ -2,21 +2,16 @@
 from telegram import Update
 from telegram.ext import MessageHandler, filters, ContextTypes, CommandHandler
 
-from bot.models.database import AsyncSessionLocal
+from bot.utils.player_context import player_session
 from bot.models import Player
+from bot.services.player_cache import PlayerCache
+from bot.utils.concurrency import battles
 from sqlalchemy import select
 
 
 async def divine_sense_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """查看神识信息 - /神识"""
-    user = update.effective_user
-
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -64,8 +59,6 @@ async def divine_sense_info_command(update: Update, context: ContextTypes.DEFAUL
 
 async def train_divine_sense_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """修炼神识 - /修炼神识 [时长]"""
-    user = update.effective_user
-
     if not context.args:
         duration_hours = 1
     else:
@@ -78,12 +71,7 @@ async def train_divine_sense_command(update: Update, context: ContextTypes.DEFAU
             await update.message.reply_text("❌ 时长必须是数字")
             return
 
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -99,7 +87,7 @@ async def train_divine_sense_command(update: Update, context: ContextTypes.DEFAU
             await update.message.reply_text("❌ 修炼中无法修炼神识")
             return
 
-        if player.is_in_battle:
+        if battles.busy(player.id):
             await update.message.reply_text("❌ 战斗中无法修炼神识")
             return
 
@@ -140,8 +128,6 @@ async def train_divine_sense_command(update: Update, context: ContextTypes.DEFAU
 
 async def probe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """探查玩家 - /探查"""
-    user = update.effective_user
-
     # 检查是否回复了某人的消息
     if not update.message.reply_to_message:
         await update.message.reply_text(
@@ -152,13 +138,7 @@ async def probe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     target_user = update.message.reply_to_message.from_user
 
-    async with AsyncSessionLocal() as session:
-        # 获取探查者
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -168,11 +148,8 @@ async def probe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("❌ 神识不足，需要至少 50 点神识")
             return
 
-        # 获取目标
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == target_user.id)
-        )
-        target = result.scalar_one_or_none()
+        # 获取目标（只读资料走缓存）
+        target = await PlayerCache.get_profile(session, target_user.id)
 
         if not target:
             await update.message.reply_text("❌ 对方还未开始游戏")
@@ -202,11 +179,7 @@ async def probe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # 探查成功
         msg = f"🔍 【探查结果】\n\n"
         msg += f"👤 道号：{target.nickname}\n"
-        msg += f"🌟 境界：{target.realm}"
-        if target.realm == "炼气期":
-            msg += f" {target.level}层\n"
-        else:
-            msg += "\n"
+        msg += f"🌟 境界：{target.full_realm_name}\n"
 
         msg += f"⚔️ 攻击：{target.attack}\n"
         msg += f"🛡️ 防御：{target.defense}\n"
@@ -218,8 +191,7 @@ async def probe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             msg += f"💧 灵力：{target.spiritual_power}/{target.max_spiritual_power}\n"
 
             if target.spirit_root:
-                elements = target.spirit_root.roots
-                msg += f"💎 灵根：{elements}\n"
+                msg += f"💎 灵根：{target.spirit_root}\n"
 
         msg += f"\n💫 消耗神识：{sense_cost}"
 
@@ -228,14 +200,7 @@ async def probe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def divine_sense_scan_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """神识扫描周围 - /神识扫描"""
-    user = update.effective_user
-
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -2,24 +2,17 @@
 from telegram import Update
 from telegram.ext import MessageHandler, filters, ContextTypes, CommandHandler
 
-from bot.models.database import AsyncSessionLocal
-from bot.models import Player, Item, PlayerInventory, ItemType
+from bot.utils.player_context import player_session
+from bot.models import Item, PlayerInventory, ItemType
 from bot.models.item import EquipmentQuality, EquipmentSlot
 from bot.services.equipment_service import EquipmentService
+from bot.services.game_catalog import GameCatalog
 from sqlalchemy import select
 
 
 async def inventory_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """查看背包 - /背包"""
-    user = update.effective_user
-
-    async with AsyncSessionLocal() as session:
-        # 获取玩家
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -140,8 +133,6 @@ async def inventory_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def use_item_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """使用物品 - /使用 <物品名>"""
-    user = update.effective_user
-
     if not context.args:
         await update.message.reply_text(
             "❌ 请指定物品名称\n"
@@ -152,13 +143,7 @@ async def use_item_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     item_name = " ".join(context.args)
 
-    async with AsyncSessionLocal() as session:
-        # 获取玩家
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -240,8 +225,6 @@ async def use_item_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def equip_item_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """装备物品 - /装备 <物品名>"""
-    user = update.effective_user
-
     if not context.args:
         await update.message.reply_text(
             "❌ 请指定物品名称\n"
@@ -252,13 +235,7 @@ async def equip_item_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
     item_name = " ".join(context.args)
 
-    async with AsyncSessionLocal() as session:
-        # 获取玩家
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -320,8 +297,6 @@ async def equip_item_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def unequip_item_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """卸下装备 - /卸下 <物品名>"""
-    user = update.effective_user
-
     if not context.args:
         await update.message.reply_text(
             "❌ 请指定物品名称\n"
@@ -332,13 +307,7 @@ async def unequip_item_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
     item_name = " ".join(context.args)
 
-    async with AsyncSessionLocal() as session:
-        # 获取玩家
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -372,8 +341,6 @@ async def unequip_item_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
 async def enhance_equipment_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """强化装备 - /强化 <物品名>"""
-    user = update.effective_user
-
     if not context.args:
         await update.message.reply_text(
             "❌ 请指定装备名称\n"
@@ -384,13 +351,7 @@ async def enhance_equipment_command(update: Update, context: ContextTypes.DEFAUL
 
     item_name = " ".join(context.args)
 
-    async with AsyncSessionLocal() as session:
-        # 获取玩家
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -467,8 +428,6 @@ async def enhance_equipment_command(update: Update, context: ContextTypes.DEFAUL
 
 async def confirm_enhance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """确认强化 - 确认强化"""
-    user = update.effective_user
-
     if 'pending_enhancement' not in context.user_data:
         await update.message.reply_text("❌ 没有待强化的装备")
         return
@@ -476,13 +435,7 @@ async def confirm_enhance_command(update: Update, context: ContextTypes.DEFAULT_
     pending_data = context.user_data['pending_enhancement']
     inventory_id = pending_data['inventory_id']
 
-    async with AsyncSessionLocal() as session:
-        # 获取玩家
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -532,8 +485,6 @@ async def confirm_enhance_command(update: Update, context: ContextTypes.DEFAULT_
 
 async def equipment_detail_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """装备详情 - /装备详情 <物品名>"""
-    user = update.effective_user
-
     if not context.args:
         await update.message.reply_text(
             "❌ 请指定装备名称\n"
@@ -544,13 +495,7 @@ async def equipment_detail_command(update: Update, context: ContextTypes.DEFAULT
 
     item_name = " ".join(context.args)
 
-    async with AsyncSessionLocal() as session:
-        # 获取玩家
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -606,11 +551,7 @@ async def equipment_detail_command(update: Update, context: ContextTypes.DEFAULT
 
         # 显示套装信息
         if item.set_id:
-            from bot.models.item import EquipmentSet
-            result = await session.execute(
-                select(EquipmentSet).where(EquipmentSet.id == item.set_id)
-            )
-            equipment_set = result.scalar_one_or_none()
+            equipment_set = (await GameCatalog.get(session)).equipment_sets_by_id.get(item.set_id)
             if equipment_set:
                 msg += f"\n━━━━━━━━━━━━━━\n"
                 msg += f"🔮 **套装信息**\n"
@@ -634,15 +575,7 @@ async def equipment_detail_command(update: Update, context: ContextTypes.DEFAULT
 
 async def set_bonus_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """套装效果 - /套装效果"""
-    user = update.effective_user
-
-    async with AsyncSessionLocal() as session:
-        # 获取玩家
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -1,15 +1,101 @@
 """市场交易和拍卖系统handlers"""
-from telegram import Update
-from telegram.ext import MessageHandler, filters, ContextTypes, CommandHandler
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import MessageHandler, filters, ContextTypes, CommandHandler, CallbackQueryHandler
 
 from bot.models.database import AsyncSessionLocal
-from bot.models import Player, Item, PlayerInventory
-from bot.services.market_service import MarketService, AuctionService
+from bot.models import Player, PlayerInventory, ItemType, OrderSide, PricePeriod
+from bot.models.item import EquipmentQuality
+from bot.services.market_service import MarketService, AuctionService, MarketFilters
+from bot.services.order_book_service import OrderBookService
+from bot.services.price_history_service import PriceHistoryService
+from bot.services.game_catalog import GameCatalog
 from sqlalchemy import select
 
+# 每个聊天保留的市场搜索数（超出后最早的搜索无法再翻页）
+MARKET_SEARCHES_KEPT = 20
+
+
+def _parse_market_filters(args) -> MarketFilters:
+    """解析市场搜索参数：物品类型/品质、价格（最高价或 最低-最高）、其余视为物品名"""
+    item_types = {t.value: t for t in ItemType}
+    qualities = {q.value: q for q in EquipmentQuality}
+
+    market_filters = {}
+    for arg in args or []:
+        low, sep, high = arg.partition("-")
+        if arg in item_types:
+            market_filters["item_type"] = item_types[arg]
+        elif arg in qualities:
+            market_filters["quality"] = qualities[arg]
+        elif arg.isdigit():
+            market_filters["max_price"] = int(arg)
+        elif sep and low.isdigit() and high.isdigit():
+            market_filters["min_price"], market_filters["max_price"] = int(low), int(high)
+        elif "item_name" not in market_filters:
+            market_filters["item_name"] = arg
+    return MarketFilters(**market_filters)
+
+
+def _remember_market_search(chat_data, message_id: int, market_filters: MarketFilters) -> None:
+    """按消息保存搜索条件，并丢弃本聊天过早的搜索"""
+    searches = chat_data.setdefault("market_searches", {})
+    searches[message_id] = market_filters
+    while len(searches) > MARKET_SEARCHES_KEPT:
+        del searches[next(iter(searches))]
+
+
+def _recall_market_search(chat_data, message_id: int):
+    """取出某条市场消息的搜索条件，已丢弃时返回 None"""
+    return chat_data.get("market_searches", {}).get(message_id)
+
+
+async def _render_market_page(session, market_filters: MarketFilters, cursor=None):
+    """生成市场列表消息和翻页按钮"""
+    items, next_cursor, total = await MarketService.search_market(
+        session, market_filters, cursor=cursor, page_size=10
+    )
+
+    if not items:
+        msg = "🏪 【市场】\n\n"
+        msg += "📦 暂无商品在售\n\n"
+        msg += "💡 使用 /上架 <背包ID> <数量> <单价> 上架物品"
+        return msg, None
+
+    msg = "🏪 【市场】\n\n"
+    if market_filters.item_name:
+        msg += f"🔍 搜索: {market_filters.item_name}\n"
+    if market_filters.item_type:
+        msg += f"📂 类型: {market_filters.item_type.value}\n"
+    if market_filters.quality:
+        msg += f"✨ 品质: {market_filters.quality.value}\n"
+    if market_filters.min_price:
+        msg += f"💰 最低价: {market_filters.min_price}\n"
+    if market_filters.max_price:
+        msg += f"💰 最高价: {market_filters.max_price}\n"
+    msg += f"📊 约 {total} 件商品\n"
+    msg += "━━━━━━━━━━━━━━\n\n"
+
+    for item in items:
+        msg += f"🆔 订单ID: {item['id']}\n"
+        msg += f"📦 {item['item_name']} x{item['quantity']}\n"
+        msg += f"💰 单价: {item['price_per_unit']} | 总价: {item['total_price']}\n"
+        msg += f"👤 卖家: {item['seller_name']}\n"
+        msg += f"⏰ 到期: {item['expires_at'].strftime('%m-%d %H:%M')}\n\n"
+
+    msg += "━━━━━━━━━━━━━━\n"
+    msg += "💡 使用 /购买 <订单ID> 购买物品\n"
+    msg += "💡 使用 /我的上架 查看自己的上架物品"
+
+    buttons = []
+    if cursor:
+        buttons.append(InlineKeyboardButton("« 首页", callback_data="market_page_"))
+    if next_cursor:
+        buttons.append(InlineKeyboardButton("下一页 »", callback_data=f"market_page_{next_cursor}"))
+    return msg, InlineKeyboardMarkup([buttons]) if buttons else None
+
 
 async def market_list_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """查看市场 - /市场 [物品名] [最高价]"""
+    """查看市场 - /市场 [物品名] [类型] [品质] [最高价 | 最低价-最高价]"""
     user = update.effective_user
 
     async with AsyncSessionLocal() as session:
@@ -22,53 +108,30 @@ async def market_list_command(update: Update, context: ContextTypes.DEFAULT_TYPE
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
 
-        # 解析参数
-        item_name = None
-        max_price = None
-
-        if context.args:
-            # 第一个参数可能是物品名
-            item_name = context.args[0]
-            # 第二个参数可能是最高价
-            if len(context.args) > 1:
-                try:
-                    max_price = int(context.args[1])
-                except ValueError:
-                    pass
-
-        # 搜索市场
-        from sqlalchemy import func
-        items, total = await MarketService.search_market(
-            session, item_name, max_price, page=1, page_size=10
-        )
-
-        if not items:
-            msg = "🏪 【市场】\n\n"
-            msg += "📦 暂无商品在售\n\n"
-            msg += "💡 使用 /上架 <背包ID> <数量> <单价> 上架物品"
-            await update.message.reply_text(msg)
-            return
+        market_filters = _parse_market_filters(context.args)
+        msg, reply_markup = await _render_market_page(session, market_filters)
 
-        msg = "🏪 【市场】\n\n"
-        if item_name:
-            msg += f"🔍 搜索: {item_name}\n"
-        if max_price:
-            msg += f"💰 最高价: {max_price}\n"
-        msg += f"📊 共找到 {total} 件商品\n"
-        msg += "━━━━━━━━━━━━━━\n\n"
-
-        for item in items:
-            msg += f"🆔 订单ID: {item['id']}\n"
-            msg += f"📦 {item['item_name']} x{item['quantity']}\n"
-            msg += f"💰 单价: {item['price_per_unit']} | 总价: {item['total_price']}\n"
-            msg += f"👤 卖家: {item['seller_name']}\n"
-            msg += f"⏰ 到期: {item['expires_at'].strftime('%m-%d %H:%M')}\n\n"
+        message = await update.message.reply_text(msg, reply_markup=reply_markup)
+        # 翻页按钮只携带游标，筛选条件跟随这条消息保存，谁点按钮都按原搜索翻页
+        if reply_markup:
+            _remember_market_search(context.chat_data, message.message_id, market_filters)
 
-        msg += "━━━━━━━━━━━━━━\n"
-        msg += "💡 使用 /购买 <订单ID> 购买物品\n"
-        msg += "💡 使用 /我的上架 查看自己的上架物品"
 
-        await update.message.reply_text(msg)
+async def market_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """市场翻页回调"""
+    query = update.callback_query
+    market_filters = _recall_market_search(context.chat_data, query.message.message_id)
+    if market_filters is None:
+        await query.answer("❌ 搜索已过期，请重新使用 /市场 搜索", show_alert=True)
+        return
+    await query.answer()
+
+    cursor = query.data.replace("market_page_", "") or None
+
+    async with AsyncSessionLocal() as session:
+        msg, reply_markup = await _render_market_page(session, market_filters, cursor)
+
+    await query.edit_message_text(msg, reply_markup=reply_markup)
 
 
 async def list_item_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -191,10 +254,7 @@ async def my_listings_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         msg = "📦 【我的上架】\n\n"
 
         for listing in listings:
-            result = await session.execute(
-                select(Item).where(Item.id == listing.item_id)
-            )
-            item = result.scalar_one_or_none()
+            item = (await GameCatalog.get(session)).items_by_id.get(listing.item_id)
             item_name = item.name if item else "未知"
 
             msg += f"🆔 订单ID: {listing.id}\n"
@@ -246,6 +306,198 @@ async def cancel_listing_command(update: Update, context: ContextTypes.DEFAULT_T
         await update.message.reply_text(msg)
 
 
+# ===== 挂单交易 =====
+
+async def buy_order_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """挂买单 - /挂买 <物品名> <数量> <单价>"""
+    user = update.effective_user
+
+    if not context.args or len(context.args) < 3:
+        await update.message.reply_text(
+            "❌ 参数错误\n"
+            "用法: /挂买 <物品名> <数量> <单价>\n"
+            "例如: /挂买 筑基丹 10 500"
+        )
+        return
+
+    try:
+        quantity = int(context.args[1])
+        price = int(context.args[2])
+    except ValueError:
+        await update.message.reply_text("❌ 数量和单价必须是数字")
+        return
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Player).where(Player.telegram_id == user.id)
+        )
+        player = result.scalar_one_or_none()
+
+        if not player:
+            await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
+            return
+
+        item = (await GameCatalog.get(session)).items_by_name.get(context.args[0])
+        if not item:
+            await update.message.reply_text(f"❌ 未找到物品【{context.args[0]}】")
+            return
+
+        success, message = await OrderBookService.place_buy_order(
+            session, player, item.id, quantity, price
+        )
+
+        await update.message.reply_text(f"✅ {message}" if success else f"❌ {message}")
+
+
+async def sell_order_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """挂卖单 - /挂卖 <背包ID> <数量> <单价>"""
+    user = update.effective_user
+
+    if not context.args or len(context.args) < 3:
+        await update.message.reply_text(
+            "❌ 参数错误\n"
+            "用法: /挂卖 <背包ID> <数量> <单价>\n"
+            "例如: /挂卖 123 10 500"
+        )
+        return
+
+    try:
+        inventory_id = int(context.args[0])
+        quantity = int(context.args[1])
+        price = int(context.args[2])
+    except ValueError:
+        await update.message.reply_text("❌ 参数必须是数字")
+        return
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Player).where(Player.telegram_id == user.id)
+        )
+        player = result.scalar_one_or_none()
+
+        if not player:
+            await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
+            return
+
+        success, message = await OrderBookService.place_sell_order(
+            session, player, inventory_id, quantity, price
+        )
+
+        msg = f"✅ {message}\n💡 提示: 成交后将收取 5% 的交易税" if success else f"❌ {message}"
+        await update.message.reply_text(msg)
+
+
+async def order_book_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """查看盘口 - /盘口 <物品名>"""
+    if not context.args:
+        await update.message.reply_text(
+            "❌ 请指定物品\n"
+            "用法: /盘口 <物品名>\n"
+            "例如: /盘口 筑基丹"
+        )
+        return
+
+    async with AsyncSessionLocal() as session:
+        item = (await GameCatalog.get(session)).items_by_name.get(context.args[0])
+        if not item:
+            await update.message.reply_text(f"❌ 未找到物品【{context.args[0]}】")
+            return
+
+        await OrderBookService.ensure_loaded(session)
+
+    depth = OrderBookService.depth(item.id)
+
+    msg = f"📈 【{item.name} 盘口】\n\n"
+    msg += "🔴 卖盘\n"
+    if depth[OrderSide.SELL]:
+        for price, quantity in reversed(depth[OrderSide.SELL]):
+            msg += f"  {price} 灵石 × {quantity}\n"
+    else:
+        msg += "  暂无卖单\n"
+    msg += "━━━━━━━━━━━━━━\n"
+    msg += "🟢 买盘\n"
+    if depth[OrderSide.BUY]:
+        for price, quantity in depth[OrderSide.BUY]:
+            msg += f"  {price} 灵石 × {quantity}\n"
+    else:
+        msg += "  暂无买单\n"
+
+    msg += "\n💡 使用 /挂买 <物品名> <数量> <单价> 挂买单\n"
+    msg += "💡 使用 /挂卖 <背包ID> <数量> <单价> 挂卖单"
+
+    await update.message.reply_text(msg)
+
+
+async def cancel_order_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """撤单 - /撤单 <挂单ID>"""
+    user = update.effective_user
+
+    if not context.args:
+        await update.message.reply_text(
+            "❌ 请指定挂单ID\n"
+            "用法: /撤单 <挂单ID>\n"
+            "例如: /撤单 123"
+        )
+        return
+
+    try:
+        order_id = int(context.args[0])
+    except ValueError:
+        await update.message.reply_text("❌ 挂单ID必须是数字")
+        return
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Player).where(Player.telegram_id == user.id)
+        )
+        player = result.scalar_one_or_none()
+
+        if not player:
+            await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
+            return
+
+        success, message = await OrderBookService.cancel_order(session, player, order_id)
+
+        await update.message.reply_text(f"✅ {message}" if success else f"❌ {message}")
+
+
+async def price_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """查看行情 - /行情 <物品名>"""
+    if not context.args:
+        await update.message.reply_text(
+            "❌ 请指定物品\n"
+            "用法: /行情 <物品名>\n"
+            "例如: /行情 筑基丹"
+        )
+        return
+
+    async with AsyncSessionLocal() as session:
+        item = (await GameCatalog.get(session)).items_by_name.get(context.args[0])
+        if not item:
+            await update.message.reply_text(f"❌ 未找到物品【{context.args[0]}】")
+            return
+
+        day = await PriceHistoryService.latest(session, item.id, PricePeriod.DAY)
+        hour = await PriceHistoryService.latest(session, item.id, PricePeriod.HOUR)
+        await OrderBookService.ensure_loaded(session)
+
+    msg = f"📊 【{item.name} 行情】\n\n"
+    if not day:
+        msg += "暂无成交记录\n"
+    else:
+        msg += f"💰 参考价: {day.vwap} 灵石\n"
+        msg += f"📅 {day.period_start.strftime('%m-%d')} 开 {day.open} | 高 {day.high} | 低 {day.low} | 收 {day.close}\n"
+        msg += f"📦 成交 {day.volume} 个，共 {day.trade_count} 笔\n"
+        if hour:
+            msg += f"⏰ {hour.period_start.strftime('%m-%d %H:00')} 收 {hour.close}，成交 {hour.volume} 个\n"
+
+    bid, ask = OrderBookService.quote(item.id)
+    if bid or ask:
+        msg += f"\n🟢 买一: {bid or '-'} | 🔴 卖一: {ask or '-'}\n"
+
+    await update.message.reply_text(msg)
+
+
 # ===== 拍卖系统 =====
 
 async def auction_list_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -283,10 +535,7 @@ async def auction_list_command(update: Update, context: ContextTypes.DEFAULT_TYP
         msg = "🔨 【拍卖行】\n\n"
 
         for auction in auctions:
-            result = await session.execute(
-                select(Item).where(Item.id == auction.item_id)
-            )
-            item = result.scalar_one_or_none()
+            item = (await GameCatalog.get(session)).items_by_id.get(auction.item_id)
             item_name = item.name if item else "未知"
 
             result = await session.execute(
@@ -481,10 +730,7 @@ async def my_auctions_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         msg = "🔨 【我的拍卖】\n\n"
 
         for auction in auctions:
-            result = await session.execute(
-                select(Item).where(Item.id == auction.item_id)
-            )
-            item = result.scalar_one_or_none()
+            item = (await GameCatalog.get(session)).items_by_id.get(auction.item_id)
             item_name = item.name if item else "未知"
 
             msg += f"🆔 拍卖ID: {auction.id}\n"
@@ -558,6 +804,14 @@ def register_handlers(application):
     application.add_handler(MessageHandler(filters.Regex(r"^\.购买"), buy_from_market_command))
     application.add_handler(MessageHandler(filters.Regex(r"^\.我的上架"), my_listings_command))
     application.add_handler(MessageHandler(filters.Regex(r"^\.取消上架"), cancel_listing_command))
+    application.add_handler(CallbackQueryHandler(market_page_callback, pattern="^market_page_"))
+
+    # 挂单交易
+    application.add_handler(MessageHandler(filters.Regex(r"^\.挂买"), buy_order_command))
+    application.add_handler(MessageHandler(filters.Regex(r"^\.挂卖"), sell_order_command))
+    application.add_handler(MessageHandler(filters.Regex(r"^\.盘口"), order_book_command))
+    application.add_handler(MessageHandler(filters.Regex(r"^\.撤单"), cancel_order_command))
+    application.add_handler(MessageHandler(filters.Regex(r"^\.行情"), price_command))
 
     # 拍卖行
     application.add_handler(MessageHandler(filters.Regex(r"^\.拍卖"), auction_list_command))
@@ -5,22 +5,14 @@ from datetime import datetime, timedelta
 from telegram import Update
 from telegram.ext import MessageHandler, filters, ContextTypes, CommandHandler
 
-from bot.models.database import AsyncSessionLocal
-from bot.models import Player, Quest, PlayerQuest, QuestType, QuestStatus
+from bot.utils.player_context import player_session
+from bot.models import Quest, PlayerQuest, QuestType, QuestStatus
 from sqlalchemy import select, and_
 
 
 async def quests_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """查看任务列表 - /quests [类型]"""
-    user = update.effective_user
-
-    async with AsyncSessionLocal() as session:
-        # 获取玩家
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -189,8 +181,6 @@ async def quests_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def accept_quest_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """接取任务 - /accept_quest <任务ID>"""
-    user = update.effective_user
-
     if not context.args:
         await update.message.reply_text(
             "❌ 请指定任务ID\n"
@@ -205,13 +195,7 @@ async def accept_quest_command(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text("❌ 任务ID必须是数字")
         return
 
-    async with AsyncSessionLocal() as session:
-        # 获取玩家
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -334,8 +318,6 @@ async def accept_quest_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
 async def complete_quest_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """完成任务并领取奖励 - /complete_quest <任务ID>"""
-    user = update.effective_user
-
     if not context.args:
         await update.message.reply_text(
             "❌ 请指定任务ID\n"
@@ -350,13 +332,7 @@ async def complete_quest_command(update: Update, context: ContextTypes.DEFAULT_T
         await update.message.reply_text("❌ 任务ID必须是数字")
         return
 
-    async with AsyncSessionLocal() as session:
-        # 获取玩家
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
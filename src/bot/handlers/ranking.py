@@ -3,8 +3,8 @@ from telegram import Update
 from telegram.ext import MessageHandler, filters, ContextTypes, CommandHandler
 
 from bot.models.database import AsyncSessionLocal
-from bot.models import Player, RealmType
-from sqlalchemy import select, desc
+from bot.services.leaderboard_service import LeaderboardService, WINRATE_MIN_BATTLES
+from bot.services.player_cache import PlayerCache
 
 
 async def ranking_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -24,149 +24,81 @@ async def ranking_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         rank_type = type_map.get(context.args[0], "combat")
 
     async with AsyncSessionLocal() as session:
-        # 获取玩家
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        current_player = result.scalar_one_or_none()
+        # 获取玩家（只读资料走缓存）
+        current_player = await PlayerCache.get_profile(session, user.id)
 
         if not current_player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
 
-        # 根据类型查询
-        if rank_type == "combat":
-            title = "⚔️ 战力榜"
-            # 战力需要计算，使用近似排序
-            result = await session.execute(
-                select(Player)
-                .order_by(
-                    desc(Player.realm),
-                    desc(Player.realm_level),
-                    desc(Player.attack)
-                )
-                .limit(20)
-            )
-        elif rank_type == "realm":
-            title = "🌟 境界榜"
-            result = await session.execute(
-                select(Player)
-                .order_by(
-                    desc(Player.realm),
-                    desc(Player.realm_level),
-                    desc(Player.cultivation_exp)
-                )
-                .limit(20)
-            )
-        elif rank_type == "wealth":
-            title = "💰 财富榜"
-            result = await session.execute(
-                select(Player)
-                .order_by(desc(Player.spirit_stones))
-                .limit(20)
-            )
-        elif rank_type == "kills":
-            title = "💀 击杀榜"
-            result = await session.execute(
-                select(Player)
-                .order_by(desc(Player.total_kills))
-                .limit(20)
-            )
-        else:  # winrate
-            title = "🏆 胜率榜"
-            result = await session.execute(
-                select(Player)
-                .where(Player.total_battles >= 10)  # 至少10场战斗
-                .order_by(desc(Player.total_wins * 100 / Player.total_battles))
-                .limit(20)
-            )
-
-        players = result.scalars().all()
-
-        if not players:
-            await update.message.reply_text("🏆 暂无排行数据")
-            return
-
-        # 构建消息
-        msg = f"{title}\n"
-        msg += "━━━━━━━━━━━━━━\n\n"
-
-        for i, player in enumerate(players, 1):
-            # 排名图标
-            if i == 1:
-                rank_icon = "🥇"
-            elif i == 2:
-                rank_icon = "🥈"
-            elif i == 3:
-                rank_icon = "🥉"
-            else:
-                rank_icon = f"{i}."
-
-            # 是否是当前玩家
-            is_me = " ⬅️" if player.id == current_player.id else ""
-
-            # 根据类型显示不同数据
-            if rank_type == "combat":
-                value = f"⚡ {player.combat_power}"
-            elif rank_type == "realm":
-                value = player.full_realm_name
-            elif rank_type == "wealth":
-                value = f"💰 {player.spirit_stones}"
-            elif rank_type == "kills":
-                value = f"💀 {player.total_kills}"
-            else:  # winrate
-                if player.total_battles > 0:
-                    winrate = player.total_wins * 100 / player.total_battles
-                    value = f"🏆 {winrate:.1f}%"
-                else:
-                    value = "🏆 0%"
-
-            msg += f"{rank_icon} **{player.nickname}** {value}{is_me}\n"
-
-        # 查找当前玩家排名
-        msg += "\n━━━━━━━━━━━━━━\n"
-
-        # 简单获取当前玩家的排名（近似）
-        if rank_type == "combat":
-            result = await session.execute(
-                select(Player)
-                .where(Player.attack > current_player.attack)
-            )
-            my_rank = len(result.scalars().all()) + 1
-            my_value = f"⚡ {current_player.combat_power}"
-        elif rank_type == "realm":
-            my_rank = "N/A"  # 境界排名较复杂
-            my_value = current_player.full_realm_name
-        elif rank_type == "wealth":
-            result = await session.execute(
-                select(Player)
-                .where(Player.spirit_stones > current_player.spirit_stones)
-            )
-            my_rank = len(result.scalars().all()) + 1
-            my_value = f"💰 {current_player.spirit_stones}"
-        elif rank_type == "kills":
-            result = await session.execute(
-                select(Player)
-                .where(Player.total_kills > current_player.total_kills)
-            )
-            my_rank = len(result.scalars().all()) + 1
-            my_value = f"💀 {current_player.total_kills}"
+        await LeaderboardService.ensure_loaded(session)
+
+    titles = {
+        "combat": "⚔️ 战力榜",
+        "realm": "🌟 境界榜",
+        "wealth": "💰 财富榜",
+        "kills": "💀 击杀榜",
+        "winrate": "🏆 胜率榜",
+    }
+    title = titles[rank_type]
+    players = LeaderboardService.top(rank_type, 20)
+
+    if not players:
+        await update.message.reply_text("🏆 暂无排行数据")
+        return
+
+    # 构建消息
+    msg = f"{title}\n"
+    msg += "━━━━━━━━━━━━━━\n\n"
+
+    for i, player in enumerate(players, 1):
+        # 排名图标
+        if i == 1:
+            rank_icon = "🥇"
+        elif i == 2:
+            rank_icon = "🥈"
+        elif i == 3:
+            rank_icon = "🥉"
         else:
-            my_rank = "N/A"
-            if current_player.total_battles > 0:
-                winrate = current_player.total_wins * 100 / current_player.total_battles
-                my_value = f"🏆 {winrate:.1f}%"
-            else:
-                my_value = "🏆 0%"
-
-        msg += f"你的排名：第{my_rank}名\n"
-        msg += f"你的数据：{my_value}\n\n"
-
-        msg += "💡 查看其他榜单：\n"
-        msg += "/排行 战力 | /排行 境界\n"
-        msg += "/排行 灵石 | /排行 击杀"
-
-        await update.message.reply_text(msg, parse_mode="Markdown")
+            rank_icon = f"{i}."
+
+        # 是否是当前玩家
+        is_me = " ⬅️" if player.player_id == current_player.player_id else ""
+
+        msg += f"{rank_icon} **{player.nickname}** {_format_value(rank_type, player)}{is_me}\n"
+
+    # 当前玩家排名
+    msg += "\n━━━━━━━━━━━━━━\n"
+
+    my_rank = LeaderboardService.rank(rank_type, current_player.player_id)
+    if my_rank:
+        msg += f"你的排名：第{my_rank}名 / 共{LeaderboardService.size(rank_type)}人\n"
+    elif rank_type == "winrate":
+        msg += f"你的排名：未上榜（至少{WINRATE_MIN_BATTLES}场战斗）\n"
+    else:
+        msg += "你的排名：未上榜\n"
+    msg += f"你的数据：{_format_value(rank_type, current_player)}\n\n"
+
+    msg += "💡 查看其他榜单：\n"
+    msg += "/排行 战力 | /排行 境界\n"
+    msg += "/排行 灵石 | /排行 击杀"
+
+    await update.message.reply_text(msg, parse_mode="Markdown")
+
+
+def _format_value(rank_type: str, player) -> str:
+    """榜单数据展示（榜单条目与玩家资料字段相同）"""
+    if rank_type == "combat":
+        return f"⚡ {player.combat_power}"
+    if rank_type == "realm":
+        return player.full_realm_name
+    if rank_type == "wealth":
+        return f"💰 {player.spirit_stones}"
+    if rank_type == "kills":
+        return f"💀 {player.total_kills}"
+    if player.total_battles > 0:
+        return f"🏆 {player.total_wins * 100 / player.total_battles:.1f}%"
+    return "🏆 0%"
 
 
 def register_handlers(application):
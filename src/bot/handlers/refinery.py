@@ -4,9 +4,10 @@ from telegram import Update
 from telegram.ext import MessageHandler, filters, ContextTypes, CommandHandler
 
 from bot.models.database import AsyncSessionLocal
-from bot.models import Player, Item
+from bot.models import Player
 from bot.models.refinery import RefineryRecipe, PlayerRefinery
 from bot.services.refinery_service import RefineryService
+from bot.services.game_catalog import GameCatalog
 from sqlalchemy import select
 
 
@@ -95,10 +96,7 @@ async def recipes_refinery_command(update: Update, context: ContextTypes.DEFAULT
             can_refine = refinery.refinery_level >= recipe.required_refinery_level
             status_icon = "✅" if can_refine else "🔒"
 
-            result = await session.execute(
-                select(Item).where(Item.id == recipe.result_item_id)
-            )
-            item = result.scalar_one_or_none()
+            item = (await GameCatalog.get(session)).items_by_id.get(recipe.result_item_id)
             item_name = item.name if item else "未知法宝"
 
             msg += f"{status_icon} **{recipe.name}**\n"
@@ -110,10 +108,7 @@ async def recipes_refinery_command(update: Update, context: ContextTypes.DEFAULT
             materials = json.loads(recipe.materials)
             material_names = []
             for mat in materials:
-                result = await session.execute(
-                    select(Item).where(Item.id == mat["item_id"])
-                )
-                item = result.scalar_one_or_none()
+                item = (await GameCatalog.get(session)).items_by_id.get(mat["item_id"])
                 if item:
                     material_names.append(f"{item.name}x{mat['quantity']}")
 
@@ -4,6 +4,7 @@ from telegram.ext import MessageHandler, filters, ContextTypes, CommandHandler
 
 from bot.models.database import AsyncSessionLocal
 from bot.models import Player, Item, PlayerInventory, ItemType
+from bot.services.game_catalog import GameCatalog
 from sqlalchemy import select
 
 
@@ -35,13 +36,14 @@ async def shop_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             filter_type = type_map.get(context.args[0])
 
         # 获取商店物品
-        query = select(Item).where(Item.buy_price > 0)
-        if filter_type:
-            query = query.where(Item.item_type == filter_type)
-        query = query.order_by(Item.item_type, Item.buy_price)
-
-        result = await session.execute(query)
-        items = result.scalars().all()
+        catalog = await GameCatalog.get(session)
+        items = sorted(
+            (
+                item for item in catalog.items_by_id.values()
+                if item.buy_price > 0 and (not filter_type or item.item_type == filter_type)
+            ),
+            key=lambda item: (item.item_type.name, item.buy_price),
+        )
 
         if not items:
             msg = "🏪 【坊市】\n\n"
@@ -154,10 +156,7 @@ async def buy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         # 获取物品
-        result = await session.execute(
-            select(Item).where(Item.name == item_name, Item.buy_price > 0)
-        )
-        item = result.scalar_one_or_none()
+        item = (await GameCatalog.get(session)).shop_items_by_name.get(item_name)
 
         if not item:
             await update.message.reply_text(
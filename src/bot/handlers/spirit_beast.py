@@ -3,10 +3,10 @@ import json
 from telegram import Update
 from telegram.ext import MessageHandler, filters, ContextTypes, CommandHandler
 
-from bot.models.database import AsyncSessionLocal
-from bot.models import Player
-from bot.models.spirit_beast import PlayerSpiritBeast, SpiritBeastTemplate
+from bot.utils.player_context import player_session
+from bot.models.spirit_beast import PlayerSpiritBeast
 from bot.services.spirit_beast_service import SpiritBeastService
+from bot.services.game_catalog import GameCatalog
 from sqlalchemy import select
 from datetime import datetime, timedelta
 import random
@@ -14,14 +14,7 @@ import random
 
 async def beast_list_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """查看灵兽列表 - /灵兽"""
-    user = update.effective_user
-
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -44,10 +37,7 @@ async def beast_list_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         msg = "🐾 【我的灵兽】\n\n"
 
         for beast in beasts:
-            result = await session.execute(
-                select(SpiritBeastTemplate).where(SpiritBeastTemplate.id == beast.template_id)
-            )
-            template = result.scalar_one_or_none()
+            template = (await GameCatalog.get(session)).beast_templates_by_id.get(beast.template_id)
 
             status_icon = "⚔️" if beast.is_active else "💤"
             training_icon = "📚" if beast.is_training else ""
@@ -83,22 +73,12 @@ async def beast_list_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def beast_codex_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """灵兽图鉴 - /灵兽图鉴"""
-    user = update.effective_user
-
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
 
-        result = await session.execute(
-            select(SpiritBeastTemplate).order_by(SpiritBeastTemplate.rarity.asc())
-        )
-        templates = result.scalars().all()
+        templates = (await GameCatalog.get(session)).beast_templates
 
         if not templates:
             await update.message.reply_text("📖 灵兽图鉴为空")
@@ -127,14 +107,7 @@ async def beast_codex_command(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def capture_beast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """捕捉灵兽 - /捕捉灵兽"""
-    user = update.effective_user
-
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -173,10 +146,7 @@ async def capture_beast_command(update: Update, context: ContextTypes.DEFAULT_TY
         player.spirit_stones -= cost
 
         # 随机遇到灵兽
-        result = await session.execute(
-            select(SpiritBeastTemplate)
-        )
-        all_templates = result.scalars().all()
+        all_templates = (await GameCatalog.get(session)).beast_templates
 
         if not all_templates:
             await update.message.reply_text("❌ 暂无可捕捉的灵兽")
@@ -268,8 +238,6 @@ async def capture_beast_command(update: Update, context: ContextTypes.DEFAULT_TY
 
 async def deploy_beast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """出战灵兽 - /出战灵兽 <昵称>"""
-    user = update.effective_user
-
     if not context.args:
         await update.message.reply_text(
             "❌ 请指定灵兽昵称\n"
@@ -280,12 +248,7 @@ async def deploy_beast_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
     nickname = " ".join(context.args)
 
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -334,8 +297,6 @@ async def deploy_beast_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
 async def train_beast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """训练灵兽 - /训练灵兽 <昵称> [时长]"""
-    user = update.effective_user
-
     if not context.args:
         await update.message.reply_text(
             "❌ 请指定灵兽昵称和训练时长\n"
@@ -358,12 +319,7 @@ async def train_beast_command(update: Update, context: ContextTypes.DEFAULT_TYPE
             await update.message.reply_text("❌ 时长必须是数字")
             return
 
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -409,8 +365,6 @@ async def train_beast_command(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def finish_training_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """训练结算 - /训练结算 <昵称>"""
-    user = update.effective_user
-
     if not context.args:
         await update.message.reply_text(
             "❌ 请指定灵兽昵称\n"
@@ -421,12 +375,7 @@ async def finish_training_command(update: Update, context: ContextTypes.DEFAULT_
 
     nickname = " ".join(context.args)
 
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -473,10 +422,7 @@ async def finish_training_command(update: Update, context: ContextTypes.DEFAULT_
             new_level = beast.level
 
             # 属性提升
-            result = await session.execute(
-                select(SpiritBeastTemplate).where(SpiritBeastTemplate.id == beast.template_id)
-            )
-            template = result.scalar_one_or_none()
+            template = (await GameCatalog.get(session)).beast_templates_by_id.get(beast.template_id)
 
             if template:
                 beast.attack += template.growth_attack
@@ -505,8 +451,6 @@ async def finish_training_command(update: Update, context: ContextTypes.DEFAULT_
 
 async def evolve_beast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """灵兽进化 - /灵兽进化 <昵称>"""
-    user = update.effective_user
-
     if not context.args:
         await update.message.reply_text(
             "❌ 请指定灵兽昵称\n"
@@ -517,12 +461,7 @@ async def evolve_beast_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
     nickname = " ".join(context.args)
 
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -539,10 +478,7 @@ async def evolve_beast_command(update: Update, context: ContextTypes.DEFAULT_TYP
             await update.message.reply_text(f"❌ 未找到名为 {nickname} 的灵兽")
             return
 
-        result = await session.execute(
-            select(SpiritBeastTemplate).where(SpiritBeastTemplate.id == beast.template_id)
-        )
-        template = result.scalar_one_or_none()
+        template = (await GameCatalog.get(session)).beast_templates_by_id.get(beast.template_id)
 
         if not template:
             await update.message.reply_text("❌ 灵兽模板数据异常")
@@ -581,8 +517,6 @@ async def evolve_beast_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
 async def fuse_beasts_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """灵兽融合 - /灵兽融合 <灵兽1> <灵兽2>"""
-    user = update.effective_user
-
     if len(context.args) < 2:
         await update.message.reply_text(
             "❌ 请指定两只灵兽的昵称\n"
@@ -595,12 +529,7 @@ async def fuse_beasts_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     nickname1 = context.args[0]
     nickname2 = context.args[1]
 
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -631,15 +560,9 @@ async def fuse_beasts_command(update: Update, context: ContextTypes.DEFAULT_TYPE
             return
 
         # 获取模板
-        result = await session.execute(
-            select(SpiritBeastTemplate).where(SpiritBeastTemplate.id == beast1.template_id)
-        )
-        template1 = result.scalar_one_or_none()
+        template1 = (await GameCatalog.get(session)).beast_templates_by_id.get(beast1.template_id)
 
-        result = await session.execute(
-            select(SpiritBeastTemplate).where(SpiritBeastTemplate.id == beast2.template_id)
-        )
-        template2 = result.scalar_one_or_none()
+        template2 = (await GameCatalog.get(session)).beast_templates_by_id.get(beast2.template_id)
 
         if not template1 or not template2:
             await update.message.reply_text("❌ 灵兽模板数据异常")
@@ -655,10 +578,7 @@ async def fuse_beasts_command(update: Update, context: ContextTypes.DEFAULT_TYPE
             return
 
         # 融合成功
-        result = await session.execute(
-            select(SpiritBeastTemplate).where(SpiritBeastTemplate.id == new_beast.template_id)
-        )
-        new_template = result.scalar_one_or_none()
+        new_template = (await GameCatalog.get(session)).beast_templates_by_id.get(new_beast.template_id)
 
         msg = f"🎊 灵兽融合成功！\n\n"
         msg += f"💫 {beast1.nickname} + {beast2.nickname}\n"
@@ -9,6 +9,7 @@ from sqlalchemy.orm import selectinload
 from bot.config import settings
 from bot.models import get_db
 from bot.models.player import Player
+from bot.services.player_cache import PlayerCache, PlayerProfile
 from bot.services.player_service import PlayerService
 from bot.services.spirit_root_service import SpiritRootService
 from bot.utils.message_utils import send_and_delete
@@ -164,45 +165,44 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await send_and_delete(update.message, help_text, parse_mode="Markdown")
 
 
+def _format_status(profile: PlayerProfile) -> str:
+    """角色状态文本"""
+    status_text = dedent(f"""
+    👤 **{profile.nickname}**
+
+    🌟 **境界**：{profile.full_realm_name}
+    📊 **修为**：{profile.cultivation_exp:,}/{profile.next_realm_exp:,}
+    ⚔️ **战力**：{profile.combat_power:,}
+
+    💚 **生命**：{profile.hp}/{profile.max_hp}
+    💙 **灵力**：{profile.spiritual_power}/{profile.max_spiritual_power}
+    ⚡ **速度**：{profile.speed}
+    💥 **暴击率**：{profile.crit_rate * 100:.1f}%
+
+    🧠 **悟性**：{profile.comprehension}
+    🔮 **神识**：{profile.divine_sense}/{profile.max_divine_sense}
+    💎 **灵石**：{profile.spirit_stones:,}
+    🏆 **贡献**：{profile.contribution:,}
+    """).strip()
+
+    if profile.spirit_root:
+        status_text += f"\n🌈 **灵根**：{profile.spirit_root}（纯度 {profile.spirit_root_purity}%）"
+
+    return status_text
+
+
 async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """查看角色状态"""
     user = update.effective_user
 
     async with get_db() as db:
-        result = await db.execute(
-            select(Player)
-            .where(Player.telegram_id == user.id)
-            .options(selectinload(Player.spirit_root))
-        )
-        player = result.scalar_one_or_none()
+        profile = await PlayerCache.get_profile(db, user.id)
 
-        if not player:
+        if not profile:
             await send_and_delete(update.message, "❌ 你还未踏入修仙之路，请先使用 .检测灵根")
             return
 
-        status_text = dedent(f"""
-        👤 **{player.nickname}**
-
-        🌟 **境界**：{player.full_realm_name}
-        📊 **修为**：{player.cultivation_exp:,}/{player.next_realm_exp:,}
-        ⚔️ **战力**：{player.combat_power:,}
-
-        💚 **生命**：{player.hp}/{player.max_hp}
-        💙 **灵力**：{player.spiritual_power}/{player.max_spiritual_power}
-        ⚡ **速度**：{player.speed}
-        💥 **暴击率**：{player.crit_rate * 100:.1f}%
-
-        🧠 **悟性**：{player.comprehension}
-        🔮 **神识**：{player.divine_sense}/{player.max_divine_sense}
-        💎 **灵石**：{player.spirit_stones:,}
-        🏆 **贡献**：{player.contribution:,}
-        """).strip()
-
-        if player.spirit_root:
-            root_desc = SpiritRootService.get_root_description(player.spirit_root)
-            status_text += f"\n🌈 **灵根**：{root_desc}（纯度 {player.spirit_root.purity}%）"
-
-        await send_and_delete(update.message, status_text, parse_mode="Markdown")
+        await send_and_delete(update.message, _format_status(profile), parse_mode="Markdown")
 
 
 async def menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -217,40 +217,15 @@ async def menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # 直接发送状态信息
         user = update.effective_user
         async with get_db() as db:
-            result = await db.execute(
-                select(Player)
-                .where(Player.telegram_id == user.id)
-                .options(selectinload(Player.spirit_root))
-            )
-            player = result.scalar_one_or_none()
+            profile = await PlayerCache.get_profile(db, user.id)
 
-            if not player:
+            if not profile:
                 await query.edit_message_text("❌ 你还未踏入修仙之路，请先使用 .检测灵根")
                 return
 
-            status_text = dedent(f"""
-            👤 **{player.nickname}**
-
-            🌟 **境界**：{player.full_realm_name}
-            📊 **修为**：{player.cultivation_exp:,}/{player.next_realm_exp:,}
-            ⚔️ **战力**：{player.combat_power:,}
-
-            💚 **生命**：{player.hp}/{player.max_hp}
-            💙 **灵力**：{player.spiritual_power}/{player.max_spiritual_power}
-            ⚡ **速度**：{player.speed}
-            💥 **暴击率**：{player.crit_rate * 100:.1f}%
-
-            🧠 **悟性**：{player.comprehension}
-            🔮 **神识**：{player.divine_sense}/{player.max_divine_sense}
-            💎 **灵石**：{player.spirit_stones:,}
-            🏆 **贡献**：{player.contribution:,}
-            """).strip()
-
-            if player.spirit_root:
-                root_desc = SpiritRootService.get_root_description(player.spirit_root)
-                status_text += f"\n🌈 **灵根**：{root_desc}（纯度 {player.spirit_root.purity}%）"
-
-            await query.edit_message_text(status_text, parse_mode="Markdown", reply_markup=_build_quick_actions())
+            await query.edit_message_text(
+                _format_status(profile), parse_mode="Markdown", reply_markup=_build_quick_actions()
+            )
 
     elif action == "cultivate":
         from bot.handlers.cultivation import cultivate_command
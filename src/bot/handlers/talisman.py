@@ -5,26 +5,20 @@ from telegram.ext import MessageHandler, filters, ContextTypes, CommandHandler
 from datetime import datetime, timedelta
 import random
 
-from bot.models.database import AsyncSessionLocal
-from bot.models import Player, Item, PlayerInventory
+from bot.utils.player_context import player_session
+from bot.models import PlayerInventory
 from bot.models.talisman import (
     TalismanRecipe, PlayerTalismanSkill, PlayerTalisman,
     TalismanCraftRecord
 )
 from bot.services.cave_service import CaveService
+from bot.services.game_catalog import GameCatalog
 from sqlalchemy import select
 
 
 async def talisman_skill_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """查看制符技能 - /制符"""
-    user = update.effective_user
-
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -77,14 +71,7 @@ async def talisman_skill_command(update: Update, context: ContextTypes.DEFAULT_T
 
 async def talisman_recipes_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """符箓图鉴 - /符箓图鉴"""
-    user = update.effective_user
-
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -126,10 +113,7 @@ async def talisman_recipes_command(update: Update, context: ContextTypes.DEFAULT
             materials = json.loads(recipe.materials)
             material_names = []
             for mat in materials:
-                result = await session.execute(
-                    select(Item).where(Item.id == mat["item_id"])
-                )
-                item = result.scalar_one_or_none()
+                item = (await GameCatalog.get(session)).items_by_id.get(mat["item_id"])
                 if item:
                     material_names.append(f"{item.name}x{mat['quantity']}")
 
@@ -149,8 +133,6 @@ async def talisman_recipes_command(update: Update, context: ContextTypes.DEFAULT
 
 async def craft_talisman_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """制作符箓 - /制作符箓 <符箓名>"""
-    user = update.effective_user
-
     if not context.args:
         await update.message.reply_text(
             "❌ 请指定符箓名称\n"
@@ -161,12 +143,7 @@ async def craft_talisman_command(update: Update, context: ContextTypes.DEFAULT_T
 
     recipe_name = " ".join(context.args)
 
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -226,10 +203,7 @@ async def craft_talisman_command(update: Update, context: ContextTypes.DEFAULT_T
             total_qty = sum(inv.quantity for inv in inv_items)
 
             if total_qty < required_qty:
-                result = await session.execute(
-                    select(Item).where(Item.id == item_id)
-                )
-                item = result.scalar_one_or_none()
+                item = (await GameCatalog.get(session)).items_by_id.get(item_id)
                 item_name = item.name if item else f"ID:{item_id}"
                 missing.append(f"{item_name}(缺{required_qty - total_qty})")
 
@@ -284,14 +258,7 @@ async def craft_talisman_command(update: Update, context: ContextTypes.DEFAULT_T
 
 async def finish_craft_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """制符结算 - /制符结算"""
-    user = update.effective_user
-
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -425,14 +392,7 @@ async def finish_craft_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
 async def cancel_craft_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """制符取消 - /制符取消"""
-    user = update.effective_user
-
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -458,14 +418,7 @@ async def cancel_craft_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
 async def my_talismans_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """查看符箓 - /我的符箓"""
-    user = update.effective_user
-
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -509,8 +462,6 @@ async def my_talismans_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
 async def use_talisman_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """使用符箓 - /使用符箓 <符箓名>"""
-    user = update.effective_user
-
     if not context.args:
         await update.message.reply_text(
             "❌ 请指定符箓名称\n"
@@ -521,12 +472,7 @@ async def use_talisman_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
     talisman_name = " ".join(context.args)
 
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Player).where(Player.telegram_id == user.id)
-        )
-        player = result.scalar_one_or_none()
-
+    async with player_session(update, context) as (session, player):
         if not player:
             await update.message.reply_text("❌ 请先使用 /灵根 开始游戏")
             return
@@ -47,6 +47,13 @@ async def world_boss_status_command(update: Update, context: ContextTypes.DEFAUL
         await update.message.reply_text(message)
 
 
+def _standing_text(participation: dict) -> str:
+    """战斗中的名次和与上一名的差距"""
+    if participation['rank'] == 1:
+        return "当前排名: 第1名"
+    return f"当前排名: 第{participation['rank']}名（距上一名 {participation['damage_to_next']:,} 伤害）"
+
+
 async def attack_boss_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """攻击世界BOSS - /攻击BOSS"""
     user_id = update.effective_user.id
@@ -144,6 +151,8 @@ async def boss_rankings_command(update: Update, context: ContextTypes.DEFAULT_TY
             message_parts.append(f"\n你的战绩:")
             message_parts.append(f"总伤害: {player_participation['total_damage']:,}")
             message_parts.append(f"攻击次数: {player_participation['attack_count']}/10")
+            if player_participation.get('rank'):
+                message_parts.append(f"\n{_standing_text(player_participation)}")
 
             if player_participation['is_rewarded']:
                 message_parts.append(f"\n✅ 已获得奖励:")
@@ -191,6 +200,8 @@ async def my_boss_stats_command(update: Update, context: ContextTypes.DEFAULT_TY
 攻击次数: {participation['attack_count']}/10
 剩余攻击: {participation['remaining_attacks']}次
 """
+        if participation.get('rank'):
+            message += _standing_text(participation) + "\n"
 
         if participation['is_rewarded']:
             message += f"""
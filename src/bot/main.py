@@ -7,12 +7,14 @@ from telegram.ext import Application
 
 from bot.config import settings
 from bot.models import init_db, close_db
+from bot.utils.concurrency import PlayerUpdateProcessor
+from bot.utils.message_dispatcher import OutboundDispatcher
 from bot.handlers import (
     start, cultivation, spirit_root, realm, skill, quest, battle,
     inventory, shop, sect, ranking, signin, rename,
     cultivation_method, alchemy, lifespan, refinery, market, core_quality,
     divine_sense, spirit_beast, formation, talisman, cave_dwelling, adventure, achievement, sect_war, arena, world_boss, credit_shop,
-    sect_elder, sect_ranking
+    sect_elder, sect_ranking, admin
 )
 
 # 配置日志
@@ -22,6 +24,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 需要接收的更新类型
+ALLOWED_UPDATES = ["message", "callback_query"]
+
 
 async def post_init(application: Application) -> None:
     """应用初始化后的回调"""
@@ -29,12 +34,42 @@ async def post_init(application: Application) -> None:
     await init_db()
     logger.info("数据库初始化完成")
 
+    # 载入静态游戏数据（物品、怪物、灵兽模板等）
+    from bot.services.game_catalog import GameCatalog
+    await GameCatalog.load()
+
+    # 建立排行榜索引
+    from bot.services.leaderboard_service import LeaderboardService
+    await LeaderboardService.rebuild()
+
+    # 建立挂单交易盘口
+    from bot.services.order_book_service import OrderBookService
+    await OrderBookService.rebuild()
+
+    # 首次部署时从已有交易记录回填行情
+    from bot.services.price_history_service import PriceHistoryService
+    await PriceHistoryService.backfill_if_empty()
+
+    # 启动到期计时（阵法、运气事件、世界BOSS）
+    from bot.services.expiry_timer import ExpiryTimer
+    await ExpiryTimer.start()
+
+    # 载入世界BOSS战斗状态（重放未写回的攻击日志）并启动定时写回
+    from bot.services.world_boss_raid import WorldBossRaids
+    await WorldBossRaids.start()
+
+    # 启动消息自动删除（载入重启前未完成的删除计划）
+    from bot.services.message_deleter import MessageDeleter
+    await MessageDeleter.start(application.bot)
+
     # 启动调度器
     from bot.scheduler import start_scheduler
     start_scheduler()
     logger.info("调度器已启动")
 
-    # TODO: 初始化Redis连接
+    # 初始化缓存（Redis不可用时退回进程内缓存）
+    from bot.services.player_cache import PlayerCache
+    await PlayerCache.init()
 
     logger.info("Bot 启动成功！")
 
@@ -46,6 +81,20 @@ async def post_shutdown(application: Application) -> None:
     stop_scheduler()
     logger.info("调度器已停止")
 
+    from bot.services.expiry_timer import ExpiryTimer
+    await ExpiryTimer.stop()
+
+    # 保存尚未写入的消息删除计划
+    from bot.services.message_deleter import MessageDeleter
+    await MessageDeleter.stop()
+
+    # 写回世界BOSS战斗状态
+    from bot.services.world_boss_raid import WorldBossRaids
+    await WorldBossRaids.stop()
+
+    from bot.services.player_cache import PlayerCache
+    await PlayerCache.close()
+
     logger.info("关闭数据库连接...")
     await close_db()
     logger.info("数据库连接已关闭")
@@ -55,10 +104,12 @@ def main():
     """主函数"""
     logger.info(f"正在启动 {settings.GAME_NAME} v{settings.GAME_VERSION}...")
 
-    # 创建应用
+    # 创建应用（不同玩家并行处理，同一玩家按顺序处理；出站消息统一排队限速）
     application = (
         Application.builder()
         .token(settings.BOT_TOKEN)
+        .concurrent_updates(PlayerUpdateProcessor(settings.MAX_CONCURRENT_UPDATES))
+        .rate_limiter(OutboundDispatcher())
         .post_init(post_init)
         .post_shutdown(post_shutdown)
         .build()
@@ -98,15 +149,28 @@ def main():
     arena.register_handlers(application)
     world_boss.register_handlers(application)
     credit_shop.register_handlers(application)
+    admin.register_handlers(application)
 
     logger.info("所有处理器注册完成")
 
     # 启动Bot
-    logger.info("启动 Bot...")
-    application.run_polling(
-        allowed_updates=["message", "callback_query"],
-        drop_pending_updates=True,
-    )
+    if settings.use_webhook:
+        import uvicorn
+        from bot.api.telegram_webhook import create_webhook_app
+
+        logger.info(f"以 Webhook 模式启动 Bot，监听 {settings.WEBHOOK_LISTEN}:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}")
+        uvicorn.run(
+            create_webhook_app(application, ALLOWED_UPDATES),
+            host=settings.WEBHOOK_LISTEN,
+            port=settings.WEBHOOK_PORT,
+            log_level=settings.LOG_LEVEL.lower(),
+        )
+    else:
+        logger.info("以长轮询模式启动 Bot...")
+        application.run_polling(
+            allowed_updates=ALLOWED_UPDATES,
+            drop_pending_updates=True,
+        )
 
 
 if __name__ == "__main__":
@@ -5,7 +5,7 @@ from .item import Item, ItemType, TreasureGrade, PlayerInventory
 from .sect import Sect, SectApplication, SectShopItem, SectContribution, SectWar, SectWarStatus, SectWarParticipation
 from .battle import Monster, BattleRecord, BattleType, BattleResult, Arena
 from .quest import Quest, PlayerQuest, QuestType, QuestStatus, Achievement, PlayerAchievement, AchievementCategory, PlayerTitle, AchievementStats
-from .market import Shop, PlayerPurchase, Market, TradeRecord, Auction, AuctionBid
+from .market import Shop, PlayerPurchase, Market, TradeRecord, Auction, AuctionBid, MarketOrder, OrderSide, PriceCandle, PricePeriod
 from .secret_realm import (
     SecretRealm, SecretRealmType, RealmDifficulty, RealmStatus,
     RealmLootPool, RealmExploration, ExplorationReward, RealmEvent
@@ -23,6 +23,7 @@ from .credit_shop import (
     CreditType, CreditShopCategory, CreditShopItem, PlayerCreditRecord,
     CreditShopPurchase, PlayerCreditShopLimit
 )
+from .message import ScheduledDeletion
 
 __all__ = [
     # Database
@@ -75,6 +76,10 @@ __all__ = [
     "TradeRecord",
     "Auction",
     "AuctionBid",
+    "MarketOrder",
+    "OrderSide",
+    "PriceCandle",
+    "PricePeriod",
     # Secret Realm
     "SecretRealm",
     "SecretRealmType",
@@ -149,4 +154,6 @@ __all__ = [
     "PlayerCreditRecord",
     "CreditShopPurchase",
     "PlayerCreditShopLimit",
+    # Message
+    "ScheduledDeletion",
 ]
@@ -13,6 +13,7 @@ class BattleType(enum.Enum):
     """战斗类型"""
     PVE = "pve"  # 打怪
     PVP = "pvp"  # 玩家对战
+    ARENA = "arena"  # 竞技场
     BOSS = "boss"  # Boss战
     SECT_WAR = "sect_war"  # 宗门战
 
@@ -86,6 +87,10 @@ class BattleRecord(Base):
     # 战斗详情（JSON格式存储）
     battle_log: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
+    # 战斗重放：随机种子 + 开战时双方属性快照（JSON）
+    seed: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    snapshot: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, nullable=False)
 
 
@@ -1,8 +1,9 @@
 """市场交易相关数据模型"""
+import enum
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, String, Text, Boolean
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, String, Text, Boolean, UniqueConstraint, Enum as SQLEnum, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .database import Base
@@ -55,6 +56,16 @@ class PlayerPurchase(Base):
 class Market(Base):
     """玩家交易市场"""
     __tablename__ = "markets"
+    __table_args__ = (
+        # 市场列表按上架时间倒序键集分页
+        Index("ix_markets_open_listed", "is_sold", "listed_at", "id"),
+        # 过期清理只扫描未售出的记录（部分索引，不支持的数据库为普通索引）
+        Index(
+            "ix_markets_unsold_expires_at", "expires_at",
+            sqlite_where=text("is_sold = 0"),
+            postgresql_where=text("NOT is_sold"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     seller_id: Mapped[int] = mapped_column(Integer, ForeignKey("players.id"), nullable=False, index=True)
@@ -76,12 +87,50 @@ class Market(Base):
     expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # 上架过期时间
 
 
+class OrderSide(enum.Enum):
+    """挂单方向"""
+    BUY = "buy"  # 买单（出价）
+    SELL = "sell"  # 卖单（要价）
+
+
+class MarketOrder(Base):
+    """挂单交易（按物品撮合的限价单）"""
+    __tablename__ = "market_orders"
+    __table_args__ = (
+        # 启动时载入所有未完成的挂单
+        Index("ix_market_orders_active_item", "is_active", "item_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    player_id: Mapped[int] = mapped_column(Integer, ForeignKey("players.id"), nullable=False, index=True)
+    item_id: Mapped[int] = mapped_column(Integer, ForeignKey("items.id"), nullable=False)
+
+    side: Mapped[OrderSide] = mapped_column(SQLEnum(OrderSide), nullable=False)
+    price: Mapped[int] = mapped_column(Integer, nullable=False)  # 单价
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)  # 挂单数量
+    filled_quantity: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # 已成交数量
+
+    # 状态（全部成交或撤单后为 False）
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, nullable=False)
+    closed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    @property
+    def remaining(self) -> int:
+        """未成交数量"""
+        return self.quantity - self.filled_quantity
+
+
 class TradeRecord(Base):
     """交易记录"""
     __tablename__ = "trade_records"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    market_id: Mapped[int] = mapped_column(Integer, ForeignKey("markets.id"), nullable=False)
+    # 一口价市场成交时为市场订单ID，挂单撮合成交时为空并记录双方挂单
+    market_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("markets.id"), nullable=True)
+    buy_order_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("market_orders.id"), nullable=True)
+    sell_order_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("market_orders.id"), nullable=True)
     seller_id: Mapped[int] = mapped_column(Integer, ForeignKey("players.id"), nullable=False, index=True)
     buyer_id: Mapped[int] = mapped_column(Integer, ForeignKey("players.id"), nullable=False, index=True)
     item_id: Mapped[int] = mapped_column(Integer, ForeignKey("items.id"), nullable=False)
@@ -93,9 +142,47 @@ class TradeRecord(Base):
     traded_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, nullable=False)
 
 
+class PricePeriod(enum.Enum):
+    """行情K线周期"""
+    HOUR = "hour"
+    DAY = "day"
+
+
+class PriceCandle(Base):
+    """物品成交行情（按小时/按天汇总的K线）"""
+    __tablename__ = "price_candles"
+    __table_args__ = (
+        UniqueConstraint("item_id", "period", "period_start", name="uq_price_candles_item_period_start"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    item_id: Mapped[int] = mapped_column(Integer, ForeignKey("items.id"), nullable=False)
+    period: Mapped[PricePeriod] = mapped_column(SQLEnum(PricePeriod), nullable=False)
+    period_start: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    # 成交单价
+    open: Mapped[int] = mapped_column(Integer, nullable=False)
+    high: Mapped[int] = mapped_column(Integer, nullable=False)
+    low: Mapped[int] = mapped_column(Integer, nullable=False)
+    close: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    volume: Mapped[int] = mapped_column(Integer, nullable=False)  # 成交数量
+    turnover: Mapped[int] = mapped_column(BigInteger, nullable=False)  # 成交额
+    trade_count: Mapped[int] = mapped_column(Integer, nullable=False)  # 成交笔数
+
+    @property
+    def vwap(self) -> int:
+        """成交量加权均价"""
+        return round(self.turnover / self.volume) if self.volume else self.close
+
+
 class Auction(Base):
     """拍卖行"""
     __tablename__ = "auctions"
+    __table_args__ = (
+        # 结算计时按结束时间载入进行中的拍卖
+        Index("ix_auctions_active_ends_at", "is_active", "ends_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     seller_id: Mapped[int] = mapped_column(Integer, ForeignKey("players.id"), nullable=False, index=True)
@@ -0,0 +1,20 @@
+"""消息相关数据模型"""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .database import Base
+
+
+class ScheduledDeletion(Base):
+    """待自动删除的消息（重启后据此恢复删除计划）"""
+    __tablename__ = "scheduled_deletions"
+    __table_args__ = (
+        UniqueConstraint("chat_id", "message_id", name="uq_scheduled_deletions_chat_message"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    message_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    delete_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)  # 删除时间
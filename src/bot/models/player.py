@@ -4,7 +4,7 @@ import json
 from datetime import datetime
 from typing import Optional, List
 
-from sqlalchemy import BigInteger, Boolean, DateTime, Enum, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import BigInteger, Boolean, DateTime, Enum, Float, ForeignKey, Integer, String, Text, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
@@ -159,6 +159,64 @@ class SpiritRoot(Base):
         return f"<SpiritRoot {self.root_type} [{elements_str}] 纯度:{self.purity}>"
 
 
+# 境界战力倍率：(基础倍率, 每层/每阶段增量)
+REALM_POWER_MULTIPLIERS = {
+    RealmType.MORTAL: (1.0, 0.0),
+    RealmType.QI_REFINING: (1.0, 0.1),  # 1.0-2.3x
+    RealmType.FOUNDATION: (5.0, 2.0),  # 5-11x
+    RealmType.CORE_FORMATION: (25.0, 10.0),  # 25-45x
+    RealmType.NASCENT_SOUL: (125.0, 50.0),  # 125-225x
+    RealmType.DEITY_TRANSFORMATION: (625.0, 250.0),  # 625-1125x
+}
+
+# 参与战力计算的属性，任一变化都会重算战力
+COMBAT_POWER_FIELDS = ("attack", "defense", "max_hp", "speed", "crit_rate", "realm", "realm_level")
+
+
+def calculate_combat_power(
+    attack: int,
+    defense: int,
+    max_hp: int,
+    speed: int,
+    crit_rate: float,
+    realm: RealmType,
+    realm_level: int,
+) -> int:
+    """战力评估"""
+    # 基础属性
+    base_power = int(
+        attack * 3 +
+        defense * 2 +
+        max_hp * 0.5 +
+        speed * 0.8 +
+        crit_rate * 1000
+    )
+
+    # 境界倍率
+    base, per_level = REALM_POWER_MULTIPLIERS.get(realm, (1.0, 0.0))
+    return int(base_power * (base + realm_level * per_level))
+
+
+# 参与修炼进度计算的属性
+REALM_PROGRESS_FIELDS = ("realm", "realm_level", "cultivation_exp")
+
+
+def calculate_realm_progress(realm: RealmType, realm_level: int, cultivation_exp: int) -> int:
+    """修炼进度：到达当前境界的累计修为 + 当前修为，随修炼和突破单调递增"""
+    from bot.config.realm_config import RealmConfig
+
+    # 突破时境界和小等级先后赋值，中间状态的小等级可能越界
+    realm_level = min(realm_level, 13 if realm == RealmType.QI_REFINING else 2)
+    return RealmConfig.get_cumulative_exp(realm, realm_level) + cultivation_exp
+
+
+# 推导字段 -> (依赖属性, 计算函数)，依赖属性变化时自动重算
+DERIVED_STATS = {
+    "combat_power": (COMBAT_POWER_FIELDS, calculate_combat_power),
+    "realm_progress": (REALM_PROGRESS_FIELDS, calculate_realm_progress),
+}
+
+
 class Player(Base):
     """玩家基础信息表"""
     __tablename__ = "players"
@@ -190,11 +248,17 @@ class Player(Base):
     crit_rate: Mapped[float] = mapped_column(Float, default=0.05, nullable=False)
     crit_damage: Mapped[float] = mapped_column(Float, default=1.5, nullable=False)
 
+    # 战力（由 COMBAT_POWER_FIELDS 推导，属性变化时自动重算，勿直接修改）
+    combat_power: Mapped[int] = mapped_column(BigInteger, default=0, index=True, nullable=False)
+
     # 修炼属性
     cultivation_exp: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)  # 当前修为
     next_realm_exp: Mapped[int] = mapped_column(BigInteger, default=10000, nullable=False)  # 突破所需修为
     comprehension: Mapped[int] = mapped_column(Integer, default=10, nullable=False)  # 悟性（8-15）
 
+    # 修炼进度（由 REALM_PROGRESS_FIELDS 推导，境界榜按此排序，勿直接修改）
+    realm_progress: Mapped[int] = mapped_column(BigInteger, default=0, index=True, nullable=False)
+
     # 神识（筑基后觉醒）
     divine_sense: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     max_divine_sense: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -281,29 +345,23 @@ class Player(Base):
         stage = stage_names.get(self.realm_level, "初期")
         return f"{self.realm.value}{stage}"
 
-    @property
-    def combat_power(self) -> int:
-        """战力评估"""
-        # 基础属性
-        base_power = int(
-            self.attack * 3 +
-            self.defense * 2 +
-            self.max_hp * 0.5 +
-            self.speed * 0.8 +
-            self.crit_rate * 1000
-        )
-
-        # 境界倍率
-        realm_multiplier = {
-            RealmType.MORTAL: 1.0,
-            RealmType.QI_REFINING: 1.0 + (self.realm_level * 0.1),  # 1.0-2.3x
-            RealmType.FOUNDATION: 5.0 + (self.realm_level * 2.0),  # 5-11x
-            RealmType.CORE_FORMATION: 25.0 + (self.realm_level * 10.0),  # 25-45x
-            RealmType.NASCENT_SOUL: 125.0 + (self.realm_level * 50.0),  # 125-225x
-            RealmType.DEITY_TRANSFORMATION: 625.0 + (self.realm_level * 250.0),  # 625-1125x
-        }.get(self.realm, 1.0)
-
-        return int(base_power * realm_multiplier)
+    def refresh_derived_stats(self, *names: str, **overrides) -> None:
+        """重算推导字段（战力、修炼进度）
+
+        Args:
+            names: 要重算的字段，为空时全部重算
+            overrides: 尚未写入对象的新属性值（属性赋值事件中使用）
+        """
+        for name in names or DERIVED_STATS:
+            fields, calculate = DERIVED_STATS[name]
+            stats = {}
+            for field in fields:
+                value = overrides[field] if field in overrides else getattr(self, field)
+                if value is None:
+                    # 新建对象尚未应用列默认值
+                    value = self.__table__.c[field].default.arg
+                stats[field] = value
+            setattr(self, name, calculate(**stats))
 
     @property
     def cultivation_speed(self) -> float:
@@ -325,6 +383,27 @@ class Player(Base):
         return base_speed * spirit_root_multi * method_bonus * comprehension_bonus * realm_penalty
 
 
+def _on_stat_set(target: Player, value, oldvalue, initiator) -> None:
+    """推导字段的依赖属性被赋值时立即重算，使同一请求内读到的也是最新值"""
+    for name, (fields, _) in DERIVED_STATS.items():
+        # 只在依赖属性已全部加载时重算；否则留给写库前的兜底重算
+        if initiator.key in fields and all(
+            field in target.__dict__ or field == initiator.key for field in fields
+        ):
+            target.refresh_derived_stats(name, **{initiator.key: value})
+
+
+for _field in dict.fromkeys(field for fields, _ in DERIVED_STATS.values() for field in fields):
+    event.listen(getattr(Player, _field), "set", _on_stat_set)
+
+
+@event.listens_for(Player, "before_insert")
+@event.listens_for(Player, "before_update")
+def _refresh_derived_stats_before_flush(mapper, connection, target: Player) -> None:
+    """写库前兜底重算推导字段"""
+    target.refresh_derived_stats()
+
+
 class CultivationMethod(Base):
     """功法表"""
     __tablename__ = "cultivation_methods"
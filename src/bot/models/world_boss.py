@@ -47,6 +47,9 @@ class WorldBoss(Base):
     defeated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, comment="击败时间")
     despawn_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, comment="消失时间(2小时后)")
 
+    # 战斗状态已写回到的攻击日志序号（见 services.world_boss_raid）
+    journal_seq: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False, comment="已写回的攻击日志序号")
+
     # 关系
     final_killer: Mapped[Optional["Player"]] = relationship("Player", foreign_keys=[final_killer_id])
     participants: Mapped[list["WorldBossParticipation"]] = relationship(
@@ -1,19 +1,19 @@
 """游戏调度器 - 定时任务系统"""
 import logging
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Callable
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, case, update
 
+from bot.config import settings
 from bot.models.database import AsyncSessionLocal
 from bot.models import Player
-from bot.models.formation import ActiveFormation
-from bot.models.adventure import LuckEvent
-from bot.models.cave_dwelling import CaveDwelling
+from bot.models.cave_dwelling import CaveDwelling, CaveRoom, CaveRoomType
+from bot.utils.batching import batched_update
 
 logger = logging.getLogger(__name__)
 
@@ -54,24 +54,6 @@ class GameScheduler:
 
     def _register_jobs(self):
         """注册所有定时任务"""
-        # 每小时检查一次阵法过期
-        self.scheduler.add_job(
-            self._check_formations_expiry,
-            trigger=IntervalTrigger(hours=1),
-            id="check_formations",
-            name="检查阵法过期",
-            replace_existing=True
-        )
-
-        # 每小时检查一次运气事件过期
-        self.scheduler.add_job(
-            self._check_luck_events_expiry,
-            trigger=IntervalTrigger(hours=1),
-            id="check_luck_events",
-            name="检查运气事件过期",
-            replace_existing=True
-        )
-
         # 每天凌晨检查洞府维护费用
         self.scheduler.add_job(
             self._check_cave_maintenance,
@@ -108,168 +90,95 @@ class GameScheduler:
             replace_existing=True
         )
 
-        # 每小时检查世界BOSS是否超时
+        # 每小时退还过期未售出的市场上架物品
         self.scheduler.add_job(
-            self._cleanup_world_bosses,
+            self._sweep_expired_listings,
             trigger=IntervalTrigger(hours=1),
-            id="cleanup_world_bosses",
-            name="清理超时BOSS",
+            id="sweep_expired_listings",
+            name="退还过期上架物品",
             replace_existing=True
         )
 
-        logger.info(f"已注册 {len(self.scheduler.get_jobs())} 个定时任务")
-
-    async def _check_formations_expiry(self):
-        """检查并处理过期的阵法"""
-        try:
-            logger.debug("开始检查阵法过期...")
-
-            async with AsyncSessionLocal() as session:
-                # 查找过期的激活阵法
-                result = await session.execute(
-                    select(ActiveFormation, Player).join(
-                        Player, Player.id == ActiveFormation.player_id
-                    ).where(
-                        ActiveFormation.is_active == True,
-                        ActiveFormation.expires_at <= datetime.now()
-                    )
-                )
-                expired_formations = result.all()
-
-                if not expired_formations:
-                    logger.debug("没有过期的阵法")
-                    return
-
-                count = 0
-                for formation, player in expired_formations:
-                    # 移除玩家属性加成
-                    player.defense -= formation.current_defense_bonus
-                    player.attack -= formation.current_attack_bonus
-
-                    # 撤除阵法
-                    formation.is_active = False
-
-                    count += 1
-
-                await session.commit()
-                logger.info(f"已处理 {count} 个过期阵法")
-
-        except Exception as e:
-            logger.error(f"检查阵法过期时出错: {e}", exc_info=True)
-
-    async def _check_luck_events_expiry(self):
-        """检查并处理过期的运气事件"""
-        try:
-            logger.debug("开始检查运气事件过期...")
-
-            async with AsyncSessionLocal() as session:
-                # 查找过期的运气事件
-                result = await session.execute(
-                    select(LuckEvent).where(
-                        LuckEvent.is_active == True,
-                        LuckEvent.end_time <= datetime.now()
-                    )
-                )
-                expired_events = result.scalars().all()
-
-                if not expired_events:
-                    logger.debug("没有过期的运气事件")
-                    return
-
-                count = 0
-                for event in expired_events:
-                    event.is_active = False
-                    count += 1
-
-                await session.commit()
-                logger.info(f"已处理 {count} 个过期运气事件")
+        # 每10分钟重建一次排行榜（兜底批量更新等未经ORM对象的修改）
+        self.scheduler.add_job(
+            self._rebuild_leaderboards,
+            trigger=IntervalTrigger(minutes=10),
+            id="rebuild_leaderboards",
+            name="重建排行榜",
+            replace_existing=True
+        )
 
-        except Exception as e:
-            logger.error(f"检查运气事件过期时出错: {e}", exc_info=True)
+        logger.info(f"已注册 {len(self.scheduler.get_jobs())} 个定时任务")
 
     async def _check_cave_maintenance(self):
-        """检查洞府维护费用（每天执行）"""
+        """检查洞府维护费用（每天执行）
+
+        超过30天未维护的洞府，每天按欠费天数降低灵气浓度（超出部分每天5点，最多50点，
+        不低于100）。欠费天数用时间阈值分档，整个任务是分批执行的集合式 UPDATE。
+        """
         try:
             logger.info("开始检查洞府维护费用...")
 
+            now = datetime.now()
+            # 欠费 31 天降 5 点 …… 40 天及以上降 50 点；阈值越早的分支越先匹配
+            penalty = case(
+                *(
+                    (CaveDwelling.last_maintenance <= now - timedelta(days=30 + steps), steps * 5)
+                    for steps in range(10, 0, -1)
+                ),
+                else_=0,
+            )
+            reduced = CaveDwelling.spiritual_density - penalty
+
             async with AsyncSessionLocal() as session:
-                # 获取所有洞府
-                result = await session.execute(
-                    select(CaveDwelling, Player).join(
-                        Player, Player.id == CaveDwelling.player_id
+                affected = await batched_update(
+                    session,
+                    update(CaveDwelling)
+                    .where(
+                        CaveDwelling.last_maintenance <= now - timedelta(days=31),
+                        CaveDwelling.spiritual_density > 100,
                     )
+                    .values(spiritual_density=case((reduced < 100, 100), else_=reduced)),
+                    CaveDwelling.id,
                 )
-                caves = result.all()
 
-                if not caves:
-                    logger.debug("没有洞府需要维护")
-                    return
-
-                total_collected = 0
-                count = 0
-
-                for cave, player in caves:
-                    # 计算欠费天数
-                    days_since = (datetime.now() - cave.last_maintenance).days
-
-                    if days_since <= 0:
-                        continue
-
-                    # 如果超过30天未维护，降低灵气浓度
-                    if days_since > 30:
-                        penalty = min((days_since - 30) * 5, 50)  # 最多降低50
-                        cave.spiritual_density = max(100, cave.spiritual_density - penalty)
-                        logger.warning(
-                            f"玩家 {player.nickname} 的洞府超过30天未维护，"
-                            f"灵气浓度降低 {penalty} -> {cave.spiritual_density}"
-                        )
-
-                    count += 1
-
-                await session.commit()
-                logger.info(f"已检查 {count} 个洞府的维护状态")
+            logger.info(f"洞府维护检查完成，{affected} 个长期欠费洞府的灵气浓度已降低")
 
         except Exception as e:
             logger.error(f"检查洞府维护时出错: {e}", exc_info=True)
 
     async def _restore_spirit_pool(self):
-        """灵池恢复灵力（每天执行）"""
+        """灵池恢复灵力（每天执行）
+
+        拥有灵池的玩家恢复30%最大灵力（不超过上限），分批执行的集合式 UPDATE。
+        """
         try:
             logger.info("开始灵池恢复灵力...")
 
-            async with AsyncSessionLocal() as session:
-                from bot.services.cave_service import CaveService
-
-                # 获取所有玩家
-                result = await session.execute(select(Player))
-                players = result.scalars().all()
-
-                count = 0
-                total_restored = 0
-
-                for player in players:
-                    # 检查是否有灵池
-                    has_pool = await CaveService.has_spirit_pool(session, player.id)
-
-                    if not has_pool:
-                        continue
-
-                    # 恢复30%灵力
-                    restore_amount = int(player.max_spiritual_power * 0.3)
-                    old_sp = player.spiritual_power
-                    player.spiritual_power = min(
-                        player.max_spiritual_power,
-                        player.spiritual_power + restore_amount
-                    )
-
-                    actual_restored = player.spiritual_power - old_sp
+            has_spirit_pool = (
+                select(CaveRoom.id)
+                .join(CaveDwelling, CaveDwelling.id == CaveRoom.cave_id)
+                .where(
+                    CaveDwelling.player_id == Player.id,
+                    CaveRoom.room_type == CaveRoomType.SPIRIT_POOL.value,
+                )
+                .exists()
+            )
+            restored = Player.spiritual_power + Player.max_spiritual_power * 3 // 10
 
-                    if actual_restored > 0:
-                        count += 1
-                        total_restored += actual_restored
+            async with AsyncSessionLocal() as session:
+                affected = await batched_update(
+                    session,
+                    update(Player)
+                    .where(Player.spiritual_power < Player.max_spiritual_power, has_spirit_pool)
+                    .values(spiritual_power=case(
+                        (restored > Player.max_spiritual_power, Player.max_spiritual_power),
+                        else_=restored,
+                    )),
+                    Player.id,
+                )
 
-                await session.commit()
-                logger.info(f"灵池为 {count} 名玩家恢复了 {total_restored} 点灵力")
+            logger.info(f"灵池为 {affected} 名玩家恢复了灵力")
 
         except Exception as e:
             logger.error(f"灵池恢复灵力时出错: {e}", exc_info=True)
@@ -324,18 +233,39 @@ class GameScheduler:
         except Exception as e:
             logger.error(f"生成世界BOSS时出错: {e}", exc_info=True)
 
-    async def _cleanup_world_bosses(self):
-        """清理超时的世界BOSS"""
+    async def _sweep_expired_listings(self):
+        """退还过期未售出的市场上架物品（每小时执行）
+
+        每批处理 SCHEDULER_BATCH_SIZE 条并提交一次，直到没有过期记录。
+        """
         try:
-            logger.debug("开始检查世界BOSS超时...")
+            from bot.services.market_service import MarketService
 
+            batch_size = settings.SCHEDULER_BATCH_SIZE
+            total = 0
             async with AsyncSessionLocal() as session:
-                from bot.services.world_boss_service import WorldBossService
+                while True:
+                    returned = await MarketService.return_expired_listings(session, batch_size)
+                    await session.commit()
+                    total += returned
+                    if returned < batch_size:
+                        break
+
+            if total:
+                logger.info(f"已退还 {total} 条过期上架物品")
+
+        except Exception as e:
+            logger.error(f"退还过期上架物品时出错: {e}", exc_info=True)
+
+    async def _rebuild_leaderboards(self):
+        """重建排行榜"""
+        try:
+            from bot.services.leaderboard_service import LeaderboardService
 
-                await WorldBossService.cleanup_old_bosses(session)
+            await LeaderboardService.rebuild()
 
         except Exception as e:
-            logger.error(f"清理世界BOSS时出错: {e}", exc_info=True)
+            logger.error(f"重建排行榜时出错: {e}", exc_info=True)
 
 
 # 全局调度器实例
@@ -4,5 +4,12 @@ from .cultivation_service import CultivationService
 from .battle_service import BattleService
 from .skill_service import SkillService
 from .realm_service import RealmService
+from .player_cache import PlayerCache, PlayerProfile
+from .leaderboard_service import LeaderboardService
+from .order_book_service import OrderBookService
+from .price_history_service import PriceHistoryService
 
-__all__ = ["PlayerService", "CultivationService", "BattleService", "SkillService", "RealmService"]
+__all__ = [
+    "PlayerService", "CultivationService", "BattleService", "SkillService", "RealmService",
+    "PlayerCache", "PlayerProfile", "LeaderboardService", "OrderBookService", "PriceHistoryService",
+]
@@ -6,8 +6,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.models import (
     Player, Achievement, PlayerAchievement, PlayerTitle, AchievementStats,
-    AchievementCategory, PlayerInventory, Item
+    AchievementCategory, PlayerInventory
 )
+from bot.services.game_catalog import GameCatalog
 
 
 class AchievementService:
@@ -87,10 +88,7 @@ class AchievementService:
             新完成的成就列表
         """
         # 查找该类型的所有成就
-        result = await db.execute(
-            select(Achievement).where(Achievement.condition_type == condition_type)
-        )
-        achievements = result.scalars().all()
+        achievements = (await GameCatalog.get(db)).achievements_by_condition.get(condition_type, [])
 
         newly_completed = []
 
@@ -143,10 +141,8 @@ class AchievementService:
             (是否成功, 消息, 奖励数据)
         """
         # 获取成就
-        result = await db.execute(
-            select(Achievement).where(Achievement.id == achievement_id)
-        )
-        achievement = result.scalar_one_or_none()
+        catalog = await GameCatalog.get(db)
+        achievement = catalog.achievements_by_id.get(achievement_id)
 
         if not achievement:
             return False, "成就不存在", {}
@@ -185,10 +181,7 @@ class AchievementService:
 
         # 物品奖励
         if achievement.reward_item_id:
-            result = await db.execute(
-                select(Item).where(Item.id == achievement.reward_item_id)
-            )
-            item = result.scalar_one_or_none()
+            item = catalog.items_by_id.get(achievement.reward_item_id)
             if item:
                 # 添加到背包
                 result = await db.execute(
@@ -7,9 +7,11 @@ from typing import Optional, Tuple, List, Dict
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.models import Player, Item, PlayerInventory
+from bot.models import Player, PlayerInventory
 from bot.models.alchemy import PlayerAlchemy, PillRecipe, AlchemyRecord
 from bot.services.cave_service import CaveService
+from bot.services.game_catalog import GameCatalog
+from bot.utils.concurrency import battles
 
 
 class AlchemyService:
@@ -47,7 +49,7 @@ class AlchemyService:
         if player.is_cultivating:
             return False, "修炼中无法炼丹"
 
-        if player.is_in_battle:
+        if battles.busy(player.id):
             return False, "战斗中无法炼丹"
 
         if alchemy.alchemy_level < recipe.required_alchemy_level:
@@ -90,10 +92,7 @@ class AlchemyService:
 
             if total_qty < required_qty:
                 # 获取物品名称
-                result = await db.execute(
-                    select(Item).where(Item.id == item_id)
-                )
-                item = result.scalar_one_or_none()
+                item = (await GameCatalog.get(db)).items_by_id.get(item_id)
                 item_name = item.name if item else f"ID:{item_id}"
                 missing.append(f"{item_name}(缺{required_qty - total_qty})")
 
@@ -217,10 +216,7 @@ class AlchemyService:
             quality_bonus = min(alchemy.alchemy_level * 5, 50)
 
             # 添加到背包
-            result = await db.execute(
-                select(Item).where(Item.id == recipe.result_pill_id)
-            )
-            pill_item = result.scalar_one_or_none()
+            pill_item = (await GameCatalog.get(db)).items_by_id.get(recipe.result_pill_id)
 
             if pill_item:
                 # 查找现有背包
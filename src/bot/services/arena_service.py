@@ -1,11 +1,11 @@
 """竞技场服务"""
-import random
 from datetime import datetime, date
 from typing import Tuple, List, Dict, Optional
 from sqlalchemy import select, func, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.models import Player, Arena, BattleRecord, BattleType, BattleResult
+from bot.models import Player, Arena, BattleType, BattleResult
+from bot.services.battle_service import BattleService
 
 
 class ArenaService:
@@ -132,20 +132,11 @@ class ArenaService:
         if target_arena.rank >= challenger_arena.rank:
             return False, "只能挑战排名高于自己的玩家", None
 
-        # 模拟战斗(简化版)
-        challenger_power = challenger.combat_power
-        target_power = target.combat_power
-
-        # 计算胜率(基于战力差异)
-        power_ratio = challenger_power / target_power if target_power > 0 else 2.0
-        base_win_rate = 0.5
-        if power_ratio > 1:
-            win_rate = min(0.85, base_win_rate + (power_ratio - 1) * 0.2)
-        else:
-            win_rate = max(0.15, base_win_rate - (1 - power_ratio) * 0.2)
-
-        # 判定结果
-        is_win = random.random() < win_rate
+        # 满状态模拟战斗（带种子，可重放）
+        battle_result, report, battle_record = await BattleService.battle_duel(
+            db, challenger, target, BattleType.ARENA
+        )
+        is_win = battle_result == BattleResult.WIN
 
         # 更新挑战次数
         today = date.today()
@@ -180,25 +171,12 @@ class ArenaService:
                 challenger_arena.highest_rank = challenger_arena.rank
 
             result_msg = f"🎉 挑战成功！\n排名: {old_challenger_rank} → {challenger_arena.rank}"
-            battle_result = BattleResult.WIN
         else:
             # 失败
             challenger_arena.win_streak = 0
             challenger_arena.points = max(0, challenger_arena.points - ArenaService.LOSS_POINTS)
 
             result_msg = f"💔 挑战失败\n排名未变: {challenger_arena.rank}"
-            battle_result = BattleResult.LOSE
-
-        # 记录战斗
-        battle_record = BattleRecord(
-            player_id=challenger.id,
-            opponent_id=target.id,
-            battle_type=BattleType.ARENA,
-            result=battle_result,
-            exp_gained=0,
-            spirit_stones_gained=0
-        )
-        db.add(battle_record)
 
         await db.commit()
 
@@ -209,7 +187,9 @@ class ArenaService:
             "target_rank": target_arena.rank,
             "points_change": ArenaService.WIN_POINTS if is_win else -ArenaService.LOSS_POINTS,
             "win_streak": challenger_arena.win_streak,
-            "remaining_challenges": challenger_arena.max_daily_challenges - challenger_arena.daily_challenges
+            "remaining_challenges": challenger_arena.max_daily_challenges - challenger_arena.daily_challenges,
+            "battle_id": battle_record.id,
+            "rounds": report.outcome.rounds,
         }
 
         return True, result_msg, result_data
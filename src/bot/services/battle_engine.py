@@ -0,0 +1,530 @@
+"""纯内存战斗引擎
+
+战斗开始前一次性把双方的属性、技能和策略加载成紧凑的 `Combatant` 对象，
+回合循环中不再访问数据库；数据库只在战斗结束后由 `BattleService` 写回。
+
+每场战斗由独立的随机种子驱动，引擎只产出紧凑的 `BattleEvent` 事件流，
+文字战报在真正发送消息时才由 `BattleReport` 渲染。种子和开战时的属性快照
+保存在 `BattleRecord` 上，可以用 `BattleEngine.replay` 精确重放任意一场战斗。
+"""
+import json
+import random
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from bot.models import Player, Monster, PlayerSkill, Skill, BattleResult
+from bot.services.battle_strategy import BattleAI, BattleStrategy
+
+
+# 怪物没有暴击属性，使用固定值
+MONSTER_CRIT_RATE = 0.05
+MONSTER_CRIT_DAMAGE = 1.5
+
+# 普通攻击随机波动范围（±20%）
+ATTACK_VARIANCE_MIN = 0.8
+ATTACK_VARIANCE_MAX = 1.2
+
+# 快照格式版本（结构变化时递增，旧记录仍按旧版本解析）
+SNAPSHOT_VERSION = 1
+
+# 事件行动类型
+ACTION_ATTACK = 0
+ACTION_SKILL = 1
+
+# 事件行动方
+SIDE_ATTACKER = 0
+SIDE_DEFENDER = 1
+
+
+class BattleEvent(NamedTuple):
+    """战斗事件（一次行动）"""
+    round: int
+    actor: int  # SIDE_ATTACKER / SIDE_DEFENDER
+    action: int  # ACTION_ATTACK / ACTION_SKILL
+    skill_id: int  # 普通攻击为 0
+    damage: int
+    is_crit: bool
+
+
+class CombatSkill:
+    """战斗中使用的技能快照"""
+
+    __slots__ = (
+        "skill_id", "name", "element", "base_power", "damage_multiplier",
+        "spiritual_cost", "level", "effects", "element_bonus",
+        "cost_ratio", "base_score",
+    )
+
+    def __init__(
+        self,
+        skill_id: int,
+        name: str,
+        element: Optional[str],
+        base_power: int,
+        damage_multiplier: float,
+        spiritual_cost: int,
+        level: int = 1,
+        effects: Sequence[str] = (),
+    ):
+        self.skill_id = skill_id
+        self.name = name
+        self.element = element
+        self.base_power = base_power
+        self.damage_multiplier = damage_multiplier
+        self.spiritual_cost = spiritual_cost
+        self.level = level
+        self.effects = tuple(effects)
+        # 以下字段依赖施法者，由 Combatant.add_skills 计算
+        self.element_bonus = 1.0
+        self.cost_ratio = 0.0
+        self.base_score = 0.0
+
+    @classmethod
+    def from_models(cls, player_skill: PlayerSkill, skill: Skill) -> "CombatSkill":
+        """从数据库模型创建技能快照"""
+        effects: Sequence[str] = ()
+        if skill.special_effects:
+            try:
+                effects = json.loads(skill.special_effects) or ()
+            except (ValueError, TypeError):
+                effects = ()
+
+        return cls(
+            skill_id=skill.id,
+            name=skill.name,
+            element=skill.element,
+            base_power=skill.base_power,
+            damage_multiplier=skill.damage_multiplier,
+            spiritual_cost=skill.spiritual_cost,
+            level=player_skill.level,
+            effects=effects,
+        )
+
+    def to_snapshot(self) -> list:
+        """导出为可JSON序列化的快照"""
+        return [
+            self.skill_id, self.name, self.element, self.base_power,
+            self.damage_multiplier, self.spiritual_cost, self.level, list(self.effects),
+        ]
+
+    @classmethod
+    def from_snapshot(cls, data: list) -> "CombatSkill":
+        """从快照恢复"""
+        skill_id, name, element, base_power, damage_multiplier, spiritual_cost, level, effects = data
+        return cls(skill_id, name, element, base_power, damage_multiplier, spiritual_cost, level, effects)
+
+
+class Combatant:
+    """参战单位（玩家或怪物）的紧凑快照"""
+
+    __slots__ = (
+        "entity_id", "name", "is_player", "icon",
+        "hp", "max_hp", "sp", "max_sp",
+        "attack", "defense", "speed", "crit_rate", "crit_damage",
+        "strategy", "elements", "skills",
+    )
+
+    def __init__(
+        self,
+        entity_id: int,
+        name: str,
+        hp: int,
+        max_hp: int,
+        attack: int,
+        defense: int,
+        speed: int,
+        crit_rate: float,
+        crit_damage: float,
+        sp: int = 0,
+        max_sp: int = 0,
+        is_player: bool = True,
+        icon: str = "🗡️",
+        strategy: BattleStrategy = BattleStrategy.BALANCED,
+        elements: Sequence[str] = (),
+    ):
+        self.entity_id = entity_id
+        self.name = name
+        self.is_player = is_player
+        self.icon = icon
+        self.hp = hp
+        self.max_hp = max_hp
+        self.sp = sp
+        self.max_sp = max_sp
+        self.attack = attack
+        self.defense = defense
+        self.speed = speed
+        self.crit_rate = crit_rate
+        self.crit_damage = crit_damage
+        self.strategy = strategy
+        self.elements = tuple(elements)
+        self.skills: tuple = ()
+
+    @classmethod
+    def from_player(
+        cls,
+        player: Player,
+        skills: Sequence[CombatSkill] = (),
+        elements: Sequence[str] = (),
+        icon: str = "🗡️",
+    ) -> "Combatant":
+        """从玩家创建参战单位"""
+        try:
+            strategy = BattleStrategy(player.battle_strategy)
+        except ValueError:
+            strategy = BattleStrategy.BALANCED
+
+        combatant = cls(
+            entity_id=player.id,
+            name=player.nickname,
+            hp=player.hp,
+            max_hp=player.max_hp,
+            sp=player.spiritual_power,
+            max_sp=player.max_spiritual_power,
+            attack=player.attack,
+            defense=player.defense,
+            speed=player.speed,
+            crit_rate=player.crit_rate,
+            crit_damage=player.crit_damage,
+            is_player=True,
+            icon=icon,
+            strategy=strategy,
+            elements=elements,
+        )
+        combatant.add_skills(skills)
+        return combatant
+
+    @classmethod
+    def from_monster(cls, monster: Monster) -> "Combatant":
+        """从怪物创建参战单位"""
+        return cls(
+            entity_id=monster.id,
+            name=monster.name,
+            hp=monster.hp,
+            max_hp=monster.hp,
+            attack=monster.attack,
+            defense=monster.defense,
+            speed=monster.speed,
+            crit_rate=MONSTER_CRIT_RATE,
+            crit_damage=MONSTER_CRIT_DAMAGE,
+            is_player=False,
+            icon="👹",
+        )
+
+    def add_skills(self, skills: Sequence[CombatSkill]) -> None:
+        """装载技能，并预计算与施法者相关的静态数据
+
+        技能按灵力消耗升序排列，回合中按当前灵力截断即可得到可用技能。
+        """
+        for skill in skills:
+            skill.element_bonus = BattleEngine.element_bonus(skill.element, self.elements)
+            skill.cost_ratio = skill.spiritual_cost / self.max_sp if self.max_sp > 0 else 1.0
+            skill.base_score = BattleAI.static_skill_score(skill, self)
+        self.skills = tuple(sorted(skills, key=lambda s: (s.spiritual_cost, s.skill_id)))
+
+    def to_snapshot(self) -> dict:
+        """导出开战时的属性快照（可JSON序列化）"""
+        return {
+            "id": self.entity_id,
+            "name": self.name,
+            "is_player": self.is_player,
+            "icon": self.icon,
+            "hp": self.hp,
+            "max_hp": self.max_hp,
+            "sp": self.sp,
+            "max_sp": self.max_sp,
+            "attack": self.attack,
+            "defense": self.defense,
+            "speed": self.speed,
+            "crit_rate": self.crit_rate,
+            "crit_damage": self.crit_damage,
+            "strategy": self.strategy.value,
+            "elements": list(self.elements),
+            "skills": [skill.to_snapshot() for skill in self.skills],
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: dict) -> "Combatant":
+        """从快照恢复参战单位"""
+        combatant = cls(
+            entity_id=data["id"],
+            name=data["name"],
+            hp=data["hp"],
+            max_hp=data["max_hp"],
+            sp=data["sp"],
+            max_sp=data["max_sp"],
+            attack=data["attack"],
+            defense=data["defense"],
+            speed=data["speed"],
+            crit_rate=data["crit_rate"],
+            crit_damage=data["crit_damage"],
+            is_player=data["is_player"],
+            icon=data["icon"],
+            strategy=BattleStrategy(data["strategy"]),
+            elements=data["elements"],
+        )
+        combatant.add_skills([CombatSkill.from_snapshot(skill) for skill in data["skills"]])
+        return combatant
+
+    def available_skills(self) -> List[CombatSkill]:
+        """当前灵力足够施放的技能"""
+        sp = self.sp
+        available = []
+        for skill in self.skills:
+            if skill.spiritual_cost > sp:
+                break
+            available.append(skill)
+        return available
+
+
+class BattleOutcome:
+    """一场战斗的结果"""
+
+    __slots__ = ("rounds", "events")
+
+    def __init__(self, rounds: int, events: List[BattleEvent]):
+        self.rounds = rounds
+        self.events = events
+
+
+class BattleReport:
+    """战报：战斗结果 + 事件流，发送消息时才渲染成文字"""
+
+    __slots__ = ("snapshot", "outcome", "result", "rewards")
+
+    def __init__(self, snapshot: dict, outcome: BattleOutcome, result: BattleResult, rewards: Dict):
+        self.snapshot = snapshot
+        self.outcome = outcome
+        self.result = result
+        self.rewards = rewards
+
+    def render(self) -> List[str]:
+        """渲染文字战报"""
+        attacker = self.snapshot["attacker"]
+        defender = self.snapshot["defender"]
+        sides = (attacker, defender)
+
+        lines = [f"⚔️ {attacker['name']} VS {defender['name']}"]
+        for unit in sides:
+            if unit["is_player"]:
+                lines.append(
+                    f"💚 {unit['name']}: {unit['hp']}/{unit['max_hp']} | 💙灵力: {unit['sp']}/{unit['max_sp']}"
+                )
+            else:
+                lines.append(f"💔 {unit['name']}: {unit['hp']}/{unit['max_hp']}")
+        for unit in sides:
+            if unit["is_player"]:
+                lines.append(f"📋 {unit['name']} 策略: {BattleStrategy(unit['strategy']).name}")
+        lines.append("---")
+
+        skill_tables = [
+            {skill[0]: (skill[1], skill[7]) for skill in unit["skills"]} for unit in sides
+        ]
+        last_round = 0
+        for event in self.outcome.events:
+            if event.round != last_round:
+                last_round = event.round
+                lines.append(f"\n第 {event.round} 回合：")
+
+            actor = sides[event.actor]
+            crit_text = "💥暴击！" if event.is_crit else ""
+            if event.action == ACTION_SKILL:
+                skill_name, effects = skill_tables[event.actor].get(event.skill_id, ("?", []))
+                lines.append(f"  ✨ {actor['name']} 施放 [{skill_name}] 造成 {event.damage} 伤害 {crit_text}")
+                if effects:
+                    lines.append(f"     附加效果: {', '.join(effects)}")
+            else:
+                lines.append(f"  {actor['icon']} {actor['name']} 攻击造成 {event.damage} 伤害 {crit_text}")
+
+        lines.append("\n---")
+        if self.result == BattleResult.WIN:
+            lines.append(f"🎉 {attacker['name']} 获胜！")
+        elif self.result == BattleResult.LOSE:
+            lines.append(f"💀 {defender['name']} 获胜！")
+        else:
+            lines.append("⏱️ 平局（达到最大回合数）")
+
+        if self.rewards.get("exp"):
+            reward_text = f"获得 {self.rewards['exp']} 修为"
+            if self.rewards.get("spirit_stones"):
+                reward_text += f"，{self.rewards['spirit_stones']} 灵石"
+            lines.append(reward_text)
+
+        return lines
+
+
+class BattleEngine:
+    """回合制战斗核心（纯计算，不访问数据库）"""
+
+    @staticmethod
+    def element_bonus(skill_element: Optional[str], elements: Sequence[str]) -> float:
+        """灵根元素匹配加成：单灵根+50%，双灵根+30%，三灵根+15%，四灵根+5%"""
+        if not skill_element or skill_element not in elements:
+            return 1.0
+
+        return {1: 1.5, 2: 1.3, 3: 1.15, 4: 1.05}.get(len(elements), 1.0)
+
+    @staticmethod
+    def attack_base_damage(attack: int, defense: int) -> int:
+        """普通攻击基础伤害（随机波动前）"""
+        return max(1, attack - defense // 2)
+
+    @staticmethod
+    def attack_damage(
+        attack: int,
+        defense: int,
+        crit_rate: float,
+        crit_damage: float,
+        rng=random
+    ) -> tuple:
+        """普通攻击伤害
+
+        Returns:
+            (damage, is_crit)
+        """
+        base_damage = BattleEngine.attack_base_damage(attack, defense)
+
+        # 随机波动 ±20%
+        damage = int(base_damage * rng.uniform(ATTACK_VARIANCE_MIN, ATTACK_VARIANCE_MAX))
+
+        # 暴击判定
+        is_crit = rng.random() < crit_rate
+        if is_crit:
+            damage = int(damage * crit_damage)
+
+        return damage, is_crit
+
+    @staticmethod
+    def skill_base_damage(
+        base_power: int,
+        damage_multiplier: float,
+        caster_attack: int,
+        skill_level: int,
+        element_bonus: float,
+        target_defense: int
+    ) -> int:
+        """技能伤害（暴击判定前，不含随机因素）"""
+        # 基础伤害 = 技能基础威力 + 施法者攻击力
+        base_damage = base_power + int(caster_attack * 0.5)
+
+        # 技能等级加成 (每级+10%)
+        level_bonus = 1.0 + (skill_level - 1) * 0.1
+
+        total_damage = int(base_damage * level_bonus * element_bonus * damage_multiplier)
+
+        # 减去防御
+        return max(1, total_damage - target_defense)
+
+    @staticmethod
+    def skill_damage(
+        base_power: int,
+        damage_multiplier: float,
+        caster_attack: int,
+        skill_level: int,
+        element_bonus: float,
+        target_defense: int,
+        crit_rate: float,
+        crit_damage: float,
+        rng=random
+    ) -> tuple:
+        """技能伤害
+
+        Returns:
+            (damage, is_crit)
+        """
+        final_damage = BattleEngine.skill_base_damage(
+            base_power, damage_multiplier, caster_attack, skill_level, element_bonus, target_defense
+        )
+
+        # 暴击判定
+        is_crit = rng.random() < crit_rate
+        if is_crit:
+            final_damage = int(final_damage * crit_damage)
+
+        return final_damage, is_crit
+
+    @staticmethod
+    def new_seed() -> int:
+        """生成新的战斗种子（63位，适配 BIGINT）"""
+        return random.SystemRandom().getrandbits(63)
+
+    @staticmethod
+    def snapshot(attacker: Combatant, defender: Combatant, max_rounds: int) -> dict:
+        """开战前的完整快照，与种子一起即可重放战斗"""
+        return {
+            "v": SNAPSHOT_VERSION,
+            "max_rounds": max_rounds,
+            "attacker": attacker.to_snapshot(),
+            "defender": defender.to_snapshot(),
+        }
+
+    @staticmethod
+    def _act(
+        actor: Combatant,
+        target: Combatant,
+        side: int,
+        round_num: int,
+        events: List[BattleEvent],
+        rng
+    ) -> None:
+        """执行一次行动"""
+        skill = None
+        if actor.skills:
+            skill = BattleAI.select_skill(
+                actor, actor.available_skills(), target.hp, target.max_hp, round_num, rng
+            )
+
+        if skill is not None:
+            damage, is_crit = BattleEngine.skill_damage(
+                skill.base_power, skill.damage_multiplier, actor.attack, skill.level,
+                skill.element_bonus, target.defense, actor.crit_rate, actor.crit_damage, rng
+            )
+            actor.sp -= skill.spiritual_cost
+            events.append(BattleEvent(round_num, side, ACTION_SKILL, skill.skill_id, damage, is_crit))
+        else:
+            damage, is_crit = BattleEngine.attack_damage(
+                actor.attack, target.defense, actor.crit_rate, actor.crit_damage, rng
+            )
+            events.append(BattleEvent(round_num, side, ACTION_ATTACK, 0, damage, is_crit))
+        target.hp -= damage
+
+    @staticmethod
+    def run(
+        attacker: Combatant,
+        defender: Combatant,
+        max_rounds: int,
+        rng=random
+    ) -> BattleOutcome:
+        """运行完整战斗，直接修改双方的 hp/sp
+
+        速度高者先手（相同时攻击方先手），先手方击倒对手后本回合立即结束。
+        """
+        if attacker.speed >= defender.speed:
+            first, second = attacker, defender
+            first_side, second_side = SIDE_ATTACKER, SIDE_DEFENDER
+        else:
+            first, second = defender, attacker
+            first_side, second_side = SIDE_DEFENDER, SIDE_ATTACKER
+
+        events: List[BattleEvent] = []
+        round_num = 0
+        while attacker.hp > 0 and defender.hp > 0 and round_num < max_rounds:
+            round_num += 1
+
+            BattleEngine._act(first, second, first_side, round_num, events, rng)
+            if second.hp <= 0:
+                break
+
+            BattleEngine._act(second, first, second_side, round_num, events, rng)
+
+        return BattleOutcome(round_num, events)
+
+    @staticmethod
+    def replay(seed: int, snapshot: dict) -> Tuple[Combatant, Combatant, BattleOutcome]:
+        """根据种子和开战快照重放战斗
+
+        Returns:
+            (attacker, defender, outcome) - 双方为战斗结束时的状态
+        """
+        attacker = Combatant.from_snapshot(snapshot["attacker"])
+        defender = Combatant.from_snapshot(snapshot["defender"])
+        outcome = BattleEngine.run(attacker, defender, snapshot["max_rounds"], random.Random(seed))
+        return attacker, defender, outcome
@@ -0,0 +1,233 @@
+"""蒙特卡洛战斗模拟器
+
+用 NumPy 把上万场战斗打包成数组逐回合并行推演，估算胜率、期望回合数和期望损血。
+确定性的伤害部分直接调用 `BattleEngine` 的公式，随机波动、暴击和技能选择与
+`BattleEngine` / `BattleAI` 保持同一套规则，因此预测结果与实战统计一致。
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import settings
+from bot.models import Player, Monster
+from bot.services.battle_engine import (
+    ATTACK_VARIANCE_MAX, ATTACK_VARIANCE_MIN, BattleEngine, Combatant,
+)
+from bot.services.battle_service import BattleService
+from bot.services.battle_strategy import BattleAI, BattleStrategy
+from bot.services.game_catalog import GameCatalog
+
+
+class SimulationResult:
+    """模拟统计结果（均以攻击方视角）"""
+
+    __slots__ = (
+        "simulations", "win_rate", "lose_rate", "draw_rate",
+        "expected_rounds", "expected_hp_loss", "expected_opponent_hp_loss",
+    )
+
+    def __init__(
+        self,
+        simulations: int,
+        win_rate: float,
+        lose_rate: float,
+        draw_rate: float,
+        expected_rounds: float,
+        expected_hp_loss: float,
+        expected_opponent_hp_loss: float,
+    ):
+        self.simulations = simulations
+        self.win_rate = win_rate
+        self.lose_rate = lose_rate
+        self.draw_rate = draw_rate
+        self.expected_rounds = expected_rounds
+        self.expected_hp_loss = expected_hp_loss
+        self.expected_opponent_hp_loss = expected_opponent_hp_loss
+
+
+class _SideState:
+    """一方在所有模拟战斗中的状态数组，以及针对对手预计算的伤害表"""
+
+    __slots__ = (
+        "unit", "hp", "sp", "attack_base", "skill_costs", "skill_damage",
+        "skill_crit_damage", "base_scores", "cost_ratios", "damage_multipliers",
+    )
+
+    def __init__(self, unit: Combatant, target: Combatant, simulations: int):
+        self.unit = unit
+        self.hp = np.full(simulations, unit.hp, dtype=np.int64)
+        self.sp = np.full(simulations, unit.sp, dtype=np.int64)
+        self.attack_base = BattleEngine.attack_base_damage(unit.attack, target.defense)
+
+        skills = unit.skills
+        damage = [
+            BattleEngine.skill_base_damage(
+                s.base_power, s.damage_multiplier, unit.attack, s.level, s.element_bonus, target.defense
+            )
+            for s in skills
+        ]
+        self.skill_costs = np.array([s.spiritual_cost for s in skills], dtype=np.int64)
+        self.skill_damage = np.array(damage, dtype=np.int64)
+        self.skill_crit_damage = np.array([int(d * unit.crit_damage) for d in damage], dtype=np.int64)
+        self.base_scores = np.array([s.base_score for s in skills], dtype=np.float64)
+        self.cost_ratios = np.array([s.cost_ratio for s in skills], dtype=np.float64)
+        self.damage_multipliers = np.array([s.damage_multiplier for s in skills], dtype=np.float64)
+
+
+class BattleSimulator:
+    """批量战斗模拟"""
+
+    DEFAULT_SIMULATIONS = 10000
+
+    @staticmethod
+    def _select_skills(
+        actor: _SideState,
+        target: _SideState,
+        idx: np.ndarray,
+        rng: np.random.Generator
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """向量化的 BattleAI.select_skill
+
+        Returns:
+            (use_skill, skill_index) - 是否施放技能，以及施放的技能下标
+        """
+        unit = actor.unit
+        n = idx.size
+        config = BattleAI.STRATEGY_CONFIG[unit.strategy]
+
+        sp = actor.sp[idx]
+        sp_percent = sp / unit.max_sp if unit.max_sp > 0 else np.zeros(n)
+        eligible = (sp_percent >= config["spiritual_power_reserve"]) & (
+            rng.random(n) <= config["skill_usage_rate"]
+        )
+
+        scores = np.broadcast_to(actor.base_scores, (n, actor.base_scores.size)).copy()
+
+        # 与 BattleAI._situational_score 相同的战况修正
+        if unit.strategy == BattleStrategy.DEFENSIVE:
+            hp_percent = actor.hp[idx] / unit.max_hp
+            low_hp = hp_percent < config["low_hp_threshold"]
+            scores -= 20 * (low_hp[:, None] & (actor.cost_ratios > 0.2)[None, :])
+        elif unit.strategy == BattleStrategy.BALANCED:
+            opponent_hp_percent = target.hp[idx] / target.unit.max_hp
+            finishing = (opponent_hp_percent < 0.3)[:, None] & (actor.damage_multipliers >= 1.5)[None, :]
+            steady = (opponent_hp_percent > 0.7)[:, None] & (actor.cost_ratios < 0.15)[None, :]
+            scores += 10 * (finishing | steady)
+
+        # 灵力不足的技能不可选
+        scores[sp[:, None] < actor.skill_costs[None, :]] = -np.inf
+        best = scores.argmax(axis=1)
+        best_score = scores[np.arange(n), best]
+
+        return eligible & (best_score >= 30), best
+
+    @staticmethod
+    def _act(
+        actor: _SideState,
+        target: _SideState,
+        mask: np.ndarray,
+        rng: np.random.Generator
+    ) -> None:
+        """对 mask 选中的战斗执行一次行动"""
+        idx = np.flatnonzero(mask)
+        n = idx.size
+        if n == 0:
+            return
+
+        unit = actor.unit
+        is_crit = rng.random(n) < unit.crit_rate
+
+        # 普通攻击：基础伤害 × 随机波动，暴击再乘暴击伤害（均向下取整）
+        damage = np.floor(
+            actor.attack_base * rng.uniform(ATTACK_VARIANCE_MIN, ATTACK_VARIANCE_MAX, n)
+        )
+        damage = np.where(is_crit, np.floor(damage * unit.crit_damage), damage).astype(np.int64)
+
+        if unit.skills:
+            use_skill, best = BattleSimulator._select_skills(actor, target, idx, rng)
+            skill_damage = np.where(is_crit, actor.skill_crit_damage[best], actor.skill_damage[best])
+            damage = np.where(use_skill, skill_damage, damage)
+            actor.sp[idx] -= np.where(use_skill, actor.skill_costs[best], 0)
+
+        target.hp[idx] -= damage
+
+    @staticmethod
+    def simulate(
+        attacker: Combatant,
+        defender: Combatant,
+        simulations: int = DEFAULT_SIMULATIONS,
+        max_rounds: Optional[int] = None,
+        seed: Optional[int] = None
+    ) -> SimulationResult:
+        """模拟 attacker 对 defender 的大量战斗（不修改传入的参战单位）"""
+        if max_rounds is None:
+            max_rounds = settings.MAX_BATTLE_ROUNDS
+
+        rng = np.random.default_rng(seed)
+        atk = _SideState(attacker, defender, simulations)
+        dfd = _SideState(defender, attacker, simulations)
+
+        # 与 BattleEngine.run 相同：速度高者先手，相同时攻击方先手
+        first, second = (atk, dfd) if attacker.speed >= defender.speed else (dfd, atk)
+
+        rounds = np.zeros(simulations, dtype=np.int64)
+        for round_num in range(1, max_rounds + 1):
+            active = (atk.hp > 0) & (dfd.hp > 0)
+            if not active.any():
+                break
+            rounds[active] = round_num
+
+            BattleSimulator._act(first, second, active, rng)
+            BattleSimulator._act(second, first, active & (second.hp > 0), rng)
+
+        wins = (atk.hp > 0) & (dfd.hp <= 0)
+        losses = atk.hp <= 0
+
+        return SimulationResult(
+            simulations=simulations,
+            win_rate=float(wins.mean()),
+            lose_rate=float(losses.mean()),
+            draw_rate=float(1.0 - wins.mean() - losses.mean()),
+            expected_rounds=float(rounds.mean()),
+            expected_hp_loss=float((attacker.hp - np.maximum(atk.hp, 0)).mean()),
+            expected_opponent_hp_loss=float((defender.hp - np.maximum(dfd.hp, 0)).mean()),
+        )
+
+    @staticmethod
+    async def predict_pve(
+        db: AsyncSession,
+        player: Player,
+        monster: Monster,
+        simulations: int = DEFAULT_SIMULATIONS
+    ) -> SimulationResult:
+        """预测玩家挑战怪物的结果"""
+        unit = await BattleService.load_combatant(db, player)
+        return BattleSimulator.simulate(unit, Combatant.from_monster(monster), simulations)
+
+    @staticmethod
+    async def predict_pvp(
+        db: AsyncSession,
+        attacker: Player,
+        defender: Player,
+        simulations: int = DEFAULT_SIMULATIONS
+    ) -> SimulationResult:
+        """预测玩家切磋的结果"""
+        attacker_unit = await BattleService.load_combatant(db, attacker)
+        defender_unit = await BattleService.load_combatant(db, defender)
+        return BattleSimulator.simulate(attacker_unit, defender_unit, simulations)
+
+    @staticmethod
+    async def sweep_monsters(
+        db: AsyncSession,
+        player: Player,
+        simulations: int = 2000
+    ) -> List[Tuple[Monster, SimulationResult]]:
+        """对整张怪物表做平衡性扫描（管理员工具）"""
+        unit = await BattleService.load_combatant(db, player)
+        monsters = (await GameCatalog.get(db)).monsters
+
+        return [
+            (monster, BattleSimulator.simulate(unit, Combatant.from_monster(monster), simulations))
+            for monster in monsters
+        ]
@@ -4,9 +4,10 @@
 """
 import enum
 import random
-from typing import Tuple, List, Optional, Dict
+from typing import TYPE_CHECKING, List, Optional, Dict
 
-from bot.models import Player, Skill, PlayerSkill
+if TYPE_CHECKING:
+    from bot.services.battle_engine import Combatant, CombatSkill
 
 
 class BattleStrategy(enum.Enum):
@@ -45,183 +46,126 @@ class BattleAI:
     }
 
     @staticmethod
-    def select_action(
-        player: Player,
-        available_skills: List[Tuple[PlayerSkill, Skill]],
-        strategy: BattleStrategy,
-        current_hp: int,
-        current_sp: int,
-        opponent_hp: int,
-        opponent_max_hp: int,
-        round_num: int
-    ) -> Tuple[str, Optional[Tuple[PlayerSkill, Skill]], str]:
-        """选择战斗行动
+    def select_skill(
+        actor: "Combatant",
+        available_skills: List["CombatSkill"],
+        opponent_hp: int = 0,
+        opponent_max_hp: int = 1,
+        round_num: int = 1,
+        rng=random
+    ) -> Optional["CombatSkill"]:
+        """选择本回合施放的技能
 
         Args:
-            player: 玩家对象
-            available_skills: 可用技能列表 [(PlayerSkill, Skill), ...]
-            strategy: 战斗策略
-            current_hp: 当前血量
-            current_sp: 当前灵力
+            actor: 行动方（技能已预加载）
+            available_skills: 灵力足够的技能列表
             opponent_hp: 对手当前血量
             opponent_max_hp: 对手最大血量
             round_num: 当前回合数
+            rng: 随机数生成器
 
         Returns:
-            (action_type, skill_tuple_or_none, reason)
-            action_type: "skill" 或 "attack"
-            skill_tuple: (PlayerSkill, Skill) 或 None
-            reason: 决策原因说明
+            选中的技能，返回 None 表示使用普通攻击
         """
-        # 计算百分比
-        hp_percent = current_hp / player.max_hp
-        sp_percent = current_sp / player.max_spiritual_power
-        opponent_hp_percent = opponent_hp / opponent_max_hp
-
-        # 获取策略配置
-        config = BattleAI.STRATEGY_CONFIG[strategy]
-
         # 没有可用技能，使用普通攻击
         if not available_skills:
-            return "attack", None, "无可用技能"
+            return None
+
+        config = BattleAI.STRATEGY_CONFIG[actor.strategy]
 
         # 检查是否应该保留灵力
+        sp_percent = actor.sp / actor.max_sp if actor.max_sp > 0 else 0.0
         if sp_percent < config["spiritual_power_reserve"]:
-            return "attack", None, f"灵力不足{int(config['spiritual_power_reserve']*100)}%，保留实力"
+            return None
 
         # 根据策略决定是否使用技能
-        skill_usage_roll = random.random()
-        if skill_usage_roll > config["skill_usage_rate"]:
-            return "attack", None, "本回合选择普通攻击"
+        if rng.random() > config["skill_usage_rate"]:
+            return None
+
+        hp_percent = actor.hp / actor.max_hp if actor.max_hp > 0 else 0.0
+        opponent_hp_percent = opponent_hp / opponent_max_hp if opponent_max_hp > 0 else 0.0
 
         # 评分所有技能并选择最佳
         best_skill = None
-        best_score = -1
-        best_reason = ""
-
-        for player_skill, skill in available_skills:
-            score, reason = BattleAI._score_skill(
-                skill=skill,
-                player_skill=player_skill,
-                player=player,
-                strategy=strategy,
-                hp_percent=hp_percent,
-                sp_percent=sp_percent,
-                opponent_hp_percent=opponent_hp_percent,
-                config=config
+        best_score = -1.0
+        for skill in available_skills:
+            score = skill.base_score + BattleAI._situational_score(
+                skill, actor.strategy, config, hp_percent, opponent_hp_percent
             )
-
             if score > best_score:
                 best_score = score
-                best_skill = (player_skill, skill)
-                best_reason = reason
+                best_skill = skill
 
         # 如果没有合适的技能（评分太低），使用普通攻击
         if best_score < 30:
-            return "attack", None, "技能评分过低，使用普通攻击"
+            return None
 
-        return "skill", best_skill, best_reason
+        return best_skill
 
     @staticmethod
-    def _score_skill(
-        skill: Skill,
-        player_skill: PlayerSkill,
-        player: Player,
-        strategy: BattleStrategy,
-        hp_percent: float,
-        sp_percent: float,
-        opponent_hp_percent: float,
-        config: Dict
-    ) -> Tuple[float, str]:
-        """为技能打分
-
-        Returns:
-            (score, reason) - 分数0-100，原因说明
-        """
-        score = 0.0
-        reasons = []
-
+    def static_skill_score(skill: "CombatSkill", actor: "Combatant") -> float:
+        """技能评分中与战况无关的部分（战斗开始前计算一次）"""
         # 基础分：技能伤害倍率
-        damage_score = skill.damage_multiplier * 20
-        score += damage_score
-        reasons.append(f"基础威力{damage_score:.0f}")
+        score = skill.damage_multiplier * 20
 
         # 技能等级加成
-        level_score = player_skill.skill_level * 2
-        score += level_score
-        reasons.append(f"等级加成{level_score:.0f}")
+        score += skill.level * 2
 
         # 元素匹配加成
-        if skill.element and player.spirit_root:
-            if skill.element in player.spirit_root.element_list:
-                element_count = player.spirit_root.element_count
-                if element_count == 1:
-                    element_score = 25  # 天灵根完美匹配
-                elif element_count == 2:
-                    element_score = 15  # 双灵根
-                elif element_count == 3:
-                    element_score = 10  # 三灵根
-                else:
-                    element_score = 5   # 伪灵根
-
-                score += element_score
-                reasons.append(f"元素匹配{element_score:.0f}")
+        if skill.element and skill.element in actor.elements:
+            element_count = len(actor.elements)
+            if element_count == 1:
+                score += 25  # 天灵根完美匹配
+            elif element_count == 2:
+                score += 15  # 双灵根
+            elif element_count == 3:
+                score += 10  # 三灵根
+            else:
+                score += 5   # 伪灵根
 
         # 灵力消耗考虑（消耗越少越好）
-        sp_cost_ratio = skill.spiritual_cost / player.max_spiritual_power
-        if sp_cost_ratio < 0.1:
-            sp_score = 10
-        elif sp_cost_ratio < 0.2:
-            sp_score = 5
-        elif sp_cost_ratio < 0.3:
-            sp_score = 0
-        else:
-            sp_score = -10  # 消耗过大扣分
-
-        score += sp_score
-        if sp_score != 0:
-            reasons.append(f"灵力消耗{sp_score:+.0f}")
-
-        # 策略相关调整
-        if strategy == BattleStrategy.AGGRESSIVE:
-            # 激进策略：优先高伤害技能
-            if skill.damage_multiplier >= 2.0:
-                score += 15
-                reasons.append("激进加成+15")
-
-        elif strategy == BattleStrategy.DEFENSIVE:
+        if skill.cost_ratio < 0.1:
+            score += 10
+        elif skill.cost_ratio < 0.2:
+            score += 5
+        elif skill.cost_ratio >= 0.3:
+            score -= 10  # 消耗过大扣分
+
+        # 激进策略：优先高伤害技能
+        if actor.strategy == BattleStrategy.AGGRESSIVE and skill.damage_multiplier >= 2.0:
+            score += 15
+
+        # 特殊效果加成
+        score += 5 * len(skill.effects)
+
+        return score
+
+    @staticmethod
+    def _situational_score(
+        skill: "CombatSkill",
+        strategy: BattleStrategy,
+        config: Dict,
+        hp_percent: float,
+        opponent_hp_percent: float
+    ) -> float:
+        """技能评分中随战况变化的部分"""
+        if strategy == BattleStrategy.DEFENSIVE:
             # 保守策略：当血量低时降低高消耗技能评分
-            if hp_percent < config["low_hp_threshold"]:
-                if sp_cost_ratio > 0.2:
-                    score -= 20
-                    reasons.append("血量低扣分-20")
+            if hp_percent < config["low_hp_threshold"] and skill.cost_ratio > 0.2:
+                return -20
 
         elif strategy == BattleStrategy.BALANCED:
             # 平衡策略：根据对手血量调整
             if opponent_hp_percent < 0.3:
                 # 对手血量低，使用高伤害技能快速击败
                 if skill.damage_multiplier >= 1.5:
-                    score += 10
-                    reasons.append("斩杀加成+10")
+                    return 10
             elif opponent_hp_percent > 0.7:
                 # 对手血量高，稳扎稳打
-                if sp_cost_ratio < 0.15:
-                    score += 10
-                    reasons.append("持久战加成+10")
+                if skill.cost_ratio < 0.15:
+                    return 10
 
-        # 特殊效果加成
-        if skill.special_effects:
-            try:
-                import json
-                effects = json.loads(skill.special_effects)
-                if effects:
-                    score += 5 * len(effects)
-                    reasons.append(f"特效加成+{5*len(effects)}")
-            except:
-                pass
-
-        reason_str = ", ".join(reasons)
-        return score, reason_str
+        return 0
 
     @staticmethod
     def get_strategy_description(strategy: BattleStrategy) -> str:
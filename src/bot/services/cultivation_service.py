@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from bot.models import Player
 from bot.config import settings
 from bot.services.cave_service import CaveService
+from bot.utils.concurrency import battles
 
 
 class CultivationService:
@@ -34,7 +35,7 @@ class CultivationService:
             remaining = (player.cultivation_end_time - datetime.now()).total_seconds()
             return False, f"正在修炼中，剩余时间：{int(remaining / 60)} 分钟"
 
-        if player.is_in_battle:
+        if battles.busy(player.id):
             return False, "战斗中无法修炼"
 
         # 检查时长限制
@@ -9,8 +9,6 @@ from bot.models.item import (
     PlayerInventory,
     EquipmentQuality,
     EquipmentSlot,
-    EquipmentSet,
-    EquipmentSetBonus,
     EnhancementRecord
 )
 from bot.models import Player
@@ -23,6 +21,7 @@ from bot.config.equipment_config import (
     QUALITY_ATTRIBUTE_MULTIPLIER,
     EQUIPMENT_SETS_CONFIG
 )
+from bot.services.game_catalog import GameCatalog
 
 
 class EquipmentService:
@@ -197,30 +196,23 @@ class EquipmentService:
             set_counts[item.set_id].append((inv_item, item))
 
         # 获取套装信息
+        catalog = await GameCatalog.get(db)
         active_sets: Dict[str, List[Dict]] = {}
 
         for set_id, items in set_counts.items():
             piece_count = len(items)
 
             # 获取套装定义
-            result = await db.execute(
-                select(EquipmentSet).where(EquipmentSet.id == set_id)
-            )
-            equipment_set = result.scalar_one_or_none()
+            equipment_set = catalog.equipment_sets_by_id.get(set_id)
 
             if not equipment_set:
                 continue
 
-            # 获取套装效果
-            result = await db.execute(
-                select(EquipmentSetBonus)
-                .where(
-                    EquipmentSetBonus.set_id == set_id,
-                    EquipmentSetBonus.piece_count <= piece_count
-                )
-                .order_by(EquipmentSetBonus.piece_count)
-            )
-            bonuses = result.scalars().all()
+            # 获取套装效果（目录中已按件数排序）
+            bonuses = [
+                bonus for bonus in catalog.set_bonuses_by_set.get(set_id, [])
+                if bonus.piece_count <= piece_count
+            ]
 
             if bonuses:
                 set_name = equipment_set.name.replace("套装", "")  # 青龙套装 -> 青龙
@@ -298,11 +290,8 @@ class EquipmentService:
         if inventory_item.is_equipped:
             return False, "❌ 该装备已装备"
 
-        # 检查使用条件
-        result = await db.execute(
-            select(Player).where(Player.id == player_id)
-        )
-        player = result.scalar_one_or_none()
+        # 检查使用条件（玩家通常已在本会话中加载，按主键取可直接命中）
+        player = await db.get(Player, player_id)
 
         if not player:
             return False, "❌ 玩家不存在"
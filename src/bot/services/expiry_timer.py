@@ -0,0 +1,247 @@
+"""到期计时服务
+
+阵法（`ActiveFormation.expires_at`）、运气事件（`LuckEvent.end_time`）、世界BOSS
+（`WorldBoss.despawn_at`）和拍卖（`Auction.ends_at`）的到期不再由调度器扫表处理，
+而是由本服务按到期时间精确触发：
+
+- 启动时从数据库载入所有未到期的对象，放入按到期时间排序的最小堆；
+- 任何会话提交了新建的此类对象，提交后自动加入计时（无需在业务代码中登记）；
+- 后台任务睡眠到堆顶的到期时间，醒来后把同时到期的对象合并到一个事务中处理。
+
+计时状态本身不落库，数据库中的到期时间就是持久化的来源，重启后重新载入即可。
+处理函数会重新校验状态和到期时间，已撤除、已击败、已成交的对象直接跳过。
+"""
+import asyncio
+import heapq
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from bot.models import WorldBoss, WorldBossStatus
+from bot.models.adventure import LuckEvent
+from bot.models.database import AsyncSessionLocal
+from bot.models.formation import ActiveFormation
+from bot.models.market import Auction
+
+logger = logging.getLogger(__name__)
+
+# 会话中待登记的新对象（Session.info）
+_NEW_TIMERS_KEY = "expiry_timer_new"
+
+# 处理失败后的重试间隔（秒）
+RETRY_DELAY = 60
+# 单次最长睡眠（秒），防止系统时间调整后长时间不醒
+MAX_SLEEP = 300
+
+
+async def _expire_formations(db: AsyncSession, ids: List[int]) -> int:
+    from bot.services.formation_service import FormationService
+
+    return await FormationService.expire_formations(db, ids)
+
+
+async def _expire_luck_events(db: AsyncSession, ids: List[int]) -> int:
+    result = await db.execute(
+        update(LuckEvent)
+        .where(LuckEvent.id.in_(ids), LuckEvent.is_active == True, LuckEvent.end_time <= datetime.now())
+        .values(is_active=False)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def _expire_world_bosses(db: AsyncSession, ids: List[int]) -> int:
+    from bot.services.world_boss_service import WorldBossService
+
+    return await WorldBossService.expire_bosses(db, ids)
+
+
+async def _settle_auctions(db: AsyncSession, ids: List[int]) -> int:
+    from bot.services.market_service import AuctionService
+
+    return await AuctionService.settle_auctions(db, ids)
+
+
+class TimerKind(NamedTuple):
+    """一类到期对象"""
+    name: str
+    model: type
+    due_attr: str
+    # 是否仍需计时（载入和登记时使用）
+    is_pending: Callable[[object], bool]
+    pending_filter: Callable[[], object]
+    expire: Callable[[AsyncSession, List[int]], Awaitable[int]]
+
+
+TIMER_KINDS: Tuple[TimerKind, ...] = (
+    TimerKind(
+        "阵法", ActiveFormation, "expires_at",
+        lambda obj: obj.is_active,
+        lambda: ActiveFormation.is_active == True,
+        _expire_formations,
+    ),
+    TimerKind(
+        "运气事件", LuckEvent, "end_time",
+        lambda obj: obj.is_active,
+        lambda: LuckEvent.is_active == True,
+        _expire_luck_events,
+    ),
+    TimerKind(
+        "世界BOSS", WorldBoss, "despawn_at",
+        lambda obj: obj.status == WorldBossStatus.ACTIVE,
+        lambda: WorldBoss.status == WorldBossStatus.ACTIVE,
+        _expire_world_bosses,
+    ),
+    TimerKind(
+        "拍卖", Auction, "ends_at",
+        lambda obj: obj.is_active,
+        lambda: Auction.is_active == True,
+        _settle_auctions,
+    ),
+)
+
+_KINDS_BY_MODEL = {kind.model: kind for kind in TIMER_KINDS}
+_KINDS_BY_NAME = {kind.name: kind for kind in TIMER_KINDS}
+
+
+class ExpiryTimer:
+    """到期计时服务"""
+
+    # (到期时间, 类型名, 对象ID)
+    _heap: List[Tuple[datetime, str, int]] = []
+    _wakeup: Optional[asyncio.Event] = None
+    _task: Optional[asyncio.Task] = None
+    _bind = None
+
+    @classmethod
+    async def start(cls, db: Optional[AsyncSession] = None) -> int:
+        """从数据库载入所有未到期对象并启动计时，返回载入数量
+
+        Args:
+            db: 用于确定数据库连接的会话；处理到期时也使用同一连接
+        """
+        await cls.stop()
+
+        cls._bind = db.bind if db else None
+        heap = []
+        async with cls._session() as session:
+            for kind in TIMER_KINDS:
+                due = getattr(kind.model, kind.due_attr)
+                result = await session.execute(
+                    select(kind.model.id, due).where(kind.pending_filter())
+                )
+                heap.extend((due_at, kind.name, obj_id) for obj_id, due_at in result.all())
+
+        heapq.heapify(heap)
+        cls._heap = heap
+        cls._wakeup = asyncio.Event()
+        cls._task = asyncio.create_task(cls._run(), name="expiry-timer")
+
+        logger.info(f"到期计时已启动，载入 {len(heap)} 个计时")
+        return len(heap)
+
+    @classmethod
+    async def stop(cls) -> None:
+        """停止计时"""
+        task, cls._task = cls._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        cls._heap = []
+        cls._wakeup = None
+
+    @classmethod
+    def schedule(cls, kind: str, obj_id: int, due_at: datetime) -> None:
+        """登记一个到期计时（重复登记无害）"""
+        if cls._task is None:
+            return
+        heapq.heappush(cls._heap, (due_at, kind, obj_id))
+        if cls._heap[0] == (due_at, kind, obj_id):
+            # 新计时排到最前，唤醒后台任务重新计算睡眠时间
+            cls._wakeup.set()
+
+    @classmethod
+    def pending(cls) -> int:
+        """尚未触发的计时数"""
+        return len(cls._heap)
+
+    @classmethod
+    def _session(cls) -> AsyncSession:
+        if cls._bind is not None:
+            return AsyncSession(bind=cls._bind, expire_on_commit=False)
+        return AsyncSessionLocal()
+
+    @classmethod
+    async def _run(cls) -> None:
+        while True:
+            cls._wakeup.clear()
+            if cls._heap:
+                delay = (cls._heap[0][0] - datetime.now()).total_seconds()
+            else:
+                delay = MAX_SLEEP
+
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(cls._wakeup.wait(), timeout=min(delay, MAX_SLEEP))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await cls._fire_due()
+
+    @classmethod
+    async def _fire_due(cls) -> None:
+        """取出所有已到期的计时，合并到一个事务中处理"""
+        now = datetime.now()
+        due: Dict[str, List[int]] = defaultdict(list)
+        while cls._heap and cls._heap[0][0] <= now:
+            _, kind, obj_id = heapq.heappop(cls._heap)
+            due[kind].append(obj_id)
+
+        try:
+            async with cls._session() as session:
+                results = {}
+                for name, ids in due.items():
+                    results[name] = await _KINDS_BY_NAME[name].expire(session, sorted(set(ids)))
+                await session.commit()
+        except Exception as e:
+            logger.error(f"处理到期计时出错，{RETRY_DELAY}秒后重试: {e}", exc_info=True)
+            retry_at = now + timedelta(seconds=RETRY_DELAY)
+            for name, ids in due.items():
+                for obj_id in ids:
+                    heapq.heappush(cls._heap, (retry_at, name, obj_id))
+            return
+
+        summary = "，".join(f"{name} {count} 个" for name, count in results.items() if count)
+        if summary:
+            logger.info(f"到期处理完成：{summary}")
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_new_timers(session: Session, flush_context) -> None:
+    """记录本次刷新中新建的计时对象（提交后才登记）"""
+    for obj in session.new:
+        kind = _KINDS_BY_MODEL.get(type(obj))
+        if kind is not None and kind.is_pending(obj):
+            session.info.setdefault(_NEW_TIMERS_KEY, []).append(
+                (getattr(obj, kind.due_attr), kind.name, obj.id)
+            )
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_new_timers(session: Session) -> None:
+    for due_at, kind, obj_id in session.info.pop(_NEW_TIMERS_KEY, ()):
+        ExpiryTimer.schedule(kind, obj_id, due_at)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_new_timers(session: Session) -> None:
+    session.info.pop(_NEW_TIMERS_KEY, None)
@@ -1,7 +1,7 @@
 """阵法服务"""
 import random
 from datetime import datetime, timedelta
-from typing import Tuple, Dict, Optional
+from typing import Tuple, Dict, List, Optional
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -172,6 +172,34 @@ class FormationService:
 
         return True, "成功撤除阵法"
 
+    @staticmethod
+    async def expire_formations(db: AsyncSession, formation_ids: List[int]) -> int:
+        """撤除已到期的阵法并移除加成（不提交），返回处理数量
+
+        已被撤除、破阵或尚未到期的阵法会被跳过。
+        """
+        result = await db.execute(
+            select(ActiveFormation, Player).join(
+                Player, Player.id == ActiveFormation.player_id
+            ).where(
+                ActiveFormation.id.in_(formation_ids),
+                ActiveFormation.is_active == True,
+                ActiveFormation.expires_at <= datetime.now()
+            )
+        )
+
+        count = 0
+        for active, player in result.all():
+            # 移除加成
+            player.defense -= active.current_defense_bonus
+            player.attack -= active.current_attack_bonus
+
+            # 撤除阵法
+            active.is_active = False
+            count += 1
+
+        return count
+
     @staticmethod
     async def break_formation(
         db: AsyncSession,
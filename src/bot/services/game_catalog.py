@@ -0,0 +1,164 @@
+"""静态游戏数据目录
+
+物品、怪物、灵兽模板、成就、套装、世界BOSS模板、技能、丹方、炼器配方等模板表在运行期间
+不会变化，启动时一次性载入内存并建立索引（按ID、名称、境界、条件类型等，名称另建
+n-gram 索引供子串和模糊查找，见 `name_index`），
+各服务与处理器直接从目录读取，不再为模板查询数据库。
+模板数据调整后由管理员执行 `.重载数据` 重新载入。
+
+目录中的对象已脱离会话，只读使用，不要修改或加入其他会话。
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.models import (
+    Achievement, Item, Monster, Skill, SpiritBeastTemplate, WorldBossTemplate,
+)
+from bot.models.alchemy import PillRecipe
+from bot.models.database import AsyncSessionLocal
+from bot.models.item import EquipmentSet, EquipmentSetBonus
+from bot.models.refinery import RefineryRecipe
+from bot.services.name_index import NameIndex
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogData:
+    """一次载入的全部模板数据及其索引"""
+
+    __slots__ = (
+        "items_by_id", "items_by_name", "shop_items_by_name",
+        "monsters", "monsters_by_id", "monsters_by_name", "monsters_by_realm",
+        "beast_templates", "beast_templates_by_id", "beast_templates_by_quality",
+        "achievements_by_id", "achievements_by_condition",
+        "equipment_sets_by_id", "set_bonuses_by_set",
+        "world_boss_templates",
+        "skills_by_id", "skills_by_name", "pill_recipes_by_id", "refinery_recipes_by_id",
+        "item_names", "skill_names", "pill_recipe_names", "refinery_recipe_names", "beast_template_names",
+    )
+
+    def __init__(
+        self,
+        items: List[Item],
+        monsters: List[Monster],
+        beast_templates: List[SpiritBeastTemplate],
+        achievements: List[Achievement],
+        equipment_sets: List[EquipmentSet],
+        set_bonuses: List[EquipmentSetBonus],
+        world_boss_templates: List[WorldBossTemplate],
+        skills: List[Skill],
+        pill_recipes: List[PillRecipe],
+        refinery_recipes: List[RefineryRecipe],
+    ):
+        # 名称在表结构上不唯一，同名时取ID最小的一条
+        self.items_by_id = {item.id: item for item in sorted(items, key=lambda i: i.id)}
+        self.items_by_name: Dict[str, Item] = {}
+        # 商店按名称购买时只在有售价的物品中取
+        self.shop_items_by_name: Dict[str, Item] = {}
+        for item in self.items_by_id.values():
+            self.items_by_name.setdefault(item.name, item)
+            if item.buy_price > 0:
+                self.shop_items_by_name.setdefault(item.name, item)
+
+        # 怪物按等级排序，便于按难度取用
+        self.monsters = sorted(monsters, key=lambda m: (m.level, m.id))
+        self.monsters_by_id = {m.id: m for m in self.monsters}
+        self.monsters_by_name: Dict[str, Monster] = {}
+        self.monsters_by_realm: Dict[str, List[Monster]] = defaultdict(list)
+        for monster in self.monsters:
+            self.monsters_by_name.setdefault(monster.name, monster)
+            self.monsters_by_realm[monster.realm].append(monster)
+
+        self.beast_templates = sorted(beast_templates, key=lambda t: (t.rarity, t.id))
+        self.beast_templates_by_id = {t.id: t for t in self.beast_templates}
+        self.beast_templates_by_quality: Dict[str, List[SpiritBeastTemplate]] = defaultdict(list)
+        for template in self.beast_templates:
+            self.beast_templates_by_quality[template.quality].append(template)
+
+        self.achievements_by_id = {a.id: a for a in achievements}
+        self.achievements_by_condition: Dict[str, List[Achievement]] = defaultdict(list)
+        for achievement in sorted(achievements, key=lambda a: a.id):
+            self.achievements_by_condition[achievement.condition_type].append(achievement)
+
+        self.equipment_sets_by_id = {s.id: s for s in equipment_sets}
+        self.set_bonuses_by_set: Dict[int, List[EquipmentSetBonus]] = defaultdict(list)
+        for bonus in sorted(set_bonuses, key=lambda b: (b.piece_count, b.id)):
+            self.set_bonuses_by_set[bonus.set_id].append(bonus)
+
+        self.world_boss_templates = [t for t in world_boss_templates if t.is_active]
+
+        self.skills_by_id = {s.id: s for s in skills}
+        self.skills_by_name = {s.name: s for s in skills}
+        self.pill_recipes_by_id = {r.id: r for r in pill_recipes}
+        self.refinery_recipes_by_id = {r.id: r for r in refinery_recipes}
+
+        # 名称 n-gram 索引（键为ID）
+        self.item_names = NameIndex((i.id, i.name) for i in self.items_by_id.values())
+        self.skill_names = NameIndex((s.id, s.name) for s in skills)
+        self.pill_recipe_names = NameIndex((r.id, r.name) for r in pill_recipes)
+        self.refinery_recipe_names = NameIndex((r.id, r.name) for r in refinery_recipes)
+        self.beast_template_names = NameIndex((t.id, t.name) for t in self.beast_templates)
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "物品": len(self.items_by_id),
+            "怪物": len(self.monsters),
+            "灵兽模板": len(self.beast_templates),
+            "成就": len(self.achievements_by_id),
+            "套装": len(self.equipment_sets_by_id),
+            "BOSS模板": len(self.world_boss_templates),
+            "技能": len(self.skills_by_id),
+            "丹方": len(self.pill_recipes_by_id),
+            "炼器配方": len(self.refinery_recipes_by_id),
+        }
+
+
+class GameCatalog:
+    """静态数据目录"""
+
+    _data: Optional[CatalogData] = None
+    _lock = asyncio.Lock()
+
+    @classmethod
+    async def load(cls, db: Optional[AsyncSession] = None) -> Dict[str, int]:
+        """（重新）载入全部模板数据，返回各类数量
+
+        Args:
+            db: 用于确定数据库连接的会话；载入本身使用独立会话，载入完成后对象与会话脱离
+        """
+        async with cls._lock:
+            session = AsyncSession(bind=db.bind, expire_on_commit=False) if db else AsyncSessionLocal()
+            async with session:
+                loaded = []
+                for model in (
+                    Item, Monster, SpiritBeastTemplate, Achievement,
+                    EquipmentSet, EquipmentSetBonus, WorldBossTemplate,
+                    Skill, PillRecipe, RefineryRecipe,
+                ):
+                    result = await session.execute(select(model))
+                    loaded.append(list(result.scalars().all()))
+                session.expunge_all()
+
+            # 整体替换，读取方要么看到旧目录、要么看到新目录
+            cls._data = CatalogData(*loaded)
+
+        counts = cls._data.counts()
+        logger.info(f"静态数据已载入: {counts}")
+        return counts
+
+    @classmethod
+    async def get(cls, db: Optional[AsyncSession] = None) -> CatalogData:
+        """获取目录（尚未载入时先载入一次）"""
+        if cls._data is None:
+            await cls.load(db)
+        return cls._data
+
+    @classmethod
+    def clear(cls) -> None:
+        """清空目录，下次访问时重新载入"""
+        cls._data = None
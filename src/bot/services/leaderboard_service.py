@@ -0,0 +1,228 @@
+"""排行榜服务
+
+每个榜单（战力、境界、灵石、击杀、胜率）维护一份进程内有序索引，
+取前N名和查询个人精确名次都是 O(log n)，不再为每次 `.排行` 扫描或排序玩家表。
+
+玩家数据变化时增量更新：会话提交了对玩家的修改后，提交时立即刷新对应条目。
+批量 UPDATE 语句不经过 ORM 对象，由调度器定期整体重建兜底。
+"""
+import asyncio
+import logging
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sortedcontainers import SortedList
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from bot.models import Player
+from bot.models.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# 会话中待应用的榜单变化（Session.info），玩家ID -> 新条目（None 表示删除）
+_CHANGES_KEY = "leaderboard_changes"
+
+# 胜率榜的最少战斗场次
+WINRATE_MIN_BATTLES = 10
+
+
+class LeaderboardEntry(NamedTuple):
+    """榜单上展示和排序所需的玩家数据"""
+    player_id: int
+    nickname: str
+    full_realm_name: str
+    realm_progress: int
+    combat_power: int
+    spirit_stones: int
+    total_kills: int
+    total_wins: int
+    total_battles: int
+
+    @property
+    def winrate(self) -> float:
+        return self.total_wins * 100 / self.total_battles if self.total_battles else 0.0
+
+
+# 各榜单的排序键（越小越靠前），返回 None 表示不上榜
+BOARD_KEYS: Dict[str, Callable[[LeaderboardEntry], Optional[Tuple]]] = {
+    "combat": lambda e: (-e.combat_power,),
+    "realm": lambda e: (-e.realm_progress,),
+    "wealth": lambda e: (-e.spirit_stones,),
+    "kills": lambda e: (-e.total_kills,),
+    "winrate": lambda e: (
+        (-e.total_wins / e.total_battles,) if e.total_battles >= WINRATE_MIN_BATTLES else None
+    ),
+}
+
+
+class SortedBoard:
+    """单个榜单的有序索引，同分按玩家ID先后排列"""
+
+    __slots__ = ("_index", "_keys")
+
+    def __init__(self):
+        self._index = SortedList()
+        self._keys: Dict[int, Tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def update(self, player_id: int, key: Optional[Tuple]) -> None:
+        old = self._keys.pop(player_id, None)
+        if old is not None:
+            self._index.remove(old)
+        if key is not None:
+            key = (*key, player_id)
+            self._index.add(key)
+            self._keys[player_id] = key
+
+    def rank(self, player_id: int) -> Optional[int]:
+        key = self._keys.get(player_id)
+        return self._index.index(key) + 1 if key is not None else None
+
+    def top(self, limit: int) -> List[int]:
+        return [key[-1] for key in self._index.islice(0, limit)]
+
+    def at(self, rank: int) -> int:
+        """第 rank 名（从1开始）的玩家ID"""
+        return self._index[rank - 1][-1]
+
+
+class LeaderboardService:
+    """排行榜服务"""
+
+    _boards: Dict[str, SortedBoard] = {name: SortedBoard() for name in BOARD_KEYS}
+    _entries: Dict[int, LeaderboardEntry] = {}
+    _loaded = False
+    # 重建期间发生的增量变化，重建完成后补上
+    _pending: Optional[Dict[int, Optional[LeaderboardEntry]]] = None
+    _lock = asyncio.Lock()
+
+    @staticmethod
+    def entry_from_player(player: Player) -> LeaderboardEntry:
+        return LeaderboardEntry(
+            player_id=player.id,
+            nickname=player.nickname,
+            full_realm_name=player.full_realm_name,
+            realm_progress=player.realm_progress,
+            combat_power=player.combat_power,
+            spirit_stones=player.spirit_stones,
+            total_kills=player.total_kills,
+            total_wins=player.total_wins,
+            total_battles=player.total_battles,
+        )
+
+    @classmethod
+    async def rebuild(cls, db: Optional[AsyncSession] = None) -> int:
+        """从数据库整体重建全部榜单，返回上榜玩家数
+
+        Args:
+            db: 用于确定数据库连接的会话；重建本身使用独立会话
+        """
+        async with cls._lock:
+            cls._pending = {}
+            try:
+                boards = {name: SortedBoard() for name in BOARD_KEYS}
+                entries: Dict[int, LeaderboardEntry] = {}
+
+                session = AsyncSession(bind=db.bind, expire_on_commit=False) if db else AsyncSessionLocal()
+                async with session:
+                    players = await session.stream_scalars(
+                        select(Player).execution_options(yield_per=1000)
+                    )
+                    async for player in players:
+                        entry = cls.entry_from_player(player)
+                        entries[entry.player_id] = entry
+                        for name, board in boards.items():
+                            board.update(entry.player_id, BOARD_KEYS[name](entry))
+                        # 已读出的玩家不再需要留在会话里
+                        session.expunge(player)
+
+                cls._boards, cls._entries, cls._loaded = boards, entries, True
+                pending, cls._pending = cls._pending, None
+            except BaseException:
+                cls._pending = None
+                raise
+
+        for player_id, entry in pending.items():
+            cls.apply(player_id, entry)
+
+        logger.info(f"排行榜已重建，共 {len(cls._entries)} 名玩家")
+        return len(cls._entries)
+
+    @classmethod
+    async def ensure_loaded(cls, db: Optional[AsyncSession] = None) -> None:
+        """尚未建立榜单时先重建一次"""
+        if not cls._loaded:
+            await cls.rebuild(db)
+
+    @classmethod
+    def apply(cls, player_id: int, entry: Optional[LeaderboardEntry]) -> None:
+        """应用单个玩家的变化（entry 为 None 表示移出全部榜单）"""
+        if cls._pending is not None:
+            cls._pending[player_id] = entry
+        if not cls._loaded:
+            return
+
+        if entry is None:
+            cls._entries.pop(player_id, None)
+        else:
+            cls._entries[player_id] = entry
+        for name, board in cls._boards.items():
+            board.update(player_id, BOARD_KEYS[name](entry) if entry is not None else None)
+
+    @classmethod
+    def top(cls, board: str, limit: int = 20) -> List[LeaderboardEntry]:
+        """榜单前 limit 名"""
+        return [cls._entries[player_id] for player_id in cls._boards[board].top(limit)]
+
+    @classmethod
+    def entry(cls, player_id: int) -> Optional[LeaderboardEntry]:
+        """玩家的榜单条目（榜单尚未建立或玩家不存在时为 None）"""
+        return cls._entries.get(player_id)
+
+    @classmethod
+    def rank(cls, board: str, player_id: int) -> Optional[int]:
+        """玩家在榜单中的名次（从1开始），不在榜上时返回 None"""
+        return cls._boards[board].rank(player_id)
+
+    @classmethod
+    def size(cls, board: str) -> int:
+        """榜单上的玩家数"""
+        return len(cls._boards[board])
+
+    @classmethod
+    def clear(cls) -> None:
+        """清空榜单，下次访问时重新建立"""
+        cls._boards = {name: SortedBoard() for name in BOARD_KEYS}
+        cls._entries = {}
+        cls._loaded = False
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_leaderboard_changes(session: Session, flush_context) -> None:
+    """记录本次刷新后玩家的最新榜单数据（提交后才生效）"""
+    changes = session.info.setdefault(_CHANGES_KEY, {})
+    for obj in session.new:
+        if isinstance(obj, Player):
+            changes[obj.id] = LeaderboardService.entry_from_player(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Player) and session.is_modified(obj):
+            changes[obj.id] = LeaderboardService.entry_from_player(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Player):
+            changes[obj.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_leaderboard_changes(session: Session) -> None:
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if changes:
+        for player_id, entry in changes.items():
+            LeaderboardService.apply(player_id, entry)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_leaderboard_changes(session: Session) -> None:
+    session.info.pop(_CHANGES_KEY, None)
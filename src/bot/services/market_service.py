@@ -1,12 +1,76 @@
 """市场交易服务"""
+import time
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Tuple, Dict, List, Optional
+from typing import Tuple, Dict, List, NamedTuple, Optional
 
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, and_, or_, func, case, delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.models import Player, Item, PlayerInventory
+from bot.models import Player, Item, PlayerInventory, ItemType
+from bot.models.item import EquipmentQuality
 from bot.models.market import Market, TradeRecord, Auction, AuctionBid
+from bot.services.name_index import match_item_ids
+
+
+class MarketFilters(NamedTuple):
+    """市场搜索条件"""
+    item_name: Optional[str] = None
+    item_type: Optional[ItemType] = None
+    quality: Optional[EquipmentQuality] = None
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+
+    @property
+    def needs_item(self) -> bool:
+        """是否需要关联物品表筛选（物品名先经名称索引解析为物品ID）"""
+        return bool(self.item_type or self.quality)
+
+
+def _listing_conditions(filters: MarketFilters, item_ids: Optional[List[int]] = None) -> List:
+    """在售商品的筛选条件（物品条件需要关联 Item 表）
+
+    Args:
+        filters: 筛选条件
+        item_ids: 物品名匹配到的物品ID（见 `_match_item_ids`）
+    """
+    conditions = [Market.is_sold == False, Market.expires_at > datetime.now()]
+    if item_ids is not None:
+        conditions.append(Market.item_id.in_(item_ids))
+    if filters.item_type:
+        conditions.append(Item.item_type == filters.item_type)
+    if filters.quality:
+        conditions.append(Item.quality == filters.quality)
+    if filters.min_price:
+        conditions.append(Market.total_price >= filters.min_price)
+    if filters.max_price:
+        conditions.append(Market.total_price <= filters.max_price)
+    return conditions
+
+
+async def _match_item_ids(db: AsyncSession, filters: MarketFilters) -> Optional[List[int]]:
+    """物品名筛选对应的物品ID（未按名称筛选时为 None）"""
+    if not filters.item_name:
+        return None
+    return await match_item_ids(db, filters.item_name)
+
+
+_CURSOR_EPOCH = datetime(2000, 1, 1)
+
+
+def encode_market_cursor(listed_at: datetime, market_id: int) -> str:
+    """把翻页位置编码为短字符串（用于按钮回调数据）"""
+    micros = (listed_at - _CURSOR_EPOCH) // timedelta(microseconds=1)
+    return f"{micros:x}.{market_id:x}"
+
+
+def decode_market_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """解析翻页游标，格式不正确时返回 None"""
+    try:
+        micros, market_id = (int(part, 16) for part in cursor.split("."))
+    except ValueError:
+        return None
+    return _CURSOR_EPOCH + timedelta(microseconds=micros), market_id
 
 
 class MarketService:
@@ -15,6 +79,11 @@ class MarketService:
     MARKET_TAX_RATE = 0.05  # 交易税率 5%
     MARKET_LISTING_DURATION = 7  # 上架天数
     MIN_BID_INCREMENT = 100  # 最小加价幅度
+    COUNT_CACHE_TTL = 60  # 在售总数缓存秒数
+    COUNT_CACHE_SIZE = 256  # 在售总数最多缓存的筛选条件数
+
+    # 筛选条件 -> (过期时间, 总数)，按写入顺序即过期顺序排列
+    _count_cache: Dict[MarketFilters, Tuple[float, int]] = {}
 
     @staticmethod
     async def list_item_on_market(
@@ -218,6 +287,13 @@ class MarketService:
         if listing.is_sold:
             return False, "该物品已售出，无法取消"
 
+        # 按条件删除订单：与购买或过期退还并发时只有一方能删到这一行，物品不会重复返还
+        result = await db.execute(
+            delete(Market).where(Market.id == listing.id, Market.is_sold == False)
+        )
+        if result.rowcount != 1:
+            return False, "该订单已售出或已过期退还"
+
         # 返还物品到背包
         result = await db.execute(
             select(PlayerInventory).where(
@@ -238,86 +314,180 @@ class MarketService:
             )
             db.add(new_inv)
 
-        # 删除订单
-        await db.delete(listing)
         await db.commit()
 
         return True, "成功取消上架，物品已返还"
 
+    @staticmethod
+    async def add_items_to_inventories(db: AsyncSession, quantities: Dict[Tuple[int, int], int]) -> None:
+        """把物品堆叠进玩家背包（没有可堆叠的格子时新建），不提交
+
+        Args:
+            quantities: (玩家ID, 物品ID) -> 数量
+        """
+        if not quantities:
+            return
+
+        player_ids = {player_id for player_id, _ in quantities}
+        item_ids = {item_id for _, item_id in quantities}
+        result = await db.scalars(
+            select(PlayerInventory).where(
+                PlayerInventory.player_id.in_(player_ids),
+                PlayerInventory.item_id.in_(item_ids),
+                PlayerInventory.is_equipped == False
+            ).order_by(PlayerInventory.id)
+        )
+        stacks: Dict[Tuple[int, int], PlayerInventory] = {}
+        for inv in result:
+            stacks.setdefault((inv.player_id, inv.item_id), inv)
+
+        for (player_id, item_id), quantity in quantities.items():
+            if (player_id, item_id) in stacks:
+                stacks[(player_id, item_id)].quantity += quantity
+            else:
+                db.add(PlayerInventory(player_id=player_id, item_id=item_id, quantity=quantity))
+
+    @staticmethod
+    async def return_expired_listings(db: AsyncSession, limit: int) -> int:
+        """退还一批已过期未售出的上架物品并删除上架记录（不提交），返回处理数量
+
+        物品按 (卖家, 物品) 合并后堆叠回背包。并发的取消上架按条件删除上架记录，
+        记录已被本次退还删除时不再返还；购买会拒绝已过期的订单。
+        """
+        result = await db.execute(
+            select(Market.id, Market.seller_id, Market.item_id, Market.quantity).where(
+                Market.is_sold == False,
+                Market.expires_at <= datetime.now()
+            ).order_by(Market.expires_at).limit(limit).with_for_update(skip_locked=True)
+        )
+        expired = result.all()
+        if not expired:
+            return 0
+
+        quantities: Dict[Tuple[int, int], int] = defaultdict(int)
+        for _, seller_id, item_id, quantity in expired:
+            quantities[(seller_id, item_id)] += quantity
+        await MarketService.add_items_to_inventories(db, quantities)
+
+        await db.execute(
+            delete(Market)
+            .where(Market.id.in_([listing_id for listing_id, *_ in expired]))
+            .execution_options(synchronize_session=False)
+        )
+        return len(expired)
+
     @staticmethod
     async def search_market(
         db: AsyncSession,
-        item_name: Optional[str] = None,
-        max_price: Optional[int] = None,
-        page: int = 1,
+        filters: MarketFilters = MarketFilters(),
+        cursor: Optional[str] = None,
         page_size: int = 10
-    ) -> Tuple[List[Dict], int]:
-        """搜索市场物品
+    ) -> Tuple[List[Dict], Optional[str], int]:
+        """搜索市场物品（按上架时间倒序，键集分页）
+
+        物品和卖家信息在同一条查询中关联取出；翻页按 (上架时间, 订单ID) 定位，
+        深翻页与首页开销相同。
 
         Args:
             db: 数据库会话
-            item_name: 物品名称（可选）
-            max_price: 最高价格（可选）
-            page: 页码
+            filters: 筛选条件
+            cursor: 上一页返回的游标，None 表示第一页
             page_size: 每页数量
 
         Returns:
-            (物品列表, 总数)
+            (物品列表, 下一页游标（没有下一页时为 None）, 近似总数)
         """
-        # 构建查询
-        query = select(Market).where(
-            Market.is_sold == False,
-            Market.expires_at > datetime.now()
+        item_ids = await _match_item_ids(db, filters)
+        if item_ids == []:
+            return [], None, 0
+
+        query = select(Market, Item.name, Player.nickname).join(
+            Item, Item.id == Market.item_id
+        ).join(
+            Player, Player.id == Market.seller_id
+        ).where(
+            *_listing_conditions(filters, item_ids)
         )
 
-        if item_name:
-            # 需要join Item表
-            query = query.join(Item).where(Item.name.contains(item_name))
-
-        if max_price:
-            query = query.where(Market.total_price <= max_price)
-
-        # 按时间排序
-        query = query.order_by(Market.listed_at.desc())
-
-        # 总数
-        count_result = await db.execute(select(func.count()).select_from(query.subquery()))
-        total = count_result.scalar()
-
-        # 分页
-        offset = (page - 1) * page_size
-        query = query.offset(offset).limit(page_size)
-
-        result = await db.execute(query)
-        listings = result.scalars().all()
-
-        # 转换为字典
-        items = []
-        for listing in listings:
-            # 获取物品信息
-            item_result = await db.execute(
-                select(Item).where(Item.id == listing.item_id)
+        position = decode_market_cursor(cursor) if cursor else None
+        if position:
+            listed_at, market_id = position
+            query = query.where(
+                or_(
+                    Market.listed_at < listed_at,
+                    and_(Market.listed_at == listed_at, Market.id < market_id)
+                )
             )
-            item = item_result.scalar_one_or_none()
 
-            # 获取卖家信息
-            seller_result = await db.execute(
-                select(Player).where(Player.id == listing.seller_id)
-            )
-            seller = seller_result.scalar_one_or_none()
+        # 多取一条用于判断是否还有下一页
+        query = query.order_by(Market.listed_at.desc(), Market.id.desc()).limit(page_size + 1)
+        rows = (await db.execute(query)).all()
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1][0]
+            next_cursor = encode_market_cursor(last.listed_at, last.id)
 
-            items.append({
+        items = [
+            {
                 "id": listing.id,
-                "item_name": item.name if item else "未知",
+                "item_name": item_name,
                 "quantity": listing.quantity,
                 "price_per_unit": listing.price_per_unit,
                 "total_price": listing.total_price,
-                "seller_name": seller.username if seller else "未知",
+                "seller_name": seller_name,
                 "listed_at": listing.listed_at,
                 "expires_at": listing.expires_at
-            })
+            }
+            for listing, item_name, seller_name in rows
+        ]
 
-        return items, total
+        total = await MarketService.count_listings(db, filters, item_ids)
+        return items, next_cursor, total
+
+    @staticmethod
+    async def count_listings(
+        db: AsyncSession,
+        filters: MarketFilters = MarketFilters(),
+        item_ids: Optional[List[int]] = None
+    ) -> int:
+        """在售商品近似总数（按筛选条件缓存 COUNT_CACHE_TTL 秒）
+
+        Args:
+            db: 数据库会话
+            filters: 筛选条件
+            item_ids: 已解析的物品名匹配结果，不传时按需解析
+        """
+        cached = MarketService._count_cache.get(filters)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        if item_ids is None:
+            item_ids = await _match_item_ids(db, filters)
+        if item_ids == []:
+            return 0
+
+        query = select(func.count()).select_from(Market).where(*_listing_conditions(filters, item_ids))
+        if filters.needs_item:
+            query = query.join(Item, Item.id == Market.item_id)
+        total = (await db.execute(query)).scalar()
+
+        MarketService._cache_count(filters, total)
+        return total
+
+    @staticmethod
+    def _cache_count(filters: MarketFilters, total: int) -> None:
+        """写入在售总数缓存，顺带清掉已过期和超出容量的最早条目"""
+        cache = MarketService._count_cache
+        now = time.monotonic()
+        cache.pop(filters, None)
+        while cache:
+            oldest = next(iter(cache))
+            if cache[oldest][0] > now and len(cache) < MarketService.COUNT_CACHE_SIZE:
+                break
+            del cache[oldest]
+        cache[filters] = (now + MarketService.COUNT_CACHE_TTL, total)
 
 
 class AuctionService:
@@ -503,6 +673,9 @@ class AuctionService:
         if not auction.is_active:
             return False, "该拍卖已结束"
 
+        if auction.ends_at <= datetime.now():
+            return False, "该拍卖已过期"
+
         if not auction.buyout_price:
             return False, "该拍卖没有设置一口价"
 
@@ -553,6 +726,16 @@ class AuctionService:
         auction.current_bid = auction.buyout_price
         auction.sold_at = datetime.now()
 
+        # 记录交易
+        db.add(TradeRecord(
+            seller_id=auction.seller_id,
+            buyer_id=player.id,
+            item_id=auction.item_id,
+            quantity=1,
+            total_price=auction.buyout_price,
+            tax=tax
+        ))
+
         await db.commit()
 
         return True, f"一口价购买成功！卖家收入 {seller_income} 灵石（税费 {tax}）"
@@ -610,7 +793,7 @@ class AuctionService:
         db: AsyncSession,
         auction_id: int
     ) -> Tuple[bool, str]:
-        """结算拍卖（定时任务调用）
+        """结算单个拍卖
 
         Args:
             db: 数据库会话
@@ -634,50 +817,75 @@ class AuctionService:
         if auction.ends_at > datetime.now():
             return False, "拍卖尚未结束"
 
-        # 如果有人出价
-        if auction.highest_bidder_id:
-            # 获取卖家
-            result = await db.execute(
-                select(Player).where(Player.id == auction.seller_id)
-            )
-            seller = result.scalar_one_or_none()
-
-            # 计算税费
-            tax = int(auction.current_bid * AuctionService.AUCTION_TAX_RATE)
-            seller_income = auction.current_bid - tax
-
-            # 转账给卖家
-            if seller:
-                seller.spirit_stones += seller_income
+        settled = await AuctionService.settle_auctions(db, [auction_id])
+        await db.commit()
 
-            # 添加物品到买家背包
-            new_inv = PlayerInventory(
-                player_id=auction.highest_bidder_id,
-                item_id=auction.item_id,
-                quantity=1
-            )
-            db.add(new_inv)
+        if not settled:
+            return False, "该拍卖已结束"
 
-            # 更新拍卖状态
-            auction.is_active = False
-            auction.is_sold = True
-            auction.sold_at = datetime.now()
+        if auction.highest_bidder_id:
+            return True, f"拍卖结算成功，成交价 {auction.current_bid} 灵石"
+        return True, "拍卖流拍，物品已返还"
 
-            await db.commit()
+    @staticmethod
+    async def settle_auctions(db: AsyncSession, auction_ids: List[int]) -> int:
+        """批量结算已到期的拍卖（不提交），返回结算数量
 
-            return True, f"拍卖结算成功，成交价 {auction.current_bid} 灵石"
+        有人出价的拍卖：卖家获得成交价扣税后的灵石，物品发给最高出价者
+        （出价时灵石已扣除，被超过的出价当时已退还），并记录交易；流拍的物品退还卖家。
 
-        else:
-            # 无人出价，返还物品给卖家
-            new_inv = PlayerInventory(
-                player_id=auction.seller_id,
-                item_id=auction.item_id,
-                quantity=1
+        先用一条带条件的 UPDATE 把到期且仍在进行的拍卖标记为结束，只有这条语句
+        真正改变了状态的拍卖才发放灵石和物品，重复结算（重启、手动结算、
+        与一口价同时发生）不会重复发放。
+        """
+        now = datetime.now()
+        has_bidder = Auction.highest_bidder_id.isnot(None)
+        result = await db.execute(
+            update(Auction)
+            .where(
+                Auction.id.in_(auction_ids),
+                Auction.is_active == True,
+                Auction.ends_at <= now
             )
-            db.add(new_inv)
+            .values(
+                is_active=False,
+                is_sold=has_bidder,
+                sold_at=case((has_bidder, now), else_=None)
+            )
+            .returning(
+                Auction.seller_id, Auction.item_id, Auction.highest_bidder_id, Auction.current_bid
+            )
+            .execution_options(synchronize_session=False)
+        )
+        settled = result.all()
+
+        # 卖家收入按卖家合并，一次取出所有卖家
+        seller_income: Dict[int, int] = defaultdict(int)
+        for seller_id, item_id, bidder_id, current_bid in settled:
+            if bidder_id:
+                tax = int(current_bid * AuctionService.AUCTION_TAX_RATE)
+                seller_income[seller_id] += current_bid - tax
+
+                db.add(TradeRecord(
+                    seller_id=seller_id,
+                    buyer_id=bidder_id,
+                    item_id=item_id,
+                    quantity=1,
+                    total_price=current_bid,
+                    tax=tax
+                ))
+
+            db.add(PlayerInventory(
+                player_id=bidder_id or seller_id,
+                item_id=item_id,
+                quantity=1
+            ))
 
-            # 更新拍卖状态
-            auction.is_active = False
-            await db.commit()
+        if seller_income:
+            sellers = await db.scalars(
+                select(Player).where(Player.id.in_(seller_income))
+            )
+            for seller in sellers:
+                seller.spirit_stones += seller_income[seller.id]
 
-            return True, "拍卖流拍，物品已返还"
+        return len(settled)
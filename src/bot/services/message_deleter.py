@@ -0,0 +1,271 @@
+"""消息自动删除服务
+
+`send_and_delete` 等发出的临时消息不再各自启动一个睡眠任务等待删除，而是登记到
+本服务：
+
+- 删除计划放入按删除时间排序的最小堆，由一个后台任务统一处理；
+- 同时到期的消息按聊天分组，用 `deleteMessages` 每次最多删除 100 条；
+- 删除计划攒一小段时间后批量写入 `scheduled_deletions` 表，删除后批量清除，
+  重启时从表中载入继续执行（停机期间已到期的立即删除）。
+
+删除请求以广播优先级发出，经出站消息调度器排队，让位于对玩家操作的回复。
+"""
+import asyncio
+import heapq
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from bot.models import ScheduledDeletion
+from bot.models.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+_deletions = ScheduledDeletion.__table__
+
+# Telegram 单次 deleteMessages 最多删除的消息数
+MAX_BATCH = 100
+# 删除计划攒多久写一次数据库（秒）
+PERSIST_DELAY = 1
+# 网络错误或被限流时的重试间隔（秒）
+RETRY_DELAY = 30
+# 单次最长睡眠（秒），防止系统时间调整后长时间不醒
+MAX_SLEEP = 300
+
+_Key = Tuple[int, int]
+
+
+class MessageDeleter:
+    """消息自动删除服务"""
+
+    # (删除时间, 聊天ID, 消息ID)
+    _heap: List[Tuple[datetime, int, int]] = []
+    # (聊天ID, 消息ID) -> 删除时间；堆中时间不一致的条目已作废
+    _scheduled: Dict[_Key, datetime] = {}
+    # 尚未写入数据库的删除计划
+    _unsaved: Dict[_Key, datetime] = {}
+    _persist_at: Optional[datetime] = None
+    # 数据库写入互斥（后台写入不随停止取消，停止时等待其完成）
+    _lock: Optional[asyncio.Lock] = None
+    _bot = None
+    _wakeup: Optional[asyncio.Event] = None
+    _task: Optional[asyncio.Task] = None
+    _bind = None
+
+    @classmethod
+    async def start(cls, bot, db: Optional[AsyncSession] = None) -> int:
+        """从数据库载入删除计划并启动服务，返回载入数量
+
+        Args:
+            bot: 用于删除消息的 Bot
+            db: 用于确定数据库连接的会话；写入删除计划时也使用同一连接
+        """
+        await cls.stop()
+
+        cls._bind = db.bind if db else None
+        async with cls._session() as session:
+            rows = (await session.execute(
+                select(ScheduledDeletion.chat_id, ScheduledDeletion.message_id, ScheduledDeletion.delete_at)
+            )).all()
+
+        cls._scheduled = {(chat_id, message_id): delete_at for chat_id, message_id, delete_at in rows}
+        cls._heap = [(delete_at, chat_id, message_id) for (chat_id, message_id), delete_at in cls._scheduled.items()]
+        heapq.heapify(cls._heap)
+        cls._unsaved = {}
+        cls._persist_at = None
+        cls._bot = bot
+        cls._lock = asyncio.Lock()
+        cls._wakeup = asyncio.Event()
+        cls._task = asyncio.create_task(cls._run(), name="message-deleter")
+
+        logger.info(f"消息自动删除服务已启动，载入 {len(rows)} 条删除计划")
+        return len(rows)
+
+    @classmethod
+    async def stop(cls) -> None:
+        """停止服务，尚未写入的删除计划写入数据库"""
+        task, cls._task = cls._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+        try:
+            await cls._persist()
+        except Exception as e:
+            logger.error(f"保存删除计划失败，{len(cls._unsaved)} 条消息不会自动删除: {e}")
+        cls._heap = []
+        cls._scheduled = {}
+        cls._unsaved = {}
+        cls._bot = None
+        cls._wakeup = None
+
+    @classmethod
+    def schedule(cls, chat_id: int, message_id: int, delay: float) -> bool:
+        """登记在 delay 秒后删除消息，服务未启动时返回 False
+
+        同一条消息重复登记时取较早的删除时间。
+        """
+        if cls._task is None:
+            return False
+
+        key = (chat_id, message_id)
+        delete_at = datetime.now() + timedelta(seconds=delay)
+        current = cls._scheduled.get(key)
+        if current is not None and current <= delete_at:
+            return True
+
+        cls._scheduled[key] = delete_at
+        heapq.heappush(cls._heap, (delete_at, chat_id, message_id))
+        if current is None:
+            # 已写入数据库的计划不再更新，重启后最多晚一些删除
+            cls._unsaved[key] = delete_at
+            if cls._persist_at is None:
+                cls._persist_at = datetime.now() + timedelta(seconds=PERSIST_DELAY)
+                cls._wakeup.set()
+        if cls._heap[0][0] == delete_at:
+            cls._wakeup.set()
+        return True
+
+    @classmethod
+    def pending(cls) -> int:
+        """尚未删除的消息数"""
+        return len(cls._scheduled)
+
+    @classmethod
+    def _session(cls) -> AsyncSession:
+        if cls._bind is not None:
+            return AsyncSession(bind=cls._bind, expire_on_commit=False)
+        return AsyncSessionLocal()
+
+    @classmethod
+    async def _run(cls) -> None:
+        while True:
+            cls._wakeup.clear()
+            now = datetime.now()
+
+            if cls._persist_at is not None and cls._persist_at <= now:
+                try:
+                    await asyncio.shield(cls._persist())
+                except Exception as e:
+                    logger.error(f"保存删除计划出错，{RETRY_DELAY}秒后重试: {e}", exc_info=True)
+                    cls._persist_at = now + timedelta(seconds=RETRY_DELAY)
+
+            if cls._heap and cls._heap[0][0] <= now:
+                await cls._delete_due(now)
+                continue
+
+            deadline = now + timedelta(seconds=MAX_SLEEP)
+            if cls._heap:
+                deadline = min(deadline, cls._heap[0][0])
+            if cls._persist_at is not None:
+                deadline = min(deadline, cls._persist_at)
+            try:
+                # asyncio.timeout 不会像 wait_for 那样在超时与取消同时发生时吞掉取消
+                async with asyncio.timeout((deadline - now).total_seconds()):
+                    await cls._wakeup.wait()
+            except TimeoutError:
+                pass
+
+    @classmethod
+    async def _persist(cls) -> None:
+        """把攒下的删除计划一次批量写入"""
+        async with cls._lock:
+            unsaved, cls._unsaved, cls._persist_at = cls._unsaved, {}, None
+            if not unsaved:
+                return
+            try:
+                async with cls._session() as session:
+                    await session.execute(insert(ScheduledDeletion), [
+                        {"chat_id": chat_id, "message_id": message_id, "delete_at": delete_at}
+                        for (chat_id, message_id), delete_at in unsaved.items()
+                    ])
+                    await session.commit()
+            except Exception:
+                # 保留到下次重试（期间已删除的消息不必再写）
+                unsaved = {key: at for key, at in unsaved.items() if key in cls._scheduled}
+                cls._unsaved = {**unsaved, **cls._unsaved}
+                raise
+
+    @classmethod
+    async def _delete_due(cls, now: datetime) -> None:
+        """取出所有到期的消息，按聊天分组批量删除"""
+        due: Dict[int, List[int]] = defaultdict(list)
+        while cls._heap and cls._heap[0][0] <= now:
+            delete_at, chat_id, message_id = heapq.heappop(cls._heap)
+            key = (chat_id, message_id)
+            if cls._scheduled.get(key) != delete_at:
+                continue
+            del cls._scheduled[key]
+            due[chat_id].append(message_id)
+
+        batches = []
+        for chat_id, message_ids in due.items():
+            message_ids.sort()
+            batches.extend((chat_id, message_ids[i:i + MAX_BATCH]) for i in range(0, len(message_ids), MAX_BATCH))
+        results = await asyncio.gather(*(cls._delete_batch(chat_id, ids) for chat_id, ids in batches))
+
+        finished: List[_Key] = []
+        retry_at = datetime.now() + timedelta(seconds=RETRY_DELAY)
+        for (chat_id, message_ids), done in zip(batches, results):
+            for message_id in message_ids:
+                key = (chat_id, message_id)
+                if done:
+                    finished.append(key)
+                elif key not in cls._scheduled:
+                    cls._scheduled[key] = retry_at
+                    heapq.heappush(cls._heap, (retry_at, chat_id, message_id))
+
+        # 还没写入数据库的直接丢弃，其余批量清除
+        stored = [key for key in finished if cls._unsaved.pop(key, None) is None]
+        if not cls._unsaved:
+            cls._persist_at = None
+        if stored:
+            await asyncio.shield(cls._clear(stored))
+
+        logger.debug(f"自动删除 {len(finished)} 条消息（{len(batches)} 次请求）")
+
+    @classmethod
+    async def _delete_batch(cls, chat_id: int, message_ids: List[int]) -> bool:
+        """删除同一聊天的一批消息，返回是否不再需要重试"""
+        from bot.utils.message_utils import Priority, rate_limit_args
+
+        try:
+            await cls._bot.delete_messages(
+                chat_id, message_ids, rate_limit_args=rate_limit_args(cls._bot, Priority.BROADCAST)
+            )
+        except (BadRequest, Forbidden) as e:
+            # 消息已被手动删除、超过 48 小时或没有权限
+            logger.debug(f"删除聊天 {chat_id} 的消息失败: {e}")
+        except (NetworkError, RetryAfter) as e:
+            logger.warning(f"删除聊天 {chat_id} 的 {len(message_ids)} 条消息失败，稍后重试: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"删除聊天 {chat_id} 的消息出错: {e}", exc_info=True)
+        return True
+
+    @classmethod
+    async def _clear(cls, keys: List[_Key]) -> None:
+        """批量清除已执行的删除计划"""
+        async with cls._lock:
+            try:
+                async with cls._session() as session:
+                    await session.execute(
+                        delete(_deletions).where(
+                            _deletions.c.chat_id == bindparam("b_chat_id"),
+                            _deletions.c.message_id == bindparam("b_message_id"),
+                        ),
+                        [{"b_chat_id": chat_id, "b_message_id": message_id} for chat_id, message_id in keys]
+                    )
+                    await session.commit()
+            except Exception as e:
+                # 残留的计划重启后再删一次，消息已不存在时 Telegram 会忽略
+                logger.error(f"清除删除计划出错: {e}", exc_info=True)
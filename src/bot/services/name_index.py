@@ -0,0 +1,133 @@
+"""名称 n-gram 索引
+
+物品、技能、丹方、炼器配方、灵兽模板的名称都是短中文串，按子串查找时数据库的
+B-tree 索引无法使用（`LIKE '%剑%'` 只能全表扫描）。目录载入时为每类名称建立
+单字 + 双字（bigram）倒排索引：
+
+- `contains`: 子串匹配，取查询中各双字的倒排表求交集后逐个核对；
+- `search`: 模糊匹配，按共有 n-gram 的 Dice 系数排序，完全相同、前缀、包含依次加分；
+- `complete`: 前缀补全，在按名称排序的列表上二分查找。
+
+索引随目录整体替换，只读使用。配置 `NAME_SEARCH_BACKEND=pg_trgm` 且使用 PostgreSQL 时，
+物品名子串搜索改由数据库的 pg_trgm 索引完成（见 `add_item_name_trgm_index.sql`）。
+"""
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.models import Item
+
+
+def normalize_name(name: str) -> str:
+    """统一大小写并去掉空白"""
+    return "".join(name.split()).lower()
+
+
+def name_grams(name: str) -> Set[str]:
+    """名称的单字和双字集合"""
+    return set(name) | {name[i:i + 2] for i in range(len(name) - 1)}
+
+
+class NameIndex:
+    """名称 n-gram 倒排索引（键通常为对象ID）"""
+
+    __slots__ = ("_names", "_gram_counts", "_postings", "_sorted")
+
+    def __init__(self, entries: Iterable[Tuple[int, str]] = ()):
+        # 键 -> 规范化名称
+        self._names: Dict[int, str] = {}
+        self._gram_counts: Dict[int, int] = {}
+        # n-gram -> 键集合
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        for key, name in entries:
+            normalized = normalize_name(name)
+            if not normalized:
+                continue
+            grams = name_grams(normalized)
+            self._names[key] = normalized
+            self._gram_counts[key] = len(grams)
+            for gram in grams:
+                self._postings[gram].add(key)
+        # (规范化名称, 键)，用于前缀补全
+        self._sorted: List[Tuple[str, int]] = sorted((name, key) for key, name in self._names.items())
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _order(self, key: int) -> Tuple[int, int]:
+        return len(self._names[key]), key
+
+    def contains(self, query: str) -> List[int]:
+        """名称包含 query 的全部键（短名在前）"""
+        query = normalize_name(query)
+        if not query:
+            return []
+        grams = [query] if len(query) == 1 else [query[i:i + 2] for i in range(len(query) - 1)]
+        postings = sorted((self._postings.get(gram, ()) for gram in set(grams)), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        if len(query) > 2:
+            candidates = {key for key in candidates if query in self._names[key]}
+        return sorted(candidates, key=self._order)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """模糊匹配，返回 [(键, 得分)]，得分高者在前
+
+        得分为共有 n-gram 的 Dice 系数（0~1），完全相同加 1，前缀加 0.5，包含加 0.25。
+        """
+        query = normalize_name(query)
+        if not query:
+            return []
+        query_grams = name_grams(query)
+        shared: Counter = Counter()
+        for gram in query_grams:
+            shared.update(self._postings.get(gram, ()))
+
+        scored = []
+        for key, common in shared.items():
+            name = self._names[key]
+            score = 2 * common / (len(query_grams) + self._gram_counts[key])
+            if name == query:
+                score += 1
+            elif name.startswith(query):
+                score += 0.5
+            elif query in name:
+                score += 0.25
+            scored.append((-score, len(name), key))
+        scored.sort()
+        return [(key, -score) for score, _, key in scored[:limit]]
+
+    def complete(self, prefix: str, limit: int = 10) -> List[int]:
+        """以 prefix 开头的键（按名称排序）"""
+        prefix = normalize_name(prefix)
+        keys = []
+        start = bisect_left(self._sorted, (prefix, -1))
+        for name, key in self._sorted[start:]:
+            if not name.startswith(prefix) or len(keys) >= limit:
+                break
+            keys.append(key)
+        return keys
+
+
+async def match_item_ids(db: AsyncSession, query: str, limit: Optional[int] = None) -> List[int]:
+    """名称包含 query 的物品ID（短名在前）
+
+    默认使用目录中的内存索引；配置 `NAME_SEARCH_BACKEND=pg_trgm` 且数据库为 PostgreSQL 时
+    由 pg_trgm 索引完成，按相似度排序。
+    """
+    from bot.config import settings
+
+    if settings.NAME_SEARCH_BACKEND == "pg_trgm" and db.bind.dialect.name == "postgresql":
+        stmt = select(Item.id).where(Item.name.contains(query, autoescape=True)).order_by(
+            func.similarity(Item.name, query).desc(), Item.id
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return list((await db.execute(stmt)).scalars().all())
+
+    from bot.services.game_catalog import GameCatalog
+
+    ids = (await GameCatalog.get(db)).item_names.contains(query)
+    return ids if limit is None else ids[:limit]
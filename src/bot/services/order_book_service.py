@@ -0,0 +1,424 @@
+"""挂单交易服务
+
+每种物品一个买卖盘，买卖双方挂限价单，按价格优先、时间优先撮合：
+新挂单先与对手盘按挂单价格逐笔成交，剩余部分挂在盘上等待成交。
+
+盘口常驻内存（买一/卖一、深度报价不查库），启动时从未完成的挂单重建。
+所有下单、撤单都在同一把锁内进行：先按内存盘口算出成交，再把整笔下单的
+全部成交（挂单状态、交易记录、灵石和物品结算）写入同一个事务，提交成功后
+才更新内存盘口，因此内存盘口始终与数据库一致。
+
+下单时即扣留资产：买单扣除 单价×数量 的灵石，卖单从背包扣除物品；
+买单以更低价格成交时退还差价，撤单时退还未成交部分。
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.models import Player, PlayerInventory
+from bot.models.database import AsyncSessionLocal
+from bot.models.market import MarketOrder, OrderSide, TradeRecord
+
+logger = logging.getLogger(__name__)
+
+
+class BookOrder:
+    """盘口上的一笔挂单"""
+
+    __slots__ = ("order_id", "player_id", "side", "price", "remaining")
+
+    def __init__(self, order_id: int, player_id: int, side: OrderSide, price: int, remaining: int):
+        self.order_id = order_id
+        self.player_id = player_id
+        self.side = side
+        self.price = price
+        self.remaining = remaining
+
+    @property
+    def key(self) -> Tuple[int, int]:
+        """排序键：买盘价高优先、卖盘价低优先，同价先挂先成交"""
+        return (-self.price if self.side == OrderSide.BUY else self.price, self.order_id)
+
+
+class OrderBook:
+    """单个物品的买卖盘"""
+
+    __slots__ = ("_sides", "_orders")
+
+    def __init__(self):
+        self._sides: Dict[OrderSide, SortedList] = {side: SortedList() for side in OrderSide}
+        self._orders: Dict[int, BookOrder] = {}
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def add(self, order: BookOrder) -> None:
+        self._orders[order.order_id] = order
+        self._sides[order.side].add((order.key, order.order_id))
+
+    def remove(self, order_id: int) -> Optional[BookOrder]:
+        order = self._orders.pop(order_id, None)
+        if order is not None:
+            self._sides[order.side].remove((order.key, order_id))
+        return order
+
+    def fill(self, order_id: int, quantity: int) -> None:
+        """成交 quantity 个，全部成交后移出盘口"""
+        order = self._orders[order_id]
+        order.remaining -= quantity
+        if order.remaining <= 0:
+            self.remove(order_id)
+
+    def best(self, side: OrderSide) -> Optional[BookOrder]:
+        """某一侧的最优挂单"""
+        entries = self._sides[side]
+        return self._orders[entries[0][1]] if entries else None
+
+    def match(self, side: OrderSide, price: int, quantity: int, player_id: int) -> List[Tuple[BookOrder, int]]:
+        """计算新挂单与对手盘的成交（不修改盘口），返回 [(对手挂单, 成交数量)]
+
+        自己的挂单不与自己成交，跳过后继续匹配。
+        """
+        opposite = OrderSide.SELL if side == OrderSide.BUY else OrderSide.BUY
+        fills = []
+        for _, order_id in self._sides[opposite]:
+            if quantity <= 0:
+                break
+            maker = self._orders[order_id]
+            crosses = maker.price <= price if side == OrderSide.BUY else maker.price >= price
+            if not crosses:
+                break
+            if maker.player_id == player_id:
+                continue
+            filled = min(quantity, maker.remaining)
+            fills.append((maker, filled))
+            quantity -= filled
+        return fills
+
+    def depth(self, side: OrderSide, levels: int) -> List[Tuple[int, int]]:
+        """按价格合并的前 levels 档 [(价格, 数量)]"""
+        result: List[Tuple[int, int]] = []
+        for _, order_id in self._sides[side]:
+            order = self._orders[order_id]
+            if result and result[-1][0] == order.price:
+                result[-1] = (order.price, result[-1][1] + order.remaining)
+            elif len(result) < levels:
+                result.append((order.price, order.remaining))
+            else:
+                break
+        return result
+
+
+class OrderBookService:
+    """挂单交易服务"""
+
+    MAX_ORDER_PRICE = 100_000_000  # 单价上限
+
+    _books: Dict[int, OrderBook] = {}
+    _loaded = False
+    _lock = asyncio.Lock()
+
+    @classmethod
+    async def rebuild(cls, db: Optional[AsyncSession] = None) -> int:
+        """从未完成的挂单重建全部盘口，返回挂单数量
+
+        Args:
+            db: 用于确定数据库连接的会话；重建本身使用独立会话
+        """
+        async with cls._lock:
+            books: Dict[int, OrderBook] = defaultdict(OrderBook)
+            session = AsyncSession(bind=db.bind, expire_on_commit=False) if db else AsyncSessionLocal()
+            async with session:
+                result = await session.execute(
+                    select(
+                        MarketOrder.id, MarketOrder.item_id, MarketOrder.player_id, MarketOrder.side,
+                        MarketOrder.price, MarketOrder.quantity - MarketOrder.filled_quantity
+                    ).where(MarketOrder.is_active == True)
+                )
+                count = 0
+                for order_id, item_id, player_id, side, price, remaining in result.all():
+                    books[item_id].add(BookOrder(order_id, player_id, side, price, remaining))
+                    count += 1
+
+            cls._books, cls._loaded = dict(books), True
+
+        logger.info(f"挂单盘口已重建，共 {count} 笔挂单")
+        return count
+
+    @classmethod
+    async def ensure_loaded(cls, db: Optional[AsyncSession] = None) -> None:
+        """尚未建立盘口时先重建一次"""
+        if not cls._loaded:
+            await cls.rebuild(db)
+
+    @classmethod
+    def quote(cls, item_id: int) -> Tuple[Optional[int], Optional[int]]:
+        """买一价和卖一价（没有挂单时为 None）"""
+        book = cls._books.get(item_id)
+        if book is None:
+            return None, None
+        bid, ask = book.best(OrderSide.BUY), book.best(OrderSide.SELL)
+        return (bid.price if bid else None), (ask.price if ask else None)
+
+    @classmethod
+    def depth(cls, item_id: int, levels: int = 5) -> Dict[OrderSide, List[Tuple[int, int]]]:
+        """买卖盘前 levels 档"""
+        book = cls._books.get(item_id)
+        if book is None:
+            return {side: [] for side in OrderSide}
+        return {side: book.depth(side, levels) for side in OrderSide}
+
+    @classmethod
+    def clear(cls) -> None:
+        """清空盘口，下次访问时重新建立"""
+        cls._books = {}
+        cls._loaded = False
+
+    @classmethod
+    async def place_buy_order(
+        cls,
+        db: AsyncSession,
+        player: Player,
+        item_id: int,
+        quantity: int,
+        price: int
+    ) -> Tuple[bool, str]:
+        """挂买单（扣留 单价×数量 的灵石）
+
+        Returns:
+            (是否成功, 消息)
+        """
+        error = cls._check_order(quantity, price)
+        if error:
+            return False, error
+
+        await cls.ensure_loaded(db)
+        async with cls._lock:
+            if player.spirit_stones < price * quantity:
+                return False, f"灵石不足，需要 {price * quantity} 灵石"
+
+            player.spirit_stones -= price * quantity
+            return await cls._submit(db, player, item_id, OrderSide.BUY, quantity, price)
+
+    @classmethod
+    async def place_sell_order(
+        cls,
+        db: AsyncSession,
+        player: Player,
+        inventory_id: int,
+        quantity: int,
+        price: int
+    ) -> Tuple[bool, str]:
+        """挂卖单（从背包扣留物品）
+
+        Returns:
+            (是否成功, 消息)
+        """
+        error = cls._check_order(quantity, price)
+        if error:
+            return False, error
+
+        await cls.ensure_loaded(db)
+        async with cls._lock:
+            result = await db.execute(
+                select(PlayerInventory).where(
+                    PlayerInventory.id == inventory_id,
+                    PlayerInventory.player_id == player.id
+                )
+            )
+            inv = result.scalar_one_or_none()
+
+            if not inv:
+                return False, "未找到该物品"
+
+            if inv.is_equipped:
+                return False, "请先卸下装备再挂单"
+
+            if inv.quantity < quantity:
+                return False, f"物品数量不足，当前拥有 {inv.quantity} 个"
+
+            item_id = inv.item_id
+            inv.quantity -= quantity
+            if inv.quantity == 0:
+                await db.delete(inv)
+
+            return await cls._submit(db, player, item_id, OrderSide.SELL, quantity, price)
+
+    @classmethod
+    async def cancel_order(
+        cls,
+        db: AsyncSession,
+        player: Player,
+        order_id: int
+    ) -> Tuple[bool, str]:
+        """撤单，退还未成交部分扣留的灵石或物品
+
+        Returns:
+            (是否成功, 消息)
+        """
+        await cls.ensure_loaded(db)
+        async with cls._lock:
+            result = await db.execute(
+                select(MarketOrder).where(
+                    MarketOrder.id == order_id,
+                    MarketOrder.player_id == player.id
+                )
+            )
+            order = result.scalar_one_or_none()
+
+            if not order:
+                return False, "未找到该挂单或无权操作"
+
+            if not order.is_active:
+                return False, "该挂单已完成或已撤销"
+
+            remaining = order.remaining
+            if order.side == OrderSide.BUY:
+                player.spirit_stones += order.price * remaining
+                refund = f"退还 {order.price * remaining} 灵石"
+            else:
+                await cls._add_items(db, {player.id: remaining}, order.item_id)
+                refund = f"退还物品 x{remaining}"
+
+            order.is_active = False
+            order.closed_at = datetime.now()
+
+            try:
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+            book = cls._books.get(order.item_id)
+            if book is not None:
+                book.remove(order_id)
+
+        return True, f"成功撤单，{refund}"
+
+    @staticmethod
+    def _check_order(quantity: int, price: int) -> Optional[str]:
+        if quantity < 1:
+            return "数量必须大于0"
+        if price < 1:
+            return "价格必须大于0"
+        if price > OrderBookService.MAX_ORDER_PRICE:
+            return f"单价不能超过 {OrderBookService.MAX_ORDER_PRICE} 灵石"
+        return None
+
+    @classmethod
+    async def _submit(
+        cls,
+        db: AsyncSession,
+        player: Player,
+        item_id: int,
+        side: OrderSide,
+        quantity: int,
+        price: int
+    ) -> Tuple[bool, str]:
+        """写入新挂单并撮合（调用方已持有锁并完成资产扣留），全部成交在同一事务中提交"""
+        from bot.services.market_service import MarketService
+
+        book = cls._books.get(item_id)
+        if book is None:
+            book = OrderBook()
+        fills = book.match(side, price, quantity, player.id)
+
+        order = MarketOrder(
+            player_id=player.id,
+            item_id=item_id,
+            side=side,
+            price=price,
+            quantity=quantity,
+            filled_quantity=sum(filled for _, filled in fills)
+        )
+        if order.remaining == 0:
+            order.is_active = False
+            order.closed_at = datetime.now()
+        db.add(order)
+
+        try:
+            await db.flush()
+
+            if fills:
+                makers = {
+                    maker.id: maker for maker in await db.scalars(
+                        select(MarketOrder).where(MarketOrder.id.in_([m.order_id for m, _ in fills]))
+                    )
+                }
+
+                stones: Dict[int, int] = defaultdict(int)
+                items: Dict[int, int] = defaultdict(int)
+                for book_order, filled in fills:
+                    maker = makers[book_order.order_id]
+                    amount = maker.price * filled
+                    tax = int(amount * MarketService.MARKET_TAX_RATE)
+
+                    if side == OrderSide.BUY:
+                        buyer_id, seller_id = player.id, maker.player_id
+                        buy_order_id, sell_order_id = order.id, maker.id
+                        # 按卖方挂单价成交，退还买单多扣留的差价
+                        stones[player.id] += (price - maker.price) * filled
+                    else:
+                        buyer_id, seller_id = maker.player_id, player.id
+                        buy_order_id, sell_order_id = maker.id, order.id
+
+                    stones[seller_id] += amount - tax
+                    items[buyer_id] += filled
+
+                    maker.filled_quantity += filled
+                    if maker.remaining == 0:
+                        maker.is_active = False
+                        maker.closed_at = datetime.now()
+
+                    db.add(TradeRecord(
+                        buy_order_id=buy_order_id,
+                        sell_order_id=sell_order_id,
+                        seller_id=seller_id,
+                        buyer_id=buyer_id,
+                        item_id=item_id,
+                        quantity=filled,
+                        total_price=amount,
+                        tax=tax
+                    ))
+
+                players = await db.scalars(
+                    select(Player).where(Player.id.in_([pid for pid, amount in stones.items() if amount]))
+                )
+                for counterparty in players:
+                    counterparty.spirit_stones += stones[counterparty.id]
+
+                await cls._add_items(db, items, item_id)
+
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        # 提交成功后再更新内存盘口
+        cls._books.setdefault(item_id, book)
+        for book_order, filled in fills:
+            book.fill(book_order.order_id, filled)
+        if order.is_active:
+            book.add(BookOrder(order.id, player.id, side, price, order.remaining))
+
+        if not fills:
+            return True, f"挂单成功，挂单ID: {order.id}"
+        traded = order.filled_quantity
+        if order.is_active:
+            return True, f"已成交 {traded} 个，剩余 {order.remaining} 个继续挂单，挂单ID: {order.id}"
+        return True, f"全部成交 {traded} 个"
+
+    @staticmethod
+    async def _add_items(db: AsyncSession, quantities: Dict[int, int], item_id: int) -> None:
+        """把同一种物品堆叠进各玩家背包"""
+        from bot.services.market_service import MarketService
+
+        await MarketService.add_items_to_inventories(
+            db, {(player_id, item_id): quantity for player_id, quantity in quantities.items()}
+        )
@@ -0,0 +1,244 @@
+"""玩家资料读穿缓存
+
+为 `.状态`、排行榜、`.探查` 等只读的热点命令缓存玩家资料快照（含计算出的战力与
+修炼速度）。优先使用 Redis；未配置或连接失败时退回进程内缓存。后端只用到
+get / set / delete 三个命令，可以直接换成 fakeredis 之类的替身。
+
+失效采用写穿方式：任何会话提交了对玩家（或其灵根）的修改，提交后立即使对应
+缓存失效，因此各个服务无需手动维护缓存。批量 UPDATE 语句不经过 ORM 对象，
+由 PLAYER_CACHE_TTL 兜底。
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from bot.config import settings
+from bot.models import Player, SpiritRoot
+from bot.services.player_service import PlayerService
+from bot.services.spirit_root_service import SpiritRootService
+
+logger = logging.getLogger(__name__)
+
+# 会话中待失效的玩家（AsyncSession.info / Session.info）
+_DIRTY_KEY = "player_cache_dirty"
+
+
+class PlayerProfile(NamedTuple):
+    """玩家资料快照"""
+    telegram_id: int
+    player_id: int
+    nickname: str
+    full_realm_name: str
+    cultivation_exp: int
+    next_realm_exp: int
+    hp: int
+    max_hp: int
+    spiritual_power: int
+    max_spiritual_power: int
+    attack: int
+    defense: int
+    speed: int
+    crit_rate: float
+    comprehension: int
+    divine_sense: int
+    max_divine_sense: int
+    spirit_stones: int
+    contribution: int
+    total_battles: int
+    total_wins: int
+    total_kills: int
+    spirit_root: Optional[str]
+    spirit_root_purity: Optional[int]
+    combat_power: int
+    cultivation_speed: float
+
+
+class MemoryCacheBackend:
+    """进程内缓存，实现与 redis.asyncio 相同的 get / set / delete 接口"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, float]] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ex: int) -> None:
+        self._data[key] = (value, time.monotonic() + ex)
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self._data.pop(key, None) is not None for key in keys)
+
+    async def aclose(self) -> None:
+        self._data.clear()
+
+
+class PlayerCache:
+    """玩家资料缓存"""
+
+    _backend = MemoryCacheBackend()
+    # 已提交修改、但后端尚未完成删除的玩家，读取时视为未命中
+    _pending: Set[int] = set()
+
+    @staticmethod
+    def key(telegram_id: int) -> str:
+        return f"player:profile:{telegram_id}"
+
+    @classmethod
+    async def init(cls, client=None) -> None:
+        """初始化缓存后端
+
+        Args:
+            client: 兼容 redis.asyncio 的客户端（如 fakeredis）；为空时按配置连接 Redis
+        """
+        if client is None and settings.REDIS_ENABLED:
+            import redis.asyncio as redis
+
+            client = redis.from_url(settings.redis_url, decode_responses=True)
+            try:
+                await client.ping()
+            except Exception as e:
+                logger.warning(f"Redis 不可用（{e}），玩家缓存使用进程内存")
+                await client.aclose()
+                client = None
+
+        cls._backend = client if client is not None else MemoryCacheBackend()
+        cls._pending.clear()
+        logger.info(f"玩家缓存后端: {type(cls._backend).__name__}")
+
+    @classmethod
+    async def close(cls) -> None:
+        await cls._backend.aclose()
+        cls._backend = MemoryCacheBackend()
+
+    @staticmethod
+    def build_profile(player: Player) -> PlayerProfile:
+        """由已加载灵根、功法的玩家对象生成资料快照"""
+        spirit_root = player.spirit_root
+        return PlayerProfile(
+            telegram_id=player.telegram_id,
+            player_id=player.id,
+            nickname=player.nickname,
+            full_realm_name=player.full_realm_name,
+            cultivation_exp=player.cultivation_exp,
+            next_realm_exp=player.next_realm_exp,
+            hp=player.hp,
+            max_hp=player.max_hp,
+            spiritual_power=player.spiritual_power,
+            max_spiritual_power=player.max_spiritual_power,
+            attack=player.attack,
+            defense=player.defense,
+            speed=player.speed,
+            crit_rate=player.crit_rate,
+            comprehension=player.comprehension,
+            divine_sense=player.divine_sense,
+            max_divine_sense=player.max_divine_sense,
+            spirit_stones=player.spirit_stones,
+            contribution=player.contribution,
+            total_battles=player.total_battles,
+            total_wins=player.total_wins,
+            total_kills=player.total_kills,
+            spirit_root=SpiritRootService.get_root_description(spirit_root) if spirit_root else None,
+            spirit_root_purity=spirit_root.purity if spirit_root else None,
+            combat_power=player.combat_power,
+            cultivation_speed=player.cultivation_speed,
+        )
+
+    @classmethod
+    async def get_profile(cls, db: AsyncSession, telegram_id: int) -> Optional[PlayerProfile]:
+        """读取玩家资料：先查缓存，未命中时查库并回填"""
+        if telegram_id not in cls._pending:
+            try:
+                raw = await cls._backend.get(cls.key(telegram_id))
+            except Exception as e:
+                logger.warning(f"读取玩家缓存失败: {e}")
+                raw = None
+            if raw is not None:
+                return PlayerProfile(**json.loads(raw))
+
+        player = await PlayerService.load_player(db, telegram_id, "full")
+        if not player:
+            return None
+
+        profile = cls.build_profile(player)
+        if telegram_id not in cls._pending:
+            try:
+                await cls._backend.set(
+                    cls.key(telegram_id),
+                    json.dumps(profile._asdict(), ensure_ascii=False),
+                    ex=settings.PLAYER_CACHE_TTL,
+                )
+            except Exception as e:
+                logger.warning(f"写入玩家缓存失败: {e}")
+        return profile
+
+    @classmethod
+    async def invalidate(cls, *telegram_ids: int) -> None:
+        """使玩家资料缓存失效"""
+        cls._pending.update(telegram_ids)
+        try:
+            await cls._backend.delete(*(cls.key(telegram_id) for telegram_id in telegram_ids))
+        except Exception as e:
+            logger.warning(f"删除玩家缓存失败: {e}")
+        finally:
+            cls._pending.difference_update(telegram_ids)
+
+    @staticmethod
+    def invalidate_on_commit(session: Session, telegram_ids: Iterable[int]) -> None:
+        """登记以批量语句修改的玩家（不经过ORM对象），会话提交后使其缓存失效"""
+        session.info.setdefault(_DIRTY_KEY, set()).update(telegram_ids)
+
+    @classmethod
+    def _invalidate_after_commit(cls, telegram_ids: Iterable[int]) -> None:
+        """提交事件是同步回调，删除操作交给事件循环执行"""
+        telegram_ids = tuple(telegram_ids)
+        cls._pending.update(telegram_ids)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有事件循环（离线脚本），直接丢弃进程内缓存
+            if isinstance(cls._backend, MemoryCacheBackend):
+                for telegram_id in telegram_ids:
+                    cls._backend._data.pop(cls.key(telegram_id), None)
+            cls._pending.difference_update(telegram_ids)
+            return
+        loop.create_task(cls.invalidate(*telegram_ids))
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_dirty_players(session: Session, flush_context, instances) -> None:
+    """记录本次刷新中被修改的玩家"""
+    dirty = session.info.setdefault(_DIRTY_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Player):
+            if obj.telegram_id is not None and (obj not in session.dirty or session.is_modified(obj)):
+                dirty.add(obj.telegram_id)
+        elif isinstance(obj, SpiritRoot) and obj.player_id is not None:
+            owner = session.identity_map.get(identity_key(Player, obj.player_id))
+            if owner is not None:
+                dirty.add(owner.telegram_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_players(session: Session) -> None:
+    dirty = session.info.pop(_DIRTY_KEY, None)
+    if dirty:
+        PlayerCache._invalidate_after_commit(dirty)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_dirty_players(session: Session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
@@ -5,9 +5,32 @@ from typing import Optional, Tuple
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from bot.models import Player, RealmType, PlayerInventory, Item, SpiritRoot
+from bot.models import Player, PlayerSkill, RealmType, PlayerInventory, Item, SpiritRoot
 from bot.config import settings
+from bot.utils.concurrency import battles
+
+
+# 玩家预加载档位：basic 只查玩家表；combat 附带灵根和技能（战斗用）；
+# full 再附带功法与金丹。档位逐级包含，高档位可满足低档位的需求。
+PLAYER_PROFILES = {
+    "basic": (),
+    "combat": (
+        selectinload(Player.spirit_root),
+        selectinload(Player.skills).selectinload(PlayerSkill.skill),
+    ),
+    "full": (
+        selectinload(Player.spirit_root),
+        selectinload(Player.skills).selectinload(PlayerSkill.skill),
+        selectinload(Player.cultivation_method),
+        selectinload(Player.core),
+    ),
+}
+PROFILE_LEVELS = {profile: level for level, profile in enumerate(PLAYER_PROFILES)}
+
+# 会话内已加载玩家的缓存键（AsyncSession.info）
+_SESSION_CACHE_KEY = "players_by_telegram_id"
 
 
 class PlayerService:
@@ -65,12 +88,34 @@ class PlayerService:
         return player, True
 
     @staticmethod
-    async def get_player(db: AsyncSession, telegram_id: int) -> Optional[Player]:
-        """通过Telegram ID获取玩家"""
+    async def load_player(
+        db: AsyncSession,
+        telegram_id: int,
+        profile: str = "basic"
+    ) -> Optional[Player]:
+        """按预加载档位获取玩家
+
+        同一会话内已按相同或更高档位加载过的玩家直接复用，不再查询数据库。
+        """
+        cache = db.info.setdefault(_SESSION_CACHE_KEY, {})
+        cached = cache.get(telegram_id)
+        if cached and PROFILE_LEVELS[cached[1]] >= PROFILE_LEVELS[profile]:
+            return cached[0]
+
         result = await db.execute(
-            select(Player).where(Player.telegram_id == telegram_id)
+            select(Player)
+            .where(Player.telegram_id == telegram_id)
+            .options(*PLAYER_PROFILES[profile])
         )
-        return result.scalar_one_or_none()
+        player = result.scalar_one_or_none()
+        if player:
+            cache[telegram_id] = (player, profile)
+        return player
+
+    @staticmethod
+    async def get_player(db: AsyncSession, telegram_id: int) -> Optional[Player]:
+        """通过Telegram ID获取玩家"""
+        return await PlayerService.load_player(db, telegram_id)
 
     @staticmethod
     async def get_player_by_telegram_id(db: AsyncSession, telegram_id: int) -> Optional[Player]:
@@ -88,6 +133,12 @@ class PlayerService:
     @staticmethod
     async def update_player_attributes(db: AsyncSession, player: Player) -> None:
         """根据境界更新玩家属性"""
+        PlayerService.apply_realm_attributes(player)
+        await db.commit()
+
+    @staticmethod
+    def apply_realm_attributes(player: Player) -> None:
+        """按境界规则计算玩家属性（不提交，离线模拟也可直接使用）"""
         # 使用累计总层数计算，确保突破后属性递增
         total_level = PlayerService._calculate_total_realm_level(player.realm, player.realm_level)
 
@@ -111,8 +162,6 @@ class PlayerService:
         from bot.config.realm_config import RealmConfig
         player.next_realm_exp = RealmConfig.get_next_realm_exp(player.realm, player.realm_level)
 
-        await db.commit()
-
     @staticmethod
     def _calculate_total_realm_level(realm: RealmType, realm_level: int) -> int:
         """计算从凡人到当前境界的累计总层数
@@ -164,7 +213,7 @@ class PlayerService:
         if player.is_cultivating:
             return False, "正在修炼中，无法突破"
 
-        if player.is_in_battle:
+        if battles.busy(player.id):
             return False, "战斗中无法突破"
 
         return True, ""
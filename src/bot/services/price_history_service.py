@@ -0,0 +1,212 @@
+"""行情服务
+
+每笔成交（`TradeRecord`）写入时，在同一事务内增量更新该物品当前小时和当天的
+K线（开/高/低/收、成交量、成交额），不论成交来自一口价市场、拍卖还是挂单撮合。
+查询参考价只需按 (物品, 周期, 起始时间) 唯一索引读取一行，不再扫描交易记录。
+
+已有的交易记录由 `PriceHistoryService.backfill` 一次性回填。
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, event, exists, insert, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from bot.models.database import AsyncSessionLocal
+from bot.models.market import PriceCandle, PricePeriod, TradeRecord
+
+logger = logging.getLogger(__name__)
+
+# (物品ID, 周期, 周期起始时间)
+CandleKey = Tuple[int, PricePeriod, datetime]
+
+
+def period_start(period: PricePeriod, at: datetime) -> datetime:
+    """时间所在周期的起始时间"""
+    if period == PricePeriod.HOUR:
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class _Bar:
+    """一根K线在内存中的汇总"""
+
+    __slots__ = ("open", "high", "low", "close", "volume", "turnover", "trade_count")
+
+    def __init__(self, price: int):
+        self.open = self.high = self.low = self.close = price
+        self.volume = self.turnover = self.trade_count = 0
+
+    def add(self, price: int, quantity: int, amount: int) -> None:
+        self.high = max(self.high, price)
+        self.low = min(self.low, price)
+        self.close = price
+        self.volume += quantity
+        self.turnover += amount
+        self.trade_count += 1
+
+    def values(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def aggregate_trades(
+    trades: Iterable[Tuple[int, datetime, int, int]],
+    bars: Optional[Dict[CandleKey, _Bar]] = None,
+) -> Dict[CandleKey, _Bar]:
+    """按K线汇总成交（需按成交时间先后传入）
+
+    Args:
+        trades: [(物品ID, 成交时间, 数量, 成交额)]
+        bars: 继续累加到已有的汇总上
+    """
+    bars = {} if bars is None else bars
+    for item_id, traded_at, quantity, amount in trades:
+        if quantity <= 0:
+            continue
+        price = amount // quantity
+        for period in PricePeriod:
+            key = (item_id, period, period_start(period, traded_at))
+            bar = bars.get(key)
+            if bar is None:
+                bar = bars[key] = _Bar(price)
+            bar.add(price, quantity, amount)
+    return bars
+
+
+def candle_upsert(dialect_name: str, key: CandleKey, bar: _Bar):
+    """把一根汇总K线合并进K线表的语句（插入，唯一键冲突时在原行上累加）
+
+    并发事务同时写入同一根新K线时，先 UPDATE 再 INSERT 会双双插入而违反唯一约束，
+    所以用数据库自身的 upsert 一条语句完成。冲突分支里引用的列均为已有行的值。
+    """
+    item_id, period, start = key
+    merged = {
+        "high": case((PriceCandle.high < bar.high, bar.high), else_=PriceCandle.high),
+        "low": case((PriceCandle.low > bar.low, bar.low), else_=PriceCandle.low),
+        "close": bar.close,
+        "volume": PriceCandle.volume + bar.volume,
+        "turnover": PriceCandle.turnover + bar.turnover,
+        "trade_count": PriceCandle.trade_count + bar.trade_count,
+    }
+    values = dict(item_id=item_id, period=period, period_start=start, **bar.values())
+
+    if dialect_name == "mysql":
+        return mysql_insert(PriceCandle).values(**values).on_duplicate_key_update(**merged)
+    upsert_insert = postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+    return upsert_insert(PriceCandle).values(**values).on_conflict_do_update(
+        index_elements=[PriceCandle.item_id, PriceCandle.period, PriceCandle.period_start],
+        set_=merged,
+    )
+
+
+def apply_bars(connection: Connection, bars: Dict[CandleKey, _Bar]) -> None:
+    """把汇总合并进K线表（已有则累加，没有则插入）"""
+    # 固定顺序写入，避免并发事务交叉锁住小时线和日线而死锁
+    for key in sorted(bars, key=lambda key: (key[0], key[1].name, key[2])):
+        connection.execute(candle_upsert(connection.dialect.name, key, bars[key]))
+
+
+class PriceHistoryService:
+    """行情服务"""
+
+    @staticmethod
+    async def latest(
+        db: AsyncSession,
+        item_id: int,
+        period: PricePeriod = PricePeriod.DAY
+    ) -> Optional[PriceCandle]:
+        """物品最近一根有成交的K线"""
+        result = await db.execute(
+            select(PriceCandle).where(
+                PriceCandle.item_id == item_id,
+                PriceCandle.period == period
+            ).order_by(PriceCandle.period_start.desc()).limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def candles(
+        db: AsyncSession,
+        item_id: int,
+        period: PricePeriod = PricePeriod.HOUR,
+        limit: int = 24
+    ) -> List[PriceCandle]:
+        """物品最近 limit 根K线（按时间先后）"""
+        result = await db.execute(
+            select(PriceCandle).where(
+                PriceCandle.item_id == item_id,
+                PriceCandle.period == period
+            ).order_by(PriceCandle.period_start.desc()).limit(limit)
+        )
+        return list(reversed(result.scalars().all()))
+
+    @staticmethod
+    async def reference_price(db: AsyncSession, item_id: int) -> Optional[int]:
+        """参考价：最近一个有成交的交易日的成交量加权均价，从未成交时为 None"""
+        candle = await PriceHistoryService.latest(db, item_id, PricePeriod.DAY)
+        return candle.vwap if candle else None
+
+    @staticmethod
+    async def backfill(db: Optional[AsyncSession] = None) -> int:
+        """从全部交易记录重新生成K线，返回K线数量
+
+        Args:
+            db: 用于确定数据库连接的会话；回填本身使用独立会话
+        """
+        session = AsyncSession(bind=db.bind, expire_on_commit=False) if db else AsyncSessionLocal()
+        async with session:
+            trades = await session.stream(
+                select(
+                    TradeRecord.item_id, TradeRecord.traded_at, TradeRecord.quantity, TradeRecord.total_price
+                ).order_by(TradeRecord.traded_at, TradeRecord.id).execution_options(yield_per=1000)
+            )
+            bars: Dict[CandleKey, _Bar] = {}
+            async for partition in trades.partitions():
+                aggregate_trades(partition, bars)
+
+            await session.execute(delete(PriceCandle))
+            if bars:
+                await session.execute(
+                    insert(PriceCandle),
+                    [
+                        {"item_id": item_id, "period": period, "period_start": start, **bar.values()}
+                        for (item_id, period, start), bar in bars.items()
+                    ]
+                )
+            await session.commit()
+
+        logger.info(f"行情已回填，共 {len(bars)} 根K线")
+        return len(bars)
+
+    @staticmethod
+    async def backfill_if_empty(db: Optional[AsyncSession] = None) -> int:
+        """有交易记录但还没有K线时（首次部署）回填一次"""
+        session = AsyncSession(bind=db.bind, expire_on_commit=False) if db else AsyncSessionLocal()
+        async with session:
+            needs_backfill = await session.scalar(
+                select(and_(exists(select(TradeRecord.id)), ~exists(select(PriceCandle.id))))
+            )
+        if not needs_backfill:
+            return 0
+        return await PriceHistoryService.backfill(db)
+
+
+@event.listens_for(Session, "after_flush")
+def _update_price_candles(session: Session, flush_context) -> None:
+    """新写入的成交在同一事务内合并进K线"""
+    trades = sorted(
+        (obj.traded_at, obj.id, obj.item_id, obj.quantity, obj.total_price)
+        for obj in session.new if isinstance(obj, TradeRecord)
+    )
+    if trades:
+        bars = aggregate_trades(
+            (item_id, traded_at, quantity, amount)
+            for traded_at, _, item_id, quantity, amount in trades
+        )
+        apply_bars(session.connection(), bars)
@@ -8,8 +8,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.models import (
     Player, SecretRealm, RealmExploration, ExplorationReward,
-    RealmLootPool, RealmEvent, RealmStatus, Item, Monster
+    RealmLootPool, RealmEvent, RealmStatus, Item
 )
+from bot.utils.concurrency import battles
+from bot.services.game_catalog import GameCatalog
 
 
 class RealmService:
@@ -58,7 +60,7 @@ class RealmService:
         # 检查是否在修炼或战斗中
         if player.is_cultivating:
             return False, "修炼中无法探索秘境"
-        if player.is_in_battle:
+        if battles.busy(player.id):
             return False, "战斗中无法探索秘境"
 
         # 检查境界要求
@@ -187,8 +189,7 @@ class RealmService:
 
             if event_roll < 0.6:  # 遭遇战
                 # 随机选择怪物 (简化版)
-                result = await db.execute(select(Monster).order_by(Monster.level))
-                monsters = result.scalars().all()
+                monsters = (await GameCatalog.get(db)).monsters
                 if monsters:
                     monster = random.choice(monsters)
                     battle_log.append(f"⚔️ 遭遇 {monster.name}！")
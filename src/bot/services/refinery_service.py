@@ -7,9 +7,11 @@ from typing import Tuple, List, Dict
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.models import Player, Item, PlayerInventory
+from bot.models import Player, PlayerInventory
 from bot.models.refinery import PlayerRefinery, RefineryRecipe, RefineryRecord, ItemEnhancement
 from bot.services.cave_service import CaveService
+from bot.services.game_catalog import GameCatalog
+from bot.utils.concurrency import battles
 
 
 class RefineryService:
@@ -47,7 +49,7 @@ class RefineryService:
         if player.is_cultivating:
             return False, "修炼中无法炼器"
 
-        if player.is_in_battle:
+        if battles.busy(player.id):
             return False, "战斗中无法炼器"
 
         if refinery.refinery_level < recipe.required_refinery_level:
@@ -84,10 +86,7 @@ class RefineryService:
             total_qty = sum(inv.quantity for inv in inv_items)
 
             if total_qty < required_qty:
-                result = await db.execute(
-                    select(Item).where(Item.id == item_id)
-                )
-                item = result.scalar_one_or_none()
+                item = (await GameCatalog.get(db)).items_by_id.get(item_id)
                 item_name = item.name if item else f"ID:{item_id}"
                 missing.append(f"{item_name}(缺{required_qty - total_qty})")
 
@@ -200,10 +199,7 @@ class RefineryService:
 
         if is_success:
             # 获取物品
-            result = await db.execute(
-                select(Item).where(Item.id == recipe.result_item_id)
-            )
-            item = result.scalar_one_or_none()
+            item = (await GameCatalog.get(db)).items_by_id.get(recipe.result_item_id)
 
             if item:
                 # 添加到背包
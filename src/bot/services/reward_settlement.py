@@ -0,0 +1,117 @@
+"""批量奖励结算
+
+世界BOSS等结算时，先在内存中算出每名参与者的奖励（`Payout`），再用一条
+executemany 的 UPDATE 统一加到玩家表上；发放记录由调用方同样一次批量写入。
+语句数与参与人数无关，不再为每个参与者查询和修改一次玩家。
+
+批量语句不经过 ORM 对象，推导字段（修炼进度）在同一条语句中一并更新；会话中已载入的
+玩家对象同步为新值（不会再次写入），玩家资料缓存在提交后失效；排行榜由调度器定期重建兜底。
+"""
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from bot.models import Player
+from bot.services.player_cache import PlayerCache
+
+_players = Player.__table__
+
+# 奖励字段（同时是 Payout 和 Player 的属性名）
+REWARD_FIELDS = ("spirit_stones", "cultivation_exp", "contribution")
+# 随奖励字段等量变化的推导字段 -> 奖励字段（修炼进度 = 境界累计修为 + 当前修为）
+DERIVED_FIELDS = {"realm_progress": "cultivation_exp"}
+# 玩家字段 -> 其增量所取的奖励字段
+_SYNCED_FIELDS = {**{field: field for field in REWARD_FIELDS}, **DERIVED_FIELDS}
+
+
+class Payout(NamedTuple):
+    """发给一名玩家的奖励"""
+    player_id: int
+    telegram_id: Optional[int] = None
+    spirit_stones: int = 0
+    cultivation_exp: int = 0
+    contribution: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return not any(getattr(self, field) for field in REWARD_FIELDS)
+
+
+def split_by_damage(
+    shares: Sequence[Tuple[int, Optional[int], int]],
+    total_stones: int,
+    total_exp: int,
+    final_killer_id: Optional[int] = None,
+    final_killer_bonus: float = 1.0,
+    top_damager_bonus: float = 1.0,
+) -> List[Payout]:
+    """按伤害比例分配奖励池
+
+    最后一击和伤害第一各有倍数加成，两者不叠加，最后一击优先；伤害相同时先参与者为第一。
+
+    Args:
+        shares: [(玩家ID, Telegram ID, 伤害)]，按参与先后排列
+    """
+    total_damage = sum(damage for _, _, damage in shares)
+    if total_damage <= 0:
+        return []
+
+    top_damager_id = max(shares, key=lambda share: share[2])[0]
+    payouts = []
+    for player_id, telegram_id, damage in shares:
+        ratio = damage / total_damage
+        if player_id == final_killer_id:
+            multiplier = final_killer_bonus
+        elif player_id == top_damager_id:
+            multiplier = top_damager_bonus
+        else:
+            multiplier = 1.0
+        payouts.append(Payout(
+            player_id, telegram_id,
+            spirit_stones=int(int(total_stones * ratio) * multiplier),
+            cultivation_exp=int(int(total_exp * ratio) * multiplier),
+        ))
+    return payouts
+
+
+async def apply_payouts(db: AsyncSession, payouts: Iterable[Payout]) -> int:
+    """把奖励加到玩家身上（一条批量 UPDATE，不提交），返回发放人数"""
+    payouts = [payout for payout in payouts if not payout.is_empty]
+    if not payouts:
+        return 0
+
+    await db.execute(
+        update(_players)
+        .where(_players.c.id == bindparam("b_player_id"))
+        .values({
+            **{field: _players.c[field] + bindparam(f"b_{field}") for field in REWARD_FIELDS},
+            **{field: _players.c[field] + bindparam(f"b_{source}") for field, source in DERIVED_FIELDS.items()},
+        }),
+        [
+            {"b_player_id": payout.player_id, **{f"b_{field}": getattr(payout, field) for field in REWARD_FIELDS}}
+            for payout in payouts
+        ]
+    )
+
+    _sync_loaded_players(db.sync_session, payouts)
+    PlayerCache.invalidate_on_commit(
+        db.sync_session, (payout.telegram_id for payout in payouts if payout.telegram_id is not None)
+    )
+    return len(payouts)
+
+
+def _sync_loaded_players(session: Session, payouts: List[Payout]) -> None:
+    """会话中已载入的玩家对象改为数据库中的新值（作为已提交的值，不会再次写入）"""
+    for payout in payouts:
+        player = session.identity_map.get(identity_key(Player, payout.player_id))
+        if player is None:
+            continue
+        for field, source in _SYNCED_FIELDS.items():
+            delta = getattr(payout, source)
+            # 已过期的属性下次访问时会重新读取，无需处理
+            if delta and field in player.__dict__:
+                set_committed_value(player, field, player.__dict__[field] + delta)
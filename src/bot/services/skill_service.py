@@ -6,7 +6,6 @@
 - 技能冷却管理
 - 技能效果计算
 """
-import random
 from typing import Tuple, Dict, Optional, List
 from datetime import datetime, timedelta
 
@@ -14,6 +13,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.models import Player, Skill, PlayerSkill
+from bot.services.battle_engine import BattleEngine
 
 
 class SkillService:
@@ -72,43 +72,21 @@ class SkillService:
         Returns:
             (damage, is_critical, effect_description)
         """
-        # 基础伤害 = 技能基础威力 + 施法者攻击力
-        base_damage = skill.base_power + int(caster.attack * 0.5)
-
-        # 技能等级加成 (每级+10%)
-        level_bonus = 1.0 + (skill_level - 1) * 0.1
-
         # 灵根元素匹配加成
-        element_bonus = 1.0
-        if skill.element and caster.spirit_root:
-            if skill.element in caster.spirit_root.element_list:
-                element_count = caster.spirit_root.element_count
-                # 单灵根对应元素伤害+50%, 双灵根+30%, 以此类推
-                if element_count == 1:
-                    element_bonus = 1.5
-                elif element_count == 2:
-                    element_bonus = 1.3
-                elif element_count == 3:
-                    element_bonus = 1.15
-                elif element_count == 4:
-                    element_bonus = 1.05
-
-        # 技能伤害倍率
-        damage_multiplier = skill.damage_multiplier
-
-        # 计算最终伤害
-        total_damage = int(
-            base_damage * level_bonus * element_bonus * damage_multiplier
+        elements = caster.spirit_root.element_list if caster.spirit_root else []
+        element_bonus = SkillService.get_skill_element_bonus(skill.element, elements)
+
+        final_damage, is_crit = BattleEngine.skill_damage(
+            base_power=skill.base_power,
+            damage_multiplier=skill.damage_multiplier,
+            caster_attack=caster.attack,
+            skill_level=skill_level,
+            element_bonus=element_bonus,
+            target_defense=target_defense,
+            crit_rate=caster.crit_rate,
+            crit_damage=caster.crit_damage,
         )
 
-        # 减去防御
-        final_damage = max(1, total_damage - target_defense)
-
-        # 暴击判定
-        is_crit = random.random() < caster.crit_rate
-        if is_crit:
-            final_damage = int(final_damage * caster.crit_damage)
-
         # 生成效果描述
         effect_desc = ""
         if skill.special_effects:
@@ -287,18 +265,4 @@ class SkillService:
     @staticmethod
     def get_skill_element_bonus(skill_element: str, spirit_root_elements: List[str]) -> float:
         """获取技能元素与灵根的匹配加成"""
-        if not skill_element or not spirit_root_elements:
-            return 1.0
-
-        if skill_element in spirit_root_elements:
-            element_count = len(spirit_root_elements)
-            if element_count == 1:
-                return 1.5  # 天灵根，完美匹配
-            elif element_count == 2:
-                return 1.3  # 双灵根
-            elif element_count == 3:
-                return 1.15  # 三灵根
-            elif element_count == 4:
-                return 1.05  # 伪灵根
-
-        return 1.0  # 无加成
+        return BattleEngine.element_bonus(skill_element, spirit_root_elements or ())
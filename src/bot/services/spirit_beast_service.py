@@ -3,7 +3,6 @@ import json
 import random
 from typing import List, Tuple, Optional, Dict
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
 from bot.models.spirit_beast import (
     PlayerSpiritBeast,
@@ -19,6 +18,7 @@ from bot.config.talent_config import (
     TALENT_COUNT_BY_QUALITY,
     TALENT_WEIGHT_BY_RARITY
 )
+from bot.services.game_catalog import GameCatalog
 
 
 class SpiritBeastService:
@@ -351,12 +351,7 @@ class SpiritBeastService:
         player.spirit_stones -= fusion_cost
 
         # 获取所有灵兽模板，随机选择一个作为融合结果
-        result = await db.execute(
-            select(SpiritBeastTemplate).where(
-                SpiritBeastTemplate.quality == template1.quality
-            )
-        )
-        same_quality_templates = result.scalars().all()
+        same_quality_templates = (await GameCatalog.get(db)).beast_templates_by_quality.get(template1.quality, [])
 
         if not same_quality_templates:
             return False, "❌ 没有找到合适的融合结果", None
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.models import Player, Item, PlayerInventory
 from bot.models.cave_dwelling import CaveDwelling, CaveRoom, SpiritField, CaveRoomType
+from bot.services.game_catalog import GameCatalog
 
 
 class SpiritFieldService:
@@ -158,10 +159,7 @@ class SpiritFieldService:
         harvest_count = int(base_harvest * spirit_field.harvest_multiplier)
 
         # 获取收获物品信息
-        result = await db.execute(
-            select(Item).where(Item.id == spirit_field.harvest_item_id)
-        )
-        harvest_item = result.scalar_one_or_none()
+        harvest_item = (await GameCatalog.get(db)).items_by_id.get(spirit_field.harvest_item_id)
 
         if not harvest_item:
             return False, "收获物品数据错误", {}
@@ -0,0 +1,397 @@
+"""世界BOSS战斗状态（写后持久化）
+
+世界BOSS降临后，大量玩家同时攻击同一行 `world_bosses`，逐次读-改-提交在 SQLite 上
+完全串行，在 PostgreSQL 上形成热点行锁。攻击改为在进程内的战斗状态上结算：
+
+- 每个活跃BOSS一份 `RaidState`：剩余血量、每名玩家的累计伤害和攻击次数。
+  一次攻击的校验、写日志和扣血在同一段同步代码中完成，不会与其他攻击交错；
+- 每次攻击先追加写入该BOSS的预写日志（`RAID_JOURNAL_DIR/boss_<id>.journal`），再修改内存；
+- 后台任务每 RAID_FLUSH_INTERVAL_MS 毫秒（或累计 RAID_FLUSH_HITS 次攻击后立即）
+  把有变化的参与记录和BOSS血量合并到一个事务写回，同时记下已写回的日志序号
+  （`WorldBoss.journal_seq`）；
+- 致命一击在内存中判定，只会有一次攻击成为最后一击；结算（标记击败、分配奖励）
+  以BOSS尚未标记为击败为条件更新，重复执行也只生效一次；
+- 伤害排行由每次攻击增量维护的有序索引提供，取前N名、个人名次和与上一名的差距
+  都是 O(log n)，战斗期间查看排行不访问数据库。
+
+进程崩溃后，启动时（或首次攻击时）从数据库载入BOSS和参与记录，再重放日志中序号大于
+`journal_seq` 的攻击即可恢复；重放后血量归零的BOSS直接结算。
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import settings
+from bot.models import WorldBoss, WorldBossParticipation, WorldBossStatus
+from bot.models.database import AsyncSessionLocal
+from bot.services.leaderboard_service import SortedBoard
+
+logger = logging.getLogger(__name__)
+
+_participations = WorldBossParticipation.__table__
+
+# (玩家ID, 累计伤害, 攻击次数)
+ParticipantRow = Tuple[int, int, int]
+
+
+class RaidState:
+    """单个世界BOSS的进程内战斗状态"""
+
+    def __init__(self, boss: WorldBoss, participations: List[WorldBossParticipation]):
+        self.boss_id = boss.id
+        self.max_hp = boss.max_hp
+        self.current_hp = boss.current_hp
+        self.defense = boss.defense
+        self.despawn_at = boss.despawn_at
+
+        self.damage: Dict[int, int] = {p.player_id: p.total_damage for p in participations}
+        self.attacks: Dict[int, int] = {p.player_id: p.attack_count for p in participations}
+        # 伤害排行（伤害高者在前）
+        self.ranking = SortedBoard()
+        for player_id, damage in self.damage.items():
+            self.ranking.update(player_id, (-damage,))
+        # 已有参与记录的玩家（写回时更新，其余插入）
+        self.persisted: Set[int] = set(self.damage)
+        # 上次写回后有变化的玩家
+        self.dirty: Set[int] = set()
+
+        # 最新的日志序号，以及已写回数据库的日志序号
+        self.seq = boss.journal_seq
+        self.flushed_seq = boss.journal_seq
+
+        self.killer_id: Optional[int] = None
+        self.defeated_at: Optional[datetime] = None
+        self.settled = False
+        # 写回与结算互斥（攻击本身不需要）
+        self.lock = asyncio.Lock()
+        self._journal = None
+
+    @property
+    def is_defeated(self) -> bool:
+        return self.killer_id is not None
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(settings.RAID_JOURNAL_DIR, f"boss_{self.boss_id}.journal")
+
+    def _apply(self, seq: int, player_id: int, damage: int, at: datetime) -> bool:
+        """把一次攻击计入状态，返回是否为致命一击"""
+        self.seq = seq
+        self.current_hp = max(0, self.current_hp - damage)
+        self.damage[player_id] = self.damage.get(player_id, 0) + damage
+        self.attacks[player_id] = self.attacks.get(player_id, 0) + 1
+        self.ranking.update(player_id, (-self.damage[player_id],))
+        self.dirty.add(player_id)
+        if self.current_hp == 0 and self.killer_id is None:
+            self.killer_id = player_id
+            self.defeated_at = at
+            return True
+        return False
+
+    def hit(self, player_id: int, damage: int) -> bool:
+        """记录一次攻击（先写日志再改内存），返回是否为致命一击
+
+        调用方负责校验BOSS未被击败、未逃跑，玩家攻击次数未用完。
+        """
+        if self._journal is None:
+            os.makedirs(settings.RAID_JOURNAL_DIR, exist_ok=True)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+        now = datetime.now()
+        seq = self.seq + 1
+        self._journal.write(f"{seq} {player_id} {damage} {now.timestamp()}\n")
+        self._journal.flush()
+        return self._apply(seq, player_id, damage, now)
+
+    def top(self, limit: int) -> List[int]:
+        """伤害前 limit 名的玩家ID"""
+        return self.ranking.top(limit)
+
+    def standing(self, player_id: int) -> Optional[Tuple[int, int]]:
+        """玩家的 (名次, 与上一名的伤害差距)，未参与时为 None"""
+        rank = self.ranking.rank(player_id)
+        if rank is None:
+            return None
+        if rank == 1:
+            return rank, 0
+        return rank, self.damage[self.ranking.at(rank - 1)] - self.damage[player_id]
+
+    def replay(self) -> int:
+        """重放日志中尚未写回数据库的攻击，返回重放条数"""
+        try:
+            journal = open(self.journal_path, encoding="utf-8")
+        except FileNotFoundError:
+            return 0
+
+        count = 0
+        with journal:
+            for line in journal:
+                try:
+                    seq, player_id, damage, timestamp = line.split()
+                    seq, player_id, damage = int(seq), int(player_id), int(damage)
+                    at = datetime.fromtimestamp(float(timestamp))
+                except ValueError:
+                    # 崩溃时只写了一半的行
+                    continue
+                if seq > self.seq:
+                    self._apply(seq, player_id, damage, at)
+                    count += 1
+        return count
+
+    def sync_journal(self) -> None:
+        """把日志刷到磁盘（写回数据库前调用，断电也不丢失已确认的攻击）"""
+        if self._journal is not None:
+            os.fsync(self._journal.fileno())
+
+    def close(self, remove: bool = False) -> None:
+        """关闭日志；remove=True 时删除日志文件（全部攻击都已写回后）"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if remove:
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
+
+    def snapshot(self) -> Tuple[List[ParticipantRow], int, int]:
+        """取出待写回的变化：(参与记录, 剩余血量, 日志序号)
+
+        同步完成，取出的数值与日志序号一致。
+        """
+        players, self.dirty = self.dirty, set()
+        rows = [(player_id, self.damage[player_id], self.attacks[player_id]) for player_id in players]
+        return rows, self.current_hp, self.seq
+
+
+class WorldBossRaids:
+    """世界BOSS战斗状态管理"""
+
+    _raids: Dict[int, RaidState] = {}
+    _lock = asyncio.Lock()
+    _wakeup: Optional[asyncio.Event] = None
+    _task: Optional[asyncio.Task] = None
+    _bind = None
+
+    @classmethod
+    async def start(cls, db: Optional[AsyncSession] = None) -> int:
+        """载入所有活跃BOSS的战斗状态（重放日志）并启动定时写回，返回载入数量
+
+        Args:
+            db: 用于确定数据库连接的会话；写回时也使用同一连接
+        """
+        await cls.stop()
+
+        cls._bind = db.bind if db else None
+        async with cls._session() as session:
+            result = await session.execute(
+                select(WorldBoss.id).where(WorldBoss.status == WorldBossStatus.ACTIVE)
+            )
+            boss_ids = result.scalars().all()
+        for boss_id in boss_ids:
+            await cls.get(boss_id)
+
+        cls._wakeup = asyncio.Event()
+        cls._task = asyncio.create_task(cls._run(), name="world-boss-raids")
+        return len(cls._raids)
+
+    @classmethod
+    async def stop(cls) -> None:
+        """停止定时写回，写回剩余变化并释放全部战斗状态"""
+        task, cls._task = cls._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        cls._wakeup = None
+
+        if cls._raids:
+            try:
+                await cls.flush()
+            except Exception as e:
+                logger.error(f"写回世界BOSS战斗状态出错（重启后由日志恢复）: {e}", exc_info=True)
+        for raid in cls._raids.values():
+            raid.close()
+        cls._raids = {}
+
+    @classmethod
+    def peek(cls, boss_id: int) -> Optional[RaidState]:
+        """已载入的战斗状态（未载入时为 None，不访问数据库）"""
+        return cls._raids.get(boss_id)
+
+    @classmethod
+    async def get(cls, boss_id: int) -> Optional[RaidState]:
+        """获取活跃BOSS的战斗状态（首次访问时载入并重放日志），BOSS不存在或不再活跃时为 None"""
+        raid = cls._raids.get(boss_id)
+        if raid is not None:
+            return raid
+
+        async with cls._lock:
+            raid = cls._raids.get(boss_id)
+            if raid is None:
+                raid = await cls._load(boss_id)
+        return raid
+
+    @classmethod
+    def hit(cls, raid: RaidState, player_id: int, damage: int) -> bool:
+        """记录一次攻击，返回是否为致命一击（之后需调用 `settle`）"""
+        killed = raid.hit(player_id, damage)
+        if cls._wakeup is not None and (killed or raid.seq - raid.flushed_seq >= settings.RAID_FLUSH_HITS):
+            cls._wakeup.set()
+        return killed
+
+    @classmethod
+    async def settle(cls, raid: RaidState, db: Optional[AsyncSession] = None) -> bool:
+        """结算被击败的BOSS（写回最后的变化、标记击败、分配奖励），返回本次是否执行了结算
+
+        同一BOSS只会结算一次；失败时由后台写回任务重试。
+        """
+        async with raid.lock:
+            if raid.settled or not raid.is_defeated:
+                return False
+            if db is not None:
+                await cls._write_back(db, raid, settle=True)
+            else:
+                async with cls._session() as session:
+                    await cls._write_back(session, raid, settle=True)
+            return True
+
+    @classmethod
+    async def flush(cls) -> int:
+        """写回全部战斗状态的变化（被击败但尚未结算的BOSS进行结算），返回写回的参与记录数"""
+        total = 0
+        for raid in list(cls._raids.values()):
+            if raid.is_defeated and not raid.settled:
+                await cls.settle(raid)
+                continue
+            async with raid.lock:
+                if raid.dirty or raid.seq > raid.flushed_seq:
+                    async with cls._session() as session:
+                        total += await cls._write_back(session, raid)
+        cls._release_finished()
+        return total
+
+    @classmethod
+    def _session(cls) -> AsyncSession:
+        if cls._bind is not None:
+            return AsyncSession(bind=cls._bind, expire_on_commit=False)
+        return AsyncSessionLocal()
+
+    @classmethod
+    async def _load(cls, boss_id: int) -> Optional[RaidState]:
+        async with cls._session() as session:
+            boss = await session.get(WorldBoss, boss_id)
+            if boss is None or boss.status != WorldBossStatus.ACTIVE:
+                return None
+            result = await session.execute(
+                select(WorldBossParticipation).where(WorldBossParticipation.boss_id == boss_id)
+            )
+            raid = RaidState(boss, list(result.scalars().all()))
+
+        replayed = raid.replay()
+        cls._raids[boss_id] = raid
+        if replayed:
+            logger.info(f"世界BOSS {boss_id} 从日志恢复 {replayed} 次攻击")
+            if raid.is_defeated:
+                await cls.settle(raid)
+        return raid
+
+    @classmethod
+    async def _write_back(cls, db: AsyncSession, raid: RaidState, settle: bool = False) -> int:
+        """（持有 raid.lock）在一个事务中写回参与记录和BOSS血量，settle=True 时一并结算
+
+        参与记录写入累计值（而非增量），重复写回不会多计。失败时取出的变化重新标记，
+        下次写回时再写。返回写回的参与记录数。
+        """
+        from bot.services.world_boss_service import WorldBossService
+
+        rows, current_hp, seq = raid.snapshot()
+        inserted = [row for row in rows if row[0] not in raid.persisted]
+        updated = [row for row in rows if row[0] in raid.persisted]
+        raid.sync_journal()
+        try:
+            if inserted:
+                await db.execute(insert(WorldBossParticipation), [
+                    {"boss_id": raid.boss_id, "player_id": player_id, "total_damage": damage, "attack_count": count}
+                    for player_id, damage, count in inserted
+                ])
+            if updated:
+                await db.execute(
+                    update(_participations)
+                    .where(
+                        _participations.c.boss_id == bindparam("b_boss_id"),
+                        _participations.c.player_id == bindparam("b_player_id")
+                    )
+                    .values(total_damage=bindparam("b_damage"), attack_count=bindparam("b_count")),
+                    [
+                        {"b_boss_id": raid.boss_id, "b_player_id": player_id, "b_damage": damage, "b_count": count}
+                        for player_id, damage, count in updated
+                    ]
+                )
+            await db.execute(
+                update(WorldBoss)
+                .where(WorldBoss.id == raid.boss_id)
+                .values(current_hp=current_hp, journal_seq=seq)
+                .execution_options(synchronize_session=False)
+            )
+
+            if settle:
+                # 击杀发生在逃跑之前，即使到期处理已先一步标记为逃跑也按击败结算
+                result = await db.execute(
+                    update(WorldBoss)
+                    .where(
+                        WorldBoss.id == raid.boss_id,
+                        WorldBoss.status.in_([WorldBossStatus.ACTIVE, WorldBossStatus.ESCAPED])
+                    )
+                    .values(
+                        status=WorldBossStatus.DEFEATED,
+                        defeated_at=raid.defeated_at,
+                        final_killer_id=raid.killer_id
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount:
+                    boss = await db.get(WorldBoss, raid.boss_id, populate_existing=True)
+                    await WorldBossService._distribute_rewards(db, boss)
+            await db.commit()
+        except Exception:
+            raid.dirty.update(row[0] for row in rows)
+            raise
+
+        raid.persisted.update(row[0] for row in inserted)
+        raid.flushed_seq = max(raid.flushed_seq, seq)
+        if settle:
+            raid.settled = True
+            logger.info(f"世界BOSS {raid.boss_id} 已被击败，最后一击玩家 {raid.killer_id}")
+        return len(rows)
+
+    @classmethod
+    def _release_finished(cls) -> None:
+        """释放已结算、或已逃跑且变化全部写回的战斗状态，并删除其日志"""
+        now = datetime.now()
+        for boss_id, raid in list(cls._raids.items()):
+            flushed = not raid.dirty and raid.seq == raid.flushed_seq
+            if raid.settled or (not raid.is_defeated and now > raid.despawn_at and flushed):
+                raid.close(remove=True)
+                del cls._raids[boss_id]
+
+    @classmethod
+    async def _run(cls) -> None:
+        interval = settings.RAID_FLUSH_INTERVAL_MS / 1000
+        while True:
+            try:
+                await asyncio.wait_for(cls._wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            cls._wakeup.clear()
+            try:
+                await cls.flush()
+            except Exception as e:
+                logger.error(f"写回世界BOSS战斗状态出错: {e}", exc_info=True)
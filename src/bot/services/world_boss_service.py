@@ -1,11 +1,20 @@
 """世界BOSS服务"""
+import logging
 import random
 from datetime import datetime, timedelta
 from typing import Tuple, List, Dict, Optional
-from sqlalchemy import select, func, and_
+from sqlalchemy import bindparam, select, func, and_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.models import Player, WorldBoss, WorldBossParticipation, WorldBossTemplate, WorldBossStatus, Item
+from bot.models import Player, WorldBoss, WorldBossParticipation, WorldBossStatus, Item
+from bot.services.game_catalog import GameCatalog
+from bot.services.reward_settlement import apply_payouts, split_by_damage
+from bot.services.leaderboard_service import LeaderboardService
+from bot.services.world_boss_raid import RaidState, WorldBossRaids
+
+logger = logging.getLogger(__name__)
+
+_participations = WorldBossParticipation.__table__
 
 
 class WorldBossService:
@@ -34,10 +43,7 @@ class WorldBossService:
             return False, "已有世界BOSS存在", existing_boss
 
         # 获取所有启用的模板
-        result = await db.execute(
-            select(WorldBossTemplate).where(WorldBossTemplate.is_active == True)
-        )
-        templates = result.scalars().all()
+        templates = (await GameCatalog.get(db)).world_boss_templates
 
         if not templates:
             return False, "无可用的BOSS模板", None
@@ -101,47 +107,29 @@ class WorldBossService:
         Returns:
             (是否成功, 消息, 结果数据)
         """
-        # 获取BOSS
-        result = await db.execute(select(WorldBoss).where(WorldBoss.id == boss_id))
-        boss = result.scalar_one_or_none()
-
-        if not boss:
-            return False, "BOSS不存在", None
-
-        if boss.status != WorldBossStatus.ACTIVE:
-            return False, f"BOSS已{boss.status.value}", None
-
-        # 检查是否超时
-        if datetime.now() > boss.despawn_at:
-            boss.status = WorldBossStatus.ESCAPED
-            await db.commit()
+        # 战斗状态在内存中结算，定期批量写回（见 world_boss_raid）
+        raid = await WorldBossRaids.get(boss_id)
+        if raid is None:
+            result = await db.execute(select(WorldBoss.status).where(WorldBoss.id == boss_id))
+            status = result.scalar_one_or_none()
+            if status is None:
+                return False, "BOSS不存在", None
+            return False, f"BOSS已{status.value}", None
+
+        if raid.is_defeated:
+            return False, f"BOSS已{WorldBossStatus.DEFEATED.value}", None
+
+        # 检查是否超时（标记逃跑由到期计时处理）
+        if datetime.now() > raid.despawn_at:
             return False, "BOSS已逃跑", None
 
-        # 获取或创建参与记录
-        result = await db.execute(
-            select(WorldBossParticipation).where(
-                and_(
-                    WorldBossParticipation.boss_id == boss_id,
-                    WorldBossParticipation.player_id == player.id
-                )
-            )
-        )
-        participation = result.scalar_one_or_none()
-
-        if not participation:
-            participation = WorldBossParticipation(
-                boss_id=boss_id,
-                player_id=player.id
-            )
-            db.add(participation)
-
         # 检查攻击次数限制
-        if participation.attack_count >= WorldBossService.MAX_ATTACKS_PER_PLAYER:
+        if raid.attacks.get(player.id, 0) >= WorldBossService.MAX_ATTACKS_PER_PLAYER:
             return False, f"今日攻击次数已用完({WorldBossService.MAX_ATTACKS_PER_PLAYER}次)", None
 
         # 计算伤害
         player_power = player.combat_power
-        boss_defense = boss.defense
+        boss_defense = raid.defense
 
         # 基础伤害 = 玩家战力 * (1 - 防御减伤率)
         defense_reduction = min(0.8, boss_defense / (boss_defense + player_power))
@@ -151,102 +139,86 @@ class WorldBossService:
         damage = int(base_damage * random.uniform(0.8, 1.2))
         damage = max(1, damage)  # 至少造成1点伤害
 
-        # 更新BOSS血量
-        boss.current_hp = max(0, boss.current_hp - damage)
-
-        # 更新参与记录
-        participation.total_damage += damage
-        participation.attack_count += 1
-
-        # 判断是否击败BOSS
-        is_defeated = boss.current_hp <= 0
+        # 扣血、记录参与（同步完成，最后一击只会判定一次）
+        is_defeated = WorldBossRaids.hit(raid, player.id, damage)
         if is_defeated:
-            boss.status = WorldBossStatus.DEFEATED
-            boss.defeated_at = datetime.now()
-            boss.final_killer_id = player.id
-
-            # 分配奖励
-            await WorldBossService._distribute_rewards(db, boss)
+            # 标记击败并分配奖励；失败时由后台写回任务重试
+            try:
+                await WorldBossRaids.settle(raid, db)
+            except Exception as e:
+                logger.error(f"结算世界BOSS {boss_id} 出错: {e}", exc_info=True)
 
-        await db.commit()
+        total_damage = raid.damage[player.id]
+        attack_count = raid.attacks[player.id]
 
         # 构建结果消息
         result_data = {
             "damage": damage,
-            "boss_current_hp": boss.current_hp,
-            "boss_max_hp": boss.max_hp,
-            "total_damage": participation.total_damage,
-            "attack_count": participation.attack_count,
-            "remaining_attacks": WorldBossService.MAX_ATTACKS_PER_PLAYER - participation.attack_count,
+            "boss_current_hp": raid.current_hp,
+            "boss_max_hp": raid.max_hp,
+            "total_damage": total_damage,
+            "attack_count": attack_count,
+            "remaining_attacks": WorldBossService.MAX_ATTACKS_PER_PLAYER - attack_count,
             "is_defeated": is_defeated
         }
 
         if is_defeated:
             message = f"⚔️ 造成伤害: {damage:,}\n\n🎉 BOSS已被击败！"
         else:
-            hp_percent = (boss.current_hp / boss.max_hp) * 100
+            hp_percent = (raid.current_hp / raid.max_hp) * 100
             message = f"""⚔️ 造成伤害: {damage:,}
 
 BOSS状态:
-❤️ 剩余血量: {boss.current_hp:,}/{boss.max_hp:,} ({hp_percent:.1f}%)
+❤️ 剩余血量: {raid.current_hp:,}/{raid.max_hp:,} ({hp_percent:.1f}%)
 
 你的战绩:
-总伤害: {participation.total_damage:,}
-攻击次数: {participation.attack_count}/{WorldBossService.MAX_ATTACKS_PER_PLAYER}"""
+总伤害: {total_damage:,}
+攻击次数: {attack_count}/{WorldBossService.MAX_ATTACKS_PER_PLAYER}"""
 
         return True, message, result_data
 
     @staticmethod
     async def _distribute_rewards(db: AsyncSession, boss: WorldBoss):
-        """分配奖励(内部方法)"""
-        # 获取所有参与者,按伤害排序
+        """分配奖励(内部方法)
+
+        奖励在内存中按伤害比例计算，玩家和参与记录各一条批量 UPDATE，与参与人数无关。
+        """
         result = await db.execute(
-            select(WorldBossParticipation).where(
+            select(
+                WorldBossParticipation.id, WorldBossParticipation.player_id,
+                Player.telegram_id, WorldBossParticipation.total_damage
+            ).join(
+                Player, Player.id == WorldBossParticipation.player_id
+            ).where(
                 WorldBossParticipation.boss_id == boss.id
-            ).order_by(WorldBossParticipation.total_damage.desc())
+            ).order_by(WorldBossParticipation.id)
         )
-        participants = result.scalars().all()
-
-        if not participants:
-            return
-
-        # 计算总伤害
-        total_damage = sum(p.total_damage for p in participants)
-        if total_damage == 0:
+        rows = result.all()
+
+        payouts = split_by_damage(
+            [(player_id, telegram_id, damage) for _, player_id, telegram_id, damage in rows],
+            boss.total_reward_stones,
+            boss.total_reward_exp,
+            final_killer_id=boss.final_killer_id,
+            final_killer_bonus=WorldBossService.FINAL_KILLER_BONUS,
+            top_damager_bonus=WorldBossService.TOP_DAMAGER_BONUS
+        )
+        if not payouts:
             return
 
-        # 获取最后一击玩家和伤害第一玩家
-        final_killer_id = boss.final_killer_id
-        top_damager_id = participants[0].player_id
-
-        # 按伤害比例分配奖励
-        for participation in participants:
-            # 基础奖励(按伤害比例)
-            damage_ratio = participation.total_damage / total_damage
-            base_stones = int(boss.total_reward_stones * damage_ratio)
-            base_exp = int(boss.total_reward_exp * damage_ratio)
-
-            # 额外奖励
-            bonus_multiplier = 1.0
-
-            # 最后一击奖励
-            if participation.player_id == final_killer_id:
-                bonus_multiplier = WorldBossService.FINAL_KILLER_BONUS
-            # 伤害第一奖励
-            elif participation.player_id == top_damager_id:
-                bonus_multiplier = WorldBossService.TOP_DAMAGER_BONUS
-
-            # 计算最终奖励
-            participation.reward_stones = int(base_stones * bonus_multiplier)
-            participation.reward_exp = int(base_exp * bonus_multiplier)
-            participation.is_rewarded = True
-
-            # 发放奖励给玩家
-            result = await db.execute(select(Player).where(Player.id == participation.player_id))
-            player = result.scalar_one_or_none()
-            if player:
-                player.spirit_stones += participation.reward_stones
-                player.cultivation_exp += participation.reward_exp
+        # 发放奖励给玩家
+        await apply_payouts(db, payouts)
+
+        # 参与记录上记下所得奖励
+        await db.execute(
+            update(_participations)
+            .where(_participations.c.id == bindparam("b_id"))
+            .values(reward_stones=bindparam("b_stones"), reward_exp=bindparam("b_exp"), is_rewarded=True),
+            [
+                {"b_id": participation_id, "b_stones": payout.spirit_stones, "b_exp": payout.cultivation_exp}
+                for (participation_id, *_), payout in zip(rows, payouts)
+            ]
+        )
 
         await db.commit()
 
@@ -267,26 +239,32 @@ BOSS状态:
             await db.commit()
             return None
 
-        # 获取参与人数
-        result = await db.execute(
-            select(func.count(WorldBossParticipation.id)).where(
-                WorldBossParticipation.boss_id == boss.id
+        # 战斗进行中以内存中的战斗状态为准（数据库中的血量和参与记录定期写回）
+        raid = WorldBossRaids.peek(boss.id)
+        if raid is not None:
+            current_hp = raid.current_hp
+            participant_count = len(raid.damage)
+        else:
+            current_hp = boss.current_hp
+            result = await db.execute(
+                select(func.count(WorldBossParticipation.id)).where(
+                    WorldBossParticipation.boss_id == boss.id
+                )
             )
-        )
-        participant_count = result.scalar() or 0
+            participant_count = result.scalar() or 0
 
         # 计算剩余时间
         time_remaining = boss.despawn_at - datetime.now()
         minutes_remaining = int(time_remaining.total_seconds() / 60)
 
-        hp_percent = (boss.current_hp / boss.max_hp) * 100
+        hp_percent = (current_hp / boss.max_hp) * 100
 
         return {
             "id": boss.id,
             "name": boss.name,
             "description": boss.description,
             "level": boss.level,
-            "current_hp": boss.current_hp,
+            "current_hp": current_hp,
             "max_hp": boss.max_hp,
             "hp_percent": hp_percent,
             "attack": boss.attack,
@@ -304,7 +282,11 @@ BOSS状态:
         boss_id: int,
         limit: int = 20
     ) -> List[Dict]:
-        """获取伤害排行榜"""
+        """获取伤害排行榜（战斗进行中直接读取内存中的伤害排行）"""
+        raid = WorldBossRaids.peek(boss_id)
+        if raid is not None and not raid.settled:
+            return await WorldBossService._live_rankings(db, raid, limit)
+
         result = await db.execute(
             select(WorldBossParticipation, Player).join(
                 Player, Player.id == WorldBossParticipation.player_id
@@ -330,6 +312,32 @@ BOSS状态:
 
         return rankings_list
 
+    @staticmethod
+    async def _live_rankings(db: AsyncSession, raid: RaidState, limit: int) -> List[Dict]:
+        """战斗中的伤害排行，玩家昵称和境界取自排行榜索引（不在索引中时才查询）"""
+        player_ids = raid.top(limit)
+        entries = {player_id: LeaderboardService.entry(player_id) for player_id in player_ids}
+        missing = [player_id for player_id, entry in entries.items() if entry is None]
+        if missing:
+            result = await db.execute(select(Player).where(Player.id.in_(missing)))
+            for player in result.scalars().all():
+                entries[player.id] = LeaderboardService.entry_from_player(player)
+
+        return [
+            {
+                "rank": idx,
+                "player_id": player_id,
+                "nickname": entries[player_id].nickname if entries.get(player_id) else "",
+                "realm": entries[player_id].full_realm_name if entries.get(player_id) else "",
+                "total_damage": raid.damage[player_id],
+                "attack_count": raid.attacks[player_id],
+                "reward_stones": 0,
+                "reward_exp": 0,
+                "is_rewarded": False
+            }
+            for idx, player_id in enumerate(player_ids, 1)
+        ]
+
     @staticmethod
     async def get_player_participation(
         db: AsyncSession,
@@ -337,6 +345,25 @@ BOSS状态:
         boss_id: int
     ) -> Optional[Dict]:
         """获取玩家参与情况"""
+        # 战斗进行中以内存为准（可能尚未写回），奖励尚未发放，无需查询
+        raid = WorldBossRaids.peek(boss_id)
+        if raid is not None and not raid.settled:
+            standing = raid.standing(player_id)
+            if standing is None:
+                return None
+            attack_count = raid.attacks[player_id]
+            return {
+                "total_damage": raid.damage[player_id],
+                "attack_count": attack_count,
+                "remaining_attacks": WorldBossService.MAX_ATTACKS_PER_PLAYER - attack_count,
+                "reward_stones": 0,
+                "reward_exp": 0,
+                "is_rewarded": False,
+                # 名次和与上一名的伤害差距
+                "rank": standing[0],
+                "damage_to_next": standing[1]
+            }
+
         result = await db.execute(
             select(WorldBossParticipation).where(
                 and_(
@@ -356,24 +383,22 @@ BOSS状态:
             "remaining_attacks": WorldBossService.MAX_ATTACKS_PER_PLAYER - participation.attack_count,
             "reward_stones": participation.reward_stones,
             "reward_exp": participation.reward_exp,
-            "is_rewarded": participation.is_rewarded
+            "is_rewarded": participation.is_rewarded,
+            "rank": None,
+            "damage_to_next": None
         }
 
     @staticmethod
-    async def cleanup_old_bosses(db: AsyncSession):
-        """清理过期的BOSS记录(调度任务)"""
-        # 将超时的BOSS标记为逃跑
+    async def expire_bosses(db: AsyncSession, boss_ids: List[int]) -> int:
+        """将超时未击败的BOSS标记为逃跑（不提交），返回处理数量"""
         result = await db.execute(
-            select(WorldBoss).where(
-                and_(
-                    WorldBoss.status == WorldBossStatus.ACTIVE,
-                    WorldBoss.despawn_at < datetime.now()
-                )
+            update(WorldBoss)
+            .where(
+                WorldBoss.id.in_(boss_ids),
+                WorldBoss.status == WorldBossStatus.ACTIVE,
+                WorldBoss.despawn_at <= datetime.now()
             )
+            .values(status=WorldBossStatus.ESCAPED)
+            .execution_options(synchronize_session=False)
         )
-        expired_bosses = result.scalars().all()
-
-        for boss in expired_bosses:
-            boss.status = WorldBossStatus.ESCAPED
-
-        await db.commit()
+        return result.rowcount
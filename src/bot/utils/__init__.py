@@ -1,4 +1,5 @@
 """工具模块"""
-from .message_utils import send_and_delete, delete_message_after
+from .message_utils import send_and_delete, schedule_delete, delete_message_after
+from .concurrency import PlayerUpdateProcessor, PlayerActivity, battles
 
-__all__ = ["send_and_delete", "delete_message_after"]
+__all__ = ["send_and_delete", "schedule_delete", "delete_message_after", "PlayerUpdateProcessor", "PlayerActivity", "battles"]
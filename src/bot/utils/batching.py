@@ -0,0 +1,67 @@
+"""分批批量更新 - 按主键区间分批执行集合式 UPDATE
+
+大表上的定时任务不把行读进内存逐行修改，而是把一条集合式 UPDATE 按主键
+区间（键集分页）切成若干批执行，每批提交一次：
+
+    affected = await batched_update(
+        session,
+        update(Player).where(...).values(...),
+        Player.id,
+    )
+
+每批只探测一次区间上界，内存占用与表大小无关，SQLite 和 PostgreSQL 通用。
+"""
+from typing import AsyncIterator, Optional, Tuple
+
+from sqlalchemy import Update, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from bot.config import settings
+
+
+async def keyset_ranges(
+    session: AsyncSession,
+    pk: InstrumentedAttribute,
+    batch_size: int,
+) -> AsyncIterator[Tuple[Optional[int], Optional[int]]]:
+    """按主键切分区间 (下界, 上界]，下界为 None 表示从头开始，上界为 None 表示到表尾"""
+    lower = None
+    while True:
+        stmt = select(pk).order_by(pk).offset(batch_size - 1).limit(1)
+        if lower is not None:
+            stmt = stmt.where(pk > lower)
+        upper = await session.scalar(stmt)
+        yield lower, upper
+        if upper is None:
+            return
+        lower = upper
+
+
+async def batched_update(
+    session: AsyncSession,
+    stmt: Update,
+    pk: InstrumentedAttribute,
+    batch_size: Optional[int] = None,
+) -> int:
+    """分批执行 UPDATE，每批提交一次，返回受影响的总行数
+
+    Args:
+        stmt: 集合式 UPDATE 语句（本函数只追加主键区间条件）
+        pk: 用于分批的整数主键列
+        batch_size: 每批的主键跨度（行数），默认 SCHEDULER_BATCH_SIZE
+    """
+    batch_size = batch_size or settings.SCHEDULER_BATCH_SIZE
+    stmt = stmt.execution_options(synchronize_session=False)
+
+    affected = 0
+    async for lower, upper in keyset_ranges(session, pk, batch_size):
+        batch = stmt
+        if lower is not None:
+            batch = batch.where(pk > lower)
+        if upper is not None:
+            batch = batch.where(pk <= upper)
+        result = await session.execute(batch)
+        affected += result.rowcount
+        await session.commit()
+    return affected
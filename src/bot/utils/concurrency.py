@@ -0,0 +1,95 @@
+"""并发工具模块 - 按玩家串行、跨玩家并行地处理更新"""
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Deque, Dict, Iterator, Optional, Set
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class PlayerUpdateProcessor(BaseUpdateProcessor):
+    """按 Telegram 用户串行处理更新的并发处理器
+
+    不同用户的更新并行处理（总数受 max_concurrent_updates 限制），
+    同一用户的更新按到达顺序依次处理，避免同一玩家的命令互相交错。
+    没有发送者的更新（频道消息等）不排队。
+
+    PTB 在调用 `do_process_update` 之前就已占用一个并发名额，所以不能在这里等待该玩家
+    之前的更新：积压的更新会占满名额，拖慢其他玩家。改为每名玩家只有第一条更新占用名额，
+    之后到达的更新排进该玩家的队列后立即返回（释放名额），由占着名额的那条依次处理。
+    """
+
+    __slots__ = ("_queues",)
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # 正在处理的玩家 -> 排在其后的更新
+        self._queues: Dict[int, Deque[Awaitable[Any]]] = {}
+
+    @staticmethod
+    def _user_id(update: object) -> Optional[int]:
+        if isinstance(update, Update) and update.effective_user:
+            return update.effective_user.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        user_id = self._user_id(update)
+        if user_id is None:
+            await coroutine
+            return
+
+        queue = self._queues.get(user_id)
+        if queue is not None:
+            queue.append(coroutine)
+            return
+
+        # 没有排队的更新时回收队列，避免队列表随用户数无限增长
+        queue = self._queues[user_id] = deque([coroutine])
+        try:
+            while queue:
+                try:
+                    await queue.popleft()
+                except Exception:
+                    # Application.process_update 自己处理处理器异常，这里只兜底，不影响后续更新
+                    logger.exception(f"处理玩家 {user_id} 的更新出错")
+        finally:
+            del self._queues[user_id]
+            # 被取消时（关闭应用）丢弃尚未开始的更新
+            for pending in queue:
+                pending.close()
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._queues:
+            logger.info(f"关闭更新处理器，仍有 {len(self._queues)} 名玩家的更新在处理中")
+
+
+class PlayerActivity:
+    """进程内的玩家状态登记（替代写数据库的状态标记）"""
+
+    __slots__ = ("_players",)
+
+    def __init__(self):
+        self._players: Set[int] = set()
+
+    def busy(self, player_id: int) -> bool:
+        """玩家是否处于该状态"""
+        return player_id in self._players
+
+    @contextmanager
+    def hold(self, *player_ids: int) -> Iterator[None]:
+        """在 with 块内把玩家登记为该状态"""
+        self._players.update(player_ids)
+        try:
+            yield
+        finally:
+            self._players.difference_update(player_ids)
+
+
+# 正在战斗中的玩家
+battles = PlayerActivity()
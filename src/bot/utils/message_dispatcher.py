@@ -0,0 +1,387 @@
+"""出站消息调度器 - 所有发送、编辑、删除请求统一排队限速
+
+作为 python-telegram-bot 的 `BaseRateLimiter` 安装到 Bot 上（见 main.py），
+处理器里的 `reply_text`、`edit_text`、`delete` 等调用都会经过这里：
+
+- 限速：全局令牌桶（约 30 条/秒）加每个聊天一个令牌桶（私聊约 1 条/秒，
+  群组约 20 条/分钟），发送前先取令牌，尽量不触发 Telegram 的洪水限制；
+- 优先级：互动回复（默认）先于广播（`rate_limit_args=Priority.BROADCAST`）发出；
+- 同一聊天按到达顺序逐条发送，同一时刻只有一个请求在途；
+- 合并编辑：同一条消息还在排队的编辑被新编辑取代，只发最后一次，
+  所有等待者拿到同一个结果；
+- 被限流（RetryAfter）时暂停该聊天，请求放回队首重试，不在处理器协程里反复重试。
+
+没有 chat_id 的请求（getUpdates、回调应答、内联消息编辑等）直接发送，不排队。
+`stats()` 返回各队列深度和累计计数，可用于健康检查。
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+from collections import deque
+from datetime import timedelta
+from enum import IntEnum
+from typing import Any, Callable, Coroutine, Deque, Dict, List, Optional, Tuple, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _retry_after_seconds(exc: RetryAfter) -> float:
+    """RetryAfter 的等待秒数
+
+    PTB 22.2 起公开的 `retry_after` 读取时会发弃用警告，改存 timedelta 的 `_retry_after`；
+    21.x 只有 int 形式的 `retry_after`。两种都接受。
+    """
+    retry_after = getattr(exc, "_retry_after", None)
+    if retry_after is None:
+        retry_after = exc.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+# 需要按聊天排队限速的接口前缀
+_CHAT_ENDPOINT_PREFIXES = ("send", "edit", "delete", "copy", "forward")
+
+
+class Priority(IntEnum):
+    """出站消息优先级（数值小者先发）"""
+    INTERACTIVE = 0  # 对玩家操作的回复
+    BROADCAST = 1    # 广播、通知等可延后的消息
+
+
+class TokenBucket:
+    """令牌桶：按 rate（个/秒）补充，最多积攒 capacity 个"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """距离有一个可用令牌还需等待的秒数"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        """取走一个令牌（可以透支，之后等待相应更久）"""
+        self._refill(now)
+        self.tokens -= 1
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Job:
+    """一个排队中的请求（合并编辑后可能对应多个等待者）"""
+
+    __slots__ = ("priority", "seq", "callback", "args", "kwargs", "endpoint", "edit_key", "futures", "retries")
+
+    def __init__(self, priority: Priority, seq: int, callback, args, kwargs, endpoint: str, edit_key):
+        self.priority = priority
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.endpoint = endpoint
+        self.edit_key = edit_key
+        self.futures: List[asyncio.Future] = []
+        self.retries = 0
+
+    @property
+    def abandoned(self) -> bool:
+        """所有等待者都已取消"""
+        return all(future.done() for future in self.futures)
+
+
+class _ChatQueue:
+    """单个聊天的待发队列（每个优先级一条）"""
+
+    __slots__ = ("chat_id", "lanes", "bucket", "paused_until", "in_flight", "version")
+
+    def __init__(self, chat_id: Union[int, str], bucket: TokenBucket):
+        self.chat_id = chat_id
+        self.lanes: Tuple[Deque[_Job], ...] = tuple(deque() for _ in Priority)
+        self.bucket = bucket
+        self.paused_until = 0.0
+        self.in_flight = False
+        # 调度堆中的条目带版本号（全局递增），版本变化后旧条目作废
+        self.version = -1
+
+    def head(self) -> Optional[_Job]:
+        for lane in self.lanes:
+            if lane:
+                return lane[0]
+        return None
+
+
+class OutboundDispatcher(BaseRateLimiter[Priority]):
+    """按聊天排队、令牌桶限速、分优先级的出站消息调度器"""
+
+    __slots__ = (
+        "_global_bucket", "_chat_rate", "_group_rate", "_chat_burst", "_max_retries",
+        "_chats", "_ready", "_parked", "_edits", "_depth", "_seq", "_in_flight",
+        "_wakeup", "_task", "_counters",
+    )
+
+    def __init__(
+        self,
+        global_rate: Optional[float] = None,
+        chat_rate: Optional[float] = None,
+        group_rate_per_minute: Optional[float] = None,
+        chat_burst: Optional[int] = None,
+        max_retries: Optional[int] = None,
+    ):
+        global_rate = global_rate or settings.OUTBOUND_GLOBAL_RATE
+        self._global_bucket = TokenBucket(global_rate, max(1.0, global_rate), 0.0)
+        self._chat_rate = chat_rate or settings.OUTBOUND_CHAT_RATE
+        self._group_rate = (group_rate_per_minute or settings.OUTBOUND_GROUP_RATE_PER_MINUTE) / 60
+        self._chat_burst = chat_burst or settings.OUTBOUND_CHAT_BURST
+        self._max_retries = settings.OUTBOUND_MAX_RETRIES if max_retries is None else max_retries
+
+        self._chats: Dict[Union[int, str], _ChatQueue] = {}
+        # 可立即发送的聊天 (优先级, 序号, 版本, chat_id)
+        self._ready: List[tuple] = []
+        # 等待令牌或限流暂停的聊天 (可发送时间, 版本, chat_id)
+        self._parked: List[tuple] = []
+        # (chat_id, message_id) -> 该消息最后一个仍在排队的编辑
+        self._edits: Dict[tuple, _Job] = {}
+        self._depth = [0] * len(Priority)
+        self._seq = itertools.count()
+        self._in_flight: set = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._counters = {"sent": 0, "coalesced": 0, "retried": 0, "failed": 0}
+
+    async def initialize(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        tasks = [self._task, *self._in_flight]
+        for task in self._in_flight:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+        pending = 0
+        for chat in self._chats.values():
+            for lane in chat.lanes:
+                for job in lane:
+                    pending += 1
+                    for future in job.futures:
+                        future.cancel()
+        if pending:
+            logger.warning(f"出站消息调度器关闭，丢弃 {pending} 条未发送的请求")
+        self._chats.clear()
+        self._ready.clear()
+        self._parked.clear()
+        self._edits.clear()
+        self._depth = [0] * len(Priority)
+
+    def stats(self) -> Dict[str, int]:
+        """队列深度和累计计数"""
+        now = asyncio.get_running_loop().time()
+        return {
+            "queued": sum(self._depth),
+            **{priority.name.lower(): self._depth[priority] for priority in Priority},
+            "chats": sum(1 for chat in self._chats.values() if chat.head() is not None),
+            "max_chat_depth": max((sum(map(len, chat.lanes)) for chat in self._chats.values()), default=0),
+            "paused_chats": sum(1 for chat in self._chats.values() if chat.paused_until > now),
+            "in_flight": len(self._in_flight),
+            **self._counters,
+        }
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Priority],
+    ) -> Any:
+        chat_id = data.get("chat_id")
+        if chat_id is None or not endpoint.startswith(_CHAT_ENDPOINT_PREFIXES) or self._task is None:
+            return await callback(*args, **kwargs)
+
+        priority = Priority.INTERACTIVE if rate_limit_args is None else Priority(rate_limit_args)
+        future = asyncio.get_running_loop().create_future()
+        edit_key = (chat_id, data["message_id"]) if endpoint.startswith("edit") and "message_id" in data else None
+
+        pending = self._edits.get(edit_key) if edit_key else None
+        if pending is not None and pending.endpoint == endpoint:
+            # 还没发出的编辑直接换成最新内容，位置不变
+            pending.callback, pending.args, pending.kwargs = callback, args, kwargs
+            pending.futures.append(future)
+            self._counters["coalesced"] += 1
+        else:
+            job = _Job(priority, next(self._seq), callback, args, kwargs, endpoint, edit_key)
+            job.futures.append(future)
+            if edit_key:
+                # 不同接口的编辑（改文字/改按钮）不互相合并，保持先后顺序
+                self._edits[edit_key] = job
+            self._enqueue(chat_id, job)
+
+        return await future
+
+    def _enqueue(self, chat_id: Union[int, str], job: _Job) -> None:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            now = asyncio.get_running_loop().time()
+            # 群组和频道（负数ID或 @用户名）限速更严格
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            rate = self._group_rate if is_group else self._chat_rate
+            chat = self._chats[chat_id] = _ChatQueue(chat_id, TokenBucket(rate, self._chat_burst, now))
+
+        old_head = chat.head()
+        chat.lanes[job.priority].append(job)
+        self._depth[job.priority] += 1
+        # 队首变化（新聊天或插入更高优先级）时重新排入调度堆
+        if not chat.in_flight and chat.head() is not old_head:
+            self._schedule(chat)
+
+    def _schedule(self, chat: _ChatQueue) -> None:
+        """把有待发请求、没有在途请求的聊天放入调度堆"""
+        head = chat.head()
+        chat.version = next(self._seq)
+        if head is None:
+            return
+        now = asyncio.get_running_loop().time()
+        ready_at = max(now + chat.bucket.delay(now), chat.paused_until)
+        if ready_at <= now:
+            heapq.heappush(self._ready, (head.priority, head.seq, chat.version, chat.chat_id))
+        else:
+            heapq.heappush(self._parked, (ready_at, chat.version, chat.chat_id))
+        self._wakeup.set()
+
+    def _current(self, version: int, chat_id) -> Optional[_ChatQueue]:
+        chat = self._chats.get(chat_id)
+        return chat if chat is not None and chat.version == version else None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            while self._parked and self._parked[0][0] <= now:
+                _, version, chat_id = heapq.heappop(self._parked)
+                chat = self._current(version, chat_id)
+                if chat is not None:
+                    self._schedule(chat)
+            while self._ready and self._current(*self._ready[0][2:]) is None:
+                heapq.heappop(self._ready)
+
+            if self._ready:
+                wait = self._global_bucket.delay(now)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                _, _, version, chat_id = heapq.heappop(self._ready)
+                self._dispatch(self._chats[chat_id], now)
+                continue
+
+            self._prune(now)
+            self._wakeup.clear()
+            timeout = self._parked[0][0] - now if self._parked else None
+            try:
+                # asyncio.timeout 不会像 wait_for 那样在超时与取消同时发生时吞掉取消
+                async with asyncio.timeout(timeout):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+
+    def _dispatch(self, chat: _ChatQueue, now: float) -> None:
+        """发出聊天队首的请求"""
+        chat.version = next(self._seq)
+        job = None
+        for lane in chat.lanes:
+            if lane:
+                job = lane.popleft()
+                self._depth[job.priority] -= 1
+                break
+        if job.edit_key and self._edits.get(job.edit_key) is job:
+            del self._edits[job.edit_key]
+        if job.abandoned:
+            self._schedule(chat)
+            return
+
+        self._global_bucket.take(now)
+        chat.bucket.take(now)
+        chat.in_flight = True
+        task = asyncio.create_task(self._send(chat, job))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, chat: _ChatQueue, job: _Job) -> None:
+        try:
+            result = await job.callback(*job.args, **job.kwargs)
+        except RetryAfter as exc:
+            try:
+                if not self._retry(chat, job, exc):
+                    self._resolve(job, exc=exc)
+            except Exception as error:
+                # 重排出错也要让等待者拿到结果，不能让处理器协程一直挂起
+                logger.error(f"聊天 {chat.chat_id} 重试 {job.endpoint} 出错: {error}", exc_info=True)
+                self._resolve(job, exc=exc)
+        except asyncio.CancelledError:
+            # 调度器关闭时在途请求随之取消
+            for future in job.futures:
+                future.cancel()
+            raise
+        except Exception as exc:
+            self._resolve(job, exc=exc)
+        else:
+            self._resolve(job, result=result)
+        finally:
+            chat.in_flight = False
+            self._schedule(chat)
+
+    def _retry(self, chat: _ChatQueue, job: _Job, exc: RetryAfter) -> bool:
+        """被限流时暂停该聊天并把请求放回队首，超过重试次数返回 False"""
+        if job.retries >= self._max_retries:
+            return False
+        retry_after = _retry_after_seconds(exc)
+        job.retries += 1
+        chat.paused_until = asyncio.get_running_loop().time() + retry_after
+        chat.lanes[job.priority].appendleft(job)
+        self._depth[job.priority] += 1
+        self._counters["retried"] += 1
+        logger.warning(f"聊天 {chat.chat_id} 被限流，{retry_after} 秒后重试 {job.endpoint}")
+        return True
+
+    def _resolve(self, job: _Job, result: Any = None, exc: Optional[BaseException] = None) -> None:
+        self._counters["failed" if exc is not None else "sent"] += 1
+        for future in job.futures:
+            if future.done():
+                continue
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    def _prune(self, now: float) -> None:
+        """回收空闲聊天的队列（令牌已回满、没有限流暂停）"""
+        idle = [
+            chat_id for chat_id, chat in self._chats.items()
+            if chat.head() is None and not chat.in_flight and chat.paused_until <= now and chat.bucket.full(now)
+        ]
+        for chat_id in idle:
+            del self._chats[chat_id]
@@ -1,18 +1,36 @@
-"""消息工具模块 - 提供自动删除消息功能"""
+"""消息工具模块 - 提供自动删除消息功能
+
+所有发送、编辑、删除都经过 Bot 上安装的出站消息调度器（见 message_dispatcher），
+按聊天排队限速；主动推送的消息用 `Priority.BROADCAST`，让位于对玩家操作的回复。
+自动删除登记到消息自动删除服务（见 services/message_deleter），统一按时批量删除。
+"""
 import asyncio
 import logging
 from typing import Optional, Union
 
 from telegram import Message, InlineKeyboardMarkup
 
+from .message_dispatcher import OutboundDispatcher, Priority
+
 logger = logging.getLogger(__name__)
 
 # 默认消息自动删除延迟（秒）
 DEFAULT_DELETE_DELAY = 60
 
 
+def schedule_delete(message: Message, delay: int = DEFAULT_DELETE_DELAY) -> None:
+    """登记在 delay 秒后删除消息
+
+    由消息自动删除服务统一处理（重启后继续删除）；服务未启动时退回为单独的后台任务。
+    """
+    from bot.services.message_deleter import MessageDeleter
+
+    if not MessageDeleter.schedule(message.chat_id, message.message_id, delay):
+        asyncio.create_task(delete_message_after(message, delay))
+
+
 async def delete_message_after(message: Message, delay: int = DEFAULT_DELETE_DELAY) -> None:
-    """延迟删除消息
+    """延迟删除消息（消息自动删除服务未启动时使用）
 
     Args:
         message: 要删除的消息对象
@@ -55,16 +73,49 @@ async def send_and_delete(
         parse_mode=parse_mode,
     )
 
-    # 创建后台任务删除发送的消息
-    asyncio.create_task(delete_message_after(sent_message, delete_delay))
+    # 登记自动删除发送的消息
+    schedule_delete(sent_message, delete_delay)
 
     # 如果需要，同时删除原始消息
     if delete_original:
-        asyncio.create_task(delete_message_after(original_message, delay=1))
+        schedule_delete(original_message, delay=1)
 
     return sent_message
 
 
+def rate_limit_args(bot, priority: Priority) -> Optional[Priority]:
+    """发送请求的优先级参数（Bot 没有安装出站消息调度器时不能传）"""
+    return priority if isinstance(getattr(bot, "rate_limiter", None), OutboundDispatcher) else None
+
+
+async def send_broadcast(
+    bot,
+    chat_id: Union[int, str],
+    text: str,
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+    parse_mode: Optional[str] = None,
+) -> Message:
+    """以广播优先级发送消息（排在玩家操作的回复之后）
+
+    Args:
+        bot: Bot对象
+        chat_id: 聊天ID
+        text: 要发送的文本内容
+        reply_markup: 内联键盘（可选）
+        parse_mode: 解析模式（可选）
+
+    Returns:
+        发送的消息对象
+    """
+    return await bot.send_message(
+        chat_id=chat_id,
+        text=text,
+        reply_markup=reply_markup,
+        parse_mode=parse_mode,
+        rate_limit_args=rate_limit_args(bot, Priority.BROADCAST),
+    )
+
+
 async def send_temp_message(
     chat_id: int,
     text: str,
@@ -72,6 +123,7 @@ async def send_temp_message(
     reply_markup: Optional[InlineKeyboardMarkup] = None,
     parse_mode: Optional[str] = None,
     delete_delay: int = DEFAULT_DELETE_DELAY,
+    priority: Priority = Priority.INTERACTIVE,
 ) -> Message:
     """直接发送临时消息到聊天（不是回复）
 
@@ -82,6 +134,7 @@ async def send_temp_message(
         reply_markup: 内联键盘（可选）
         parse_mode: 解析模式（可选）
         delete_delay: 删除延迟时间（秒）
+        priority: 发送优先级，主动推送用 Priority.BROADCAST
 
     Returns:
         发送的消息对象
@@ -91,10 +144,11 @@ async def send_temp_message(
         text=text,
         reply_markup=reply_markup,
         parse_mode=parse_mode,
+        rate_limit_args=rate_limit_args(bot, priority),
     )
 
-    # 创建后台任务删除消息
-    asyncio.create_task(delete_message_after(sent_message, delete_delay))
+    # 登记自动删除
+    schedule_delete(sent_message, delete_delay)
 
     return sent_message
 
@@ -125,8 +179,8 @@ async def edit_and_delete(
             parse_mode=parse_mode,
         )
 
-        # 创建后台任务删除消息
-        asyncio.create_task(delete_message_after(edited_message, delete_delay))
+        # 登记自动删除（内联消息编辑返回 True，按原消息登记）
+        schedule_delete(message, delete_delay)
 
         return edited_message
     except Exception as e:
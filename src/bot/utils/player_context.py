@@ -0,0 +1,46 @@
+"""请求级玩家加载 - 每个更新只查询一次玩家
+
+处理器通过 `player_session` 获取本次更新的数据库会话和玩家对象：
+
+    async with player_session(update, context, "combat") as (session, player):
+        if not player:
+            ...
+
+首次调用时打开会话并按档位（basic / combat / full）预加载玩家，结果存入
+`context`；同一更新内再次调用（其他处理器组、辅助函数）直接复用。服务层在
+同一会话上调用 `PlayerService.get_player` / `load_player` 也会命中缓存。
+"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from telegram import Update
+from telegram.ext import CallbackContext
+
+from bot.models import Player
+from bot.models.database import AsyncSessionLocal
+from bot.services.player_service import PlayerService
+
+# 存放在 context 上的属性名
+_SCOPE_ATTR = "player_scope"
+
+
+@asynccontextmanager
+async def player_session(
+    update: Update,
+    context: CallbackContext,
+    profile: str = "basic"
+) -> AsyncIterator[Tuple[AsyncSession, Optional[Player]]]:
+    """获取本次更新的 (会话, 玩家)，玩家未注册时为 None"""
+    scope = getattr(context, _SCOPE_ATTR, None)
+    if scope is not None:
+        session = scope
+        yield session, await PlayerService.load_player(session, update.effective_user.id, profile)
+        return
+
+    async with AsyncSessionLocal() as session:
+        setattr(context, _SCOPE_ATTR, session)
+        try:
+            yield session, await PlayerService.load_player(session, update.effective_user.id, profile)
+        finally:
+            delattr(context, _SCOPE_ATTR)
@@ -0,0 +1,67 @@
+"""测试拍卖结算"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.models import Player, PlayerInventory
+from bot.models.database import Base
+from bot.models.market import Auction
+from bot.services.market_service import AuctionService
+
+
+@pytest.mark.asyncio
+async def test_settle_due_auctions_once():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    now = datetime.now()
+    async with async_session() as session:
+        seller, bidder = (
+            Player(telegram_id=i, first_name=name, nickname=name, spirit_stones=0)
+            for i, name in enumerate(["韩立", "厉飞雨"], start=1)
+        )
+        session.add_all([seller, bidder])
+        await session.flush()
+
+        def auction(item_id, ends_at, bidder_id=None, bid=1000):
+            return Auction(
+                seller_id=seller.id, item_id=item_id, inventory_id=item_id,
+                starting_price=bid, current_bid=bid, highest_bidder_id=bidder_id, ends_at=ends_at,
+            )
+
+        sold = auction(1, now - timedelta(minutes=1), bidder.id, 2000)
+        sold_too = auction(2, now - timedelta(minutes=2), bidder.id, 3000)
+        unsold = auction(3, now - timedelta(minutes=1))
+        running = auction(4, now + timedelta(hours=1), bidder.id)
+        session.add_all([sold, sold_too, unsold, running])
+        await session.commit()
+
+        ids = [sold.id, sold_too.id, unsold.id, running.id]
+        assert await AuctionService.settle_auctions(session, ids) == 3
+        await session.commit()
+        # 重复结算不会重复发放
+        assert await AuctionService.settle_auctions(session, ids) == 0
+        await session.commit()
+
+        await session.refresh(seller)
+        assert seller.spirit_stones == 2000 - 100 + 3000 - 150
+
+        inventory = (await session.execute(
+            select(PlayerInventory.player_id, PlayerInventory.item_id).order_by(PlayerInventory.item_id)
+        )).all()
+        assert inventory == [(bidder.id, 1), (bidder.id, 2), (seller.id, 3)]
+
+        for obj in (sold, unsold, running):
+            await session.refresh(obj)
+        assert (sold.is_active, sold.is_sold, sold.sold_at is not None) == (False, True, True)
+        assert (unsold.is_active, unsold.is_sold, unsold.sold_at) == (False, False, None)
+        assert running.is_active
+
+        success, _ = await AuctionService.finalize_auction(session, sold.id)
+        assert not success
+
+    await engine.dispose()
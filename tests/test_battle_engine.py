@@ -0,0 +1,141 @@
+"""测试内存战斗引擎"""
+import json
+import random
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.models import Player, Monster, Skill, PlayerSkill, SpiritRoot, BattleRecord, BattleResult, RealmType
+from bot.models.database import Base
+from bot.services.battle_engine import ACTION_SKILL, BattleEngine, BattleReport, Combatant, CombatSkill
+from bot.services.battle_service import BattleService
+from bot.services.battle_strategy import BattleStrategy
+
+
+def make_player_unit(**overrides) -> Combatant:
+    stats = dict(
+        entity_id=1, name="韩立", hp=500, max_hp=500, sp=200, max_sp=200,
+        attack=60, defense=20, speed=15, crit_rate=0.1, crit_damage=1.5,
+        strategy=BattleStrategy.AGGRESSIVE, elements=["火"],
+    )
+    stats.update(overrides)
+    unit = Combatant(**stats)
+    unit.add_skills([
+        CombatSkill(1, "火球术", "火", 80, 1.5, 20, level=2),
+        CombatSkill(2, "烈焰风暴", "火", 150, 2.2, 60, effects=["灼烧"]),
+    ])
+    return unit
+
+
+def make_monster_unit() -> Combatant:
+    return Combatant(
+        entity_id=1, name="妖狼", hp=900, max_hp=900, attack=45, defense=15,
+        speed=12, crit_rate=0.05, crit_damage=1.5, is_player=False, icon="👹",
+    )
+
+
+def test_same_rng_same_battle():
+    """相同随机源得到完全相同的战斗"""
+    outcomes = []
+    for _ in range(2):
+        player, monster = make_player_unit(), make_monster_unit()
+        outcome = BattleEngine.run(player, monster, 50, random.Random(7))
+        outcomes.append((outcome.rounds, outcome.events, player.hp, player.sp, monster.hp))
+
+    assert outcomes[0] == outcomes[1]
+
+
+def test_replay_from_snapshot():
+    """快照 + 种子重放得到与原战斗相同的事件流"""
+    player, monster = make_player_unit(), make_monster_unit()
+    snapshot = BattleEngine.snapshot(player, monster, 50)
+    outcome = BattleEngine.run(player, monster, 50, random.Random(99))
+
+    # 快照需能经过 JSON 往返
+    replayed_player, replayed_monster, replayed = BattleEngine.replay(
+        99, json.loads(json.dumps(snapshot))
+    )
+
+    assert replayed.events == outcome.events
+    assert (replayed_player.hp, replayed_monster.hp) == (player.hp, monster.hp)
+    assert any(event.action == ACTION_SKILL for event in outcome.events)
+
+    report = BattleReport(snapshot, outcome, BattleResult.WIN, {})
+    lines = report.render()
+    assert lines[0] == "⚔️ 韩立 VS 妖狼"
+    assert any("火球术" in line or "烈焰风暴" in line for line in lines)
+
+
+def test_skills_spend_spiritual_power():
+    """技能施放扣除灵力，且灵力不足时不会施放"""
+    player, monster = make_player_unit(), make_monster_unit()
+    BattleEngine.run(player, monster, 50, random.Random(1))
+
+    assert 0 <= player.sp < 200
+    assert all(s.spiritual_cost <= 200 for s in player.skills)
+    assert player.skills[0].element_bonus == 1.5  # 单灵根元素匹配
+
+
+def test_available_skills_sorted_by_cost():
+    """可用技能按当前灵力截断"""
+    player = make_player_unit(sp=30)
+    assert [s.name for s in player.available_skills()] == ["火球术"]
+
+
+@pytest.mark.asyncio
+async def test_battle_pve_loads_skills_once():
+    """整场战斗只查询一次技能，不随回合数增长"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with async_session() as session:
+        player = Player(
+            telegram_id=1, first_name="韩立", nickname="韩立",
+            hp=5000, max_hp=5000, attack=30, defense=10,
+            realm=RealmType.QI_REFINING, realm_level=3,
+        )
+        monster = Monster(
+            name="铁甲龟", description="皮糙肉厚", level=1, realm="炼气期",
+            hp=3000, attack=20, defense=25, speed=5, exp_reward=100,
+            spirit_stones_min=1, spirit_stones_max=5,
+        )
+        skill = Skill(
+            name="火弹术", description="小火球", skill_type="攻击", element="火",
+            base_power=30, spiritual_cost=10, required_realm=RealmType.QI_REFINING,
+        )
+        session.add_all([player, monster, skill])
+        await session.flush()
+        session.add_all([
+            PlayerSkill(player_id=player.id, skill_id=skill.id),
+            SpiritRoot(player_id=player.id, elements=json.dumps(["火", "木"])),
+        ])
+        await session.commit()
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            if "player_skills" in statement:
+                statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+
+        result, report, rewards = await BattleService.battle_pve(session, player, monster)
+
+        record_row = (await session.execute(
+            BattleRecord.__table__.select()
+        )).first()
+
+        _, replayed, verified = await BattleService.replay_battle(session, record_row.id)
+
+    await engine.dispose()
+
+    assert len(statements) == 1
+    assert record_row.rounds > 1
+    assert record_row.player_hp_before == 5000
+    assert record_row.seed is not None
+    assert verified
+    assert replayed.outcome.events == report.outcome.events
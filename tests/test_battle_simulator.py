@@ -0,0 +1,53 @@
+"""测试蒙特卡洛战斗模拟器与实战引擎的一致性"""
+import random
+
+from bot.services.battle_engine import BattleEngine, Combatant, CombatSkill
+from bot.services.battle_simulator import BattleSimulator
+from bot.services.battle_strategy import BattleStrategy
+
+
+def make_units(strategy: BattleStrategy):
+    player = Combatant(
+        entity_id=1, name="韩立", hp=600, max_hp=600, sp=150, max_sp=150,
+        attack=55, defense=18, speed=12, crit_rate=0.15, crit_damage=1.8,
+        strategy=strategy, elements=["火", "木"],
+    )
+    player.add_skills([
+        CombatSkill(1, "火弹术", "火", 40, 1.2, 15),
+        CombatSkill(2, "青元剑诀", "木", 120, 2.0, 45, level=3),
+    ])
+    monster = Combatant(
+        entity_id=1, name="赤焰狮", hp=1400, max_hp=1400, attack=70, defense=20,
+        speed=14, crit_rate=0.05, crit_damage=1.5, is_player=False, icon="👹",
+    )
+    return player, monster
+
+
+def scalar_stats(strategy: BattleStrategy, fights: int):
+    rng = random.Random(2024)
+    wins = rounds = 0
+    for _ in range(fights):
+        player, monster = make_units(strategy)
+        outcome = BattleEngine.run(player, monster, 50, rng)
+        wins += player.hp > 0 and monster.hp <= 0
+        rounds += outcome.rounds
+    return wins / fights, rounds / fights
+
+
+def test_simulator_matches_engine():
+    """向量化模拟的胜率和回合数与逐场运行引擎一致"""
+    for strategy in BattleStrategy:
+        win_rate, avg_rounds = scalar_stats(strategy, 3000)
+        player, monster = make_units(strategy)
+        result = BattleSimulator.simulate(player, monster, 20000, max_rounds=50, seed=1)
+
+        assert abs(result.win_rate - win_rate) < 0.04, strategy
+        assert abs(result.expected_rounds - avg_rounds) < 0.3, strategy
+        assert abs(result.win_rate + result.lose_rate + result.draw_rate - 1.0) < 1e-9
+
+
+def test_simulate_does_not_mutate_units():
+    """模拟不修改传入的参战单位"""
+    player, monster = make_units(BattleStrategy.BALANCED)
+    BattleSimulator.simulate(player, monster, 100, max_rounds=50, seed=3)
+    assert (player.hp, player.sp, monster.hp) == (600, 150, 1400)
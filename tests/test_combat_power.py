@@ -0,0 +1,54 @@
+"""测试持久化战力字段"""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.models import Player, RealmType
+from bot.models.database import Base
+from bot.models.player import calculate_combat_power
+
+
+def _expected(player: Player) -> int:
+    return calculate_combat_power(
+        player.attack, player.defense, player.max_hp, player.speed,
+        player.crit_rate, player.realm, player.realm_level,
+    )
+
+
+@pytest.mark.asyncio
+async def test_combat_power_follows_stats():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        # 只给出部分属性，其余取列默认值
+        player = Player(telegram_id=1, first_name="韩立", nickname="韩立", attack=50)
+        session.add(player)
+        await session.commit()
+        assert player.combat_power == _expected(player) == 268
+
+        # 赋值后立即可读到新战力（突破、装备、阵法等都只需修改属性）
+        player.realm = RealmType.FOUNDATION
+        player.realm_level = 1
+        assert player.combat_power == _expected(player)
+
+        player.defense += 20
+        player.crit_rate = 0.2
+        assert player.combat_power == _expected(player)
+        await session.commit()
+
+    async with async_session() as session:
+        stored = await session.scalar(select(Player.combat_power).where(Player.telegram_id == 1))
+        reloaded = await session.get(Player, player.id)
+        assert stored == _expected(reloaded) == player.combat_power
+
+        # 未加载的对象在写库前兜底重算
+        session.expire(reloaded)
+        reloaded.speed = 40
+        await session.commit()
+        stored = await session.scalar(select(Player.combat_power).where(Player.telegram_id == 1))
+        assert stored == _expected(reloaded)
+
+    await engine.dispose()
@@ -0,0 +1,82 @@
+"""测试按玩家串行的并发更新处理"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from telegram import Chat, Message, Update, User
+
+from bot.utils.concurrency import PlayerActivity, PlayerUpdateProcessor
+
+
+def make_update(update_id: int, user_id: int) -> Update:
+    message = Message(
+        message_id=update_id, date=datetime.now(), chat=Chat(user_id, Chat.PRIVATE),
+        from_user=User(user_id, "道友", False), text=".战斗",
+    )
+    return Update(update_id, message=message)
+
+
+@pytest.mark.asyncio
+async def test_same_player_serialized_other_players_parallel():
+    """同一玩家的更新按顺序执行，不同玩家的更新并行执行"""
+    processor = PlayerUpdateProcessor(16)
+    log = []
+
+    async def handle(name: str, delay: float):
+        log.append(f"{name}开始")
+        await asyncio.sleep(delay)
+        log.append(f"{name}结束")
+
+    async with processor:
+        await asyncio.gather(
+            processor.process_update(make_update(1, 100), handle("甲1", 0.05)),
+            processor.process_update(make_update(2, 100), handle("甲2", 0)),
+            processor.process_update(make_update(3, 200), handle("乙1", 0.01)),
+        )
+
+    # 甲2 必须等甲1 结束；乙1 不用等甲1
+    assert log.index("甲2开始") > log.index("甲1结束")
+    assert log.index("乙1结束") < log.index("甲1结束")
+    # 处理完后回收队列
+    assert not processor._queues
+
+
+@pytest.mark.asyncio
+async def test_player_backlog_does_not_hold_permits():
+    """同一玩家积压的更新不占并发名额，其他玩家不用等"""
+    processor = PlayerUpdateProcessor(4)
+    loop = asyncio.get_running_loop()
+    order = []
+
+    async def handle(name: str, delay: float):
+        await asyncio.sleep(delay)
+        order.append(name)
+
+    async with processor:
+        backlog = [
+            asyncio.create_task(processor.process_update(make_update(i, 100), handle(f"甲{i}", 0.1)))
+            for i in range(6)
+        ]
+        await asyncio.sleep(0)
+        # 积压的更新入队后立即释放名额，只有甲正在处理的一条占名额
+        assert processor.current_concurrent_updates == 1
+
+        start = loop.time()
+        await processor.process_update(make_update(10, 200), handle("乙", 0))
+        assert loop.time() - start < 0.05
+
+        await asyncio.gather(*backlog)
+
+    # 乙最先完成，甲的更新仍按到达顺序依次执行
+    assert order == ["乙", *(f"甲{i}" for i in range(6))]
+    assert not processor._queues
+
+
+def test_player_activity_hold():
+    """状态只在 with 块内生效，异常时也会清除"""
+    activity = PlayerActivity()
+    with pytest.raises(RuntimeError):
+        with activity.hold(1, 2):
+            assert activity.busy(1) and activity.busy(2)
+            raise RuntimeError
+    assert not activity.busy(1) and not activity.busy(2)
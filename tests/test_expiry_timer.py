@@ -0,0 +1,86 @@
+"""测试到期计时"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.models import Player, WorldBoss, WorldBossStatus
+from bot.models.adventure import LuckEvent
+from bot.models.database import Base
+from bot.models.formation import ActiveFormation
+from bot.services.expiry_timer import ExpiryTimer
+
+
+async def _eventually(session, obj, check, timeout=3.0):
+    """等待后台计时处理完成（最多 timeout 秒）"""
+    deadline = datetime.now() + timedelta(seconds=timeout)
+    while True:
+        await session.refresh(obj)
+        if check(obj) or datetime.now() > deadline:
+            return check(obj)
+        await asyncio.sleep(0.05)
+
+
+def _formation(player, expires_at):
+    return ActiveFormation(
+        player_id=player.id, formation_id=1, location="洞府",
+        current_defense_bonus=30, current_attack_bonus=20, expires_at=expires_at,
+    )
+
+
+@pytest.mark.asyncio
+async def test_expiries_fire_at_due_time():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    now = datetime.now()
+    async with async_session() as session:
+        player = Player(
+            telegram_id=1, first_name="韩立", nickname="韩立", attack=120, defense=80,
+        )
+        session.add(player)
+        await session.flush()
+        # 停机期间已到期的阵法，以及远未到期的阵法
+        overdue = _formation(player, now - timedelta(hours=1))
+        later = _formation(player, now + timedelta(hours=1))
+        session.add_all([overdue, later])
+        await session.commit()
+
+        try:
+            assert await ExpiryTimer.start(session) == 2
+
+            assert await _eventually(session, overdue, lambda f: not f.is_active)
+            await session.refresh(player)
+            assert (player.attack, player.defense) == (100, 50)
+            assert ExpiryTimer.pending() == 1
+
+            # 运行中新建的对象提交后自动登记
+            soon = datetime.now() + timedelta(seconds=0.5)
+            event = LuckEvent(
+                player_id=player.id, event_type="祈福", event_name="紫气东来",
+                luck_modifier=10, duration_hours=1, end_time=soon,
+            )
+            boss = WorldBoss(
+                name="血玉蜘蛛", description="", level=1, max_hp=100, current_hp=100,
+                attack=10, defense=10, despawn_at=soon,
+            )
+            session.add_all([event, boss])
+            await session.commit()
+            assert ExpiryTimer.pending() == 3
+
+            await session.refresh(event)
+            assert event.is_active
+
+            assert await _eventually(session, event, lambda e: not e.is_active)
+            assert await _eventually(session, boss, lambda b: b.status == WorldBossStatus.ESCAPED)
+            assert datetime.now() >= soon
+            await session.refresh(later)
+            assert later.is_active
+            assert ExpiryTimer.pending() == 1
+        finally:
+            await ExpiryTimer.stop()
+
+    await engine.dispose()
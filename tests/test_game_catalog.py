@@ -0,0 +1,104 @@
+"""测试静态游戏数据目录"""
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.models import Achievement, Item, ItemType, Monster, RealmType
+from bot.models.database import Base
+from bot.services import BattleService
+from bot.services.game_catalog import GameCatalog
+
+
+def _monster(name: str, realm: str, level: int) -> Monster:
+    return Monster(
+        name=name, description=name, level=level, realm=realm,
+        hp=100, attack=10, defense=5, speed=10, exp_reward=10,
+    )
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        session.add_all([
+            Item(name="回春丹", description="回复气血", item_type=ItemType.PILL, buy_price=100),
+            Item(name="回春丹", description="同名的第二条", item_type=ItemType.PILL, buy_price=200),
+            Item(name="青锋剑", description="凡品飞剑", item_type=ItemType.WEAPON),
+            Item(name="青锋剑", description="商店出售的仿品", item_type=ItemType.WEAPON, buy_price=500),
+            _monster("妖狼", RealmType.QI_REFINING.value, 3),
+            _monster("野猪精", RealmType.QI_REFINING.value, 1),
+            _monster("赤焰蟒", RealmType.FOUNDATION.value, 12),
+            Achievement(name="初战告捷", description="赢得第一场战斗", condition_type="battle_win", condition_value=1),
+            Achievement(name="百战百胜", description="赢得一百场战斗", condition_type="battle_win", condition_value=100),
+            Achievement(name="筑基有成", description="突破筑基", condition_type="realm_reach", condition_value=2),
+        ])
+        await session.commit()
+        yield session
+
+    GameCatalog.clear()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_load_builds_indexes(session):
+    counts = await GameCatalog.load(session)
+    catalog = await GameCatalog.get()
+
+    assert counts["物品"] == 4 and counts["怪物"] == 3 and counts["成就"] == 3
+    # 同名物品取ID最小的一条
+    assert catalog.items_by_name["回春丹"].buy_price == 100
+    # 商店购买跳过没有售价的同名物品
+    assert catalog.items_by_name["青锋剑"].id == 3 and catalog.shop_items_by_name["青锋剑"].id == 4
+    assert catalog.shop_items_by_name["回春丹"].id == 1
+    assert [m.name for m in catalog.monsters] == ["野猪精", "妖狼", "赤焰蟒"]
+    assert [m.name for m in catalog.monsters_by_realm[RealmType.QI_REFINING.value]] == ["野猪精", "妖狼"]
+    assert [a.condition_value for a in catalog.achievements_by_condition["battle_win"]] == [1, 100]
+    assert catalog.achievements_by_condition["kill_boss"] == []
+    # 名称索引包含同名的全部物品
+    assert catalog.item_names.contains("春丹") == [1, 2]
+    assert counts["技能"] == 0 and len(catalog.skill_names) == 0
+
+
+@pytest.mark.asyncio
+async def test_lookups_do_not_query(session):
+    await GameCatalog.load(session)
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        player = SimpleNamespace(realm=RealmType.QI_REFINING)
+        monsters = await BattleService.get_random_monsters(session, player, count=5)
+        item = (await GameCatalog.get(session)).items_by_id[3]
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert {m.name for m in monsters} == {"野猪精", "妖狼"}
+    assert item.name == "青锋剑"
+    assert statements == []
+
+
+@pytest.mark.asyncio
+async def test_reload_replaces_catalog(session):
+    await GameCatalog.load(session)
+    before = await GameCatalog.get()
+
+    session.add(_monster("金丹傀儡", RealmType.CORE_FORMATION.value, 25))
+    await session.commit()
+    await GameCatalog.load(session)
+    after = await GameCatalog.get()
+
+    assert before is not after
+    assert "金丹傀儡" not in before.monsters_by_name
+    assert after.monsters_by_name["金丹傀儡"].level == 25
@@ -0,0 +1,100 @@
+"""测试排行榜服务"""
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.models import Player, RealmType
+from bot.models.database import Base
+from bot.services.leaderboard_service import LeaderboardService
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        session.add_all([
+            Player(
+                telegram_id=i, first_name=name, nickname=name,
+                realm=realm, realm_level=level, spirit_stones=stones,
+                total_kills=kills, total_battles=battles, total_wins=wins,
+            )
+            for i, (name, realm, level, stones, kills, battles, wins) in enumerate([
+                ("韩立", RealmType.FOUNDATION, 1, 500, 3, 20, 15),
+                ("厉飞雨", RealmType.QI_REFINING, 9, 2000, 8, 5, 5),
+                ("南宫婉", RealmType.CORE_FORMATION, 1, 800, 1, 10, 9),
+                ("墨大夫", RealmType.QI_REFINING, 12, 800, 0, 0, 0),
+            ], start=1)
+        ])
+        await session.commit()
+        await LeaderboardService.rebuild(session)
+        yield session
+
+    LeaderboardService.clear()
+    await engine.dispose()
+
+
+def _names(board: str):
+    return [entry.nickname for entry in LeaderboardService.top(board)]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_orders_boards(session):
+    assert _names("realm") == ["南宫婉", "韩立", "墨大夫", "厉飞雨"]
+    # 同分按玩家ID先后
+    assert _names("wealth") == ["厉飞雨", "南宫婉", "墨大夫", "韩立"]
+    assert _names("kills")[0] == "厉飞雨"
+    # 胜率榜至少10场战斗
+    assert _names("winrate") == ["南宫婉", "韩立"]
+
+    combat = [entry.combat_power for entry in LeaderboardService.top("combat")]
+    assert combat == sorted(combat, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_rank_lookup(session):
+    players = {entry.nickname: entry.player_id for entry in LeaderboardService.top("realm")}
+
+    assert LeaderboardService.rank("realm", players["南宫婉"]) == 1
+    assert LeaderboardService.rank("wealth", players["韩立"]) == 4
+    assert LeaderboardService.rank("winrate", players["厉飞雨"]) is None
+    assert LeaderboardService.size("winrate") == 2
+    assert LeaderboardService.top("realm", 2)[1].nickname == "韩立"
+
+
+@pytest.mark.asyncio
+async def test_commit_updates_boards_incrementally(session):
+    player = await session.get(Player, 1)
+    player.spirit_stones = 10_000
+    player.total_battles = 30
+    await session.flush()
+
+    # 提交前不生效
+    assert LeaderboardService.rank("wealth", player.id) == 4
+
+    await session.commit()
+    assert LeaderboardService.rank("wealth", player.id) == 1
+    assert LeaderboardService.top("wealth", 1)[0].spirit_stones == 10_000
+    assert LeaderboardService.rank("winrate", player.id) == 2
+
+
+@pytest.mark.asyncio
+async def test_rollback_and_delete(session):
+    player = await session.get(Player, 2)
+    player.total_kills = 0
+    await session.flush()
+    await session.rollback()
+    assert LeaderboardService.rank("kills", 2) == 1
+
+    newcomer = Player(telegram_id=99, first_name="银月", nickname="银月", realm=RealmType.NASCENT_SOUL)
+    session.add(newcomer)
+    await session.commit()
+    assert _names("realm")[0] == "银月"
+
+    await session.delete(newcomer)
+    await session.commit()
+    assert "银月" not in _names("realm")
+    assert LeaderboardService.size("realm") == 4
@@ -0,0 +1,129 @@
+"""测试市场搜索分页"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.models import Item, ItemType, Player
+from bot.models.database import Base
+from bot.models.market import Market
+from bot.services.game_catalog import GameCatalog
+from bot.services.market_service import (
+    MarketFilters, MarketService, decode_market_cursor, encode_market_cursor,
+)
+
+
+def test_cursor_round_trip():
+    listed_at = datetime(2026, 10, 18, 12, 30, 5, 123456)
+    assert decode_market_cursor(encode_market_cursor(listed_at, 42)) == (listed_at, 42)
+    assert decode_market_cursor("bad") is None
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_in_one_query_each():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    now = datetime.now()
+    async with async_session() as session:
+        seller = Player(telegram_id=1, first_name="韩立", nickname="韩立")
+        pill = Item(name="筑基丹", description="", item_type=ItemType.PILL)
+        herb = Item(name="紫猴花", description="", item_type=ItemType.HERB)
+        session.add_all([seller, pill, herb])
+        await session.flush()
+
+        # 每三单同一时间上架，检验同时间的翻页顺序
+        for i in range(25):
+            item = pill if i % 5 else herb
+            session.add(Market(
+                seller_id=seller.id, item_id=item.id, inventory_id=i + 1,
+                quantity=1, price_per_unit=100 * (i + 1), total_price=100 * (i + 1),
+                listed_at=now - timedelta(minutes=i // 3), expires_at=now + timedelta(days=1),
+            ))
+        await session.commit()
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        seen, cursor = [], None
+        while True:
+            items, cursor, total = await MarketService.search_market(session, cursor=cursor, page_size=10)
+            seen.extend(item["id"] for item in items)
+            if cursor is None:
+                break
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+        assert total == 25
+        def newest_first(ids):
+            return sorted(ids, key=lambda i: ((i - 1) // 3, -i))
+
+        assert seen == newest_first(range(1, 26))
+        assert items[-1]["item_name"] and items[-1]["seller_name"] == "韩立"
+        # 每页一条查询，总数只统计一次
+        assert len(statements) == 3 + 1
+        assert sum("count(" in s.lower() for s in statements) == 1
+
+        filters = MarketFilters(item_type=ItemType.PILL, min_price=1000, max_price=2000)
+        items, cursor, total = await MarketService.search_market(session, filters)
+        # 价格 1000-2000 的丹药（11、16号为灵药）
+        assert [item["id"] for item in items] == newest_first([10, 12, 13, 14, 15, 17, 18, 19, 20])
+        assert cursor is None and total == 9
+
+        # 物品名经目录的名称索引解析为物品ID，不再对物品名做 LIKE 扫描
+        await GameCatalog.load(session)
+        try:
+            statements.clear()
+            event.listen(engine.sync_engine, "before_cursor_execute", record)
+            items, cursor, total = await MarketService.search_market(session, MarketFilters(item_name="猴花"))
+            missing = await MarketService.search_market(session, MarketFilters(item_name="九曲灵参"))
+            event.remove(engine.sync_engine, "before_cursor_execute", record)
+        finally:
+            GameCatalog.clear()
+
+        assert [item["id"] for item in items] == newest_first([1, 6, 11, 16, 21])
+        assert total == 5
+        assert missing == ([], None, 0)
+        assert not any("LIKE" in s.upper() for s in statements)
+        assert len(statements) == 2
+
+    await engine.dispose()
+
+
+def test_page_filters_follow_the_search_message():
+    from bot.handlers.market import MARKET_SEARCHES_KEPT, _recall_market_search, _remember_market_search
+
+    chat_data = {}
+    pills = MarketFilters(item_type=ItemType.PILL)
+    _remember_market_search(chat_data, 10, pills)
+    _remember_market_search(chat_data, 11, MarketFilters(item_name="紫猴花"))
+    # 同一聊天里后来的搜索不影响前一条消息的翻页
+    assert _recall_market_search(chat_data, 10) == pills
+    assert _recall_market_search({}, 10) is None
+
+    for message_id in range(12, 12 + MARKET_SEARCHES_KEPT):
+        _remember_market_search(chat_data, message_id, pills)
+    assert len(chat_data["market_searches"]) == MARKET_SEARCHES_KEPT
+    assert _recall_market_search(chat_data, 10) is None and _recall_market_search(chat_data, 12) == pills
+
+
+def test_count_cache_is_pruned_on_write(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("bot.services.market_service.time.monotonic", lambda: now[0])
+    monkeypatch.setattr(MarketService, "_count_cache", {})
+    monkeypatch.setattr(MarketService, "COUNT_CACHE_SIZE", 3)
+
+    for price in range(5):
+        MarketService._cache_count(MarketFilters(max_price=price), price)
+    # 超出容量时丢弃最早写入的条件
+    assert list(MarketService._count_cache) == [MarketFilters(max_price=price) for price in (2, 3, 4)]
+
+    # 过期的条目在下次写入时清掉
+    now[0] += MarketService.COUNT_CACHE_TTL
+    MarketService._cache_count(MarketFilters(item_name="筑基丹"), 7)
+    assert MarketService._count_cache == {MarketFilters(item_name="筑基丹"): (now[0] + MarketService.COUNT_CACHE_TTL, 7)}
@@ -0,0 +1,111 @@
+"""测试消息自动删除服务"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from telegram.error import BadRequest, TimedOut
+
+from bot.models import ScheduledDeletion
+from bot.models.database import Base
+from bot.services import message_deleter
+from bot.services.message_deleter import MessageDeleter
+
+
+class FakeBot:
+    """记录 deleteMessages 调用，可按聊天返回错误"""
+
+    def __init__(self):
+        self.calls = []
+        self.errors = {}
+
+    async def delete_messages(self, chat_id, message_ids, **kwargs):
+        self.calls.append((chat_id, list(message_ids)))
+        error = self.errors.pop(chat_id, None)
+        if error is not None:
+            raise error
+        return True
+
+
+@pytest_asyncio.fixture
+async def session(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    monkeypatch.setattr(message_deleter, "PERSIST_DELAY", 0)
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        yield session
+
+    await MessageDeleter.stop()
+    await engine.dispose()
+
+
+async def _stored(session):
+    rows = await session.execute(select(ScheduledDeletion.chat_id, ScheduledDeletion.message_id))
+    return sorted(rows.all())
+
+
+async def _eventually(check, timeout=3.0):
+    deadline = datetime.now() + timedelta(seconds=timeout)
+    while not check() and datetime.now() < deadline:
+        await asyncio.sleep(0.02)
+    return check()
+
+
+@pytest.mark.asyncio
+async def test_due_messages_are_deleted_in_batches_per_chat(session):
+    now = datetime.now()
+    # 停机期间已到期的计划，重启后立即删除
+    session.add_all([
+        ScheduledDeletion(chat_id=-100, message_id=1, delete_at=now - timedelta(minutes=5)),
+        ScheduledDeletion(chat_id=7, message_id=1, delete_at=now + timedelta(hours=1)),
+    ])
+    await session.commit()
+
+    bot = FakeBot()
+    assert await MessageDeleter.start(bot, session) == 2
+    assert await _eventually(lambda: bot.calls)
+    assert bot.calls == [(-100, [1])]
+
+    for message_id in range(2, 152):
+        assert MessageDeleter.schedule(-100, message_id, 0.3)
+    for message_id in (3, 2):
+        MessageDeleter.schedule(42, message_id, 0.3)
+    # 重复登记取较早的时间，不重复删除
+    MessageDeleter.schedule(42, 2, 60)
+
+    # 到期前先批量写入数据库
+    assert await _eventually(lambda: not MessageDeleter._unsaved)
+    assert len(await _stored(session)) == 1 + 150 + 2
+
+    assert await _eventually(lambda: len(bot.calls) == 4)
+    # 同一聊天每次最多 100 条
+    assert sorted(bot.calls[1:]) == [(-100, list(range(2, 102))), (-100, list(range(102, 152))), (42, [2, 3])]
+    assert await _eventually(lambda: MessageDeleter.pending() == 1)
+    assert await _stored(session) == [(7, 1)]
+
+
+@pytest.mark.asyncio
+async def test_failed_deletions_retry_and_plans_survive_restart(session, monkeypatch):
+    monkeypatch.setattr(message_deleter, "RETRY_DELAY", 0.1)
+    bot = FakeBot()
+    bot.errors = {1: TimedOut(), 2: BadRequest("Message to delete not found")}
+    await MessageDeleter.start(bot, session)
+
+    MessageDeleter.schedule(1, 10, 0)
+    MessageDeleter.schedule(2, 20, 0)
+    # 网络错误稍后重试，消息已不存在则放弃
+    assert await _eventually(lambda: len(bot.calls) == 3)
+    assert sorted(bot.calls) == [(1, [10]), (1, [10]), (2, [20])]
+    assert MessageDeleter.pending() == 0
+
+    # 未到期的计划停止时写入数据库，重启后继续
+    MessageDeleter.schedule(3, 30, 3600)
+    await MessageDeleter.stop()
+    assert await _stored(session) == [(3, 30)]
+    assert await MessageDeleter.start(FakeBot(), session) == 1
+    assert MessageDeleter.pending() == 1
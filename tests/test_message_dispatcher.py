@@ -0,0 +1,216 @@
+"""测试出站消息调度器"""
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from telegram.error import RetryAfter, TelegramError
+from telegram.ext import ExtBot
+from telegram.request import BaseRequest
+
+from bot.utils.message_dispatcher import OutboundDispatcher, Priority, TokenBucket
+from bot.utils.message_utils import send_broadcast
+
+
+class FakeRequest(BaseRequest):
+    """记录请求的假 Bot API，可按需阻塞或返回限流"""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.flood = 0
+        self.message_id = 100
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        endpoint = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.calls.append((endpoint, params))
+        await self.gate.wait()
+        if self.flood:
+            self.flood -= 1
+            return 429, json.dumps({"ok": False, "error_code": 429, "description": "Too Many Requests",
+                                    "parameters": {"retry_after": 0.05}}).encode()
+        self.message_id += 1
+        message = {
+            "message_id": params.get("message_id", self.message_id),
+            "date": int(datetime.now().timestamp()),
+            "chat": {"id": params.get("chat_id"), "type": "private"},
+            "text": params.get("text", ""),
+        }
+        return 200, json.dumps({"ok": True, "result": True if endpoint == "deleteMessage" else message}).encode()
+
+
+class LegacyRetryAfter(RetryAfter):
+    """python-telegram-bot 21.x 形式的限流异常：只有 int 的 retry_after"""
+
+    retry_after = 0
+
+    def __init__(self, retry_after):
+        TelegramError.__init__(self, f"Flood control exceeded. Retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+async def make_bot(**rates):
+    request = FakeRequest()
+    dispatcher = OutboundDispatcher(**rates)
+    bot = ExtBot("1:fake", request=request, get_updates_request=request, rate_limiter=dispatcher)
+    await dispatcher.initialize()
+    return bot, request, dispatcher
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=2, capacity=3, now=0)
+    for _ in range(3):
+        assert bucket.delay(0) == 0
+        bucket.take(0)
+    assert bucket.delay(0) == pytest.approx(0.5)
+    assert bucket.delay(1) == 0 and not bucket.full(1)
+    assert bucket.full(10) and bucket.tokens == 3
+
+
+@pytest.mark.asyncio
+async def test_interactive_replies_overtake_broadcasts():
+    bot, request, dispatcher = await make_bot(global_rate=1000, chat_rate=1000, chat_burst=10)
+    try:
+        sends = [send_broadcast(bot, 1, f"广播{i}") for i in range(3)]
+        sends.append(bot.send_message(2, "回复"))
+        await asyncio.gather(*sends)
+    finally:
+        await dispatcher.shutdown()
+
+    # 同一聊天按顺序，互动回复排在先到的广播前面
+    assert [params["text"] for _, params in request.calls] == ["回复", "广播0", "广播1", "广播2"]
+    assert dispatcher.stats()["sent"] == 4
+
+
+@pytest.mark.asyncio
+async def test_per_chat_rate_is_enforced():
+    bot, request, dispatcher = await make_bot(global_rate=1000, chat_rate=20, group_rate_per_minute=600, chat_burst=1)
+    loop = asyncio.get_running_loop()
+    try:
+        start = loop.time()
+        await asyncio.gather(*(bot.send_message(1, str(i)) for i in range(3)))
+        private = loop.time() - start
+        start = loop.time()
+        await asyncio.gather(*(bot.send_message(-100, str(i)) for i in range(3)))
+        group = loop.time() - start
+    finally:
+        await dispatcher.shutdown()
+
+    # 私聊 20 条/秒、群组 10 条/秒，突发 1 条：3 条至少要等 2 个间隔
+    assert 0.09 <= private < 0.3
+    assert group >= 0.19
+
+
+@pytest.mark.asyncio
+async def test_pending_edits_are_coalesced():
+    bot, request, dispatcher = await make_bot(global_rate=1000, chat_rate=1000, chat_burst=10)
+    try:
+        request.gate.clear()
+        first = asyncio.create_task(bot.send_message(1, "战斗开始"))
+        await asyncio.sleep(0.01)
+        edits = [asyncio.create_task(bot.edit_message_text(f"第{i}回合", chat_id=1, message_id=7)) for i in range(5)]
+        other = asyncio.create_task(bot.edit_message_text("另一条", chat_id=1, message_id=8))
+        await asyncio.sleep(0.01)
+
+        # 第一条在途，其余排队；5 次编辑只剩 1 个请求
+        stats = dispatcher.stats()
+        assert (stats["in_flight"], stats["queued"], stats["interactive"], stats["coalesced"]) == (1, 2, 2, 4)
+        assert stats["max_chat_depth"] == 2
+
+        request.gate.set()
+        await first
+        results = await asyncio.gather(*edits)
+        await other
+    finally:
+        await dispatcher.shutdown()
+
+    texts = [params.get("text") for _, params in request.calls]
+    assert texts == ["战斗开始", "第4回合", "另一条"]
+    assert {message.text for message in results} == {"第4回合"}
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_chat_and_retries():
+    bot, request, dispatcher = await make_bot(global_rate=1000, chat_rate=1000, chat_burst=10, max_retries=1)
+    try:
+        request.flood = 1
+        message = await bot.send_message(1, "BOSS出现了")
+        assert message.text == "BOSS出现了"
+        assert len(request.calls) == 2 and dispatcher.stats()["retried"] == 1
+
+        # 超过重试次数后异常交给调用方
+        request.flood = 2
+        with pytest.raises(RetryAfter):
+            await bot.send_message(1, "再来")
+        assert dispatcher.stats()["failed"] == 1
+    finally:
+        await dispatcher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_retry_after_of_any_ptb_version_resolves_callers():
+    dispatcher = OutboundDispatcher(global_rate=1000, chat_rate=1000, chat_burst=10, max_retries=1)
+    await dispatcher.initialize()
+    errors = [LegacyRetryAfter(0)]
+
+    async def callback():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    async def send():
+        return await dispatcher.process_request(callback, (), {}, "sendMessage", {"chat_id": 1}, None)
+
+    try:
+        async with asyncio.timeout(1):
+            # int 形式的等待时间照常暂停后重试
+            assert await send() == "ok"
+            assert dispatcher.stats()["retried"] == 1
+            # 重排时出错也把异常交给调用方，而不是让它一直等下去
+            errors.append(LegacyRetryAfter("很久"))
+            with pytest.raises(RetryAfter):
+                await send()
+        assert dispatcher.stats()["failed"] == 1
+    finally:
+        await dispatcher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_requests_without_chat_are_not_queued():
+    bot, request, dispatcher = await make_bot()
+    try:
+        request.gate.clear()
+        blocked = asyncio.create_task(bot.send_message(1, "在途"))
+        await asyncio.sleep(0.01)
+        # 同一聊天的请求在途时，没有 chat_id 的请求照常直接发出
+        request.gate.set()
+        assert await bot.answer_callback_query("42")
+        await blocked
+        assert dispatcher.stats()["queued"] == 0
+    finally:
+        await dispatcher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_shutdown_cancels_pending_requests():
+    bot, request, dispatcher = await make_bot(global_rate=1000, chat_rate=1000, chat_burst=10)
+    request.gate.clear()
+    sends = [asyncio.create_task(bot.send_message(1, str(i), rate_limit_args=Priority.BROADCAST)) for i in range(3)]
+    await asyncio.sleep(0.01)
+    await dispatcher.shutdown()
+
+    results = await asyncio.gather(*sends, return_exceptions=True)
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert dispatcher.stats()["queued"] == 0
@@ -0,0 +1,42 @@
+"""测试名称 n-gram 索引"""
+from bot.services.name_index import NameIndex, name_grams
+
+
+def _index():
+    return NameIndex(enumerate([
+        "筑基丹", "聚气丹", "紫猴花种子", "紫猴花", "青锋剑", "青竹蜂云剑", "天雷竹", "Sword of Dawn",
+    ], start=1))
+
+
+def test_grams_include_single_characters():
+    assert name_grams("灵草") == {"灵", "草", "灵草"}
+
+
+def test_contains_matches_substrings():
+    index = _index()
+    assert index.contains("丹") == [1, 2]
+    # 短名在前
+    assert index.contains("紫猴") == [4, 3]
+    assert index.contains("猴花种") == [3]
+    assert index.contains("青剑") == []
+    assert index.contains("sword of") == [8]
+    assert index.contains("") == []
+
+
+def test_search_ranks_fuzzy_matches():
+    index = _index()
+    ranked = [key for key, _ in index.search("紫猴花")]
+    # 完全相同 > 前缀 > 其余
+    assert ranked[:2] == [4, 3]
+    # 字序不同、缺字时仍能找到
+    assert index.search("竹蜂剑")[0][0] == 6
+    assert index.search("天雷")[0][0] == 7
+    assert index.search("混沌") == []
+
+
+def test_complete_by_prefix():
+    index = _index()
+    assert index.complete("青") == [6, 5]
+    assert index.complete("紫猴花", limit=1) == [4]
+    assert index.complete("元婴") == []
+    assert len(index) == 8
@@ -0,0 +1,87 @@
+"""测试挂单交易"""
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.models import Player, PlayerInventory
+from bot.models.database import Base
+from bot.models.market import MarketOrder, OrderSide, TradeRecord
+from bot.services.order_book_service import BookOrder, OrderBook, OrderBookService
+
+
+def test_price_time_priority():
+    book = OrderBook()
+    book.add(BookOrder(1, 10, OrderSide.SELL, 100, 5))
+    book.add(BookOrder(2, 11, OrderSide.SELL, 90, 5))
+    book.add(BookOrder(3, 10, OrderSide.SELL, 90, 3))
+    book.add(BookOrder(4, 12, OrderSide.BUY, 80, 2))
+
+    # 低价优先，同价先挂先成交
+    fills = book.match(OrderSide.BUY, 100, 10, player_id=12)
+    assert [(order.order_id, filled) for order, filled in fills] == [(2, 5), (3, 3), (1, 2)]
+    # 不与自己的挂单成交
+    fills = book.match(OrderSide.BUY, 100, 4, player_id=11)
+    assert [(order.order_id, filled) for order, filled in fills] == [(3, 3), (1, 1)]
+    # 价格不交叉时不成交，撮合不修改盘口
+    assert book.match(OrderSide.SELL, 81, 1, player_id=10) == []
+    assert book.depth(OrderSide.SELL, 5) == [(90, 8), (100, 5)]
+    assert book.depth(OrderSide.BUY, 5) == [(80, 2)]
+
+
+@pytest.mark.asyncio
+async def test_orders_match_and_settle():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    OrderBookService.clear()
+    async with async_session() as session:
+        seller_a, seller_b, buyer = (
+            Player(telegram_id=i, first_name=name, nickname=name, spirit_stones=1000)
+            for i, name in enumerate(["韩立", "厉飞雨", "南宫婉"], start=1)
+        )
+        session.add_all([seller_a, seller_b, buyer])
+        await session.flush()
+        inv_a = PlayerInventory(player_id=seller_a.id, item_id=7, quantity=8)
+        inv_b = PlayerInventory(player_id=seller_b.id, item_id=7, quantity=5)
+        session.add_all([inv_a, inv_b])
+        await session.commit()
+
+        assert (await OrderBookService.place_sell_order(session, seller_a, inv_a.id, 5, 100))[0]
+        assert (await OrderBookService.place_sell_order(session, seller_b, inv_b.id, 5, 90))[0]
+        assert (await OrderBookService.place_sell_order(session, seller_a, inv_a.id, 3, 90))[0]
+        assert OrderBookService.quote(7) == (None, 90)
+
+        success, _ = await OrderBookService.place_buy_order(session, buyer, 7, 10, 100)
+        assert success
+
+        # 按卖方挂单价成交：5@90 + 3@90 + 2@100，买单多扣的差价退还
+        assert buyer.spirit_stones == 1000 - 920
+        assert seller_b.spirit_stones == 1000 + 450 - 22
+        assert seller_a.spirit_stones == 1000 + (270 - 13) + (200 - 10)
+        bought = await session.scalar(
+            select(PlayerInventory.quantity).where(PlayerInventory.player_id == buyer.id)
+        )
+        assert bought == 10
+        assert await session.scalar(select(func.count()).select_from(TradeRecord)) == 3
+
+        assert OrderBookService.quote(7) == (None, 100)
+        depth = OrderBookService.depth(7)
+
+        # 重启后从数据库重建出相同的盘口
+        OrderBookService.clear()
+        assert await OrderBookService.rebuild(session) == 1
+        assert OrderBookService.depth(7) == depth == {OrderSide.BUY: [], OrderSide.SELL: [(100, 3)]}
+
+        order_id = await session.scalar(select(MarketOrder.id).where(MarketOrder.is_active == True))
+        success, _ = await OrderBookService.cancel_order(session, seller_a, order_id)
+        assert success
+        assert OrderBookService.quote(7) == (None, None)
+        returned = await session.scalar(
+            select(PlayerInventory.quantity).where(PlayerInventory.player_id == seller_a.id)
+        )
+        assert returned == 3
+
+    OrderBookService.clear()
+    await engine.dispose()
@@ -0,0 +1,76 @@
+"""测试玩家资料缓存"""
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.models import Player, SpiritRoot, RealmType
+from bot.models.database import Base
+from bot.services.player_cache import MemoryCacheBackend, PlayerCache
+
+
+async def make_sessionmaker():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def run_read_through(backend):
+    engine, async_session = await make_sessionmaker()
+    await PlayerCache.init(backend)
+
+    async with async_session() as session:
+        player = Player(
+            telegram_id=9, first_name="南宫婉", nickname="南宫婉",
+            realm=RealmType.FOUNDATION, realm_level=1, attack=100, spirit_stones=500,
+        )
+        session.add(player)
+        await session.flush()
+        session.add(SpiritRoot(player_id=player.id, elements=json.dumps(["水"]), purity=90))
+        await session.commit()
+
+    queries = []
+    event.listen(
+        engine.sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: queries.append(statement) if "FROM players" in statement else None,
+    )
+
+    async with async_session() as session:
+        first = await PlayerCache.get_profile(session, 9)
+    async with async_session() as session:
+        second = await PlayerCache.get_profile(session, 9)
+
+    assert first == second
+    assert len(queries) == 1
+    assert first.spirit_root_purity == 90 and first.combat_power > 0
+
+    # 任意会话提交对玩家的修改后缓存失效
+    async with async_session() as session:
+        player = (await session.execute(select(Player).where(Player.telegram_id == 9))).scalar_one()
+        player.spirit_stones += 100
+        await session.commit()
+    await asyncio.sleep(0)
+
+    async with async_session() as session:
+        refreshed = await PlayerCache.get_profile(session, 9)
+
+    await PlayerCache.close()
+    await engine.dispose()
+
+    assert refreshed.spirit_stones == 600
+
+
+@pytest.mark.asyncio
+async def test_read_through_and_invalidation_in_memory():
+    """进程内后端：命中缓存不查库，提交修改后失效"""
+    await run_read_through(MemoryCacheBackend())
+
+
+@pytest.mark.asyncio
+async def test_read_through_and_invalidation_fakeredis():
+    """Redis 替身后端行为一致"""
+    fakeredis = pytest.importorskip("fakeredis")
+    await run_read_through(fakeredis.FakeAsyncRedis(decode_responses=True))
@@ -0,0 +1,71 @@
+"""测试请求级玩家加载"""
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from telegram import Chat, Message, Update, User
+
+from bot.models import Player, PlayerSkill, Skill, SpiritRoot, RealmType
+from bot.models.database import Base
+from bot.services import BattleService, PlayerService
+from bot.utils import player_context
+from bot.utils.player_context import player_session
+
+
+@pytest.mark.asyncio
+async def test_one_player_query_per_update(monkeypatch):
+    """同一更新内处理器、辅助函数和服务层共用一次玩家查询"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(player_context, "AsyncSessionLocal", async_session)
+
+    async with async_session() as session:
+        player = Player(
+            telegram_id=7, first_name="厉飞雨", nickname="厉飞雨",
+            realm=RealmType.QI_REFINING, realm_level=1,
+        )
+        skill = Skill(
+            name="火弹术", description="小火球", skill_type="攻击", element="火",
+            base_power=30, spiritual_cost=10, required_realm=RealmType.QI_REFINING,
+        )
+        session.add_all([player, skill])
+        await session.flush()
+        session.add_all([
+            PlayerSkill(player_id=player.id, skill_id=skill.id),
+            SpiritRoot(player_id=player.id, elements=json.dumps(["火"])),
+        ])
+        await session.commit()
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if "FROM players" in statement:
+            statements.append(statement)
+
+    update = Update(1, message=Message(
+        message_id=1, date=datetime.now(), chat=Chat(7, Chat.PRIVATE),
+        from_user=User(7, "厉飞雨", False), text=".战斗",
+    ))
+    context = SimpleNamespace()
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+
+    async with player_session(update, context, "combat") as (session, loaded):
+        async with player_session(update, context) as (inner_session, again):
+            assert inner_session is session and again is loaded
+        assert await PlayerService.get_player(session, 7) is loaded
+
+        unit = await BattleService.load_combatant(session, loaded)
+
+    await engine.dispose()
+
+    assert len(statements) == 1
+    assert [s.name for s in unit.skills] == ["火弹术"]
+    assert tuple(unit.elements) == ("火",)
+    assert not hasattr(context, "player_scope")
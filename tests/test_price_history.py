@@ -0,0 +1,116 @@
+"""测试成交行情"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.dialects import mysql, postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.api.market_api import get_price
+from bot.models.database import Base
+from bot.models.market import PriceCandle, PricePeriod, TradeRecord
+from bot.services.price_history_service import PriceHistoryService, aggregate_trades, candle_upsert
+
+
+def _trade(at, quantity, unit_price, item_id=7):
+    return TradeRecord(
+        seller_id=1, buyer_id=2, item_id=item_id,
+        quantity=quantity, total_price=quantity * unit_price, traded_at=at,
+    )
+
+
+async def _snapshot(session):
+    result = await session.execute(
+        select(
+            PriceCandle.item_id, PriceCandle.period, PriceCandle.period_start,
+            PriceCandle.open, PriceCandle.high, PriceCandle.low, PriceCandle.close,
+            PriceCandle.volume, PriceCandle.turnover, PriceCandle.trade_count,
+        ).order_by(PriceCandle.item_id, PriceCandle.period, PriceCandle.period_start)
+    )
+    return result.all()
+
+
+@pytest.mark.asyncio
+async def test_candles_follow_trades_and_backfill():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        # 分几次提交，检验增量更新
+        session.add_all([
+            _trade(datetime(2026, 10, 18, 9, 5), 2, 100),
+            _trade(datetime(2026, 10, 18, 9, 40), 1, 130),
+        ])
+        await session.commit()
+        session.add(_trade(datetime(2026, 10, 18, 9, 50), 3, 90))
+        await session.commit()
+        session.add_all([
+            _trade(datetime(2026, 10, 18, 10, 15), 4, 110),
+            _trade(datetime(2026, 10, 18, 10, 20), 1, 500, item_id=8),
+        ])
+        await session.commit()
+
+        hours = await PriceHistoryService.candles(session, 7, PricePeriod.HOUR)
+        assert [(c.period_start.hour, c.open, c.high, c.low, c.close, c.volume) for c in hours] == [
+            (9, 100, 130, 90, 90, 6),
+            (10, 110, 110, 110, 110, 4),
+        ]
+
+        day = await PriceHistoryService.latest(session, 7, PricePeriod.DAY)
+        assert (day.open, day.high, day.low, day.close, day.volume, day.trade_count) == (100, 130, 90, 110, 10, 4)
+        # (200 + 130 + 270 + 440) / 10
+        assert await PriceHistoryService.reference_price(session, 7) == 104
+        assert await PriceHistoryService.reference_price(session, 9) is None
+
+        response = await get_price(7, db=session)
+        assert response.reference_price == 104 and response.hour.close == 110
+
+        # 回填结果与增量更新一致
+        incremental = await _snapshot(session)
+        assert len(incremental) == 5
+        assert await PriceHistoryService.backfill(session) == 5
+        assert await _snapshot(session) == incremental
+        # 已有K线时不重复回填
+        assert await PriceHistoryService.backfill_if_empty(session) == 0
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_candles_are_merged_with_one_upsert_each():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if "price_candles" in statement:
+            statements.append(statement.upper())
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        session.add(_trade(datetime(2026, 10, 18, 9, 5), 2, 100))
+        await session.commit()
+
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        session.add(_trade(datetime(2026, 10, 18, 9, 10), 1, 130))
+        await session.commit()
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+        # 小时线和日线各一条 upsert，不再先 UPDATE 再按需 INSERT
+        assert len(statements) == 2 and all("ON CONFLICT" in s for s in statements)
+        hour = (await PriceHistoryService.candles(session, 7, PricePeriod.HOUR))[0]
+        assert (hour.open, hour.high, hour.close, hour.volume, hour.trade_count) == (100, 130, 130, 3, 2)
+
+    await engine.dispose()
+
+    # PostgreSQL 和 MySQL 同样生成单条 upsert
+    (key, bar), = [(k, b) for k, b in aggregate_trades([(7, datetime(2026, 10, 18, 9, 5), 2, 200)]).items()
+                   if k[1] == PricePeriod.HOUR]
+    assert "ON CONFLICT (item_id, period, period_start) DO UPDATE" in str(
+        candle_upsert("postgresql", key, bar).compile(dialect=postgresql.dialect())
+    )
+    assert "ON DUPLICATE KEY UPDATE" in str(candle_upsert("mysql", key, bar).compile(dialect=mysql.dialect()))
@@ -0,0 +1,59 @@
+"""测试修炼进度"""
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.config.realm_config import RealmConfig
+from bot.models import Player, RealmType
+from bot.models.database import Base
+
+
+def _all_stages():
+    stage = (RealmType.MORTAL, 0)
+    stages = [stage]
+    while RealmConfig.get_next_realm_exp(*stage):
+        stage = RealmConfig.get_next_realm_info(*stage)
+        stages.append(stage)
+    return stages
+
+
+def test_cumulative_exp_matches_breakthrough_costs():
+    """相邻境界的累计修为之差等于突破所需修为"""
+    stages = _all_stages()
+    assert stages[-1] == (RealmType.DEITY_TRANSFORMATION, 2)
+
+    for current, following in zip(stages, stages[1:]):
+        assert (
+            RealmConfig.get_cumulative_exp(*following) - RealmConfig.get_cumulative_exp(*current)
+            == RealmConfig.get_next_realm_exp(*current)
+        )
+
+
+@pytest.mark.asyncio
+async def test_progress_is_unchanged_by_breakthrough():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        player = Player(
+            telegram_id=1, first_name="韩立", nickname="韩立",
+            realm=RealmType.QI_REFINING, realm_level=13, cultivation_exp=2_500_000,
+        )
+        session.add(player)
+        await session.commit()
+        before = player.realm_progress
+        assert before == RealmConfig.get_cumulative_exp(RealmType.QI_REFINING, 13) + 2_500_000
+
+        # 修炼结算
+        player.cultivation_exp += 100
+        assert player.realm_progress == before + 100
+
+        # 突破只是把修为换成境界，进度不变
+        player.realm = RealmType.FOUNDATION
+        player.realm_level = 0
+        player.cultivation_exp -= RealmConfig.get_next_realm_exp(RealmType.QI_REFINING, 13)
+        assert player.realm_progress == before + 100
+        await session.commit()
+
+    await engine.dispose()
@@ -0,0 +1,85 @@
+"""测试批量奖励结算"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.models import Player, WorldBoss, WorldBossParticipation, WorldBossStatus
+from bot.models.database import Base
+from bot.services.reward_settlement import split_by_damage
+from bot.services.world_boss_service import WorldBossService
+
+
+def test_split_by_damage_applies_bonuses():
+    shares = [(1, None, 500), (2, None, 300), (3, None, 200)]
+    payouts = split_by_damage(shares, 1000, 100, final_killer_id=3, final_killer_bonus=1.5, top_damager_bonus=1.3)
+
+    assert [(p.spirit_stones, p.cultivation_exp) for p in payouts] == [(650, 65), (300, 30), (300, 30)]
+    # 最后一击同时是伤害第一时只按最后一击加成
+    payouts = split_by_damage(shares, 1000, 100, final_killer_id=1, final_killer_bonus=1.5, top_damager_bonus=1.3)
+    assert [p.spirit_stones for p in payouts] == [750, 300, 200]
+    assert split_by_damage([(1, None, 0)], 1000, 100) == []
+
+
+def _record_statements(engine):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    return statements, lambda: event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest.mark.asyncio
+async def test_boss_rewards_use_bulk_statements():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        players = [
+            Player(telegram_id=i, first_name=f"修士{i}", nickname=f"修士{i}", spirit_stones=100, cultivation_exp=0)
+            for i in range(1, 51)
+        ]
+        boss = WorldBoss(
+            name="血玉蜘蛛", description="", level=10, max_hp=100, current_hp=0, attack=10, defense=10,
+            status=WorldBossStatus.DEFEATED, total_reward_stones=100000, total_reward_exp=50000,
+            despawn_at=datetime.now() + timedelta(hours=1),
+        )
+        session.add_all([*players, boss])
+        await session.flush()
+        boss.final_killer_id = players[-1].id
+        session.add_all([
+            WorldBossParticipation(boss_id=boss.id, player_id=p.id, total_damage=10 * i, attack_count=1)
+            for i, p in enumerate(players, 1)
+        ])
+        await session.commit()
+
+        statements, stop = _record_statements(engine)
+        await WorldBossService._distribute_rewards(session, boss)
+        stop()
+
+        # 一次查询参与者，玩家和参与记录各一条批量 UPDATE
+        assert len(statements) == 3
+        assert sum(s.lstrip().upper().startswith("UPDATE") for s in statements) == 2
+
+        killer = players[-1]
+        # 会话中已载入的玩家同步为新值，修炼进度随修为一起增加
+        assert killer.spirit_stones == 100 + int(int(100000 * 500 / 12750) * 1.5)
+        assert killer.realm_progress == killer.cultivation_exp == int(int(50000 * 500 / 12750) * 1.5)
+
+    async with async_session() as session:
+        rows = (await session.execute(
+            select(Player.spirit_stones - 100, WorldBossParticipation.reward_stones, WorldBossParticipation.is_rewarded)
+            .join(WorldBossParticipation, WorldBossParticipation.player_id == Player.id)
+        )).all()
+        assert all(gain == reward and rewarded for gain, reward, rewarded in rows)
+        progress = (await session.execute(select(Player.cultivation_exp, Player.realm_progress))).all()
+        assert all(exp > 0 and realm_progress == exp for exp, realm_progress in progress)
+        # 伤害第一即最后一击，只加成一次
+        assert max(reward for _, reward, _ in rows) == int(int(100000 * 500 / 12750) * 1.5)
+
+    await engine.dispose()
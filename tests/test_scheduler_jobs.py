@@ -0,0 +1,175 @@
+"""测试定时任务的批量更新"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot import scheduler as scheduler_module
+from bot.config import settings
+from bot.models import Player, PlayerInventory
+from bot.models.cave_dwelling import CaveDwelling, CaveRoom, CaveRoomType
+from bot.models.market import Market
+from bot.models.database import Base
+from bot.scheduler import GameScheduler
+from bot.services.market_service import MarketService
+
+
+@pytest.mark.asyncio
+async def test_daily_jobs_update_in_batches(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(scheduler_module, "AsyncSessionLocal", async_session)
+    monkeypatch.setattr(settings, "SCHEDULER_BATCH_SIZE", 2)
+
+    now = datetime.now()
+    overdue_days = [0, 20, 31, 35, 45, 60, 90]
+    async with async_session() as session:
+        players = [
+            Player(
+                telegram_id=i, first_name=f"修士{i}", nickname=f"修士{i}",
+                spiritual_power=10, max_spiritual_power=101,
+            )
+            for i in range(len(overdue_days))
+        ]
+        session.add_all(players)
+        await session.flush()
+
+        for player, days in zip(players, overdue_days):
+            cave = CaveDwelling(
+                player_id=player.id,
+                spiritual_density=130 if days == 60 else 500,
+                last_maintenance=now - timedelta(days=days, hours=1),
+            )
+            session.add(cave)
+            await session.flush()
+            # 偶数号玩家建有灵池
+            room_type = CaveRoomType.SPIRIT_POOL if player.id % 2 == 0 else CaveRoomType.STORAGE
+            session.add(CaveRoom(
+                cave_id=cave.id, room_type=room_type.value,
+                room_name=room_type.value, effect_description="",
+            ))
+
+        players[-2].spiritual_power = 95
+        await session.commit()
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    job = GameScheduler()
+    await job._restore_spirit_pool()
+    await job._check_cave_maintenance()
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    async with async_session() as session:
+        power = dict((await session.execute(select(Player.id, Player.spiritual_power))).all())
+        density = dict((await session.execute(
+            select(CaveDwelling.player_id, CaveDwelling.spiritual_density)
+        )).all())
+
+    # 恢复 30% 向下取整，不超过上限
+    assert power == {1: 10, 2: 40, 3: 10, 4: 40, 5: 10, 6: 101, 7: 10}
+    # 31天降5，35天降25，45天及以上降50，不低于100
+    assert density == {1: 500, 2: 500, 3: 495, 4: 475, 5: 450, 6: 100, 7: 450}
+    # 每批一次区间探测和一条 UPDATE，与行数无关
+    assert sum(s.lstrip().upper().startswith("UPDATE") for s in statements) == 8
+    assert not any("FROM players" in s and "UPDATE" not in s and "LIMIT" not in s for s in statements)
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_expired_listings_are_returned_in_batches(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(scheduler_module, "AsyncSessionLocal", async_session)
+    monkeypatch.setattr(settings, "SCHEDULER_BATCH_SIZE", 2)
+
+    now = datetime.now()
+    async with async_session() as session:
+        seller = Player(telegram_id=1, first_name="韩立", nickname="韩立")
+        session.add(seller)
+        await session.flush()
+        session.add(PlayerInventory(player_id=seller.id, item_id=7, quantity=2))
+
+        def listing(item_id, quantity, expires_in, is_sold=False):
+            return Market(
+                seller_id=seller.id, item_id=item_id, inventory_id=1, quantity=quantity,
+                price_per_unit=10, total_price=10 * quantity, is_sold=is_sold,
+                expires_at=now + timedelta(hours=expires_in),
+            )
+
+        session.add_all([
+            listing(7, 1, -3), listing(7, 2, -2), listing(7, 3, -1), listing(8, 4, -1),
+            listing(7, 5, 1), listing(7, 6, -1, is_sold=True),
+        ])
+        await session.commit()
+
+    await GameScheduler()._sweep_expired_listings()
+
+    async with async_session() as session:
+        inventory = (await session.execute(
+            select(PlayerInventory.item_id, PlayerInventory.quantity).order_by(PlayerInventory.item_id)
+        )).all()
+        remaining = (await session.execute(select(Market.quantity).order_by(Market.id))).scalars().all()
+        index_sql = await session.scalar(
+            text("SELECT sql FROM sqlite_master WHERE name = 'ix_markets_unsold_expires_at'")
+        )
+
+    # 过期物品合并回原有堆叠，售出和未过期的记录保留
+    assert inventory == [(7, 8), (8, 4)]
+    assert remaining == [5, 6]
+    assert "WHERE is_sold = 0" in index_sql
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_cancel_racing_the_sweep_returns_items_once(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(scheduler_module, "AsyncSessionLocal", async_session)
+
+    async with async_session() as session:
+        seller = Player(telegram_id=1, first_name="韩立", nickname="韩立")
+        session.add(seller)
+        await session.flush()
+        listing = Market(
+            seller_id=seller.id, item_id=7, inventory_id=1, quantity=3, price_per_unit=10,
+            total_price=30, expires_at=datetime.now() - timedelta(minutes=1),
+        )
+        session.add(listing)
+        await session.commit()
+
+        # 取消上架读到订单之后，整点清理抢先退还并删除了它
+        execute = session.execute
+        swept = []
+
+        async def execute_then_sweep(*args, **kwargs):
+            result = await execute(*args, **kwargs)
+            if not swept:
+                swept.append(await GameScheduler()._sweep_expired_listings())
+            return result
+
+        monkeypatch.setattr(session, "execute", execute_then_sweep)
+        success, _ = await MarketService.cancel_market_listing(session, seller, listing.id)
+        assert not success and swept
+
+    async with async_session() as session:
+        inventory = (await session.execute(select(PlayerInventory.quantity))).scalars().all()
+        assert inventory == [3]
+        assert not (await session.execute(select(Market.id))).all()
+
+    await engine.dispose()
@@ -0,0 +1,54 @@
+"""测试 Webhook 端点"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from telegram.ext import Application
+
+from bot.api.telegram_webhook import create_webhook_router
+
+# 录制的真实更新（群内 .战斗 命令）
+RECORDED_UPDATE = {
+    "update_id": 10001,
+    "message": {
+        "message_id": 42,
+        "date": 1700000000,
+        "chat": {"id": -1001, "type": "supergroup", "title": "修仙群"},
+        "from": {"id": 123456, "is_bot": False, "first_name": "韩立"},
+        "text": ".战斗 妖狼",
+    },
+}
+
+
+def make_client(secret: str = ""):
+    application = Application.builder().token("123:TEST").build()
+    app = FastAPI()
+    app.include_router(create_webhook_router(application, "/telegram/webhook", secret))
+    return application, TestClient(app)
+
+
+def test_update_enqueued():
+    """POST 的更新进入 Application.update_queue"""
+    application, client = make_client()
+
+    response = client.post("/telegram/webhook", json=RECORDED_UPDATE)
+
+    assert response.status_code == 200
+    update = application.update_queue.get_nowait()
+    assert update.update_id == 10001
+    assert update.effective_user.id == 123456
+    assert update.message.text == ".战斗 妖狼"
+
+
+def test_secret_and_bad_payload_rejected():
+    """密钥不符返回403，无效数据返回400，均不入队"""
+    application, client = make_client(secret="s3cret")
+
+    assert client.post("/telegram/webhook", json=RECORDED_UPDATE).status_code == 403
+    assert client.post(
+        "/telegram/webhook", json={"message": {}},
+        headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"},
+    ).status_code == 400
+    assert client.post(
+        "/telegram/webhook", json=RECORDED_UPDATE,
+        headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"},
+    ).status_code == 200
+    assert application.update_queue.qsize() == 1
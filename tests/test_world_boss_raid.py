@@ -0,0 +1,187 @@
+"""测试世界BOSS战斗状态的写后持久化"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.config import settings
+from bot.models import Player, WorldBoss, WorldBossParticipation, WorldBossStatus
+from bot.models.database import Base
+from bot.services import LeaderboardService, world_boss_raid
+from bot.services.world_boss_raid import WorldBossRaids
+from bot.services.world_boss_service import WorldBossService
+
+
+@pytest_asyncio.fixture
+async def async_session(monkeypatch, tmp_path):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(world_boss_raid, "AsyncSessionLocal", async_session)
+    monkeypatch.setattr(settings, "RAID_JOURNAL_DIR", str(tmp_path))
+    yield async_session
+
+    await WorldBossRaids.stop()
+    await engine.dispose()
+
+
+async def _setup(async_session, max_hp, players=2):
+    async with async_session() as session:
+        heroes = [
+            Player(
+                telegram_id=i, first_name=f"修士{i}", nickname=f"修士{i}",
+                spirit_stones=0, cultivation_exp=0,
+            )
+            for i in range(1, players + 1)
+        ]
+        boss = WorldBoss(
+            name="血玉蜘蛛", description="", level=10, max_hp=max_hp, current_hp=max_hp,
+            attack=100, defense=0, total_reward_stones=10000, total_reward_exp=5000,
+            despawn_at=datetime.now() + timedelta(hours=2),
+        )
+        session.add_all([*heroes, boss])
+        await session.commit()
+        return heroes, boss
+
+
+def _crash():
+    """模拟进程崩溃：丢弃内存状态，不写回"""
+    for raid in WorldBossRaids._raids.values():
+        raid.close()
+    WorldBossRaids._raids = {}
+
+
+@pytest.mark.asyncio
+async def test_hits_are_written_behind_and_recovered_from_journal(async_session):
+    (han, li), boss = await _setup(async_session, max_hp=10 ** 9)
+    engine = async_session.kw["bind"].sync_engine
+
+    async with async_session() as session:
+        await WorldBossRaids.get(boss.id)
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        for player in (han, li, han, han, li):
+            success, _, _ = await WorldBossService.attack_boss(session, player, boss.id)
+            assert success
+        event.remove(engine, "before_cursor_execute", record)
+        # 攻击期间不访问数据库
+        assert statements == []
+
+        raid = WorldBossRaids.peek(boss.id)
+        damage, hp = dict(raid.damage), raid.current_hp
+        assert raid.attacks == {han.id: 3, li.id: 2}
+
+        await WorldBossRaids.flush()
+        await WorldBossService.attack_boss(session, li, boss.id)
+        damage_after, hp_after = dict(raid.damage), raid.current_hp
+
+    async with async_session() as session:
+        rows = (await session.execute(
+            select(WorldBossParticipation.player_id, WorldBossParticipation.total_damage)
+        )).all()
+        stored = await session.get(WorldBoss, boss.id)
+        assert dict(rows) == damage
+        assert (stored.current_hp, stored.journal_seq) == (hp, 5)
+
+    # 第6次攻击只在日志中，重启后重放恢复，已写回的5次不重复计算
+    _crash()
+    raid = await WorldBossRaids.get(boss.id)
+    assert (raid.damage, raid.current_hp) == (damage_after, hp_after)
+    assert raid.attacks == {han.id: 3, li.id: 3}
+    await WorldBossRaids.flush()
+
+    async with async_session() as session:
+        counts = (await session.execute(
+            select(WorldBossParticipation.player_id, WorldBossParticipation.attack_count)
+        )).all()
+        assert dict(counts) == {han.id: 3, li.id: 3}
+
+
+@pytest.mark.asyncio
+async def test_killing_blow_settles_exactly_once(async_session):
+    heroes, boss = await _setup(async_session, max_hp=800, players=5)
+
+    async def attack(player):
+        async with async_session() as session:
+            return await WorldBossService.attack_boss(session, player, boss.id)
+
+    results = await asyncio.gather(*(attack(p) for p in heroes * 2))
+    kills = [data for success, _, data in results if success and data["is_defeated"]]
+    assert len(kills) == 1
+    # 击败之后的攻击被拒绝
+    assert any(not success for success, _, _ in results)
+
+    # 再次结算不会重复发放
+    assert not await WorldBossRaids.settle(WorldBossRaids.peek(boss.id))
+    await WorldBossRaids.flush()
+
+    async with async_session() as session:
+        stored = await session.get(WorldBoss, boss.id)
+        assert stored.status == WorldBossStatus.DEFEATED and stored.final_killer_id is not None
+        rewards = dict((await session.execute(
+            select(WorldBossParticipation.player_id, WorldBossParticipation.reward_stones)
+        )).all())
+        stones = dict((await session.execute(select(Player.id, Player.spirit_stones))).all())
+        assert stones == rewards and sum(rewards.values()) > 0
+    # 结算后释放状态和日志
+    assert WorldBossRaids.peek(boss.id) is None
+
+
+@pytest.mark.asyncio
+async def test_kill_in_journal_is_settled_on_restart(async_session, tmp_path):
+    (han, li), boss = await _setup(async_session, max_hp=100)
+    now = datetime.now().timestamp()
+    # 最后一击已写入日志但未结算就崩溃，末尾是写了一半的行
+    (tmp_path / f"boss_{boss.id}.journal").write_text(
+        f"1 {han.id} 60 {now}\n2 {li.id} 70 {now}\n3 {han.id}"
+    )
+
+    assert await WorldBossRaids.start() == 1
+
+    async with async_session() as session:
+        stored = await session.get(WorldBoss, boss.id)
+        assert stored.status == WorldBossStatus.DEFEATED
+        assert (stored.final_killer_id, stored.current_hp, stored.journal_seq) == (li.id, 0, 2)
+        assert (await session.get(Player, li.id)).spirit_stones > 0
+
+
+@pytest.mark.asyncio
+async def test_live_rankings_are_served_from_memory(async_session):
+    heroes, boss = await _setup(async_session, max_hp=10 ** 9, players=4)
+    engine = async_session.kw["bind"].sync_engine
+
+    async with async_session() as session:
+        await LeaderboardService.rebuild(session)
+        raid = await WorldBossRaids.get(boss.id)
+        for player, damage in zip(heroes * 2, [50, 300, 80, 10, 200, 20, 30, 10]):
+            WorldBossRaids.hit(raid, player.id, damage)
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            rankings = await WorldBossService.get_damage_rankings(session, boss.id, limit=3)
+            mine = await WorldBossService.get_player_participation(session, heroes[2].id, boss.id)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+            LeaderboardService.clear()
+
+    assert statements == []
+    # 伤害: 1 号 250，2 号 320，3 号 110，4 号 20
+    assert [(r["nickname"], r["total_damage"]) for r in rankings] == [("修士2", 320), ("修士1", 250), ("修士3", 110)]
+    assert (mine["rank"], mine["damage_to_next"], mine["attack_count"]) == (3, 140, 2)
+    assert raid.standing(heroes[1].id) == (1, 0)
+    assert raid.standing(999) is None